@@ -0,0 +1,79 @@
+"""Бенчмарк сетки доступности: python -m benchmarks.bench_availability"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from inbibe_bot.config import AppConfig
+from inbibe_bot.core.availability import AvailabilityGrid
+from inbibe_bot.core.occupancy import InMemoryTableOccupancy, Reservation, ReservationEvent, TableOccupancy
+
+# Столы по умолчанию из AppConfig
+TABLES = (1, 2, 3, 4, 5, 6, 11, 12, 13, 14, 15, 16, 17, 18, 21, 22, 23, 24, 25, 31, 32, 33, 34, 35, 36, 37, 38, 39)
+HORIZON_DAYS = 31
+NUMBER = 2_000
+
+
+def _bench(fn: Callable[[], object], number: int) -> float:
+    """Среднее время одного вызова в микросекундах (лучший из 3 прогонов)."""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def _fill(occupancy: TableOccupancy, today: date, load: float) -> None:
+    """Занимает долю load столов каждый вечер горизонта: брони по 2 часа с 15:00 до 23:00."""
+    busy_tables = TABLES[: int(len(TABLES) * load)]
+    for day in range(HORIZON_DAYS):
+        evening = datetime.combine(today + timedelta(days=day), datetime.min.time()) + timedelta(hours=15)
+        for slot in range(4):
+            start = evening + timedelta(hours=2 * slot)
+            for table in busy_tables:
+                occupancy.reserve(f"{day}-{slot}-{table}", {table}, start)
+
+
+def run(number: int = NUMBER) -> dict[str, dict[str, float]]:
+    today = date.today()
+    capacities = {t: 4 for t in TABLES}
+    results: dict[str, dict[str, float]] = {}
+    for load in (0.0, 0.5, 1.0):
+        occupancy = InMemoryTableOccupancy(TABLES, timedelta(minutes=120))
+        grid = AvailabilityGrid(occupancy, capacities, HORIZON_DAYS, today)
+        _fill(occupancy, today, load)
+        grid.attach()
+        # Без пересчёта «сегодня» по МСК бенчмарк не зависит от часового пояса машины
+        grid._sync_day = lambda: None  # type: ignore[method-assign]
+
+        day = today + timedelta(days=7)
+        start = datetime.combine(day, datetime.min.time()) + timedelta(hours=19)
+        probe = Reservation("probe", frozenset({TABLES[-1]}), start, start + timedelta(hours=2))
+
+        def update() -> None:
+            grid.apply(ReservationEvent.RESERVED, probe)
+            grid.apply(ReservationEvent.RELEASED, probe)
+
+        results[f"load_{int(load * 100)}"] = {
+            "update_reserve_release_us": round(_bench(update, number), 2),
+            "full_slots_us": round(_bench(lambda: grid.full_slots(day, 4), number), 2),
+            "free_capacity_us": round(_bench(lambda: grid.free_capacity(day), number), 2),
+            "free_tables_us": round(_bench(lambda: grid.free_tables(start, 4), number), 2),
+            "interval_free_tables_us": round(_bench(lambda: occupancy.free_tables(start), number), 2),
+            "rebuild_ms": round(_bench(lambda: grid.rebuild(occupancy.list_all()), 20) / 1000, 2),
+        }
+    return results
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    for load, metrics in results.items():
+        print(load)
+        for name, value in metrics.items():
+            print(f"  {name:<28} {value:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Микробенчмарк кодека callback_data: python -m benchmarks.bench_callback_codec"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from datetime import datetime
+from typing import Callable
+
+from inbibe_bot.client.callbacks import CallbackData
+from inbibe_bot.shared.id_gen import gen_id
+
+NUMBER = 100_000
+
+
+def _legacy_parse_time(data: str) -> datetime:
+    return datetime.strptime(data[len(CallbackData.LEGACY_TIME):], "%Y-%m-%d_%H:%M")
+
+
+def _bench(fn: Callable[[], object], number: int) -> float:
+    """Возвращает среднее время одного вызова в наносекундах (лучший из 3 прогонов)."""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e9
+
+
+def run(number: int = NUMBER) -> dict[str, dict[str, float | int]]:
+    booking_id = gen_id()
+    dt = datetime(2025, 10, 5, 19, 45)
+    cases: dict[str, tuple[Callable[[], object], str]] = {}
+
+    v2_time = CallbackData.encode_time(dt)
+    v2_table = CallbackData.encode_table(booking_id, 12)
+    v2_approve = CallbackData.encode_approve_alt(booking_id)
+    v1_time = f"time_{dt:%Y-%m-%d_%H:%M}"
+    v1_table = f"table_{booking_id}_12"
+    v1_approve = f"approve_alt_{booking_id}"
+
+    cases["encode_time_v2"] = (lambda: CallbackData.encode_time(dt), v2_time)
+    cases["decode_time_v2"] = (lambda: CallbackData.parse_time(v2_time), v2_time)
+    cases["decode_time_v1"] = (lambda: CallbackData.parse_time(v1_time), v1_time)
+    cases["decode_time_v1_strptime"] = (lambda: _legacy_parse_time(v1_time), v1_time)
+    cases["encode_table_v2"] = (lambda: CallbackData.encode_table(booking_id, 12), v2_table)
+    cases["decode_table_v2"] = (lambda: CallbackData.parse_table(v2_table), v2_table)
+    cases["decode_table_v1"] = (lambda: CallbackData.parse_table(v1_table), v1_table)
+    cases["encode_approve_alt_v2"] = (lambda: CallbackData.encode_approve_alt(booking_id), v2_approve)
+    cases["decode_approve_alt_v2"] = (lambda: CallbackData.parse_booking_id(v2_approve), v2_approve)
+    cases["decode_approve_alt_v1"] = (lambda: CallbackData.parse_booking_id(v1_approve), v1_approve)
+
+    return {
+        name: {"ns_per_op": round(_bench(fn, number), 1), "bytes": len(sample.encode("utf-8"))}
+        for name, (fn, sample) in cases.items()
+    }
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        print(f"{name:<28} {r['ns_per_op']:>10.1f} ns/op  {r['bytes']:>3} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Конкурентный доступ к хранилищу заявок: одна RLock против ConcurrentMap: python -m benchmarks.bench_concurrent_map
+
+Смесь операций как у репозиториев под нагрузкой: чтение по ключу (require), обход всех значений
+(list_active, датчики метрик, сохранение) и запись (update). Потоки стартуют одновременно и выполняют
+по OPS_PER_THREAD операций; считаются суммарная пропускная способность и хвост задержки операции.
+"""
+from __future__ import annotations
+
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from threading import RLock
+from typing import Any, Iterator, Protocol
+
+from benchmarks.harness import percentiles
+from inbibe_bot.shared.tracing import TracedLock
+from inbibe_bot.storage.concurrent_map import ConcurrentMap
+
+THREADS = (1, 8, 32)
+OPS_PER_THREAD = 5_000
+KEYS = 200
+# Доли: чтение по ключу, обход, запись
+MIX = (0.80, 0.10, 0.10)
+
+
+class _Map(Protocol):
+    def get(self, key: str) -> int | None: ...
+    def values(self) -> list[int]: ...
+    def put(self, key: str, value: int) -> int | None: ...
+    def locked(self, key: str) -> Any: ...
+
+
+class _StripedMap:
+    """Схема репозиториев: ConcurrentMap, обход — по согласованному снимку."""
+
+    def __init__(self) -> None:
+        self._map: ConcurrentMap[str, int] = ConcurrentMap("lock.bench")
+
+    def get(self, key: str) -> int | None:
+        return self._map.get(key)
+
+    def values(self) -> list[int]:
+        return list(self._map.snapshot().values())
+
+    def put(self, key: str, value: int) -> int | None:
+        return self._map.put(key, value)
+
+    def locked(self, key: str) -> Any:
+        return self._map.locked(key)
+
+
+class _GlobalLockMap:
+    """Прежняя схема репозиториев: словарь под одной RLock на все операции."""
+
+    def __init__(self) -> None:
+        self._data: dict[str, int] = {}
+        self._lock = TracedLock(RLock(), "lock.bench")
+
+    def get(self, key: str) -> int | None:
+        with self._lock:
+            return self._data.get(key)
+
+    def values(self) -> list[int]:
+        with self._lock:
+            return list(self._data.values())
+
+    def put(self, key: str, value: int) -> int | None:
+        with self._lock:
+            previous = self._data.get(key)
+            self._data[key] = value
+            return previous
+
+    @contextmanager
+    def locked(self, key: str) -> Iterator[None]:
+        with self._lock:
+            yield
+
+
+def _worker(store: _Map, seed: int, start: threading.Barrier, latencies: list[float]) -> None:
+    rng = random.Random(seed)
+    keys = [f"b{rng.randrange(KEYS)}" for _ in range(OPS_PER_THREAD)]
+    kinds = rng.choices(range(3), weights=MIX, k=OPS_PER_THREAD)
+    own: list[float] = []
+    start.wait()
+    for key, kind in zip(keys, kinds):
+        started = time.perf_counter_ns()
+        if kind == 0:
+            store.get(key)
+        elif kind == 1:
+            next((v for v in store.values() if v < 0), None)
+        else:
+            with store.locked(key):
+                store.put(key, (store.get(key) or 0) + 1)
+        own.append((time.perf_counter_ns() - started) / 1e6)
+    latencies.extend(own)
+
+
+def _run(store: _Map, threads: int) -> dict[str, Any]:
+    for i in range(KEYS):
+        store.put(f"b{i}", i)
+    start = threading.Barrier(threads + 1)
+    latencies: list[float] = []
+    workers = [
+        threading.Thread(target=_worker, args=(store, i, start, latencies)) for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return {"ops_per_s": round(threads * OPS_PER_THREAD / elapsed), "latency": percentiles(latencies)}
+
+
+def run() -> dict[str, dict[str, Any]]:
+    results: dict[str, dict[str, Any]] = {}
+    for threads in THREADS:
+        results[str(threads)] = {
+            "global_lock": _run(_GlobalLockMap(), threads),
+            "concurrent_map": _run(_StripedMap(), threads),
+        }
+    return results
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'потоков':<9}{'хранилище':<16}{'опер/с':>10}{'p50':>9}{'p99':>9}{'max':>9}  (мс)")
+    for threads, by_store in results.items():
+        for name, r in by_store.items():
+            lat = r["latency"]
+            print(f"{threads:<9}{name:<16}{r['ops_per_s']:>10}{lat['p50_ms']:>9}{lat['p99_ms']:>9}{lat['max_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
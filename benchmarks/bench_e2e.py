@@ -0,0 +1,326 @@
+"""Сквозной бенчмарк на реальном графе зависимостей: python -m benchmarks.bench_e2e [--flows N] [--json] [--out FILE]
+
+Telegram подменён транспортом в памяти, апдейты идут через bot.process_new_updates,
+заявки из VK — через Flask test client на /api/book. Результат — JSON, пригодный
+для сравнения между коммитами.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+import telebot
+
+from benchmarks.fake_telegram import FakeTelegram
+from benchmarks.harness import bench_config, git_commit, percentiles
+from inbibe_bot.bootstrap import AppContext, build_context
+from inbibe_bot.client.callbacks import CallbackData
+from inbibe_bot.config import AppConfig
+from inbibe_bot.core.booking import Booking, Source
+from inbibe_bot.core.occupancy import InMemoryTableOccupancy
+from inbibe_bot.server.routes import build_app
+from inbibe_bot.shared.datetime_utils import MSK
+from inbibe_bot.storage.booking_repository import BookingRepository, InMemoryBookingRepository
+from inbibe_bot.storage.delivery_queue import InMemoryBookingQueue
+from inbibe_bot.storage.ephemeral_messages import InMemoryEphemeralMessages
+from inbibe_bot.storage.persistence import StatePersister
+from inbibe_bot.storage.reservation_history import ReservationHistory
+from inbibe_bot.storage.user_flow_repository import InMemoryUserFlowRepository
+
+ADMIN_GROUP_ID = -1001
+ADMIN_USER_ID = 7
+FIRST_USER_ID = 100_000
+STATE_SIZES = (0, 100, 1_000, 5_000)
+
+
+class Driver:
+    """Генерирует апдейты Telegram и замеряет время их обработки по имени хэндлера."""
+
+    def __init__(self, app: AppContext, telegram: FakeTelegram, seed: int) -> None:
+        self.app = app
+        self.bot = app.deps.bot
+        self.telegram = telegram
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self._rng = random.Random(seed)
+        self._update_ids = itertools.count(1)
+        self._http = build_app(app.server_deps).test_client()
+
+    def run_flow(self, n: int) -> None:
+        user = FIRST_USER_ID + n
+        self._send("cmd_start", self._message(user, "/start"))
+        self._send("handle_message", self._message(user, f"Гость {n}"))
+        self._send("handle_message", self._message(user, "+79991234567"))
+        dates = self.telegram.last_markup[user]["inline_keyboard"]
+        day = self._rng.choice([b for row in dates for b in row])
+        self._send(
+            "handle_date_callback",
+            self._callback(user, user, day["callback_data"], self.telegram.last_markup_message[user]),
+        )
+        times = [
+            b for row in self.telegram.last_markup[user]["inline_keyboard"] for b in row
+            if b["callback_data"] != CallbackData.IGNORE
+        ]
+        slot = self._rng.choice(times)
+        self._send(
+            "handle_time_callback",
+            self._callback(user, user, slot["callback_data"], self.telegram.last_markup_message[user]),
+        )
+        self._send("handle_message", self._message(user, str(self._rng.randint(1, 8))))
+        self.review(self._carded_booking(), n % 4)
+
+    def run_api_booking(self, n: int) -> None:
+        start = datetime.now(MSK) + timedelta(days=1 + n % 30, hours=n % 5)
+        body = {
+            "user_id": FIRST_USER_ID + n,
+            "name": f"VK {n}",
+            "phone": "+79991234567",
+            "date_time": start.replace(minute=0, second=0, microsecond=0).isoformat(),
+            "guests": 1 + n % 6,
+        }
+        started = time.perf_counter()
+        response = self._http.post("/api/book", data=json.dumps(body), content_type="application/json")
+        self.samples["api_book"].append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/book вернул {response.status_code}: {response.get_data(as_text=True)}")
+        self.review(self._carded_booking(), 3)
+
+    def _carded_booking(self) -> Booking:
+        """Заявка с последней карточки в админ-чате — по id из её кнопки «Отклонить»."""
+        data = _find(self.telegram.last_markup[ADMIN_GROUP_ID], CallbackData.REJECT)
+        if data is None:
+            raise RuntimeError("В админ-чат не пришла карточка заявки")
+        return self.app.deps.booking_repo.require(CallbackData.parse_booking_id(data))
+
+    def review(self, booking: Booking, scenario: int) -> None:
+        """0 — стол кнопкой, 1 — смена даты и стол reply, 2 — отказ, 3 — подсказка с карточки."""
+        card = self.telegram.last_markup[ADMIN_GROUP_ID]
+        card_id = self.telegram.last_markup_message[ADMIN_GROUP_ID]
+        if scenario == 3:
+            suggestion = _find(card, CallbackData.ASSIGN)
+            if suggestion:
+                self._admin_callback("handle_suggested_tables", suggestion, card_id)
+                return
+            scenario = 2
+        if scenario == 2:
+            self._admin_callback("handle_reject", CallbackData.encode_reject(booking.id), card_id)
+            return
+        if scenario == 1:
+            repo = self.app.deps.booking_repo
+            self._admin_callback("handle_approve_alt", CallbackData.encode_approve_alt(booking.id), card_id)
+            # Репозиторий выдаёт копии: id запросов, записанные хэндлерами, видны только после перечитывания
+            booking = repo.require(booking.id)
+            new_dt = booking.date_time + timedelta(days=1)
+            self._send(
+                "handle_alt_datetime_reply",
+                self._message(ADMIN_GROUP_ID, f"{new_dt:%d.%m.%y %H:%M}", reply_to=booking.alt_request_message_id),
+            )
+            booking = repo.require(booking.id)
+            table = _first_table(self.telegram.last_markup[ADMIN_GROUP_ID])
+            if table is None:
+                self._admin_callback("handle_reject", CallbackData.encode_reject(booking.id), card_id)
+                return
+            self._send(
+                "handle_table_reply",
+                self._message(ADMIN_GROUP_ID, str(table), reply_to=booking.table_request_message_id),
+            )
+            return
+        self._admin_callback("handle_approve", CallbackData.encode_approve(booking.id), card_id)
+        table = _first_table(self.telegram.last_markup[ADMIN_GROUP_ID])
+        if table is None:
+            self._admin_callback("handle_reject", CallbackData.encode_reject(booking.id), card_id)
+            return
+        self._admin_callback(
+            "handle_table_inline",
+            CallbackData.encode_table(booking.id, table),
+            self.telegram.last_markup_message[ADMIN_GROUP_ID],
+        )
+
+    def _admin_callback(self, handler: str, data: str, message_id: int) -> None:
+        self._send(handler, self._callback(ADMIN_USER_ID, ADMIN_GROUP_ID, data, message_id))
+
+    def _send(self, handler: str, update: dict[str, Any]) -> None:
+        update["update_id"] = next(self._update_ids)
+        parsed = telebot.types.Update.de_json(update)
+        started = time.perf_counter()
+        self.bot.process_new_updates([parsed])
+        self.samples[handler].append((time.perf_counter() - started) * 1000)
+
+    def _message(self, chat_id: int, text: str, reply_to: int | None = None) -> dict[str, Any]:
+        chat_type = "supergroup" if chat_id < 0 else "private"
+        message: dict[str, Any] = {
+            "message_id": self.telegram.next_message_id(),
+            "date": 0,
+            "chat": {"id": chat_id, "type": chat_type},
+            "from": {"id": chat_id if chat_id > 0 else ADMIN_USER_ID, "is_bot": False, "first_name": "u"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        if reply_to is not None:
+            message["reply_to_message"] = {"message_id": reply_to, "date": 0, "chat": {"id": chat_id, "type": chat_type}}
+        return {"message": message}
+
+    def _callback(self, user: int, chat_id: int, data: str, message_id: int) -> dict[str, Any]:
+        return {
+            "callback_query": {
+                "id": str(self.telegram.next_message_id()),
+                "from": {"id": user, "is_bot": False, "first_name": "u"},
+                "chat_instance": "bench",
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": 0,
+                    "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+                },
+            }
+        }
+
+
+def _find(markup: dict[str, Any], prefix: str) -> str | None:
+    for row in markup.get("inline_keyboard", []):
+        for button in row:
+            if button["callback_data"].startswith(prefix):
+                return str(button["callback_data"])
+    return None
+
+
+def _first_table(markup: dict[str, Any]) -> int | None:
+    data = _find(markup, CallbackData.TABLE)
+    return CallbackData.parse_table(data)[1] if data else None
+
+
+def _persistence_cost(config: AppConfig, workdir: Path) -> list[dict[str, float | int]]:
+    """Стоимость StatePersister.save/load в зависимости от числа заявок в работе."""
+    results: list[dict[str, float | int]] = []
+    bot = telebot.TeleBot(config.tg_api_key, threaded=False)
+    for size in STATE_SIZES:
+        path = workdir / f"state_{size}.json"
+
+        def persister(bookings: BookingRepository) -> StatePersister:
+            return StatePersister(
+                path=path,
+                bookings=bookings,
+                flows=InMemoryUserFlowRepository(),
+                queue=InMemoryBookingQueue(),
+                ephemeral=InMemoryEphemeralMessages(bot),
+                occupancy=InMemoryTableOccupancy(config.actual_tables, timedelta(minutes=config.booking_duration_min)),
+                history=ReservationHistory(workdir / f"history_{size}.jsonl"),
+            )
+
+        repo = InMemoryBookingRepository()
+        start = datetime.now(MSK).replace(tzinfo=None, microsecond=0)
+        for i in range(size):
+            repo.add(Booking(
+                id=f"b{i:06d}", user_id=FIRST_USER_ID + i, name=f"Гость {i}", phone="+79991234567",
+                date_time=start + timedelta(hours=i % 700), guests=1 + i % 8, source=Source.TG,
+                admin_message_id=i,
+            ))
+        saver = persister(repo)
+        save_ms = _best_of(saver.save, 5)
+        load_ms = _best_of(lambda: persister(InMemoryBookingRepository()).load(), 5)
+        results.append({
+            "bookings": size,
+            "bytes": path.stat().st_size,
+            "save_ms": round(save_ms, 3),
+            "load_ms": round(load_ms, 3),
+        })
+    return results
+
+
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def run(flows: int, seed: int = 1) -> dict[str, Any]:
+    commit = git_commit()
+    telegram = FakeTelegram()
+    telegram.install()
+    previous_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="inbibe-bench-") as tmp:
+            workdir = Path(tmp)
+            # Реестры пользователей пишутся в ./data
+            os.chdir(workdir)
+            config = bench_config(workdir, ADMIN_GROUP_ID)
+            app = build_context(config, bot=telebot.TeleBot(config.tg_api_key, threaded=False))
+            driver = Driver(app, telegram, seed)
+
+            started = time.perf_counter()
+            for n in range(flows):
+                driver.run_flow(n)
+                if n % 2 == 0:
+                    driver.run_api_booking(n)
+            elapsed = time.perf_counter() - started
+
+            updates = sum(len(s) for name, s in driver.samples.items() if name != "api_book")
+            requests = len(driver.samples["api_book"])
+            return {
+                "meta": {
+                    "commit": commit,
+                    "python": platform.python_version(),
+                    "flows": flows,
+                    "seed": seed,
+                },
+                "throughput": {
+                    "updates": updates,
+                    "http_requests": requests,
+                    "seconds": round(elapsed, 3),
+                    "events_per_s": round((updates + requests) / elapsed, 1),
+                },
+                "handlers": {name: percentiles(s) for name, s in sorted(driver.samples.items())},
+                "telegram_calls": dict(sorted(telegram.calls.items())),
+                "state": {
+                    "active_bookings": len(app.deps.booking_repo.list_all()),
+                    "state_bytes": config.state_file.stat().st_size if config.state_file.exists() else 0,
+                },
+                "persistence": _persistence_cost(config, workdir),
+            }
+    finally:
+        os.chdir(previous_cwd)
+        telegram.uninstall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--flows", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    parser.add_argument("--out", type=Path, help="дополнительно записать JSON в файл")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    results = run(args.flows, args.seed)
+    if args.out:
+        args.out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    t = results["throughput"]
+    print(f"{t['updates']} апдейтов + {t['http_requests']} HTTP за {t['seconds']} с — {t['events_per_s']}/с")
+    print(f"{'handler':<28}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (мс)")
+    for name, s in results["handlers"].items():
+        print(f"{name:<28}{s['count']:>7}{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}")
+    print("persistence:")
+    for row in results["persistence"]:
+        print(f"  {row['bookings']:>6} заявок  {row['bytes']:>9} байт  save {row['save_ms']} мс  load {row['load_ms']} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Стоимость записи метрик и сборки /api/metrics: python -m benchmarks.bench_metrics"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from typing import Callable
+
+from inbibe_bot.shared.metrics import MetricsRegistry
+
+NUMBER = 200_000
+THREADS = (1, 8)
+
+
+def _per_op_ns(op: Callable[[], None], threads: int, number: int) -> float:
+    """Среднее время одной операции в потоке, нс; все потоки стартуют одновременно."""
+    barrier = threading.Barrier(threads + 1)
+    elapsed: list[int] = []
+
+    def worker() -> None:
+        barrier.wait()
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            op()
+        elapsed.append(time.perf_counter_ns() - started)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    for w in workers:
+        w.join()
+    # Под GIL потоки чередуются: чистое время операции — суммарное время потоков / число операций / потоки
+    return max(elapsed) / (number * threads)
+
+
+def run(number: int = NUMBER) -> dict[str, dict[str, float]]:
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_events", "bench", ("handler",))
+    histogram = registry.histogram("bench_seconds", "bench", ("handler",))
+    results: dict[str, dict[str, float]] = {}
+    for threads in THREADS:
+        results[f"counter_inc_t{threads}"] = {
+            "ns_per_op": round(_per_op_ns(lambda: counter.inc("handle_approve"), threads, number), 1)
+        }
+        results[f"histogram_observe_t{threads}"] = {
+            "ns_per_op": round(_per_op_ns(lambda: histogram.observe(0.0042, "handle_approve"), threads, number), 1)
+        }
+    started = time.perf_counter_ns()
+    text = registry.render()
+    results["render"] = {"ns_per_op": round(time.perf_counter_ns() - started, 1), "bytes": len(text)}
+    return results
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        print(f"{name:<24} {r['ns_per_op']:>12.1f} ns/op")
+
+
+if __name__ == "__main__":
+    main()
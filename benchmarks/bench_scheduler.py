@@ -0,0 +1,103 @@
+"""Задержка действий админа во время наплыва пользователей: python -m benchmarks.bench_scheduler [--json]
+
+Пул telebot (FIFO) против UpdateScheduler при одинаковом числе потоков. Пользовательский хэндлер
+занят USER_HANDLER_MS (ответ Telegram через прокси), на фоне RUSH сообщений приходят ADMIN_ACTIONS
+нажатий в админ-чате; меряется время от process_new_updates до начала админского хэндлера.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from typing import Any
+
+import telebot
+from telebot.types import CallbackQuery, Message
+
+from benchmarks.harness import percentiles
+from inbibe_bot.client.scheduler import Priority, UpdateScheduler
+
+ADMIN_GROUP_ID = -1001
+THREADS = 4
+RUSH = 300
+ADMIN_ACTIONS = 20
+ADMIN_INTERVAL_S = 0.01
+USER_HANDLER_MS = 20
+USER_TEXT_QUEUE = 100
+
+
+def _text(n: int) -> telebot.types.Update:
+    update: telebot.types.Update = telebot.types.Update.de_json({"update_id": n, "message": {
+        "message_id": n, "date": 0, "chat": {"id": 100_000 + n, "type": "private"}, "text": f"Гость {n}",
+    }})
+    return update
+
+
+def _admin_tap(n: int) -> telebot.types.Update:
+    update: telebot.types.Update = telebot.types.Update.de_json({"update_id": 10_000 + n, "callback_query": {
+        "id": str(n), "chat_instance": "bench", "data": "approve_x",
+        "from": {"id": 7, "is_bot": False, "first_name": "admin"},
+        "message": {"message_id": 1, "date": 0, "chat": {"id": ADMIN_GROUP_ID, "type": "supergroup"}},
+    }})
+    return update
+
+
+def _run(scheduled: bool) -> dict[str, Any]:
+    bot = telebot.TeleBot("0:bench", threaded=True, num_threads=THREADS)
+    scheduler: UpdateScheduler | None = None
+    if scheduled:
+        # Один поток из THREADS — резервный под админ-чат
+        scheduler = UpdateScheduler(ADMIN_GROUP_ID, THREADS - 1, {Priority.USER_TEXT: USER_TEXT_QUEUE})
+        scheduler.install(bot)
+
+    sent: dict[str, float] = {}
+    latencies: list[float] = []
+    done = threading.Event()
+    handled = [0]
+    handled_lock = threading.Lock()
+
+    @bot.message_handler(func=lambda m: True)
+    def user_text(message: Message) -> None:
+        time.sleep(USER_HANDLER_MS / 1000)
+        with handled_lock:
+            handled[0] += 1
+
+    @bot.callback_query_handler(func=lambda c: True)
+    def admin_tap(call: CallbackQuery) -> None:
+        latencies.append((time.perf_counter() - sent[str(call.id)]) * 1000)
+        if len(latencies) == ADMIN_ACTIONS:
+            done.set()
+
+    bot.process_new_updates([_text(n) for n in range(RUSH)])
+    for n in range(ADMIN_ACTIONS):
+        update = _admin_tap(n)
+        sent[str(n)] = time.perf_counter()
+        bot.process_new_updates([update])
+        time.sleep(ADMIN_INTERVAL_S)
+    done.wait(RUSH * USER_HANDLER_MS / 1000 + 10)
+
+    if scheduler is not None:
+        scheduler.stop()
+    else:
+        bot.worker_pool.close()
+    return {"admin": percentiles(latencies), "user_handled": handled[0]}
+
+
+def run() -> dict[str, dict[str, Any]]:
+    return {"telebot_pool": _run(scheduled=False), "scheduler": _run(scheduled=True)}
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'pool':<14}{'p50':>9}{'p99':>9}{'max':>9}  (мс, админ)  обработано из {RUSH}")
+    for name, r in results.items():
+        a = r["admin"]
+        print(f"{name:<14}{a['p50_ms']:>9}{a['p99_ms']:>9}{a['max_ms']:>9}  {r['user_handled']:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Цена общего хранилища и время переключения лидера: python -m benchmarks.bench_shared_state
+
+Репозитории в памяти против тех же операций через RESP на подменный Redis (benchmarks.fake_redis),
+затем — сколько реплика-последователь ждёт лидерства после остановки лидера.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Callable
+
+from benchmarks.fake_redis import FakeRedisServer
+from inbibe_bot.core.booking import Booking, Source
+from inbibe_bot.shared.leader_election import LeaderElector
+from inbibe_bot.shared.resp import RespClient
+from inbibe_bot.storage.booking_repository import BookingRepository, InMemoryBookingRepository
+from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue, InMemoryBookingQueue
+from inbibe_bot.storage.shared_state import RespBookingQueue, RespBookingRepository
+
+NUMBER = 2_000
+ACTIVE = 30
+LEADER_TTL_MS = 600
+
+
+def _booking(i: int) -> Booking:
+    return Booking(
+        id=f"b{i}",
+        user_id=i,
+        name="Гость",
+        phone="+79990000000",
+        date_time=datetime(2030, 1, 1, 19, 0),
+        guests=2,
+        source=Source.TG,
+        admin_message_id=i,
+    )
+
+
+def _per_op_us(op: Callable[[int], object], number: int) -> float:
+    started = time.perf_counter_ns()
+    for i in range(number):
+        op(i)
+    return round((time.perf_counter_ns() - started) / number / 1000, 2)
+
+
+def _repository_costs(repo: BookingRepository, queue: ApprovedBookingQueue, number: int) -> dict[str, float]:
+    for i in range(ACTIVE):
+        repo.add(_booking(i))
+    booking = _booking(0)
+
+    def enqueue_drain(i: int) -> None:
+        queue.enqueue(booking)
+        queue.drain()
+
+    return {
+        "update_us": _per_op_us(lambda i: repo.update(booking), number),
+        "require_us": _per_op_us(lambda i: repo.require(f"b{i % ACTIVE}"), number),
+        # Поиск карточки по reply админа — перебор активных заявок
+        "find_by_message_us": _per_op_us(lambda i: repo.find_by_admin_message_id(i % ACTIVE), number),
+        "enqueue_drain_us": _per_op_us(enqueue_drain, number),
+    }
+
+
+def _failover_ms(url: str) -> float:
+    first = LeaderElector(RespClient.from_url(url), "bench:leader", "first", LEADER_TTL_MS)
+    second = LeaderElector(RespClient.from_url(url), "bench:leader", "second", LEADER_TTL_MS)
+    first.start()
+    first.wait_elected(5)
+    second.start()
+    started = time.perf_counter()
+    first.stop()
+    second.wait_elected(5)
+    elapsed = (time.perf_counter() - started) * 1000
+    second.stop()
+    return round(elapsed, 1)
+
+
+def run(number: int = NUMBER) -> dict[str, dict[str, float]]:
+    results = {"memory": _repository_costs(InMemoryBookingRepository(), InMemoryBookingQueue(), number)}
+    with FakeRedisServer().start() as server:
+        client = RespClient.from_url(server.url)
+        results["resp"] = _repository_costs(
+            RespBookingRepository(client, "bench:"), RespBookingQueue(client, "bench:"), number
+        )
+        client.close()
+        results["leader"] = {"failover_ms": _failover_ms(server.url), "ttl_ms": LEADER_TTL_MS}
+        server.shutdown()
+    return results
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    for backend in ("memory", "resp"):
+        for name, value in results[backend].items():
+            print(f"{backend:<8} {name:<22} {value:>10.2f}")
+    print(f"leader   failover_ms            {results['leader']['failover_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Бенчмарк подбора столов при полной посадке: python -m benchmarks.bench_table_suggester"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+from inbibe_bot.core.availability import AvailabilityGrid
+from inbibe_bot.core.occupancy import InMemoryTableOccupancy, TableOccupancy
+from inbibe_bot.core.table_suggester import TableSuggester
+
+from benchmarks.bench_availability import HORIZON_DAYS, TABLES
+
+NUMBER = 5_000
+# Свободными остаются два стола, чтобы подбору было что найти
+LEFT_FREE = (22, 23)
+
+
+def _full_house(occupancy: TableOccupancy, start: datetime) -> None:
+    for table in TABLES:
+        if table not in LEFT_FREE:
+            occupancy.reserve(f"full-{table}", {table}, start)
+
+
+def run(number: int = NUMBER) -> dict[str, dict[str, float | int | list[list[int]]]]:
+    today = date.today()
+    start = datetime.combine(today + timedelta(days=3), datetime.min.time()) + timedelta(hours=19)
+    capacities = {t: 2 if t < 10 else 4 if t < 30 else 6 for t in TABLES}
+
+    occupancy = InMemoryTableOccupancy(TABLES, timedelta(minutes=120))
+    grid = AvailabilityGrid(occupancy, capacities, HORIZON_DAYS, today)
+    grid.attach()
+    grid._sync_day = lambda: None  # type: ignore[method-assign]
+
+    build_us = min(timeit.repeat(lambda: TableSuggester(capacities, grid), number=200, repeat=3)) / 200 * 1e6
+    suggester = TableSuggester(capacities, grid)
+
+    results: dict[str, dict[str, float | int | list[list[int]]]] = {
+        "index": {"combinations": suggester.size, "build_us": round(build_us, 2)},
+    }
+    for label, prepare in (("empty", None), ("full_house", _full_house)):
+        if prepare is not None:
+            prepare(occupancy, start)
+        for guests in (2, 6, 12):
+            elapsed = min(timeit.repeat(lambda: suggester.suggest(guests, start), number=number, repeat=3))
+            results[f"{label}_guests_{guests}"] = {
+                "us_per_call": round(elapsed / number * 1e6, 2),
+                "suggestions": [list(s) for s in suggester.suggest(guests, start)],
+            }
+    return results
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    for case, metrics in results.items():
+        print(case)
+        for name, value in metrics.items():
+            print(f"  {name:<14} {value}")
+
+
+if __name__ == "__main__":
+    main()
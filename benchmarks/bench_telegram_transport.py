@@ -0,0 +1,104 @@
+"""Задержка вызова Bot API: сессии apihelper на поток против общего пула: python -m benchmarks.bench_telegram_transport
+
+Локальный HTTP/1.1-сервер держит keep-alive и на каждом новом соединении ждёт HANDSHAKE_MS — так
+моделируется TCP+TLS (через прокси — ещё и CONNECT) до api.telegram.org. Вызовы идут из нового потока
+на каждый запрос, как из API бронирований под werkzeug, по CONCURRENCY одновременно.
+"""
+from __future__ import annotations
+
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from benchmarks.harness import percentiles
+from inbibe_bot.shared.telegram_transport import RequestSender, TelegramTransport, default_sender
+
+CALLS = 300
+CONCURRENCY = 8
+HANDSHAKE_MS = 30
+SERVER_MS = 5
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _Server
+
+    def setup(self) -> None:
+        super().setup()
+        # Заголовки и тело уходят двумя write: без TCP_NODELAY на переиспользуемом соединении их разделяет delayed ACK
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+        time.sleep(HANDSHAKE_MS / 1000)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(SERVER_MS / 1000)
+        body = json.dumps({"ok": True, "result": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def _run(sender: RequestSender) -> dict[str, Any]:
+    server = _Server(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/bot0:bench/answerCallbackQuery"
+    slots = threading.Semaphore(CONCURRENCY)
+    latencies: list[float] = []
+
+    def call() -> None:
+        try:
+            started = time.perf_counter()
+            sender("post", url, params={"callback_query_id": "1"}, timeout=(5, 15))
+            latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            slots.release()
+
+    threads = []
+    for _ in range(CALLS):
+        slots.acquire()
+        thread = threading.Thread(target=call)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    server.server_close()
+    return {"latency": percentiles(latencies), "connections": server.connections}
+
+
+def run() -> dict[str, dict[str, Any]]:
+    transport = TelegramTransport(pool_size=CONCURRENCY, connect_timeout=5, read_timeout=15)
+    try:
+        return {"per_thread_session": _run(default_sender), "pooled": _run(transport)}
+    finally:
+        transport.close()
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'transport':<20}{'p50':>9}{'p95':>9}{'p99':>9}  (мс)  соединений на {CALLS} вызовов")
+    for name, r in results.items():
+        lat = r["latency"]
+        print(f"{name:<20}{lat['p50_ms']:>9}{lat['p95_ms']:>9}{lat['p99_ms']:>9}  {r['connections']:>16}")
+
+
+if __name__ == "__main__":
+    main()
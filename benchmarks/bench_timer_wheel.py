@@ -0,0 +1,77 @@
+"""Постановка, отмена и тик колеса таймеров при разном числе таймеров: python -m benchmarks.bench_timer_wheel
+
+Для сравнения — heapq с ленивой отменой (пометка и пропуск при извлечении): постановка O(log n),
+а отменённые записи остаются в куче до своего срока.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import random
+import sys
+import time
+
+from inbibe_bot.shared.timer_wheel import TimerWheel
+
+SIZES = (1_000, 10_000, 100_000)
+HORIZON_S = 7 * 24 * 3600
+
+
+def _noop() -> None:
+    pass
+
+
+def _wheel(n: int, delays: list[int]) -> dict[str, float]:
+    wheel = TimerWheel()
+    started = time.perf_counter_ns()
+    timers = [wheel.schedule(d, _noop) for d in delays]
+    schedule_ns = (time.perf_counter_ns() - started) / n
+    started = time.perf_counter_ns()
+    for timer in timers[::2]:
+        wheel.cancel(timer)
+    cancel_ns = (time.perf_counter_ns() - started) / (n // 2)
+    ticks = 3600
+    started = time.perf_counter_ns()
+    wheel.advance(ticks)
+    tick_ns = (time.perf_counter_ns() - started) / ticks
+    return {"schedule_ns": round(schedule_ns), "cancel_ns": round(cancel_ns), "tick_ns": round(tick_ns)}
+
+
+def _heap(n: int, delays: list[int]) -> dict[str, float]:
+    heap: list[tuple[int, int, list[bool]]] = []
+    started = time.perf_counter_ns()
+    entries = []
+    for i, d in enumerate(delays):
+        entry = (d, i, [False])
+        heapq.heappush(heap, entry)
+        entries.append(entry)
+    schedule_ns = (time.perf_counter_ns() - started) / n
+    started = time.perf_counter_ns()
+    for entry in entries[::2]:
+        entry[2][0] = True
+    cancel_ns = (time.perf_counter_ns() - started) / (n // 2)
+    return {"schedule_ns": round(schedule_ns), "cancel_ns": round(cancel_ns), "heap_len_after_cancel": len(heap)}
+
+
+def run() -> dict[str, dict[str, dict[str, float]]]:
+    rng = random.Random(1)
+    results = {}
+    for n in SIZES:
+        delays = [rng.randint(1, HORIZON_S) for _ in range(n)]
+        results[str(n)] = {"wheel": _wheel(n, delays), "heapq": _heap(n, delays)}
+    return results
+
+
+def main() -> None:
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'timers':>8}  {'wheel sched':>12}{'cancel':>8}{'tick':>8}  {'heap sched':>11}{'cancel':>8}  (нс)")
+    for n, r in results.items():
+        w, h = r["wheel"], r["heapq"]
+        print(f"{n:>8}  {w['schedule_ns']:>12}{w['cancel_ns']:>8}{w['tick_ns']:>8}  {h['schedule_ns']:>11}{h['cancel_ns']:>8}")
+
+
+if __name__ == "__main__":
+    main()
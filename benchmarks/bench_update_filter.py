@@ -0,0 +1,109 @@
+"""Цена лишних апдейтов с предфильтром и без: python -m benchmarks.bench_update_filter [--json]
+
+Для каждого вида апдейта сравниваются полный путь (Update.de_json и предикаты всех хэндлеров)
+и UpdateFilter.classify по сырому JSON. В админ-чате висит ACTIVE заявок, ожидающих reply.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import telebot
+
+from benchmarks.fake_telegram import FakeTelegram
+from benchmarks.harness import bench_config
+from inbibe_bot.bootstrap import build_context
+from inbibe_bot.client.update_filter import UpdateFilter
+from inbibe_bot.core.booking import Booking, Source
+
+ADMIN_GROUP_ID = -1001
+ACTIVE = 30
+NUMBER = 5_000
+
+
+def _message(chat_id: int, chat_type: str, reply_to: int | None = None) -> dict[str, Any]:
+    message: dict[str, Any] = {
+        "message_id": 900_000,
+        "date": 0,
+        "chat": {"id": chat_id, "type": chat_type},
+        "from": {"id": 7, "is_bot": False, "first_name": "admin"},
+        "text": "обычное сообщение в чате",
+    }
+    if reply_to is not None:
+        message["reply_to_message"] = {"message_id": reply_to, "date": 0, "chat": {"id": chat_id, "type": chat_type}}
+    return message
+
+
+def _cases() -> dict[str, bytes]:
+    updates: dict[str, dict[str, Any]] = {
+        "admin_chatter": {"message": _message(ADMIN_GROUP_ID, "supergroup")},
+        "admin_unknown_reply": {"message": _message(ADMIN_GROUP_ID, "supergroup", reply_to=1)},
+        "edited_message": {"edited_message": _message(ADMIN_GROUP_ID, "supergroup")},
+        "foreign_chat": {"message": _message(-2002, "group")},
+    }
+    return {name: json.dumps({"update_id": 1, **u}).encode("utf-8") for name, u in updates.items()}
+
+
+def _per_op_us(fn: Callable[[], object], number: int) -> float:
+    return round(min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6, 2)
+
+
+def run(number: int = NUMBER) -> dict[str, dict[str, float]]:
+    telegram = FakeTelegram()
+    telegram.install()
+    previous_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="inbibe-bench-") as tmp:
+            workdir = Path(tmp)
+            os.chdir(workdir)
+            config = bench_config(workdir, ADMIN_GROUP_ID)
+            app = build_context(config, bot=telebot.TeleBot(config.tg_api_key, threaded=False))
+            for i in range(ACTIVE):
+                app.deps.booking_repo.add(Booking(
+                    id=f"b{i}", user_id=i, name="Гость", phone="+79990000000",
+                    date_time=datetime(2030, 1, 1, 19, 0), guests=2, source=Source.TG,
+                    admin_message_id=10_000 + i, table_request_message_id=20_000 + i,
+                ))
+            update_filter = app.server_deps.update_filter
+            assert isinstance(update_filter, UpdateFilter)
+            bot = app.deps.bot
+
+            def full(raw: bytes) -> None:
+                bot.process_new_updates([telebot.types.Update.de_json(json.loads(raw))])
+
+            results = {}
+            for name, raw in _cases().items():
+                assert update_filter.classify(json.loads(raw)) is not None
+                full_us = _per_op_us(lambda: full(raw), number)
+                filtered_us = _per_op_us(lambda: update_filter.classify(json.loads(raw)), number)
+                results[name] = {
+                    "full_us": full_us,
+                    "filtered_us": filtered_us,
+                    "speedup": round(full_us / filtered_us, 1) if filtered_us else 0.0,
+                }
+            return results
+    finally:
+        os.chdir(previous_cwd)
+        telegram.uninstall()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.ERROR)
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'update':<22}{'full':>10}{'filtered':>10}{'x':>7}  (мкс)")
+    for name, r in results.items():
+        print(f"{name:<22}{r['full_us']:>10.2f}{r['filtered_us']:>10.2f}{r['speedup']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Подменный Redis для бенчмарков и локальной проверки нескольких реплик.
+
+Понимает подмножество RESP2, которым пользуются inbibe_bot.storage.shared_state и LeaderElector:
+строки с TTL, хэши, списки, множества, MULTI/EXEC/WATCH. Данные только в памяти.
+
+    python -m benchmarks.fake_redis --port 6379
+"""
+from __future__ import annotations
+
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Callable
+
+Reply = Any
+
+
+class _Error(Exception):
+    pass
+
+
+class _Queued:
+    pass
+
+
+class _Status(str):
+    """Простая строка RESP (+OK), в отличие от bulk-строк с данными."""
+
+
+_OK = _Status("OK")
+
+
+class FakeRedisStore:
+    def __init__(self) -> None:
+        self.data: dict[str, Any] = {}
+        self.expires: dict[str, float] = {}
+        self.versions: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self._commands: dict[str, Callable[[list[str]], Reply]] = {
+            "PING": lambda a: _Status("PONG"),
+            "AUTH": lambda a: _OK,
+            "SELECT": lambda a: _OK,
+            "FLUSHDB": self._flushdb,
+            "GET": self._get,
+            "SET": self._set,
+            "DEL": self._del,
+            "EXISTS": lambda a: sum(1 for k in a if self._lookup(k) is not None),
+            "PEXPIRE": self._pexpire,
+            "PTTL": self._pttl,
+            "HGET": lambda a: self._hash(a[0]).get(a[1]),
+            "HSET": self._hset,
+            "HSETNX": self._hsetnx,
+            "HDEL": self._hdel,
+            "HVALS": lambda a: list(self._hash(a[0]).values()),
+            "HLEN": lambda a: len(self._hash(a[0])),
+            "RPUSH": self._rpush,
+            "LRANGE": self._lrange,
+            "LLEN": lambda a: len(self._list(a[0])),
+            "SADD": self._sadd,
+            "SREM": self._srem,
+            "SMEMBERS": lambda a: sorted(self._set_of(a[0])),
+        }
+
+    def call(self, args: list[str]) -> Reply:
+        handler = self._commands.get(args[0].upper())
+        if handler is None:
+            raise _Error(f"ERR unknown command '{args[0]}'")
+        return handler(args[1:])
+
+    def version(self, key: str) -> int:
+        self._lookup(key)
+        return self.versions.get(key, 0)
+
+    # --- ключи ---
+
+    def _lookup(self, key: str) -> Any:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._remove(key)
+        return self.data.get(key)
+
+    def _touch(self, key: str) -> None:
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _remove(self, key: str) -> bool:
+        self.expires.pop(key, None)
+        if self.data.pop(key, None) is None:
+            return False
+        self._touch(key)
+        return True
+
+    def _typed(self, key: str, kind: type, create: bool) -> Any:
+        value = self._lookup(key)
+        if value is None:
+            value = kind()
+            if create:
+                self.data[key] = value
+        elif not isinstance(value, kind):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _hash(self, key: str, create: bool = False) -> dict[str, str]:
+        value: dict[str, str] = self._typed(key, dict, create)
+        return value
+
+    def _list(self, key: str, create: bool = False) -> list[str]:
+        value: list[str] = self._typed(key, list, create)
+        return value
+
+    def _set_of(self, key: str, create: bool = False) -> set[str]:
+        value: set[str] = self._typed(key, set, create)
+        return value
+
+    def _drop_if_empty(self, key: str) -> None:
+        if not self.data.get(key):
+            self._remove(key)
+
+    # --- команды ---
+
+    def _flushdb(self, args: list[str]) -> Reply:
+        for key in list(self.data):
+            self._remove(key)
+        return _OK
+
+    def _get(self, args: list[str]) -> Reply:
+        value = self._lookup(args[0])
+        if value is not None and not isinstance(value, str):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _set(self, args: list[str]) -> Reply:
+        key, value, options = args[0], args[1], [o.upper() for o in args[2:]]
+        exists = self._lookup(key) is not None
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in (("PX", 1000), ("EX", 1)):
+            if unit in options:
+                self.expires[key] = time.monotonic() + int(args[2 + options.index(unit) + 1]) / scale
+        self._touch(key)
+        return _OK
+
+    def _del(self, args: list[str]) -> Reply:
+        return sum(1 for key in args if self._lookup(key) is not None and self._remove(key))
+
+    def _pexpire(self, args: list[str]) -> Reply:
+        if self._lookup(args[0]) is None:
+            return 0
+        self.expires[args[0]] = time.monotonic() + int(args[1]) / 1000
+        self._touch(args[0])
+        return 1
+
+    def _pttl(self, args: list[str]) -> Reply:
+        if self._lookup(args[0]) is None:
+            return -2
+        deadline = self.expires.get(args[0])
+        return -1 if deadline is None else int((deadline - time.monotonic()) * 1000)
+
+    def _hset(self, args: list[str]) -> Reply:
+        h = self._hash(args[0], create=True)
+        added = 0
+        for field, value in zip(args[1::2], args[2::2]):
+            added += field not in h
+            h[field] = value
+        self._touch(args[0])
+        return added
+
+    def _hsetnx(self, args: list[str]) -> Reply:
+        h = self._hash(args[0], create=True)
+        if args[1] in h:
+            return 0
+        h[args[1]] = args[2]
+        self._touch(args[0])
+        return 1
+
+    def _hdel(self, args: list[str]) -> Reply:
+        h = self._hash(args[0])
+        removed = sum(1 for field in args[1:] if h.pop(field, None) is not None)
+        if removed:
+            self._touch(args[0])
+            self._drop_if_empty(args[0])
+        return removed
+
+    def _rpush(self, args: list[str]) -> Reply:
+        items = self._list(args[0], create=True)
+        items.extend(args[1:])
+        self._touch(args[0])
+        return len(items)
+
+    def _lrange(self, args: list[str]) -> Reply:
+        items = self._list(args[0])
+        start, stop = int(args[1]), int(args[2])
+        stop = len(items) if stop == -1 else stop + 1
+        return items[start:stop]
+
+    def _sadd(self, args: list[str]) -> Reply:
+        members = self._set_of(args[0], create=True)
+        before = len(members)
+        members.update(args[1:])
+        self._touch(args[0])
+        return len(members) - before
+
+    def _srem(self, args: list[str]) -> Reply:
+        members = self._set_of(args[0])
+        before = len(members)
+        members.difference_update(args[1:])
+        if len(members) != before:
+            self._touch(args[0])
+            self._drop_if_empty(args[0])
+        return before - len(members)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "FakeRedisServer"
+
+    def setup(self) -> None:
+        super().setup()
+        # Как у настоящего Redis: без Nagle ответы транзакции не ждут delayed ACK клиента
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        store = self.server.store
+        queued: list[list[str]] | None = None
+        watched: dict[str, int] = {}
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            name = args[0].upper()
+            try:
+                with store.lock:
+                    if name == "MULTI":
+                        queued = []
+                        reply: Reply = _OK
+                    elif name == "DISCARD":
+                        queued, watched = None, {}
+                        reply = _OK
+                    elif name == "WATCH":
+                        watched.update({k: store.version(k) for k in args[1:]})
+                        reply = _OK
+                    elif name == "UNWATCH":
+                        watched = {}
+                        reply = _OK
+                    elif name == "EXEC":
+                        if queued is None:
+                            raise _Error("ERR EXEC without MULTI")
+                        if any(store.version(k) != v for k, v in watched.items()):
+                            reply = None
+                        else:
+                            reply = []
+                            for command in queued:
+                                try:
+                                    reply.append(store.call(command))
+                                except _Error as e:
+                                    reply.append(e)
+                        queued, watched = None, {}
+                    elif queued is not None:
+                        queued.append(args)
+                        reply = _Queued()
+                    else:
+                        reply = store.call(args)
+            except _Error as e:
+                reply = e
+            self.wfile.write(_encode(reply))
+
+    def _read_command(self) -> list[str] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.decode("utf-8").split()
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2].decode("utf-8"))
+        return args
+
+
+def _encode(reply: Reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, _Queued):
+        return b"+QUEUED\r\n"
+    if isinstance(reply, _Error):
+        return b"-" + str(reply).encode("utf-8") + b"\r\n"
+    if isinstance(reply, bool) or isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, _Status):
+        return b"+" + reply.encode() + b"\r\n"
+    if isinstance(reply, str):
+        data = reply.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(r) for r in reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _Handler)
+        self.store = FakeRedisStore()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host!s}:{port}/0"
+
+    def start(self) -> "FakeRedisServer":
+        threading.Thread(target=self.serve_forever, daemon=True, name="fake-redis").start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    with FakeRedisServer(args.host, args.port) as server:
+        print(f"Подменный Redis слушает {server.url}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
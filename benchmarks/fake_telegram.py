@@ -0,0 +1,97 @@
+"""Подменный транспорт Bot API для бенчмарков: запросы не уходят в сеть, ответы — как у Telegram."""
+from __future__ import annotations
+
+import itertools
+import json
+from collections import Counter
+from threading import Lock
+from typing import Any
+
+import telebot.apihelper as apihelper
+
+_MESSAGE_METHODS = {"sendMessage", "editMessageText", "editMessageReplyMarkup"}
+
+
+class FakeResponse:
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self.status_code = 200
+        self._payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self) -> dict[str, Any]:
+        return self._payload
+
+
+class FakeTelegram:
+    """Встаёт в apihelper.CUSTOM_REQUEST_SENDER, считает вызовы и запоминает последние клавиатуры по чатам.
+
+    В sent — исходящие вызовы в формате записи TrafficRecorder (для сверки при воспроизведении).
+    """
+
+    def __init__(self) -> None:
+        self.calls: Counter[str] = Counter()
+        self.last_markup: dict[int, dict[str, Any]] = {}
+        self.last_markup_message: dict[int, int] = {}
+        self.sent: list[dict[str, Any]] = []
+        self._message_ids = itertools.count(1)
+        self._lock = Lock()
+        self._previous: Any = None
+
+    def install(self) -> None:
+        self._previous = apihelper.CUSTOM_REQUEST_SENDER
+        apihelper.CUSTOM_REQUEST_SENDER = self  # type: ignore[assignment]
+
+    def uninstall(self) -> None:
+        apihelper.CUSTOM_REQUEST_SENDER = self._previous
+
+    def next_message_id(self) -> int:
+        with self._lock:
+            return next(self._message_ids)
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        files: Any = None,
+        timeout: Any = None,
+        proxies: Any = None,
+    ) -> FakeResponse:
+        name = url.rsplit("/", 1)[-1]
+        params = params or {}
+        record: dict[str, Any] = {"method": name}
+        if "chat_id" in params:
+            record["chat_id"] = int(params["chat_id"])
+        if name == "answerCallbackQuery":
+            record["callback_query_id"] = params.get("callback_query_id")
+            record["text"] = params.get("text")
+        if name not in _MESSAGE_METHODS:
+            self._log(name, record)
+            return FakeResponse({"ok": True, "result": True})
+
+        chat_id = int(params.get("chat_id", 0))
+        message_id = self.next_message_id()
+        record["message_id"] = message_id
+        markup = params.get("reply_markup")
+        if markup:
+            parsed = json.loads(markup)
+            self.last_markup[chat_id] = parsed
+            self.last_markup_message[chat_id] = message_id
+            record["buttons"] = [
+                b["callback_data"] for row in parsed.get("inline_keyboard", []) for b in row if "callback_data" in b
+            ]
+        self._log(name, record)
+        return FakeResponse({
+            "ok": True,
+            "result": {
+                "message_id": message_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+                "text": params.get("text", ""),
+            },
+        })
+
+    def _log(self, name: str, record: dict[str, Any]) -> None:
+        with self._lock:
+            self.calls[name] += 1
+            self.sent.append(record)
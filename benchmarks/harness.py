@@ -0,0 +1,44 @@
+"""Общие части бенчмарков: конфигурация во временном каталоге и перцентили."""
+from __future__ import annotations
+
+import os
+import subprocess
+from pathlib import Path
+
+from inbibe_bot.config import AppConfig
+
+
+def bench_config(workdir: Path, admin_group_id: int, **env: str) -> AppConfig:
+    """AppConfig для прогона: состояние и история — во workdir, VK выключен, если не задан явно."""
+    os.environ.pop("VK_ACCESS_TOKEN", None)
+    os.environ.pop("CAPTURE_DIR", None)
+    os.environ.update({
+        "TG_API_KEY": "0:bench",
+        "ADMIN_GROUP_ID": str(admin_group_id),
+        "WEBHOOK_SECRET": "bench",
+        "TG_MODE": "polling",
+        "STATE_FILE": str(workdir / "data" / "state.json"),
+        "HISTORY_FILE": str(workdir / "data" / "reservations.jsonl"),
+        **env,
+    })
+    return AppConfig.from_env()
+
+
+def percentiles(samples: list[float]) -> dict[str, float | int]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+    return {"count": len(ordered), "p50_ms": rank(0.50), "p95_ms": rank(0.95), "p99_ms": rank(0.99),
+            "max_ms": round(ordered[-1], 3)}
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
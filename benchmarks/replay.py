@@ -0,0 +1,306 @@
+"""Воспроизведение записанного трафика: python -m benchmarks.replay CAPTURE [CAPTURE ...] [--speed 1|N|max] [--json] [--out FILE]
+
+Записи TrafficRecorder подаются в свежего бота с подменённым Telegram и локальной заглушкой VK.
+ID сообщений бота и callback_data кнопок в записи — продовые; они сопоставляются с тем, что
+бот отправил при воспроизведении, по порядку сообщений в чате и позиции кнопки. Расхождения
+(другие ответы на нажатия, другая последовательность вызовов Bot API, другие HTTP-статусы) и
+тайминги выводятся в JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Thread
+from typing import Any
+
+import telebot
+
+from benchmarks.fake_telegram import FakeTelegram
+from benchmarks.harness import bench_config, git_commit, percentiles
+from inbibe_bot.bootstrap import build_context
+from inbibe_bot.server.routes import build_app
+from inbibe_bot.storage.traffic_recorder import read_capture
+
+MAX_EXAMPLES = 20
+
+
+class _VkStub(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        type(self).calls += 1
+        body = b'{"response": 1}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _MessageMap:
+    """Сопоставляет продовые сообщения бота с отправленными при воспроизведении (k-е сообщение в чате ↔ k-е)."""
+
+    def __init__(self, recorded: list[dict[str, Any]], replayed: list[dict[str, Any]]) -> None:
+        self._recorded_pos: dict[tuple[int, int], tuple[int, list[str]]] = {}
+        counts: Counter[int] = Counter()
+        for rec in recorded:
+            if rec.get("method") == "sendMessage" and "message_id" in rec:
+                chat = rec["chat_id"]
+                self._recorded_pos[(chat, rec["message_id"])] = (counts[chat], rec.get("buttons", []))
+                counts[chat] += 1
+        self._replayed = replayed
+        self._seen = 0
+        self._replayed_by_chat: dict[int, list[dict[str, Any]]] = defaultdict(list)
+
+    def message(self, chat: int, message_id: int) -> dict[str, Any] | None:
+        """Сообщение воспроизведения, соответствующее продовому, или None."""
+        found = self._recorded_pos.get((chat, message_id))
+        if found is None:
+            return None
+        self._catch_up()
+        sent = self._replayed_by_chat[chat]
+        return sent[found[0]] if found[0] < len(sent) else None
+
+    def callback_data(self, chat: int, message_id: int, data: str) -> str | None:
+        found = self._recorded_pos.get((chat, message_id))
+        replayed = self.message(chat, message_id)
+        if found is None or replayed is None:
+            return None
+        buttons = found[1]
+        if data not in buttons:
+            return data
+        position = buttons.index(data)
+        new_buttons = replayed.get("buttons", [])
+        return new_buttons[position] if position < len(new_buttons) else None
+
+    def _catch_up(self) -> None:
+        for rec in self._replayed[self._seen:]:
+            if rec["method"] == "sendMessage":
+                self._replayed_by_chat[rec["chat_id"]].append(rec)
+        self._seen = len(self._replayed)
+
+
+class Replayer:
+    def __init__(self, records: list[dict[str, Any]], admin_group_id: int, speed: float | None) -> None:
+        self.inbound = [r for r in records if r["k"] in ("in", "api")]
+        self.recorded_out = [r for r in records if r["k"] == "out"]
+        self.admin_group_id = admin_group_id
+        self.speed = speed
+        self.telegram = FakeTelegram()
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.lag: list[float] = []
+        self.divergences: dict[str, list[Any]] = defaultdict(list)
+
+    def run(self) -> dict[str, Any]:
+        vk = ThreadingHTTPServer(("127.0.0.1", 0), _VkStub)
+        Thread(target=vk.serve_forever, daemon=True, name="vk-stub").start()
+        self.telegram.install()
+        previous_cwd = os.getcwd()
+        try:
+            with tempfile.TemporaryDirectory(prefix="inbibe-replay-") as tmp:
+                workdir = Path(tmp)
+                os.chdir(workdir)
+                config = bench_config(
+                    workdir,
+                    self.admin_group_id,
+                    VK_ACCESS_TOKEN="replay",
+                    VK_API_URL=f"http://127.0.0.1:{vk.server_address[1]}/method/messages.send",
+                )
+                app = build_context(config, bot=telebot.TeleBot(config.tg_api_key, threaded=False))
+                http = build_app(app.server_deps).test_client()
+                messages = _MessageMap(self.recorded_out, self.telegram.sent)
+
+                started = time.perf_counter()
+                origin = self.inbound[0]["t"] if self.inbound else 0.0
+                for rec in self.inbound:
+                    if self.speed is not None:
+                        target = (rec["t"] - origin) / self.speed
+                        delay = target - (time.perf_counter() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+                        self.lag.append(max(0.0, -delay) * 1000)
+                    if rec["k"] == "api":
+                        self._replay_api(http, rec)
+                    else:
+                        self._replay_update(app.deps.bot, messages, rec)
+                elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(previous_cwd)
+            self.telegram.uninstall()
+            vk.shutdown()
+
+        self._compare_outbound()
+        span = self.inbound[-1]["t"] - self.inbound[0]["t"] if self.inbound else 0.0
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "records": len(self.inbound),
+                "recorded_span_s": round(span, 3),
+                "speed": self.speed or "max",
+                "admin_group_id": self.admin_group_id,
+            },
+            "timing": {
+                "seconds": round(elapsed, 3),
+                "events_per_s": round(len(self.inbound) / elapsed, 1) if elapsed else None,
+                "effective_speed": round(span / elapsed, 2) if elapsed else None,
+                "lag": percentiles(self.lag),
+                "latency": {kind: percentiles(s) for kind, s in sorted(self.latency.items())},
+            },
+            "calls": {
+                "telegram_recorded": dict(Counter(r["method"] for r in self.recorded_out)),
+                "telegram_replayed": dict(self.telegram.calls),
+                "vk_replayed": _VkStub.calls,
+            },
+            "divergences": {
+                kind: {"count": len(items), "examples": items[:MAX_EXAMPLES]}
+                for kind, items in sorted(self.divergences.items())
+            },
+        }
+
+    def _replay_update(self, bot: telebot.TeleBot, messages: _MessageMap, rec: dict[str, Any]) -> None:
+        update = rec["update"]
+        kind = "callback_query" if "callback_query" in update else "message" if "message" in update else "other"
+        if "callback_query" in update:
+            self._translate_callback(messages, update["callback_query"])
+        elif "message" in update and "reply_to_message" in update["message"]:
+            self._translate_reply(messages, update["message"])
+
+        parsed = telebot.types.Update.de_json(update)
+        started = time.perf_counter()
+        try:
+            bot.process_new_updates([parsed])
+        except Exception as e:
+            self.divergences["handler_errors"].append({"update_id": update.get("update_id"), "error": repr(e)})
+        self.latency[kind].append((time.perf_counter() - started) * 1000)
+
+    def _replay_api(self, http: Any, rec: dict[str, Any]) -> None:
+        body = json.dumps(rec["body"]).encode("utf-8") if "body" in rec else b"{" * rec.get("invalid", 0)
+        started = time.perf_counter()
+        response = http.post(rec["route"], data=body, content_type="application/json")
+        self.latency["api"].append((time.perf_counter() - started) * 1000)
+        if response.status_code != rec["status"]:
+            self.divergences["api_status"].append(
+                {"route": rec["route"], "recorded": rec["status"], "replayed": response.status_code}
+            )
+
+    def _translate_callback(self, messages: _MessageMap, call: dict[str, Any]) -> None:
+        message = call.get("message")
+        if not message:
+            return
+        chat, message_id = message["chat"]["id"], message["message_id"]
+        replayed = messages.message(chat, message_id)
+        if replayed is None:
+            self.divergences["unmapped_messages"].append({"chat_id": chat, "message_id": message_id})
+            return
+        message["message_id"] = replayed["message_id"]
+        data = messages.callback_data(chat, message_id, call.get("data", ""))
+        if data is None:
+            self.divergences["unmapped_buttons"].append({"chat_id": chat, "data": call.get("data")})
+            return
+        call["data"] = data
+
+    def _translate_reply(self, messages: _MessageMap, message: dict[str, Any]) -> None:
+        reply = message["reply_to_message"]
+        chat = message["chat"]["id"]
+        replayed = messages.message(chat, reply["message_id"])
+        if replayed is None:
+            self.divergences["unmapped_messages"].append({"chat_id": chat, "message_id": reply["message_id"]})
+            return
+        reply["message_id"] = replayed["message_id"]
+
+    def _compare_outbound(self) -> None:
+        recorded_answers = {
+            r["callback_query_id"]: r.get("text")
+            for r in self.recorded_out if r["method"] == "answerCallbackQuery"
+        }
+        for r in self.telegram.sent:
+            if r["method"] != "answerCallbackQuery" or r["callback_query_id"] not in recorded_answers:
+                continue
+            expected = recorded_answers[r["callback_query_id"]]
+            if r.get("text") != expected:
+                self.divergences["callback_answers"].append(
+                    {"callback_query_id": r["callback_query_id"], "recorded": expected, "replayed": r.get("text")}
+                )
+
+        recorded_seq = _methods_by_chat(self.recorded_out)
+        replayed_seq = _methods_by_chat(self.telegram.sent)
+        for chat in sorted(set(recorded_seq) | set(replayed_seq)):
+            a, b = recorded_seq.get(chat, []), replayed_seq.get(chat, [])
+            if a == b:
+                continue
+            index = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+            self.divergences["call_sequence"].append({
+                "chat_id": chat,
+                "index": index,
+                "recorded": a[index:index + 3],
+                "replayed": b[index:index + 3],
+                "recorded_total": len(a),
+                "replayed_total": len(b),
+            })
+
+
+def _methods_by_chat(calls: list[dict[str, Any]]) -> dict[int, list[str]]:
+    result: dict[int, list[str]] = defaultdict(list)
+    for r in calls:
+        if "chat_id" in r:
+            result[r["chat_id"]].append(r["method"])
+    return result
+
+
+def _detect_admin_group(records: list[dict[str, Any]]) -> int | None:
+    chats: Counter[int] = Counter()
+    for rec in records:
+        if rec["k"] == "out" and isinstance(rec.get("chat_id"), int) and rec["chat_id"] < 0:
+            chats[rec["chat_id"]] += 1
+    return chats.most_common(1)[0][0] if chats else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("captures", nargs="+", type=Path, help="файлы capture*.jsonl.gz по порядку")
+    parser.add_argument("--speed", default="max", help="1 — в реальном времени, N — в N раз быстрее, max — без пауз")
+    parser.add_argument("--admin-group", type=int, help="ID админ-чата (по умолчанию — из записи)")
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    parser.add_argument("--out", type=Path, help="дополнительно записать JSON в файл")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    records = read_capture(args.captures)
+    admin_group = args.admin_group or _detect_admin_group(records)
+    if admin_group is None:
+        parser.error("не удалось определить админ-чат по записи, укажите --admin-group")
+    speed = None if args.speed == "max" else float(args.speed)
+
+    results = Replayer(records, admin_group, speed).run()
+    if args.out:
+        args.out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    timing = results["timing"]
+    print(f"{results['meta']['records']} событий за {timing['seconds']} с "
+          f"({timing['events_per_s']}/с, ускорение ×{timing['effective_speed']})")
+    for kind, s in timing["latency"].items():
+        print(f"  {kind:<16} p50 {s.get('p50_ms')} мс  p95 {s.get('p95_ms')} мс  p99 {s.get('p99_ms')} мс")
+    if not results["divergences"]:
+        print("Расхождений нет")
+    for kind, d in results["divergences"].items():
+        print(f"Расхождения {kind}: {d['count']}")
+        for example in d["examples"][:3]:
+            print(f"    {example}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Asyncio-транспорт для действий сервисного слоя (inbibe_bot.service.actions)."""
+from __future__ import annotations
+
+import functools
+import logging
+from typing import Awaitable, Callable, Sequence
+
+from telebot.types import CallbackQuery, Message
+
+from inbibe_bot.aio.bot_factory import AsyncDeps, clear_ephemeral, defer, notify_user, run_blocking
+from inbibe_bot.service.actions import Action, Answer, ClearEphemeral, EditCard, NotifyUser, Prompt, PromptKind, Send
+from inbibe_bot.shared.circuit_breaker import TELEGRAM_BREAKER, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+async def answer_callback(deps: AsyncDeps, call: CallbackQuery, actions: Sequence[Action]) -> None:
+    async def answer(a: Answer) -> None:
+        await deps.bot.answer_callback_query(call.id, a.text, show_alert=a.alert)
+
+    await perform(deps, actions, answer)
+
+
+async def answer_reply(deps: AsyncDeps, message: Message, booking_id: str, actions: Sequence[Action]) -> None:
+    async def reply(a: Answer) -> None:
+        await run_blocking(deps, deps.ephemeral.register, booking_id, await deps.bot.reply_to(message, a.text))
+
+    await perform(deps, actions, reply)
+
+
+async def perform(
+    deps: AsyncDeps, actions: Sequence[Action], answer: Callable[[Answer], Awaitable[None]] | None = None
+) -> None:
+    for action in actions:
+        if isinstance(action, Answer):
+            if answer is not None:
+                await answer(action)
+        elif isinstance(action, Send):
+            await deps.bot.send_message(
+                action.chat_id, action.text, reply_markup=action.markup, parse_mode=action.parse_mode
+            )
+        elif isinstance(action, NotifyUser):
+            await notify_user(deps, action.booking, action.text)
+        elif isinstance(action, EditCard):
+            await _edit_card(deps, action)
+        elif isinstance(action, ClearEphemeral):
+            await clear_ephemeral(deps, action.booking_id)
+        elif not await _send_prompt(deps, action) and action.failure is not None:
+            if answer is not None:
+                await answer(Answer(action.failure, alert=True))
+            return
+
+
+async def _edit_card(deps: AsyncDeps, action: EditCard) -> None:
+    edit = functools.partial(
+        deps.bot.edit_message_text,
+        action.text,
+        chat_id=deps.config.admin_group_id,
+        message_id=action.booking.admin_message_id or -1,
+        parse_mode="Markdown",
+    )
+    try:
+        await edit()
+    except CircuitOpenError:
+        defer(deps, TELEGRAM_BREAKER, f"карточка заявки {action.booking.id}", edit)
+    except Exception:
+        logger.error("Не удалось обновить карточку заявки %s", action.booking.id)
+
+
+async def _send_prompt(deps: AsyncDeps, prompt: Prompt) -> bool:
+    try:
+        await _deliver_prompt(deps, prompt)
+    except CircuitOpenError:
+        if prompt.kind is not PromptKind.CARD:
+            return False
+        # Заявка уже сохранена: карточка уйдёт в админ-чат, когда Telegram снова станет доступен
+        defer(
+            deps, TELEGRAM_BREAKER, f"карточка новой заявки {prompt.booking_id}",
+            functools.partial(_deliver_prompt, deps, prompt),
+        )
+    except Exception:
+        logger.exception("Ошибка при отправке сообщения (%s) по заявке %s", prompt.kind.value, prompt.booking_id)
+        return False
+    return True
+
+
+async def _deliver_prompt(deps: AsyncDeps, prompt: Prompt) -> None:
+    msg = await deps.bot.send_message(deps.config.admin_group_id, prompt.text, reply_markup=prompt.markup)
+    if prompt.kind.ephemeral:
+        await run_blocking(deps, deps.ephemeral.register, prompt.booking_id, msg)
+    await run_blocking(deps, deps.bookings.record_prompt, prompt.booking_id, prompt.kind, msg.message_id)
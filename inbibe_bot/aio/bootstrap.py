@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from aiohttp import web
+from telebot.async_telebot import AsyncTeleBot
+
+from inbibe_bot.aio import telegram
+from inbibe_bot.aio.actions import perform
+from inbibe_bot.aio.bot_factory import AsyncDeps, register_all_handlers
+from inbibe_bot.aio.router import AsyncUpdateRouter
+from inbibe_bot.aio.server import build_web_app
+from inbibe_bot.aio.vk_client import AsyncVkClient
+from inbibe_bot.bootstrap import build_core, build_elector, build_replication, build_retry, build_wheel
+from inbibe_bot.client.update_filter import UpdateFilter
+from inbibe_bot.config import AppConfig
+from inbibe_bot.service.actions import Action
+from inbibe_bot.shared.leader_election import LeaderElector
+from inbibe_bot.shared.retry_queue import RetryQueue
+from inbibe_bot.shared.timer_wheel import TimerWheel
+from inbibe_bot.storage.replication import Replication, ReplicationPrimary, ReplicationStandby
+
+logger = logging.getLogger(__name__)
+
+# Соединения к api.vk.com в общем пуле aiohttp
+VK_CONNECTIONS = 20
+
+
+class CoalescingSaver:
+    """Сохраняет состояние в пуле потоков, не блокируя event loop.
+
+    Изменения во время записи не ставят записи в очередь: по её окончании делается ровно одна следующая.
+    Создаётся в event loop; request() из других потоков (колесо таймеров) передаётся в него.
+    """
+
+    def __init__(self, save: Callable[[], None], loop: asyncio.AbstractEventLoop) -> None:
+        self._save = save
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._running: asyncio.Future[None] | None = None
+        self._dirty = False
+
+    def request(self) -> None:
+        if threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self.request)
+            return
+        self._dirty = True
+        if self._running is None:
+            self._start()
+
+    async def flush(self) -> None:
+        while self._running is not None:
+            await self._running
+
+    def _start(self) -> None:
+        self._dirty = False
+        self._running = self._loop.run_in_executor(None, self._save)
+        self._running.add_done_callback(self._done)
+
+    def _done(self, _: asyncio.Future[None]) -> None:
+        self._running = None
+        if self._dirty:
+            self._start()
+
+
+class LoopPerformer:
+    """Выполняет действия сервисного слоя из потока колеса таймеров в event loop (aio.actions.perform).
+
+    Поток колеса не ждёт отправки; drain() при остановке дожидается начатого.
+    """
+
+    def __init__(self, deps: AsyncDeps, loop: asyncio.AbstractEventLoop) -> None:
+        self._deps = deps
+        self._loop = loop
+        # Трогается только из event loop
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def __call__(self, actions: Sequence[Action]) -> None:
+        self._loop.call_soon_threadsafe(self._spawn, actions)
+
+    async def drain(self, timeout: float) -> None:
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning("Брошено при остановке: %d действий по таймерам не уложились в %.1f с", len(pending), timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _spawn(self, actions: Sequence[Action]) -> None:
+        task = self._loop.create_task(perform(self._deps, actions))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task[None]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Ошибка при выполнении действий по таймеру", exc_info=task.exception())
+
+
+@dataclass
+class AsyncAppContext:
+    config: AppConfig
+    deps: AsyncDeps
+    router: AsyncUpdateRouter
+    saver: CoalescingSaver | None
+    web_app: web.Application
+    elector: LeaderElector | None
+    wheel: TimerWheel
+    performer: LoopPerformer
+    retry: RetryQueue
+    replication: Replication | None
+
+
+async def build_async_context(config: AppConfig, bot: AsyncTeleBot | None = None) -> AsyncAppContext:
+    """Asyncio-аналог bootstrap.build_context поверх того же ядра; вызывается из работающего event loop."""
+    bot = bot or telegram.build_async_bot(config)
+    # Загрузка state.json в потоке: event loop тем временем выполняет первые запросы к Telegram
+    core = await asyncio.to_thread(build_core, config, None)
+
+    vk: AsyncVkClient | None = None
+    if config.vk_access_token:
+        vk = AsyncVkClient(config.vk_access_token, config.vk_api_version, config.vk_api_url, VK_CONNECTIONS)
+        await vk.start()
+
+    # Предохранители и очередь повторов — как в синхронном рантайме; поток очереди запускает main_async
+    retry = build_retry(config, telegram.NETWORK_ERRORS)
+
+    deps = AsyncDeps(
+        bot=bot,
+        config=config,
+        booking_repo=core.booking_repo,
+        flow_repo=core.flow_repo,
+        delivery_queue=core.delivery_queue,
+        ephemeral=core.ephemeral,
+        keyboards=core.keyboards,
+        bookings=core.bookings,
+        flows=core.flows,
+        vk=vk,
+        retry=retry,
+        offload=core.shared,
+    )
+
+    saver: CoalescingSaver | None = None
+    if not core.shared:
+        saver = CoalescingSaver(core.persister.save, asyncio.get_running_loop())
+    # Поток репликации запускает main_async; резерв начнёт сохранять состояние после promote
+    replication = build_replication(config, core, saver.request if saver is not None else None)
+    if saver is not None and not isinstance(replication, ReplicationStandby):
+        core.set_change_callback(saver.request)
+
+    # Истечения — на колесе таймеров, как в синхронном рантайме; запускает main_async
+    elector = build_elector(config, core)
+    performer = LoopPerformer(deps, asyncio.get_running_loop())
+    wheel = build_wheel(config, core, elector, performer)
+
+    router = register_all_handlers(deps)
+    telegram.install_metrics()
+    telegram.instrument_bot(bot)
+
+    return AsyncAppContext(
+        config=config,
+        deps=deps,
+        router=router,
+        saver=saver,
+        web_app=build_web_app(
+            deps,
+            config.webhook_secret,
+            config.shutdown_timeout_s,
+            UpdateFilter(config.admin_group_id, router.knows_prompt, router.resolve),
+        ),
+        elector=elector,
+        wheel=wheel,
+        performer=performer,
+        retry=retry,
+        replication=replication,
+    )
+
+
+async def close_context(app: AsyncAppContext) -> None:
+    timeout = app.config.shutdown_timeout_s
+    await asyncio.to_thread(app.wheel.stop, timeout)
+    await app.performer.drain(timeout)
+    # Поток очереди выполняет отложенные вызовы в event loop: ждём его, не останавливая loop
+    await asyncio.to_thread(app.retry.stop, timeout)
+    if app.saver is not None:
+        await app.saver.flush()
+    if isinstance(app.replication, ReplicationPrimary):
+        primary = app.replication
+        unsent = await asyncio.to_thread(primary.flush, timeout)
+        if unsent:
+            logger.warning("Брошено при остановке: %d операций репликации не отправлены резерву", unsent)
+        await asyncio.to_thread(primary.stop)
+    if app.elector is not None:
+        await asyncio.to_thread(app.elector.stop)
+    if app.deps.vk is not None:
+        await app.deps.vk.close()
+    await app.deps.bot.close_session()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Coroutine, TypeVar
+
+from telebot.async_telebot import AsyncTeleBot
+
+from inbibe_bot.aio.router import AsyncUpdateRouter
+from inbibe_bot.aio.vk_client import AsyncVkClient
+from inbibe_bot.client.keyboard_cache import KeyboardCache
+from inbibe_bot.config import AppConfig
+from inbibe_bot.core.booking import Booking, Source
+from inbibe_bot.service.bookings import BookingService
+from inbibe_bot.service.flows import FlowService
+from inbibe_bot.shared.circuit_breaker import TELEGRAM_BREAKER, VK_BREAKER, CircuitBreaker, CircuitOpenError
+from inbibe_bot.shared.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+from inbibe_bot.shared.retry_queue import RetryQueue
+from inbibe_bot.shared.vk_api import VkSendError
+from inbibe_bot.shared.tracing import span
+from inbibe_bot.storage.booking_repository import BookingRepository
+from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
+from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService
+from inbibe_bot.storage.user_flow_repository import UserFlowRepository
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class AsyncDeps:
+    """offload — хранилища синхронные и сетевые (STATE_BACKEND=redis): вызовы сервисов и хранилищ
+    идут через run_blocking в пуле потоков, иначе ожидание Redis останавливало бы весь event loop.
+    """
+
+    bot: AsyncTeleBot
+    config: AppConfig
+    booking_repo: BookingRepository
+    flow_repo: UserFlowRepository
+    delivery_queue: ApprovedBookingQueue
+    ephemeral: EphemeralMessageService
+    keyboards: KeyboardCache
+    bookings: BookingService
+    flows: FlowService
+    vk: AsyncVkClient | None
+    retry: RetryQueue
+    offload: bool = False
+
+
+async def run_blocking(deps: AsyncDeps, fn: Callable[..., _T], *args: Any) -> _T:
+    """Вызов синхронного сервиса или хранилища: в потоке при offload, иначе прямо в event loop.
+
+    In-memory хранилища отвечают за микросекунды — переход в поток стоил бы дороже самого вызова.
+    """
+    if deps.offload:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+def defer(deps: AsyncDeps, breaker: CircuitBreaker, description: str, call: Callable[[], Coroutine[Any, Any, object]]) -> None:
+    """Откладывает вызов в RetryQueue; её поток выполняет его в этом event loop и ждёт результата."""
+    loop = asyncio.get_running_loop()
+    deps.retry.defer(breaker, description, lambda: asyncio.run_coroutine_threadsafe(call(), loop).result())
+
+
+async def notify_user(deps: AsyncDeps, booking: Booking, text: str) -> None:
+    """Уведомляет гостя в TG или VK; если канал недоступен (предохранитель разомкнут) — откладывает."""
+    try:
+        await _send_to_user(deps, booking, text)
+    except CircuitOpenError as e:
+        breaker = VK_BREAKER if e.name == VK_BREAKER.name else TELEGRAM_BREAKER
+        defer(deps, breaker, f"уведомление по заявке {booking.id}", functools.partial(_send_to_user, deps, booking, text))
+    except Exception:
+        channel = "TG" if booking.source == Source.TG else "VK"
+        logger.exception("Не удалось уведомить %s-пользователя %s", channel, booking.user_id)
+
+
+async def _send_to_user(deps: AsyncDeps, booking: Booking, text: str) -> None:
+    """Бросает исключение при любой неудаче: RetryQueue.flush должен отличать доставку от сбоя."""
+    if booking.source == Source.TG:
+        await deps.bot.send_message(booking.user_id, text)
+    elif deps.vk is not None:
+        if not await deps.vk.send_message(booking.user_id, text):
+            raise VkSendError(booking.user_id)
+    else:
+        logger.warning("VK_ACCESS_TOKEN не задан, уведомление не отправлено")
+
+
+async def clear_ephemeral(deps: AsyncDeps, booking_id: str) -> None:
+    """Удаляет временные сообщения заявки параллельно; при недоступном Telegram удаление откладывается."""
+    messages = await run_blocking(deps, deps.ephemeral.take, booking_id)
+    results = await asyncio.gather(
+        *(deps.bot.delete_message(chat_id, message_id) for chat_id, message_id in messages),
+        return_exceptions=True,
+    )
+    for (chat_id, message_id), result in zip(messages, results):
+        if isinstance(result, CircuitOpenError):
+            defer(
+                deps,
+                TELEGRAM_BREAKER,
+                f"временное сообщение {message_id} заявки {booking_id}",
+                functools.partial(deps.bot.delete_message, chat_id, message_id),
+            )
+        elif isinstance(result, Exception):
+            logger.warning("Не удалось удалить временное сообщение заявки %s: %s", booking_id, result)
+
+
+def register_all_handlers(deps: AsyncDeps) -> AsyncUpdateRouter:
+    from inbibe_bot.aio.handlers import user_flow, admin_review, table_selection, alt_datetime
+    router = AsyncUpdateRouter(deps.config.admin_group_id, offload=deps.offload)
+    user_flow.register(deps, router)
+    admin_review.register(deps, router)
+    table_selection.register(deps, router)
+    alt_datetime.register(deps, router)
+    router.install(deps.bot)
+    _instrument_message_handlers(deps.bot, router)
+    return router
+
+
+def _instrument_message_handlers(bot: AsyncTeleBot, router: AsyncUpdateRouter) -> None:
+    for handler in bot.message_handlers:
+        fn = handler["function"]
+        if fn == router.dispatch_reply or hasattr(fn, "__wrapped__"):
+            continue
+        handler["function"] = _timed(fn)
+
+
+def _timed(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter_ns()
+        try:
+            with span("handler", route=name):
+                return await fn(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe_ns(time.perf_counter_ns() - started, name)
+
+    return wrapper
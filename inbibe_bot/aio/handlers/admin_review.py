@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from telebot.types import CallbackQuery
+
+from inbibe_bot.aio.actions import answer_callback
+from inbibe_bot.aio.bot_factory import AsyncDeps, run_blocking
+from inbibe_bot.aio.router import AsyncUpdateRouter
+from inbibe_bot.client.callbacks import CallbackData
+
+
+def register(deps: AsyncDeps, router: AsyncUpdateRouter) -> None:
+
+    @router.callback(CallbackData.APPROVE_ALT, CallbackData.LEGACY_APPROVE_ALT)
+    async def handle_approve_alt(call: CallbackQuery) -> None:
+        booking_id = CallbackData.parse_booking_id(call.data or "")
+        actions = await run_blocking(deps, deps.bookings.request_alt_datetime, booking_id)
+        await answer_callback(deps, call, actions)
+
+    @router.callback(CallbackData.APPROVE, CallbackData.LEGACY_APPROVE)
+    async def handle_approve(call: CallbackQuery) -> None:
+        booking_id = CallbackData.parse_booking_id(call.data or "")
+        actions = await run_blocking(deps, deps.bookings.approve, booking_id)
+        await answer_callback(deps, call, actions)
+
+    @router.callback(CallbackData.REJECT, CallbackData.LEGACY_REJECT)
+    async def handle_reject(call: CallbackQuery) -> None:
+        booking_id = CallbackData.parse_booking_id(call.data or "")
+        actions = await run_blocking(deps, deps.bookings.reject, booking_id)
+        await answer_callback(deps, call, actions)
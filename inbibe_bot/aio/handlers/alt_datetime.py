@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from telebot.types import Message
+
+from inbibe_bot.aio.actions import answer_reply
+from inbibe_bot.aio.bot_factory import AsyncDeps, run_blocking
+from inbibe_bot.aio.router import AsyncUpdateRouter
+from inbibe_bot.core.booking import Booking
+
+
+def register(deps: AsyncDeps, router: AsyncUpdateRouter) -> None:
+
+    @router.reply(deps.booking_repo.find_by_alt_request_message_id)
+    async def handle_alt_datetime_reply(message: Message, booking: Booking) -> None:
+        await run_blocking(deps, deps.ephemeral.register, booking.id, message)
+        actions = await run_blocking(deps, deps.bookings.reschedule_from_reply, booking.id, message.text)
+        await answer_reply(deps, message, booking.id, actions)
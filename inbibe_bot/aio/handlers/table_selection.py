@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from telebot.types import CallbackQuery, Message
+
+from inbibe_bot.aio.actions import answer_callback, answer_reply
+from inbibe_bot.aio.bot_factory import AsyncDeps, run_blocking
+from inbibe_bot.aio.router import AsyncUpdateRouter
+from inbibe_bot.client.callbacks import CallbackData
+from inbibe_bot.core.booking import Booking
+
+
+def register(deps: AsyncDeps, router: AsyncUpdateRouter) -> None:
+    bot = deps.bot
+
+    @router.callback(CallbackData.TABLE, CallbackData.LEGACY_TABLE)
+    async def handle_table_inline(call: CallbackQuery) -> None:
+        try:
+            booking_id, table_num = CallbackData.parse_table(call.data or "")
+        except (ValueError, IndexError):
+            await bot.answer_callback_query(call.id, "Неверные данные.", show_alert=True)
+            return
+        actions = await run_blocking(deps, deps.bookings.assign_table, booking_id, table_num)
+        await answer_callback(deps, call, actions)
+
+    @router.callback(CallbackData.ASSIGN)
+    async def handle_suggested_tables(call: CallbackQuery) -> None:
+        try:
+            booking_id, tables = CallbackData.parse_assign(call.data or "")
+        except (ValueError, IndexError):
+            await bot.answer_callback_query(call.id, "Неверные данные.", show_alert=True)
+            return
+        if not tables:
+            await bot.answer_callback_query(call.id, "Неверные данные.", show_alert=True)
+            return
+        actions = await run_blocking(deps, deps.bookings.assign_suggested, booking_id, tables)
+        await answer_callback(deps, call, actions)
+
+    @router.reply(deps.booking_repo.find_by_table_request_message_id)
+    async def handle_table_reply(message: Message, booking: Booking) -> None:
+        await run_blocking(deps, deps.ephemeral.register, booking.id, message)
+        actions = await run_blocking(deps, deps.bookings.assign_from_reply, booking.id, message.text)
+        await answer_reply(deps, message, booking.id, actions)
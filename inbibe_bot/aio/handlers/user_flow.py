@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from telebot.types import Message, CallbackQuery
+
+from inbibe_bot.aio.actions import answer_callback, perform
+from inbibe_bot.aio.bot_factory import AsyncDeps, run_blocking
+from inbibe_bot.aio.router import AsyncUpdateRouter
+from inbibe_bot.client.callbacks import CallbackData
+
+
+def register(deps: AsyncDeps, router: AsyncUpdateRouter) -> None:
+    bot = deps.bot
+
+    @bot.message_handler(commands=["start"])
+    async def cmd_start(message: Message) -> None:
+        if message.chat.type != "private":
+            return
+        await perform(deps, await run_blocking(deps, deps.flows.start, message.chat.id))
+
+    @bot.message_handler(content_types=["contact"])
+    async def handle_contact(message: Message) -> None:
+        if not message.contact:
+            return
+        phone = message.contact.phone_number
+        await perform(deps, await run_blocking(deps, deps.flows.contact, message.chat.id, phone))
+
+    @router.callback(CallbackData.DATE, CallbackData.LEGACY_DATE)
+    async def handle_date_callback(call: CallbackQuery) -> None:
+        actions = await run_blocking(deps, deps.flows.pick_date, call.from_user.id, call.data or "")
+        await answer_callback(deps, call, actions)
+
+    @router.callback(CallbackData.TIME, CallbackData.LEGACY_TIME)
+    async def handle_time_callback(call: CallbackQuery) -> None:
+        actions = await run_blocking(deps, deps.flows.pick_time, call.from_user.id, call.data or "")
+        await answer_callback(deps, call, actions)
+
+    @router.callback(CallbackData.IGNORE)
+    async def handle_ignore(call: CallbackQuery) -> None:
+        # Заголовки и занятые слоты клавиатуры времени: только снять «часики» с кнопки
+        await bot.answer_callback_query(call.id)
+
+    @bot.message_handler(func=lambda msg: msg.chat.type == "private")
+    async def handle_message(message: Message) -> None:
+        text = (message.text or "").strip()
+        await perform(deps, await run_blocking(deps, deps.flows.message, message.chat.id, text))
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import CallbackQuery, Message
+
+from inbibe_bot.client.router import BookingLookup, RouteStats, RouteTrie
+from inbibe_bot.core.booking import Booking
+from inbibe_bot.shared.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+from inbibe_bot.shared.tracing import span
+
+AsyncCallbackHandler = Callable[[CallbackQuery], Awaitable[None]]
+AsyncReplyHandler = Callable[[Message, Booking], Awaitable[None]]
+
+
+class AsyncUpdateRouter:
+    """Асинхронный вариант UpdateRouter: тот же разбор callback_data, корутины вместо функций.
+
+    Всё выполняется в одном потоке event loop, поэтому статистика не требует блокировок.
+    offload — поиск заявки по reply (запрос к общему хранилищу) идёт в пуле потоков.
+    """
+
+    def __init__(self, admin_group_id: int, offload: bool = False) -> None:
+        self._admin_group_id = admin_group_id
+        self._offload = offload
+        self._trie = RouteTrie()
+        self._callbacks: dict[str, AsyncCallbackHandler] = {}
+        self._replies: list[tuple[str, BookingLookup, AsyncReplyHandler]] = []
+        self._stats: dict[str, RouteStats] = {}
+
+    def callback(self, *prefixes: str) -> Callable[[AsyncCallbackHandler], AsyncCallbackHandler]:
+        def decorator(handler: AsyncCallbackHandler) -> AsyncCallbackHandler:
+            route = handler.__name__
+            for prefix in prefixes:
+                self._trie.insert(prefix, route)
+            self._callbacks[route] = handler
+            return handler
+        return decorator
+
+    def reply(self, lookup: BookingLookup) -> Callable[[AsyncReplyHandler], AsyncReplyHandler]:
+        def decorator(handler: AsyncReplyHandler) -> AsyncReplyHandler:
+            self._replies.append((handler.__name__, lookup, handler))
+            return handler
+        return decorator
+
+    def install(self, bot: AsyncTeleBot) -> None:
+        bot.callback_query_handler(func=lambda call: True)(self.dispatch_callback)
+        bot.message_handler(func=self.is_admin_reply)(self.dispatch_reply)
+
+    def is_admin_reply(self, message: Message) -> bool:
+        return message.chat.id == self._admin_group_id and message.reply_to_message is not None
+
+    def resolve(self, data: str) -> str | None:
+        return self._trie.resolve(data)
+
+    def knows_prompt(self, message_id: int) -> bool:
+        return any(lookup(message_id) is not None for _, lookup, _ in self._replies)
+
+    async def dispatch_callback(self, call: CallbackQuery) -> None:
+        route = self.resolve(call.data or "")
+        if route is None:
+            return
+        await self._run(route, self._callbacks[route], call)
+
+    async def dispatch_reply(self, message: Message) -> None:
+        reply_to = message.reply_to_message
+        if reply_to is None:
+            return
+        for route, lookup, handler in self._replies:
+            if self._offload:
+                booking = await asyncio.to_thread(lookup, reply_to.message_id)
+            else:
+                booking = lookup(reply_to.message_id)
+            if booking is not None:
+                await self._run(route, handler, message, booking)
+                return
+
+    def stats(self) -> dict[str, dict[str, float | int]]:
+        return {route: s.to_dict() for route, s in sorted(self._stats.items())}
+
+    async def _run(self, route: str, handler: Callable[..., Awaitable[Any]], *args: object) -> None:
+        started = time.perf_counter_ns()
+        failed = True
+        try:
+            with span("handler", route=route):
+                await handler(*args)
+            failed = False
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            self._stats.setdefault(route, RouteStats()).record(elapsed, failed)
+            HANDLER_SECONDS.observe_ns(elapsed, route)
+            if failed:
+                HANDLER_ERRORS.inc(route)
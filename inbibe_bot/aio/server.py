@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+import telebot
+from aiohttp import web
+from aiohttp.abc import AbstractAccessLogger
+from aiohttp.web_request import BaseRequest
+from aiohttp.web_response import StreamResponse
+
+from inbibe_bot.aio.actions import perform
+from inbibe_bot.aio.bot_factory import AsyncDeps, run_blocking
+from inbibe_bot.client.update_filter import UpdateFilter
+from inbibe_bot.core.booking import Booking, Source
+from inbibe_bot.server.access_log import BOOKINGS_ACCESS_LOG_EVERY, access_log, policy_of
+from inbibe_bot.server.dto import BookingResponse, parse_booking_body
+from inbibe_bot.shared.id_gen import gen_id
+from inbibe_bot.shared.metrics import HTTP_REQUESTS, HTTP_SECONDS, REGISTRY
+from inbibe_bot.shared.tracing import TRACER, current_span
+from inbibe_bot.storage.user_registry import register_vk_user
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+_DEPS = web.AppKey("deps", AsyncDeps)
+_SECRET = web.AppKey("webhook_secret", str)
+_BACKGROUND = web.AppKey("background", set)
+_FILTER = web.AppKey("update_filter", UpdateFilter)
+_SHUTDOWN_TIMEOUT = web.AppKey("shutdown_timeout_s", float)
+
+
+class AccessLogger(AbstractAccessLogger):
+    """Access-лог aiohttp с теми же метаданными маршрутов (@access_log), что и у Flask-сервера."""
+
+    def log(self, request: BaseRequest, response: StreamResponse, time: float) -> None:
+        handler = request.match_info.handler if isinstance(request, web.Request) else None
+        policy = policy_of(handler)
+        if policy is not None and not policy.should_log(response.status):
+            return
+        self.logger.info(
+            '%s "%s %s" %s %.1f мс', request.remote, request.method, request.path_qs, response.status, time * 1000
+        )
+
+
+@web.middleware
+async def _observe(request: web.Request, handler: Handler) -> web.StreamResponse:
+    started = time.perf_counter_ns()
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource is not None else "unmatched"
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        HTTP_SECONDS.observe_ns(time.perf_counter_ns() - started, route, request.method)
+        HTTP_REQUESTS.inc(route, request.method, str(status))
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+    return response
+
+
+def _json(data: Any, status: int = 200) -> web.Response:
+    return web.json_response(data, status=status, dumps=_dumps)
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+async def health(request: web.Request) -> web.Response:
+    return _json(BookingResponse.ok().to_dict())
+
+
+@access_log(every=0)
+async def metrics(request: web.Request) -> web.Response:
+    # Датчики читают хранилища: при общем хранилище это запросы к Redis
+    text = await run_blocking(request.app[_DEPS], REGISTRY.render)
+    return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+
+@access_log(every=0)
+async def traces(request: web.Request) -> web.Response:
+    limit = request.query.get("limit")
+    return _json(TRACER.recent(int(limit) if limit else None, slow_only=request.query.get("slow") == "1"))
+
+
+@access_log(every=BOOKINGS_ACCESS_LOG_EVERY)
+async def get_bookings(request: web.Request) -> web.Response:
+    deps = request.app[_DEPS]
+    bookings = await run_blocking(deps, deps.delivery_queue.drain)
+    if bookings:
+        logger.info("Отправлена информация о %d одобренных бронях", len(bookings))
+    return _json([b.to_dict() for b in bookings])
+
+
+async def post_booking(request: web.Request) -> web.Response:
+    deps = request.app[_DEPS]
+    parsed = parse_booking_body(await request.read())
+    if isinstance(parsed, BookingResponse):
+        return _json(parsed.to_dict(), status=400)
+
+    booking = Booking(
+        id=gen_id(),
+        user_id=parsed.user_id or -1,
+        name=parsed.name,
+        phone=parsed.phone,
+        date_time=parsed.date_time,
+        guests=parsed.guests,
+        source=Source.VK,
+    )
+    actions = await run_blocking(deps, deps.bookings.submit, booking)
+    if parsed.user_id is not None:
+        register_vk_user(parsed.user_id)
+    await perform(deps, actions)
+    return _json(BookingResponse.ok().to_dict())
+
+
+async def webhook(request: web.Request) -> web.Response:
+    if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != request.app[_SECRET]:
+        return web.Response(status=403)
+    with TRACER.trace("update", source="webhook"):
+        raw = await request.read()
+        if not raw:
+            return web.Response(status=400)
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            return web.Response(status=400)
+        update_filter = request.app.get(_FILTER)
+        skipped: str | None = None
+        if update_filter is not None:
+            # classify ищет reply админа по заявкам — при общем хранилище это запрос к Redis
+            skipped = await run_blocking(request.app[_DEPS], update_filter.classify, data)
+        current = current_span()
+        assert current is not None
+        if skipped is not None:
+            current.trace.root.attrs["skipped"] = skipped
+            return web.Response(status=200)
+        try:
+            update = telebot.types.Update.de_json(data)
+        except Exception:
+            return web.Response(status=400)
+        # Telegram не ждёт обработки: ответ сразу, апдейт — в отдельной задаче (контекст трейса копируется)
+        current.trace.hold()
+        task = asyncio.create_task(_process(request.app[_DEPS], update))
+        background = request.app[_BACKGROUND]
+        background.add(task)
+        task.add_done_callback(background.discard)
+        task.add_done_callback(lambda _: current.trace.release())
+    return web.Response(status=200)
+
+
+async def _process(deps: AsyncDeps, update: telebot.types.Update) -> None:
+    try:
+        await deps.bot.process_new_updates([update])
+    except Exception:
+        logger.exception("Ошибка обработки webhook update")
+
+
+async def _drain_background(app: web.Application) -> None:
+    """on_shutdown: приём уже закрыт, начатые апдейты webhook дорабатывают в пределах SHUTDOWN_TIMEOUT_S."""
+    # Копия: завершившиеся задачи удаляют себя из множества приложения
+    background = app[_BACKGROUND]
+    tasks: set[asyncio.Task[None]] = set(background)
+    if not tasks:
+        return
+    timeout = app[_SHUTDOWN_TIMEOUT]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    logger.info("Апдейты webhook дообработаны при остановке: %d", len(done))
+    if pending:
+        logger.warning("Брошено при остановке: %d апдейтов webhook не уложились в %.1f с", len(pending), timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def build_web_app(
+    deps: AsyncDeps, webhook_secret: str, shutdown_timeout_s: float, update_filter: UpdateFilter | None = None
+) -> web.Application:
+    app = web.Application(middlewares=[_observe])
+    app[_DEPS] = deps
+    app[_SECRET] = webhook_secret
+    app[_SHUTDOWN_TIMEOUT] = shutdown_timeout_s
+    if update_filter is not None:
+        app[_FILTER] = update_filter
+    app[_BACKGROUND] = set()
+    app.on_shutdown.append(_drain_background)
+    app.router.add_get("/api/health", health)
+    app.router.add_get("/api/metrics", metrics)
+    app.router.add_get("/api/traces", traces)
+    app.router.add_get("/api/bookings", get_bookings)
+    app.router.add_post("/api/book", post_booking)
+    app.router.add_post("/webhook", webhook)
+    return app
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from typing import Any, Callable, Coroutine
+
+import aiohttp
+from telebot import asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import Update
+
+from inbibe_bot.config import AppConfig
+from inbibe_bot.shared.circuit_breaker import TELEGRAM_BREAKER, CircuitBreaker
+from inbibe_bot.shared.metrics import TELEGRAM_REQUESTS, TELEGRAM_SECONDS
+from inbibe_bot.shared.tracing import TRACER, current_span, span, update_kind
+
+# Соединения к api.telegram.org в общем пуле aiohttp
+TELEGRAM_CONNECTIONS = 100
+# У long polling свои повторы: через предохранитель он не идёт (как пул poll в TelegramTransport)
+LONG_POLL_METHOD = "getUpdates"
+# Ошибки, после которых отложенный вызов Bot API или VK стоит повторить (RetryQueue)
+NETWORK_ERRORS: tuple[type[Exception], ...] = (asyncio_helper.RequestTimeout, aiohttp.ClientError, asyncio.TimeoutError)
+
+_instrumented: weakref.WeakSet[AsyncTeleBot] = weakref.WeakSet()
+
+
+def build_async_bot(config: AppConfig) -> AsyncTeleBot:
+    asyncio_helper.REQUEST_LIMIT = TELEGRAM_CONNECTIONS
+    if config.tg_proxy:
+        asyncio_helper.proxy = config.tg_proxy  # type: ignore[assignment]
+    install_breaker(TELEGRAM_BREAKER)
+    return AsyncTeleBot(config.tg_api_key)
+
+
+def install_breaker(breaker: CircuitBreaker) -> None:
+    """Пропускает вызовы Bot API через предохранитель: при разомкнутом — CircuitOpenError без запроса.
+
+    Сбоем считаются сеть и таймаут (RequestTimeout) и ответы 5xx; остальные ошибки API — ответ на сам запрос.
+    """
+    original: Callable[..., Coroutine[Any, Any, Any]] = asyncio_helper._process_request
+    if getattr(original, "__breaker__", None) is breaker:
+        return
+
+    async def process_request(token: str, url: str, *args: Any, **kwargs: Any) -> Any:
+        if url == LONG_POLL_METHOD:
+            return await original(token, url, *args, **kwargs)
+        breaker.check()
+        ok = False
+        try:
+            result = await original(token, url, *args, **kwargs)
+            ok = True
+            return result
+        except asyncio_helper.ApiTelegramException as e:
+            ok = e.error_code < 500
+            raise
+        except asyncio_helper.ApiHTTPException as e:
+            ok = e.result.status < 500
+            raise
+        finally:
+            breaker.record(ok)
+
+    process_request.__breaker__ = breaker  # type: ignore[attr-defined]
+    asyncio_helper._process_request = process_request
+
+
+def install_metrics() -> None:
+    """Оборачивает asyncio_helper._process_request: длительность, коды ответов и спан на каждый вызов Bot API."""
+    original: Callable[..., Coroutine[Any, Any, Any]] = asyncio_helper._process_request
+    if getattr(original, "__wrapped__", None) is not None:
+        return
+
+    async def process_request(token: str, url: str, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter_ns()
+        code = "error"
+        try:
+            with span(f"telegram.{url}"):
+                result = await original(token, url, *args, **kwargs)
+            code = "200"
+            return result
+        except asyncio_helper.ApiTelegramException as e:
+            code = str(e.error_code)
+            raise
+        finally:
+            TELEGRAM_SECONDS.observe_ns(time.perf_counter_ns() - started, url)
+            TELEGRAM_REQUESTS.inc(url, code)
+
+    process_request.__wrapped__ = original  # type: ignore[attr-defined]
+    asyncio_helper._process_request = process_request
+
+
+def instrument_bot(bot: AsyncTeleBot) -> None:
+    """Каждый апдейт — свой трейс; хэндлеры AsyncTeleBot ожидаются внутри process_new_updates."""
+    if bot in _instrumented:
+        return
+    _instrumented.add(bot)
+    process = bot.process_new_updates
+
+    async def process_new_updates(updates: list[Update]) -> None:
+        current = current_span()
+        if current is not None:
+            # Вебхук: трейс открыт при приёме HTTP-запроса
+            if updates:
+                current.trace.root.attrs.setdefault("kind", update_kind(updates[0]))
+            with span("process"):
+                await process(updates)
+            return
+        for update in updates:
+            with TRACER.trace("update", source="polling", kind=update_kind(update)):
+                await process([update])
+
+    bot.process_new_updates = process_new_updates  # type: ignore[method-assign]
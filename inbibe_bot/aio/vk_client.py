@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+import aiohttp
+
+from inbibe_bot.shared.circuit_breaker import VK_BREAKER
+from inbibe_bot.shared.metrics import VK_REQUESTS, VK_SECONDS
+from inbibe_bot.shared.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncVkClient:
+    """Отправка сообщений VK через общий пул соединений aiohttp (аналог shared.vk_api.send_vk_message)."""
+
+    def __init__(self, token: str, api_version: str, api_url: str, connections: int) -> None:
+        self._token = token
+        self._api_version = api_version
+        self._api_url = api_url
+        self._connections = connections
+        self._session: aiohttp.ClientSession | None = None
+
+    async def start(self) -> None:
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self._connections),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def send_message(self, user_id: int, message: str) -> bool:
+        """Как send_vk_message: CircuitOpenError при разомкнутом предохранителе, aiohttp.ClientError или
+        asyncio.TimeoutError при недоступности VK (сеть, таймаут, 5xx), False — ошибка API.
+        """
+        assert self._session is not None, "AsyncVkClient.start() не вызван"
+        VK_BREAKER.check()
+        started = time.perf_counter_ns()
+        code = "error"
+        available = False
+        try:
+            with span("vk.send"):
+                async with self._session.post(
+                    self._api_url,
+                    data={
+                        "user_id": user_id,
+                        "random_id": int(datetime.now().timestamp() * 1000),
+                        "message": message,
+                        "access_token": self._token,
+                        "v": self._api_version,
+                    },
+                ) as resp:
+                    code = str(resp.status)
+                    available = resp.status < 500
+                    if not available:
+                        resp.raise_for_status()
+                    data = await resp.json(content_type=None)
+            if isinstance(data.get("error"), dict):
+                code = f"vk_{data['error'].get('error_code')}"
+            return "response" in data and isinstance(data["response"], int)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            available = False
+            logger.warning("VK недоступен, сообщение пользователю %s не отправлено", user_id)
+            raise
+        except Exception:
+            logger.warning("Сообщение пользователю VK %s не было отправлено", user_id)
+            return False
+        finally:
+            VK_BREAKER.record(available)
+            VK_SECONDS.observe_ns(time.perf_counter_ns() - started)
+            VK_REQUESTS.inc(code)
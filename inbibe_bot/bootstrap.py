@@ -0,0 +1,398 @@
+from __future__ import annotations
+
+import functools
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+
+import telebot
+
+from inbibe_bot.client.actions import perform
+from inbibe_bot.client.bot_factory import Deps, build_bot, register_all_handlers
+from inbibe_bot.client.keyboard_cache import KeyboardCache
+from inbibe_bot.client.keyboards import DATE_HORIZON_DAYS
+from inbibe_bot.client.router import UpdateRouter
+from inbibe_bot.client.scheduler import Priority, UpdateScheduler
+from inbibe_bot.client.update_filter import UpdateFilter
+from inbibe_bot.config import AppConfig
+from inbibe_bot.core.availability import AvailabilityGrid
+from inbibe_bot.core.booking_workflow import BookingWorkflow
+from inbibe_bot.core.formatter import BookingFormatter
+from inbibe_bot.core.occupancy import InMemoryTableOccupancy, TableOccupancy
+from inbibe_bot.core.table_suggester import TableSuggester
+from inbibe_bot.server.deps import ServerDeps
+from inbibe_bot.service.bookings import BookingService
+from inbibe_bot.service.expiry import ExpiryService, Perform
+from inbibe_bot.service.flows import FlowService
+from inbibe_bot.shared.circuit_breaker import BREAKERS
+from inbibe_bot.shared.circuit_breaker import register_metrics as register_breaker_metrics
+from inbibe_bot.shared.datetime_utils import MSK
+from inbibe_bot.shared.leader_election import LeaderElector
+from inbibe_bot.shared.metrics import REGISTRY
+from inbibe_bot.shared.resp import RespClient
+from inbibe_bot.shared.retry_queue import NETWORK_ERRORS, RetryQueue
+from inbibe_bot.shared.striped_lock import StripedLock
+from inbibe_bot.shared.telegram_transport import install_metrics
+from inbibe_bot.shared.timer_wheel import TimerWheel
+from inbibe_bot.shared.tracing import TRACER, instrument_bot
+from inbibe_bot.storage.booking_repository import BookingRepository, InMemoryBookingRepository
+from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue, InMemoryBookingQueue
+from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService, InMemoryEphemeralMessages
+from inbibe_bot.storage.persistence import StatePersister
+from inbibe_bot.storage.replication import (
+    Replication,
+    ReplicationPrimary,
+    ReplicationStandby,
+    Stores,
+)
+from inbibe_bot.storage.reservation_history import ReservationHistory
+from inbibe_bot.storage.shared_state import (
+    RespBookingQueue,
+    RespBookingRepository,
+    RespEphemeralMessages,
+    RespTableOccupancy,
+    RespUserFlowRepository,
+)
+from inbibe_bot.storage.traffic_recorder import TrafficRecorder
+from inbibe_bot.storage.user_flow_repository import InMemoryUserFlowRepository, UserFlowRepository
+
+# Полосы блокировок заявок: активных заявок десятки, коллизии полос при 64 редки
+BOOKING_LOCK_STRIPES = 64
+# Как часто реплика перечитывает брони из общего хранилища в сетку доступности. Сетка только
+# подсказывает свободные слоты и столы: занять чужой стол не даёт reserve() в общем хранилище
+AVAILABILITY_REFRESH_S = 10
+
+
+@dataclass
+class AppContext:
+    config: AppConfig
+    deps: Deps
+    server_deps: ServerDeps
+    persister: StatePersister
+    router: UpdateRouter
+    recorder: TrafficRecorder | None
+    elector: LeaderElector | None
+    replication: Replication | None
+    scheduler: UpdateScheduler | None
+    wheel: TimerWheel
+    retry: RetryQueue
+
+
+@dataclass
+class Core:
+    """Общее ядро для синхронного и asyncio-рантайма: репозитории, доменная логика, persistence."""
+
+    booking_repo: BookingRepository
+    flow_repo: UserFlowRepository
+    delivery_queue: ApprovedBookingQueue
+    ephemeral: EphemeralMessageService
+    occupancy: TableOccupancy
+    workflow: BookingWorkflow
+    formatter: BookingFormatter
+    availability: AvailabilityGrid
+    keyboards: KeyboardCache
+    suggester: TableSuggester
+    persister: StatePersister
+    bookings: BookingService
+    flows: FlowService
+    state_client: RespClient | None
+
+    @property
+    def shared(self) -> bool:
+        """Состояние в общем хранилище (STATE_BACKEND=redis): state.json не читается и не пишется."""
+        return self.state_client is not None
+
+    def set_change_callback(self, fn: Callable[[], None]) -> None:
+        for repo in (self.booking_repo, self.flow_repo, self.delivery_queue, self.ephemeral, self.occupancy):
+            repo.set_change_callback(fn)
+
+    def refresh_availability(self) -> None:
+        """Перестраивает сетку из общего хранилища: брони, занятые и снятые другими репликами."""
+        self.availability.rebuild(self.occupancy.list_all())
+
+
+def build_core(config: AppConfig, bot: telebot.TeleBot | None) -> Core:
+    """Создаёт репозитории и доменные сервисы, поднимает сохранённое состояние.
+
+    bot нужен только EphemeralMessageService.clear(); asyncio-рантайм удаляет сообщения сам.
+    """
+    state_client: RespClient | None = None
+    booking_repo: BookingRepository
+    flow_repo: UserFlowRepository
+    delivery_queue: ApprovedBookingQueue
+    ephemeral: EphemeralMessageService
+    occupancy: TableOccupancy
+    duration = timedelta(minutes=config.booking_duration_min)
+    history = ReservationHistory(config.history_file)
+    if config.state_backend == "redis":
+        assert config.redis_url is not None
+        state_client = RespClient.from_url(config.redis_url)
+        booking_repo = RespBookingRepository(state_client, config.redis_prefix)
+        flow_repo = RespUserFlowRepository(state_client, config.redis_prefix)
+        delivery_queue = RespBookingQueue(state_client, config.redis_prefix)
+        ephemeral = RespEphemeralMessages(state_client, config.redis_prefix, bot)
+        # Брони — в общем хранилище: локальный журнал у каждой реплики был бы своим и неполным
+        occupancy = RespTableOccupancy(state_client, config.redis_prefix, config.actual_tables, duration)
+    else:
+        booking_repo = InMemoryBookingRepository()
+        flow_repo = InMemoryUserFlowRepository()
+        delivery_queue = InMemoryBookingQueue()
+        ephemeral = InMemoryEphemeralMessages(bot)
+        occupancy = InMemoryTableOccupancy(config.actual_tables, duration)
+        occupancy.add_listener(history.append)
+        # После уборки журнал переписывается из оставшихся броней, а не копит строки о прошедших
+        occupancy.add_prune_listener(lambda _cutoff: history.compact(occupancy.list_all))
+    workflow = BookingWorkflow(allowed_tables=set(config.actual_tables))
+    formatter = BookingFormatter()
+    availability = AvailabilityGrid(
+        occupancy,
+        config.table_capacities,
+        horizon_days=DATE_HORIZON_DAYS,
+        today=datetime.now(MSK).date(),
+    )
+    keyboards = KeyboardCache()
+    suggester = TableSuggester(config.table_capacities, availability)
+    bookings = BookingService(
+        booking_repo=booking_repo,
+        delivery_queue=delivery_queue,
+        occupancy=occupancy,
+        workflow=workflow,
+        formatter=formatter,
+        keyboards=keyboards,
+        availability=availability,
+        suggester=suggester,
+        locks=StripedLock(BOOKING_LOCK_STRIPES, "lock.booking"),
+    )
+    flows = FlowService(flow_repo=flow_repo, keyboards=keyboards, availability=availability, bookings=bookings)
+
+    # --- Persistence ---
+    persister = StatePersister(
+        path=config.state_file,
+        bookings=booking_repo,
+        flows=flow_repo,
+        queue=delivery_queue,
+        ephemeral=ephemeral,
+        occupancy=occupancy,
+        history=history,
+    )
+    if state_client is None and config.replication_role != "standby":
+        # Резерв не читает state.json: состояние придёт снимком от основного экземпляра
+        persister.load()
+    occupancy.prune(datetime.now(MSK))
+    availability.attach()
+    keyboards.warm(config.actual_tables, availability.full_slots)
+
+    # --- Метрики и трассировка ---
+    _register_gauges(booking_repo, flow_repo, delivery_queue, ephemeral)
+    TRACER.configure(config.trace_slow_ms, config.trace_buffer, config.trace_export_file)
+
+    return Core(
+        booking_repo=booking_repo,
+        flow_repo=flow_repo,
+        delivery_queue=delivery_queue,
+        ephemeral=ephemeral,
+        occupancy=occupancy,
+        workflow=workflow,
+        formatter=formatter,
+        availability=availability,
+        keyboards=keyboards,
+        suggester=suggester,
+        persister=persister,
+        bookings=bookings,
+        flows=flows,
+        state_client=state_client,
+    )
+
+
+def build_context(config: AppConfig, bot: telebot.TeleBot | None = None) -> AppContext:
+    """Собирает граф зависимостей, поднимает сохранённое состояние и регистрирует хэндлеры.
+
+    В сеть не ходит: вебхук/polling и HTTP-сервер запускает вызывающий код.
+    """
+    # --- Зависимости ---
+    bot = bot or build_bot(config)
+    core = build_core(config, bot)
+
+    # --- Предохранители внешних вызовов и очередь повторов (поток запускает вызывающий код) ---
+    retry = build_retry(config)
+    core.ephemeral.set_retry_queue(retry)
+
+    deps = Deps(
+        bot=bot,
+        config=config,
+        booking_repo=core.booking_repo,
+        flow_repo=core.flow_repo,
+        delivery_queue=core.delivery_queue,
+        ephemeral=core.ephemeral,
+        keyboards=core.keyboards,
+        availability=core.availability,
+        retry=retry,
+        bookings=core.bookings,
+        flows=core.flows,
+    )
+
+    # Сохранять при каждом изменении — надёжнее чем atexit в Docker (резерв начнёт после promote)
+    replication = build_replication(config, core)
+    if not core.shared and not isinstance(replication, ReplicationStandby):
+        core.set_change_callback(core.persister.save)
+
+    # --- Регистрация хэндлеров ---
+    router = register_all_handlers(deps)
+
+    # --- Истечения и фоновые проходы (колесо запускает вызывающий код; резерв — после promote) ---
+    elector = build_elector(config, core)
+    wheel = build_wheel(config, core, elector, functools.partial(perform, deps))
+
+    # --- Планировщик апдейтов вместо пула telebot (до трассировки: трейс оборачивает постановку в очередь) ---
+    scheduler: UpdateScheduler | None = None
+    if bot.threaded:
+        scheduler = UpdateScheduler(
+            config.admin_group_id,
+            workers=config.update_workers,
+            limits={Priority.USER_CALLBACK: config.user_callback_queue, Priority.USER_TEXT: config.user_text_queue},
+        )
+        scheduler.install(bot)
+
+    # --- Метрики и трассировка транспорта ---
+    install_metrics()
+    instrument_bot(bot)
+
+    # --- Запись трафика (опционально) ---
+    recorder: TrafficRecorder | None = None
+    if config.capture_dir is not None:
+        recorder = TrafficRecorder(
+            config.capture_dir,
+            max_bytes=config.capture_max_bytes,
+            backups=config.capture_backups,
+            salt=config.capture_salt.encode("utf-8") if config.capture_salt else None,
+        )
+        recorder.install()
+
+    server_deps = ServerDeps(
+        bot=bot,
+        admin_group_id=config.admin_group_id,
+        webhook_secret=config.webhook_secret,
+        booking_repo=core.booking_repo,
+        delivery_queue=core.delivery_queue,
+        formatter=core.formatter,
+        keyboards=core.keyboards,
+        suggester=core.suggester,
+        recorder=recorder,
+        admin_token=config.admin_token,
+        max_profile_s=config.profiler_max_s,
+        replication=replication,
+        update_filter=UpdateFilter(config.admin_group_id, router.knows_prompt, router.resolve),
+        retry=retry,
+    )
+    return AppContext(
+        config=config,
+        deps=deps,
+        server_deps=server_deps,
+        persister=core.persister,
+        router=router,
+        recorder=recorder,
+        elector=elector,
+        replication=replication,
+        scheduler=scheduler,
+        wheel=wheel,
+        retry=retry,
+    )
+
+
+def build_retry(
+    config: AppConfig, retryable: tuple[type[Exception], ...] = NETWORK_ERRORS
+) -> RetryQueue:
+    """Настраивает предохранители Telegram и VK и очередь повторов к ним; поток запускает вызывающий код."""
+    for breaker in BREAKERS:
+        breaker.configure(config.circuit_failure_rate, config.circuit_min_calls, config.circuit_open_s)
+    retry = RetryQueue(config.retry_queue_limit, retryable)
+    for breaker in BREAKERS:
+        breaker.add_listener(retry.on_breaker_change)
+    register_breaker_metrics()
+    return retry
+
+
+def build_wheel(config: AppConfig, core: Core, elector: LeaderElector | None, perform: Perform) -> TimerWheel:
+    """Колесо таймеров с истечениями и фоновыми проходами; запускает вызывающий код."""
+    wheel = TimerWheel()
+    expiry = ExpiryService(
+        bookings=core.bookings,
+        flow_repo=core.flow_repo,
+        ephemeral=core.ephemeral,
+        wheel=wheel,
+        perform=perform,
+        grace=timedelta(minutes=config.booking_expire_grace_min),
+        flow_ttl=timedelta(hours=config.flow_ttl_hours),
+    )
+    if elector is not None:
+        # Общее хранилище не сообщает о мутациях других реплик: истечения — по обходу на лидере,
+        # брони в сетку перечитываются по таймеру
+        expiry.attach_shared(lambda: elector.is_leader)
+        wheel.every(AVAILABILITY_REFRESH_S, core.refresh_availability)
+    else:
+        expiry.attach()
+    return wheel
+
+
+def build_elector(config: AppConfig, core: Core) -> LeaderElector | None:
+    """Лидер нужен только при общем хранилище: getUpdates допускает одного потребителя на бота."""
+    if core.state_client is None:
+        return None
+    assert config.redis_url is not None
+    # Своё соединение с таймаутом ttl/4: зависшее продление должно упасть раньше, чем истечёт аренда
+    client = RespClient.from_url(config.redis_url, timeout=config.leader_ttl_ms / 4000)
+    return LeaderElector(client, f"{config.redis_prefix}leader", config.replica_id, config.leader_ttl_ms)
+
+
+def build_replication(
+    config: AppConfig, core: Core, on_change: Callable[[], None] | None = None
+) -> Replication | None:
+    """on_change — сохранение при изменениях после promote резерва (по умолчанию persister.save)."""
+    if config.replication_role is None:
+        return None
+    assert config.replication_address is not None and config.replication_secret is not None
+    stores = Stores(
+        bookings=core.booking_repo,
+        flows=core.flow_repo,
+        queue=core.delivery_queue,
+        ephemeral=core.ephemeral,
+        occupancy=core.occupancy,
+        availability=core.availability,
+        persister=core.persister,
+    )
+    if config.replication_role == "primary":
+        primary = ReplicationPrimary(config.replication_address, config.replication_secret, stores)
+        primary.attach()
+        return primary
+
+    def go_live() -> None:
+        core.occupancy.prune(datetime.now(MSK))
+        core.set_change_callback(on_change or core.persister.save)
+        core.persister.save()
+
+    return ReplicationStandby(config.replication_address, config.replication_secret, stores, on_promote=go_live)
+
+
+def _register_gauges(
+    booking_repo: BookingRepository,
+    flow_repo: UserFlowRepository,
+    delivery_queue: ApprovedBookingQueue,
+    ephemeral: EphemeralMessageService,
+) -> None:
+    REGISTRY.gauge_callback(
+        "inbibe_bookings", "Заявки в репозитории по статусам", ("status",),
+        lambda: {(s.value,): n for s, n in Counter(b.status for b in booking_repo.snapshot().values()).items()},
+    )
+    REGISTRY.gauge_callback(
+        "inbibe_user_flows", "Незавершённые сценарии пользователей по шагам", ("step",),
+        lambda: {(s.value,): n for s, n in Counter(f.step for f in flow_repo.snapshot().values()).items()},
+    )
+    REGISTRY.gauge_callback(
+        "inbibe_delivery_queue_depth", "Одобренные заявки, ожидающие выдачи через /api/bookings", (),
+        lambda: {(): delivery_queue.size()},
+    )
+    REGISTRY.gauge_callback(
+        "inbibe_ephemeral_messages", "Временные сообщения в админ-чате", (),
+        lambda: {(): ephemeral.count()},
+    )
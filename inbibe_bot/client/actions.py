@@ -0,0 +1,71 @@
+"""Синхронный транспорт для действий сервисного слоя (inbibe_bot.service.actions)."""
+from __future__ import annotations
+
+import functools
+import logging
+from typing import Callable, Sequence
+
+from telebot.types import CallbackQuery, Message
+
+from inbibe_bot.client.bot_factory import Deps, notify_user, update_admin_card
+from inbibe_bot.service.actions import Action, Answer, ClearEphemeral, EditCard, NotifyUser, Prompt, PromptKind, Send
+from inbibe_bot.shared.circuit_breaker import TELEGRAM_BREAKER, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+def answer_callback(deps: Deps, call: CallbackQuery, actions: Sequence[Action]) -> None:
+    perform(deps, actions, lambda a: deps.bot.answer_callback_query(call.id, a.text, show_alert=a.alert))
+
+
+def answer_reply(deps: Deps, message: Message, booking_id: str, actions: Sequence[Action]) -> None:
+    """Ответы на reply админа — reply в админ-чате; они удаляются вместе с остальными сообщениями заявки."""
+    def reply(answer: Answer) -> None:
+        deps.ephemeral.register(booking_id, deps.bot.reply_to(message, answer.text))
+
+    perform(deps, actions, reply)
+
+
+def perform(deps: Deps, actions: Sequence[Action], answer: Callable[[Answer], object] | None = None) -> None:
+    """Выполняет действия по порядку; Answer — через answer (без него ответы некому адресовать)."""
+    for action in actions:
+        if isinstance(action, Answer):
+            if answer is not None:
+                answer(action)
+        elif isinstance(action, Send):
+            deps.bot.send_message(
+                action.chat_id, action.text, reply_markup=action.markup, parse_mode=action.parse_mode
+            )
+        elif isinstance(action, NotifyUser):
+            notify_user(deps, action.booking, action.text)
+        elif isinstance(action, EditCard):
+            update_admin_card(deps, action.booking, action.text, deps.config.admin_group_id)
+        elif isinstance(action, ClearEphemeral):
+            deps.ephemeral.clear(action.booking_id)
+        elif not _send_prompt(deps, action) and action.failure is not None:
+            if answer is not None:
+                answer(Answer(action.failure, alert=True))
+            return
+
+
+def _send_prompt(deps: Deps, prompt: Prompt) -> bool:
+    try:
+        _deliver_prompt(deps, prompt)
+    except CircuitOpenError:
+        if prompt.kind is not PromptKind.CARD:
+            return False
+        # Заявка уже сохранена: карточка уйдёт в админ-чат, когда Telegram снова станет доступен
+        deps.retry.defer(
+            TELEGRAM_BREAKER, f"карточка новой заявки {prompt.booking_id}", functools.partial(_deliver_prompt, deps, prompt)
+        )
+    except Exception:
+        logger.exception("Ошибка при отправке сообщения (%s) по заявке %s", prompt.kind.value, prompt.booking_id)
+        return False
+    return True
+
+
+def _deliver_prompt(deps: Deps, prompt: Prompt) -> None:
+    msg = deps.bot.send_message(deps.config.admin_group_id, prompt.text, reply_markup=prompt.markup)
+    if prompt.kind.ephemeral:
+        deps.ephemeral.register(prompt.booking_id, msg)
+    deps.bookings.record_prompt(prompt.booking_id, prompt.kind, msg.message_id)
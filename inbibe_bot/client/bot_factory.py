@@ -1,19 +1,31 @@
 from __future__ import annotations
 
+import functools
 import logging
+import time
 from dataclasses import dataclass
+from typing import Any, Callable
 
 import telebot
+import telebot.apihelper as apihelper
 
+from inbibe_bot.client.keyboard_cache import KeyboardCache
+from inbibe_bot.client.router import UpdateRouter
 from inbibe_bot.config import AppConfig
 from inbibe_bot.core.booking import Booking, Source
-from inbibe_bot.core.booking_workflow import BookingWorkflow
-from inbibe_bot.core.formatter import BookingFormatter
+from inbibe_bot.core.availability import AvailabilityGrid
+from inbibe_bot.service.bookings import BookingService
+from inbibe_bot.service.flows import FlowService
 from inbibe_bot.storage.booking_repository import BookingRepository
 from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
 from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService
 from inbibe_bot.storage.user_flow_repository import UserFlowRepository
-from inbibe_bot.shared.vk_api import send_vk_message
+from inbibe_bot.shared.circuit_breaker import TELEGRAM_BREAKER, VK_BREAKER, CircuitOpenError
+from inbibe_bot.shared.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+from inbibe_bot.shared.retry_queue import RetryQueue
+from inbibe_bot.shared.telegram_transport import TelegramTransport, install_transport
+from inbibe_bot.shared.tracing import span
+from inbibe_bot.shared.vk_api import VkSendError, send_vk_message
 
 logger = logging.getLogger(__name__)
 
@@ -26,38 +38,107 @@ class Deps:
     flow_repo: UserFlowRepository
     delivery_queue: ApprovedBookingQueue
     ephemeral: EphemeralMessageService
-    workflow: BookingWorkflow
-    formatter: BookingFormatter
+    keyboards: KeyboardCache
+    availability: AvailabilityGrid
+    retry: RetryQueue
+    bookings: BookingService
+    flows: FlowService
 
 
 def build_bot(config: AppConfig) -> telebot.TeleBot:
+    if config.tg_proxy:
+        apihelper.proxy = {"https": config.tg_proxy}  # type: ignore[assignment]
+    transport = TelegramTransport(
+        config.tg_pool_size, config.tg_connect_timeout_s, config.tg_read_timeout_s, breaker=TELEGRAM_BREAKER
+    )
+    transport.register_metrics()
+    install_transport(transport)
     return telebot.TeleBot(config.tg_api_key)
 
 
 def notify_user(deps: Deps, booking: Booking, text: str) -> None:
+    """Уведомляет гостя в TG или VK; если канал недоступен (предохранитель разомкнут) — откладывает."""
+    try:
+        _send_to_user(deps, booking, text)
+    except CircuitOpenError as e:
+        breaker = VK_BREAKER if e.name == VK_BREAKER.name else TELEGRAM_BREAKER
+        deps.retry.defer(
+            breaker, f"уведомление по заявке {booking.id}", functools.partial(_send_to_user, deps, booking, text)
+        )
+    except Exception:
+        channel = "TG" if booking.source == Source.TG else "VK"
+        logger.exception("Не удалось уведомить %s-пользователя %s", channel, booking.user_id)
+
+
+def update_admin_card(deps: Deps, booking: Booking, text: str, chat_id: int) -> None:
+    """Заменяет текст карточки заявки в админ-чате; при недоступном Telegram правка откладывается."""
+    edit = functools.partial(
+        deps.bot.edit_message_text,
+        text,
+        chat_id=chat_id,
+        message_id=booking.admin_message_id or -1,
+        parse_mode="Markdown",
+    )
+    try:
+        edit()
+    except CircuitOpenError:
+        deps.retry.defer(TELEGRAM_BREAKER, f"карточка заявки {booking.id}", edit)
+    except Exception:
+        logger.error("Не удалось обновить карточку заявки %s", booking.id)
+
+
+def _send_to_user(deps: Deps, booking: Booking, text: str) -> None:
+    """Бросает исключение при любой неудаче: RetryQueue.flush должен отличать доставку от сбоя."""
     if booking.source == Source.TG:
-        try:
-            deps.bot.send_message(booking.user_id, text)
-        except Exception:
-            logger.exception("Не удалось уведомить TG-пользователя %s", booking.user_id)
+        deps.bot.send_message(booking.user_id, text)
+    elif deps.config.vk_access_token:
+        sent = send_vk_message(
+            booking.user_id,
+            text,
+            token=deps.config.vk_access_token,
+            api_version=deps.config.vk_api_version,
+            api_url=deps.config.vk_api_url,
+        )
+        if not sent:
+            raise VkSendError(booking.user_id)
     else:
-        if deps.config.vk_access_token:
-            try:
-                send_vk_message(
-                    booking.user_id,
-                    text,
-                    token=deps.config.vk_access_token,
-                    api_version=deps.config.vk_api_version,
-                )
-            except Exception:
-                logger.exception("Не удалось уведомить VK-пользователя %s", booking.user_id)
-        else:
-            logger.warning("VK_ACCESS_TOKEN не задан, уведомление не отправлено")
-
-
-def register_all_handlers(deps: Deps) -> None:
+        logger.warning("VK_ACCESS_TOKEN не задан, уведомление не отправлено")
+
+
+def register_all_handlers(deps: Deps) -> UpdateRouter:
     from inbibe_bot.client.handlers import user_flow, admin_review, table_selection, alt_datetime
-    user_flow.register(deps)
-    admin_review.register(deps)
-    table_selection.register(deps)
-    alt_datetime.register(deps)
+    router = UpdateRouter(deps.config.admin_group_id)
+    user_flow.register(deps, router)
+    admin_review.register(deps, router)
+    table_selection.register(deps, router)
+    alt_datetime.register(deps, router)
+    router.install(deps.bot)
+    _instrument_message_handlers(deps.bot, router)
+    return router
+
+
+def _instrument_message_handlers(bot: telebot.TeleBot, router: UpdateRouter) -> None:
+    """Оборачивает хэндлеры сообщений замером времени; маршруты UpdateRouter меряет сам."""
+    for handler in bot.message_handlers:
+        fn = handler["function"]
+        if fn == router.dispatch_reply or hasattr(fn, "__wrapped__"):
+            continue
+        handler["function"] = _timed(fn)
+
+
+def _timed(fn: Callable[..., Any]) -> Callable[..., Any]:
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter_ns()
+        try:
+            with span("handler", route=name):
+                return fn(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe_ns(time.perf_counter_ns() - started, name)
+
+    return wrapper
@@ -1,33 +1,232 @@
 from __future__ import annotations
 
+import re
+import string
 from datetime import datetime, date
+from functools import lru_cache
+from typing import Final
+
+# Версия компактного формата. Строки без цифры в начале — кнопки формата v1
+# (date_YYYY-MM-DD, approve_<id>, ...), которые ещё могут висеть в чатах.
+VERSION: Final = "2"
+
+_ALPHABET: Final = string.digits + string.ascii_uppercase + string.ascii_lowercase
+_BASE: Final = len(_ALPHABET)
+_INDEX: Final[dict[str, int]] = {ch: i for i, ch in enumerate(_ALPHABET)}
+_PAIR_BASE: Final = _BASE * _BASE
+_PAIRS: Final[list[str]] = [a + b for a in _ALPHABET for b in _ALPHABET]
+_PAIR_INDEX: Final[dict[str, int]] = {pair: i for i, pair in enumerate(_PAIRS)}
+
+_EPOCH: Final = date(2000, 1, 1).toordinal()
+_SLOT_MINUTES: Final = 15
+_SLOTS_PER_DAY: Final = 24 * 60 // _SLOT_MINUTES
+
+_DATE_WIDTH: Final = 3   # 62^3 дней ≈ 650 лет от 2000-01-01
+_SLOT_WIDTH: Final = 4   # день * 96 + номер 15-минутного слота
+_TABLE_WIDTH: Final = 2  # номера столов до 3843
+
+# ID из gen_id(): буква + YYMMDD + "-" + 5 символов [a-z0-9] упаковываются в 8 символов base62.
+_GEN_ID: Final = re.compile(r"^[a-z]\d{6}-[a-z0-9]{5}$")
+_ID_WIDTH: Final = 8
+_RAW_ID: Final = "~"
+_SUFFIX_ALPHABET: Final = string.digits + string.ascii_lowercase
+_SUFFIX_SPAN: Final = 36 ** 5
+
+
+class Op:
+    """Однобайтовые коды операций формата v2."""
+
+    DATE = "d"
+    TIME = "t"
+    APPROVE = "a"
+    APPROVE_ALT = "l"
+    REJECT = "r"
+    TABLE = "s"
+    ASSIGN = "c"
+    IGNORE = "i"
 
 
 class CallbackData:
-    """Парсеры и билдеры для callback_data строк."""
+    """Кодек callback_data: компактный формат v2 и разбор кнопок формата v1."""
+
+    # Prefixes (v2)
+    DATE = VERSION + Op.DATE
+    TIME = VERSION + Op.TIME
+    APPROVE = VERSION + Op.APPROVE
+    APPROVE_ALT = VERSION + Op.APPROVE_ALT
+    REJECT = VERSION + Op.REJECT
+    TABLE = VERSION + Op.TABLE
+    ASSIGN = VERSION + Op.ASSIGN
+    IGNORE = VERSION + Op.IGNORE
 
-    # Prefixes
-    DATE = "date_"
-    TIME = "time_"
-    APPROVE = "approve_"
-    APPROVE_ALT = "approve_alt_"
-    REJECT = "reject_"
-    TABLE = "table_"
+    # Prefixes (v1)
+    LEGACY_DATE = "date_"
+    LEGACY_TIME = "time_"
+    LEGACY_APPROVE = "approve_"
+    LEGACY_APPROVE_ALT = "approve_alt_"
+    LEGACY_REJECT = "reject_"
+    LEGACY_TABLE = "table_"
+
+    @staticmethod
+    def encode_date(d: date) -> str:
+        return CallbackData.DATE + _encode_int(d.toordinal() - _EPOCH, _DATE_WIDTH)
+
+    @staticmethod
+    def encode_time(dt: datetime) -> str:
+        minutes = dt.hour * 60 + dt.minute
+        if minutes % _SLOT_MINUTES:
+            raise ValueError(f"Время {dt:%H:%M} не кратно {_SLOT_MINUTES} минутам")
+        slot = (dt.toordinal() - _EPOCH) * _SLOTS_PER_DAY + minutes // _SLOT_MINUTES
+        return CallbackData.TIME + _encode_int(slot, _SLOT_WIDTH)
+
+    @staticmethod
+    def encode_id(booking_id: str) -> str:
+        """Сегмент ID заявки, которым заканчиваются callback_data заявочных кнопок."""
+        return _encode_id(booking_id)
+
+    @staticmethod
+    def encode_approve(booking_id: str) -> str:
+        return CallbackData.APPROVE + _encode_id(booking_id)
+
+    @staticmethod
+    def encode_approve_alt(booking_id: str) -> str:
+        return CallbackData.APPROVE_ALT + _encode_id(booking_id)
+
+    @staticmethod
+    def encode_reject(booking_id: str) -> str:
+        return CallbackData.REJECT + _encode_id(booking_id)
+
+    @staticmethod
+    def encode_table(booking_id: str, table_num: int) -> str:
+        return CallbackData.TABLE + _encode_int(table_num, _TABLE_WIDTH) + _encode_id(booking_id)
+
+    @staticmethod
+    def encode_assign(booking_id: str, tables: tuple[int, ...]) -> str:
+        """Подтверждение заявки сразу с набором столов: число столов, номера, ID."""
+        encoded = "".join(_encode_int(t, _TABLE_WIDTH) for t in tables)
+        return CallbackData.ASSIGN + _encode_int(len(tables), 1) + encoded + _encode_id(booking_id)
 
     @staticmethod
     def parse_date(data: str) -> date:
-        return datetime.strptime(data[len(CallbackData.DATE):], "%Y-%m-%d").date()
+        if data.startswith(VERSION):
+            return date.fromordinal(_EPOCH + _decode_int(data, 2, _DATE_WIDTH))
+        # v1: date_YYYY-MM-DD
+        raw = data[len(CallbackData.LEGACY_DATE):]
+        if len(raw) != 10:
+            raise ValueError(f"Неверная дата в callback_data: {data!r}")
+        return date(int(raw[0:4]), int(raw[5:7]), int(raw[8:10]))
 
     @staticmethod
     def parse_time(data: str) -> datetime:
-        return datetime.strptime(data[len(CallbackData.TIME):], "%Y-%m-%d_%H:%M")
+        if data.startswith(VERSION):
+            return _slot_to_datetime(_decode_int(data, 2, _SLOT_WIDTH))
+        # v1: time_YYYY-MM-DD_HH:MM
+        raw = data[len(CallbackData.LEGACY_TIME):]
+        if len(raw) != 16:
+            raise ValueError(f"Неверное время в callback_data: {data!r}")
+        return datetime(
+            int(raw[0:4]), int(raw[5:7]), int(raw[8:10]), int(raw[11:13]), int(raw[14:16])
+        )
 
     @staticmethod
-    def parse_booking_id(data: str, prefix: str) -> str:
-        return data[len(prefix):]
+    def parse_booking_id(data: str) -> str:
+        if data.startswith(VERSION):
+            return _decode_id(data, 2)
+        # v1: approve_<id>, approve_alt_<id>, reject_<id> — в ID нет "_"
+        return data.rsplit("_", 1)[-1]
 
     @staticmethod
     def parse_table(data: str) -> tuple[str, int]:
         """Возвращает (booking_id, table_num)."""
+        if data.startswith(VERSION):
+            table_num = _decode_int(data, 2, _TABLE_WIDTH)
+            return _decode_id(data, 2 + _TABLE_WIDTH), table_num
         _, booking_id, tail = data.split("_", 2)
         return booking_id, int(tail)
+
+    @staticmethod
+    def parse_assign(data: str) -> tuple[str, tuple[int, ...]]:
+        """Возвращает (booking_id, столы)."""
+        count = _decode_int(data, 2, 1)
+        tables = tuple(_decode_int(data, 3 + i * _TABLE_WIDTH, _TABLE_WIDTH) for i in range(count))
+        return _decode_id(data, 3 + count * _TABLE_WIDTH), tables
+
+
+def _encode_int(value: int, width: int) -> str:
+    """Кодирует value в base62 фиксированной ширины (чётная ширина — по два символа за шаг)."""
+    if value < 0:
+        raise ValueError(f"Отрицательное значение не кодируется: {value}")
+    chunks = []
+    if width % 2:
+        value, rem = divmod(value, _BASE)
+        chunks.append(_ALPHABET[rem])
+    for _ in range(width // 2):
+        value, rem = divmod(value, _PAIR_BASE)
+        chunks.append(_PAIRS[rem])
+    if value:
+        raise ValueError(f"Значение не помещается в {width} символов base{_BASE}")
+    return "".join(reversed(chunks))
+
+
+def _decode_int(data: str, start: int, width: int) -> int:
+    end = start + width
+    if len(data) < end:
+        raise ValueError(f"Слишком короткая callback_data: {data!r}")
+    value = 0
+    try:
+        if width % 2:
+            value = _INDEX[data[start]]
+            start += 1
+        for i in range(start, end, 2):
+            value = value * _PAIR_BASE + _PAIR_INDEX[data[i:i + 2]]
+    except KeyError:
+        raise ValueError(f"Недопустимый символ в callback_data: {data!r}")
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _slot_to_datetime(value: int) -> datetime:
+    days, slot = divmod(value, _SLOTS_PER_DAY)
+    day = date.fromordinal(_EPOCH + days)
+    minutes = slot * _SLOT_MINUTES
+    return datetime(day.year, day.month, day.day, minutes // 60, minutes % 60)
+
+
+def _encode_id(booking_id: str) -> str:
+    if not _GEN_ID.match(booking_id):
+        return _RAW_ID + booking_id
+    return _pack_id(booking_id)
+
+
+def _decode_id(data: str, start: int) -> str:
+    if data[start:start + 1] == _RAW_ID:
+        return data[start + 1:]
+    if len(data) != start + _ID_WIDTH:
+        raise ValueError(f"Неверный ID заявки в callback_data: {data!r}")
+    return _unpack_id(data[start:])
+
+
+# Активных заявок единицы, а их кнопки нажимают многократно — упакованные ID кэшируются.
+@lru_cache(maxsize=1024)
+def _pack_id(booking_id: str) -> str:
+    yy, mm, dd = int(booking_id[1:3]), int(booking_id[3:5]), int(booking_id[5:7])
+    if not (1 <= mm <= 12 and 1 <= dd <= 31):
+        return _RAW_ID + booking_id
+    value = ((ord(booking_id[0]) - ord("a")) * 100 + yy) * 12 + mm - 1
+    value = (value * 31 + dd - 1) * _SUFFIX_SPAN + int(booking_id[8:], 36)
+    return _encode_int(value, _ID_WIDTH)
+
+
+@lru_cache(maxsize=1024)
+def _unpack_id(packed: str) -> str:
+    value, suffix = divmod(_decode_int(packed, 0, _ID_WIDTH), _SUFFIX_SPAN)
+    value, dd = divmod(value, 31)
+    value, mm = divmod(value, 12)
+    letter, yy = divmod(value, 100)
+    if letter >= 26:
+        raise ValueError(f"Неверный ID заявки в callback_data: {packed!r}")
+    chars = []
+    for _ in range(5):
+        suffix, rem = divmod(suffix, 36)
+        chars.append(_SUFFIX_ALPHABET[rem])
+    return f"{chr(ord('a') + letter)}{yy:02d}{mm + 1:02d}{dd + 1:02d}-{''.join(reversed(chars))}"
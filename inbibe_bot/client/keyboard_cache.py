@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from enum import Enum
+from threading import Lock
+from typing import Callable, Collection, Hashable
+
+import telebot
+
+from inbibe_bot.client import keyboards
+from inbibe_bot.client.callbacks import CallbackData
+from inbibe_bot.shared.datetime_utils import MSK
+
+logger = logging.getLogger(__name__)
+
+# Заглушка ID в шаблонах заявочных клавиатур; при отправке заменяется на реальный ID.
+_TEMPLATE_ID = "@"
+_TEMPLATE_MARK = json.dumps(CallbackData.encode_id(_TEMPLATE_ID))[1:-1] + '"'
+
+
+class KeyboardKind(str, Enum):
+    MAIN_MENU = "main_menu"
+    PHONE = "phone"
+    DATE = "date"
+    TIME = "time"
+    TABLE = "table"
+    ADMIN_REVIEW = "admin_review"
+
+
+CacheKey = tuple[KeyboardKind, date | None, tuple[Hashable, ...]]
+
+
+class FrozenInlineMarkup(telebot.types.InlineKeyboardMarkup):
+    """Inline-клавиатура с готовым JSON: telebot берёт его из to_json() без повторной сериализации."""
+
+    def __init__(self, payload: str) -> None:
+        super().__init__()
+        self._payload = payload
+
+    def to_json(self) -> str:
+        return self._payload
+
+
+class FrozenReplyMarkup(telebot.types.ReplyKeyboardMarkup):
+    """Reply-клавиатура с готовым JSON."""
+
+    def __init__(self, payload: str) -> None:
+        super().__init__()
+        self._payload = payload
+
+    def to_json(self) -> str:
+        return self._payload
+
+
+class KeyboardCache:
+    """Кэш уже сериализованных клавиатур с ключом (вид, дата, набор столов).
+
+    Для клавиатуры времени третий элемент ключа — номера полностью занятых слотов,
+    поэтому после подтверждения брони клавиатура дня пересобирается сама.
+    Для карточки заявки — подсказанные варианты столов.
+
+    Клавиатура дат привязана к текущему дню по МСК и перестраивается после полуночи,
+    устаревшие клавиатуры времени при этом вытесняются. Клавиатуры с ID заявки
+    хранятся шаблоном, в который ID подставляется заменой строки.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, str] = OrderedDict()
+        self._lock = Lock()
+        self._today: date | None = None
+        self._hits: Counter[KeyboardKind] = Counter()
+        self._misses: Counter[KeyboardKind] = Counter()
+
+    def main_menu(self) -> telebot.types.ReplyKeyboardMarkup:
+        key: CacheKey = (KeyboardKind.MAIN_MENU, None, ())
+        return FrozenReplyMarkup(self._get(key, keyboards.main_menu_keyboard))
+
+    def phone(self) -> telebot.types.ReplyKeyboardMarkup:
+        key: CacheKey = (KeyboardKind.PHONE, None, ())
+        return FrozenReplyMarkup(self._get(key, keyboards.get_phone_keyboard))
+
+    def dates(self) -> telebot.types.InlineKeyboardMarkup:
+        today = self._roll_over()
+        key: CacheKey = (KeyboardKind.DATE, today, ())
+        return FrozenInlineMarkup(self._get(key, lambda: keyboards.generate_date_keyboard(today)))
+
+    def times(self, booking_date: date, full_slots: Collection[int] = ()) -> telebot.types.InlineKeyboardMarkup:
+        self._roll_over()
+        full = tuple(sorted(full_slots))
+        key: CacheKey = (KeyboardKind.TIME, booking_date, full)
+        return FrozenInlineMarkup(self._get(key, lambda: keyboards.generate_time_keyboard(booking_date, full)))
+
+    def tables(self, booking_id: str, tables: tuple[int, ...]) -> telebot.types.InlineKeyboardMarkup:
+        key: CacheKey = (KeyboardKind.TABLE, None, tables)
+        template = self._get(key, lambda: keyboards.build_table_keyboard(_TEMPLATE_ID, tables))
+        return FrozenInlineMarkup(_fill(template, booking_id))
+
+    def admin_review(
+        self, booking_id: str, suggestions: tuple[tuple[int, ...], ...] = ()
+    ) -> telebot.types.InlineKeyboardMarkup:
+        key: CacheKey = (KeyboardKind.ADMIN_REVIEW, None, suggestions)
+        template = self._get(key, lambda: keyboards.build_admin_review_keyboard(_TEMPLATE_ID, suggestions))
+        return FrozenInlineMarkup(_fill(template, booking_id))
+
+    def warm(self, tables: tuple[int, ...], full_slots: Callable[[date], Collection[int]]) -> None:
+        started = time.perf_counter()
+        self.main_menu()
+        self.phone()
+        self.dates()
+        today = self._roll_over()
+        for i in range(keyboards.DATE_HORIZON_DAYS):
+            day = today + timedelta(days=i)
+            self.times(day, full_slots(day))
+        self.tables(_TEMPLATE_ID, tables)
+        self.admin_review(_TEMPLATE_ID)
+        with self._lock:
+            # Прогрев не считается промахами
+            self._hits.clear()
+            self._misses.clear()
+            size = len(self._entries)
+        logger.info(
+            "Клавиатуры прогреты: %d шт. за %.1f мс", size, (time.perf_counter() - started) * 1000
+        )
+
+    def stats(self) -> dict[str, dict[str, float | int]]:
+        with self._lock:
+            kinds = sorted(set(self._hits) | set(self._misses), key=lambda k: k.value)
+            result: dict[str, dict[str, float | int]] = {}
+            for kind in kinds:
+                hits, misses = self._hits[kind], self._misses[kind]
+                result[kind.value] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3),
+                }
+            return result
+
+    def _get(self, key: CacheKey, build: Callable[[], telebot.types.JsonSerializable]) -> str:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._hits[key[0]] += 1
+                return cached
+            self._misses[key[0]] += 1
+        payload: str = build().to_json()
+        with self._lock:
+            self._entries[key] = payload
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def _roll_over(self) -> date:
+        today = datetime.now(MSK).date()
+        if today == self._today:
+            return today
+        with self._lock:
+            if today != self._today:
+                stale = [k for k in self._entries if k[1] is not None and k[1] < today]
+                for k in stale:
+                    del self._entries[k]
+                self._today = today
+                if stale:
+                    logger.debug("Смена дня: вытеснено %d клавиатур", len(stale))
+        return today
+
+
+def _fill(template: str, booking_id: str) -> str:
+    return template.replace(_TEMPLATE_MARK, json.dumps(CallbackData.encode_id(booking_id))[1:-1] + '"')
@@ -1,9 +1,20 @@
 from __future__ import annotations
 
-from datetime import date, timedelta, datetime
+from datetime import date, timedelta, datetime, time
+from typing import Collection, Sequence
 
 import telebot
 
+from inbibe_bot.client.callbacks import CallbackData
+
+DATE_HORIZON_DAYS = 31
+
+_NIGHT_START = time(0, 0)
+_NIGHT_END_WEEKDAY = time(2, 45)
+_NIGHT_END_WEEKEND = time(4, 45)
+_DAY_START = time(15, 0)
+_DAY_END = time(23, 45)
+
 
 def main_menu_keyboard() -> telebot.types.ReplyKeyboardMarkup:
     markup = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
@@ -17,16 +28,15 @@ def get_phone_keyboard() -> telebot.types.ReplyKeyboardMarkup:
     return markup
 
 
-def generate_date_keyboard() -> telebot.types.InlineKeyboardMarkup:
+def generate_date_keyboard(today: date) -> telebot.types.InlineKeyboardMarkup:
     markup = telebot.types.InlineKeyboardMarkup()
-    today = date.today()
     row: list[telebot.types.InlineKeyboardButton] = []
-    for i in range(31):
+    for i in range(DATE_HORIZON_DAYS):
         d = today + timedelta(days=i)
         row.append(
             telebot.types.InlineKeyboardButton(
                 text=d.strftime("%d.%m"),
-                callback_data=f"date_{d.strftime('%Y-%m-%d')}",
+                callback_data=CallbackData.encode_date(d),
             )
         )
         if len(row) == 5:
@@ -37,24 +47,23 @@ def generate_date_keyboard() -> telebot.types.InlineKeyboardMarkup:
     return markup
 
 
-def generate_time_keyboard(booking_date: date) -> telebot.types.InlineKeyboardMarkup:
+def generate_time_keyboard(
+    booking_date: date, full_slots: Collection[int] = ()
+) -> telebot.types.InlineKeyboardMarkup:
+    """full_slots — номера 15-минутных слотов дня без свободных столов; они помечаются и не нажимаются."""
     markup = telebot.types.InlineKeyboardMarkup()
     wd = booking_date.weekday()
+    early_end_time = _NIGHT_END_WEEKEND if wd in (5, 6) else _NIGHT_END_WEEKDAY
 
-    if wd in (5, 6):
-        early_end_time = "04:45"
-    else:
-        early_end_time = "02:45"
-
-    early_start = datetime.combine(booking_date, datetime.strptime("00:00", "%H:%M").time())
-    early_end = datetime.combine(booking_date, datetime.strptime(early_end_time, "%H:%M").time())
-    markup.row(telebot.types.InlineKeyboardButton(text="Ночное время", callback_data="ignore"))
-    _add_time_row(markup, booking_date, early_start, early_end)
+    early_start = datetime.combine(booking_date, _NIGHT_START)
+    early_end = datetime.combine(booking_date, early_end_time)
+    markup.row(telebot.types.InlineKeyboardButton(text="Ночное время", callback_data=CallbackData.IGNORE))
+    _add_time_row(markup, early_start, early_end, full_slots)
 
-    main_start = datetime.combine(booking_date, datetime.strptime("15:00", "%H:%M").time())
-    main_end = datetime.combine(booking_date, datetime.strptime("23:45", "%H:%M").time())
-    markup.row(telebot.types.InlineKeyboardButton(text="Дневное время", callback_data="ignore"))
-    _add_time_row(markup, booking_date, main_start, main_end)
+    main_start = datetime.combine(booking_date, _DAY_START)
+    main_end = datetime.combine(booking_date, _DAY_END)
+    markup.row(telebot.types.InlineKeyboardButton(text="Дневное время", callback_data=CallbackData.IGNORE))
+    _add_time_row(markup, main_start, main_end, full_slots)
 
     return markup
 
@@ -62,7 +71,7 @@ def generate_time_keyboard(booking_date: date) -> telebot.types.InlineKeyboardMa
 def build_table_keyboard(booking_id: str, tables: list[int] | tuple[int, ...]) -> telebot.types.InlineKeyboardMarkup:
     markup = telebot.types.InlineKeyboardMarkup(row_width=5)
     buttons = [
-        telebot.types.InlineKeyboardButton(text=str(num), callback_data=f"table_{booking_id}_{num}")
+        telebot.types.InlineKeyboardButton(text=str(num), callback_data=CallbackData.encode_table(booking_id, num))
         for num in tables
     ]
     for i in range(0, len(buttons), 5):
@@ -70,21 +79,53 @@ def build_table_keyboard(booking_id: str, tables: list[int] | tuple[int, ...]) -
     return markup
 
 
+def build_admin_review_keyboard(
+    booking_id: str, suggestions: Sequence[tuple[int, ...]] = ()
+) -> telebot.types.InlineKeyboardMarkup:
+    """suggestions — подобранные столы; кнопка подтверждает заявку сразу с ними."""
+    markup = telebot.types.InlineKeyboardMarkup()
+    if suggestions:
+        markup.row(
+            *(
+                telebot.types.InlineKeyboardButton(
+                    "🪑 " + "+".join(map(str, tables)),
+                    callback_data=CallbackData.encode_assign(booking_id, tables),
+                )
+                for tables in suggestions
+            )
+        )
+    markup.add(
+        telebot.types.InlineKeyboardButton("✅ Подтвердить", callback_data=CallbackData.encode_approve(booking_id)),
+        telebot.types.InlineKeyboardButton("❌ Отклонить", callback_data=CallbackData.encode_reject(booking_id)),
+    )
+    markup.add(
+        telebot.types.InlineKeyboardButton(
+            "🕘 Изменить дату/время", callback_data=CallbackData.encode_approve_alt(booking_id)
+        )
+    )
+    return markup
+
+
 def _add_time_row(
     markup: telebot.types.InlineKeyboardMarkup,
-    booking_date: date,
     start: datetime,
     end: datetime,
+    full_slots: Collection[int],
 ) -> None:
     row: list[telebot.types.InlineKeyboardButton] = []
     current = start
     while current <= end:
-        row.append(
-            telebot.types.InlineKeyboardButton(
+        if (current.hour * 60 + current.minute) // 15 in full_slots:
+            button = telebot.types.InlineKeyboardButton(
+                text=f"✖ {current:%H:%M}",
+                callback_data=CallbackData.IGNORE,
+            )
+        else:
+            button = telebot.types.InlineKeyboardButton(
                 text=current.strftime("%H:%M"),
-                callback_data=f"time_{current.strftime('%Y-%m-%d_%H:%M')}",
+                callback_data=CallbackData.encode_time(current),
             )
-        )
+        row.append(button)
         if len(row) == 4:
             markup.row(*row)
             row = []
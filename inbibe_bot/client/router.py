@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable
+
+import telebot
+from telebot.types import CallbackQuery, Message
+
+from inbibe_bot.core.booking import Booking
+from inbibe_bot.shared.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+from inbibe_bot.shared.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CallbackHandler = Callable[[CallbackQuery], None]
+ReplyHandler = Callable[[Message, Booking], None]
+BookingLookup = Callable[[int], Booking | None]
+
+
+@dataclass
+class RouteStats:
+    hits: int = 0
+    errors: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+
+    def record(self, elapsed_ns: int, failed: bool) -> None:
+        self.hits += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        if failed:
+            self.errors += 1
+
+    def to_dict(self) -> dict[str, float | int]:
+        avg_ms = self.total_ns / self.hits / 1e6 if self.hits else 0.0
+        return {
+            "hits": self.hits,
+            "errors": self.errors,
+            "avg_ms": round(avg_ms, 3),
+            "max_ms": round(self.max_ns / 1e6, 3),
+        }
+
+
+class _TrieNode:
+    __slots__ = ("children", "route")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.route: str | None = None
+
+
+class RouteTrie:
+    """Префиксное дерево callback_data: разбор за O(len(data)),
+    при пересечении префиксов (approve_ / approve_alt_) побеждает самый длинный.
+    """
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+
+    def insert(self, prefix: str, route: str) -> None:
+        node = self._root
+        for ch in prefix:
+            node = node.children.setdefault(ch, _TrieNode())
+        if node.route is not None and node.route != route:
+            raise ValueError(f"Префикс {prefix!r} уже занят маршрутом {node.route}")
+        node.route = route
+
+    def resolve(self, data: str) -> str | None:
+        node = self._root
+        best: str | None = None
+        for ch in data:
+            child = node.children.get(ch)
+            if child is None:
+                break
+            node = child
+            if node.route is not None:
+                best = node.route
+        return best
+
+
+class UpdateRouter:
+    """Единый диспетчер callback-запросов и reply-сообщений админ-чата."""
+
+    def __init__(self, admin_group_id: int) -> None:
+        self._admin_group_id = admin_group_id
+        self._trie = RouteTrie()
+        self._callbacks: dict[str, CallbackHandler] = {}
+        self._replies: list[tuple[str, BookingLookup, ReplyHandler]] = []
+        self._stats: dict[str, RouteStats] = {}
+        self._stats_lock = Lock()
+
+    def callback(self, *prefixes: str) -> Callable[[CallbackHandler], CallbackHandler]:
+        def decorator(handler: CallbackHandler) -> CallbackHandler:
+            route = handler.__name__
+            for prefix in prefixes:
+                self._trie.insert(prefix, route)
+            self._callbacks[route] = handler
+            return handler
+        return decorator
+
+    def reply(self, lookup: BookingLookup) -> Callable[[ReplyHandler], ReplyHandler]:
+        """Регистрирует обработчик ответа на сообщение-запрос, найденное через lookup(message_id)."""
+        def decorator(handler: ReplyHandler) -> ReplyHandler:
+            self._replies.append((handler.__name__, lookup, handler))
+            return handler
+        return decorator
+
+    def install(self, bot: telebot.TeleBot) -> None:
+        """Регистрирует в telebot ровно по одному обработчику на callback-запросы и reply."""
+        bot.callback_query_handler(func=lambda call: True)(self.dispatch_callback)
+        bot.message_handler(func=self.is_admin_reply)(self.dispatch_reply)
+
+    def resolve(self, data: str) -> str | None:
+        return self._trie.resolve(data)
+
+    def dispatch_callback(self, call: CallbackQuery) -> None:
+        route = self.resolve(call.data or "")
+        if route is None:
+            return
+        self._run(route, self._callbacks[route], call)
+
+    def is_admin_reply(self, message: Message) -> bool:
+        return message.chat.id == self._admin_group_id and message.reply_to_message is not None
+
+    def knows_prompt(self, message_id: int) -> bool:
+        """Есть ли заявка, ожидающая reply на сообщение message_id."""
+        return any(lookup(message_id) is not None for _, lookup, _ in self._replies)
+
+    def dispatch_reply(self, message: Message) -> None:
+        reply_to = message.reply_to_message
+        if reply_to is None:
+            return
+        for route, lookup, handler in self._replies:
+            booking = lookup(reply_to.message_id)
+            if booking is not None:
+                self._run(route, handler, message, booking)
+                return
+
+    def stats(self) -> dict[str, dict[str, float | int]]:
+        with self._stats_lock:
+            return {route: s.to_dict() for route, s in sorted(self._stats.items())}
+
+    def _run(self, route: str, handler: Callable[..., None], *args: object) -> None:
+        started = time.perf_counter_ns()
+        failed = True
+        try:
+            with span("handler", route=route):
+                handler(*args)
+            failed = False
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            with self._stats_lock:
+                self._stats.setdefault(route, RouteStats()).record(elapsed, failed)
+            HANDLER_SECONDS.observe_ns(elapsed, route)
+            if failed:
+                HANDLER_ERRORS.inc(route)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Any, Callable
+
+import telebot
+from telebot.types import CallbackQuery, Message
+
+from inbibe_bot.shared.metrics import REGISTRY, SCHEDULER_SHED, SCHEDULER_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    ADMIN = 0
+    USER_CALLBACK = 1
+    USER_TEXT = 2
+
+
+_Item = tuple[int, Callable[..., Any], tuple[Any, ...], dict[str, Any]]
+
+
+class UpdateScheduler:
+    """Замена пула потоков telebot: задачи хэндлеров выполняются по классам приоритета.
+
+    Действия админ-чата (кнопки и reply) идут первыми и не отбрасываются, затем кнопки пользователей,
+    затем их текст. Очереди пользовательских классов ограничены: при переполнении новый апдейт
+    отбрасывается. Один поток зарезервирован под админ-чат — подтверждение не ждёт, пока общие
+    потоки заняты медленными хэндлерами пользователей.
+    """
+
+    def __init__(self, admin_group_id: int, workers: int, limits: dict[Priority, int]) -> None:
+        self._admin_group_id = admin_group_id
+        self._workers = workers
+        self._limits = limits
+        self._queues: dict[Priority, deque[_Item]] = {p: deque() for p in Priority}
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+        self._draining = False
+        self._active = 0
+        self._on_error: Callable[[Exception], object] | None = None
+
+    def install(self, bot: telebot.TeleBot) -> None:
+        """Подменяет bot._exec_task; вызывать до instrument_bot, чтобы трейсы оборачивали планировщик."""
+        bot._exec_task = self.submit  # type: ignore[method-assign]
+        self._on_error = bot._handle_exception
+        self.start()
+
+    def start(self) -> None:
+        REGISTRY.gauge_callback(
+            "inbibe_update_queue_depth", "Апдейты в очереди планировщика по классам", ("priority",),
+            lambda: {(p.name.lower(),): n for p, n in self.depths().items()},
+        )
+        names = ["admin"] + [str(i) for i in range(self._workers)]
+        for name in names:
+            thread = threading.Thread(
+                target=self._work, args=(name == "admin",), daemon=True, name=f"update-worker-{name}"
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Останавливает потоки после того, как очереди опустеют."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def drain(self, timeout: float) -> dict[str, int]:
+        """Перестаёт принимать задачи и ждёт, пока очереди и выполняющиеся хэндлеры опустеют.
+
+        Возвращает число брошенных по классам: не успевшие начаться к сроку снимаются с очереди,
+        пришедшие после начала остановки — не принимаются.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._draining = True
+            while any(self._queues.values()) or self._active:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            abandoned = {p: list(q) for p, q in self._queues.items() if q}
+            for queue in self._queues.values():
+                queue.clear()
+            running = self._active
+        counts = {p.name.lower(): len(items) for p, items in abandoned.items()}
+        for items in abandoned.values():
+            for _, task, _, _ in items:
+                _cancel(task, "shutdown")
+        if running:
+            counts["running"] = running
+        return counts
+
+    def classify(self, obj: object) -> Priority:
+        if isinstance(obj, CallbackQuery):
+            chat_id = obj.message.chat.id if obj.message is not None else None
+            return Priority.ADMIN if chat_id == self._admin_group_id else Priority.USER_CALLBACK
+        if isinstance(obj, Message) and obj.chat.id == self._admin_group_id:
+            return Priority.ADMIN
+        return Priority.USER_TEXT
+
+    def submit(self, task: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        priority = self.classify(args[0] if args else None)
+        with self._cond:
+            draining = self._draining
+            queue = self._queues[priority]
+            limit = self._limits.get(priority)
+            if not draining and (limit is None or len(queue) < limit):
+                queue.append((time.perf_counter_ns(), task, args, kwargs))
+                # Всех: поток админ-чата не возьмёт пользовательскую задачу, и она ждала бы следующего notify
+                self._cond.notify_all()
+                return
+        if draining:
+            logger.debug("Остановка: апдейт класса %s не принят", priority.name.lower())
+            _cancel(task, "shutdown")
+            return
+        SCHEDULER_SHED.inc(priority.name.lower())
+        logger.debug("Очередь %s переполнена (%d), апдейт отброшен", priority.name.lower(), limit)
+        _cancel(task, priority.name.lower())
+
+    def depths(self) -> dict[Priority, int]:
+        with self._cond:
+            return {p: len(q) for p, q in self._queues.items()}
+
+    def _take(self, admin_only: bool) -> tuple[Priority, _Item] | None:
+        with self._cond:
+            while True:
+                for priority in (Priority.ADMIN,) if admin_only else Priority:
+                    queue = self._queues[priority]
+                    if queue:
+                        self._active += 1
+                        return priority, queue.popleft()
+                if self._stopping:
+                    return None
+                self._cond.wait()
+
+    def _work(self, admin_only: bool) -> None:
+        while True:
+            taken = self._take(admin_only)
+            if taken is None:
+                return
+            priority, (enqueued_ns, task, args, kwargs) = taken
+            SCHEDULER_WAIT_SECONDS.observe_ns(time.perf_counter_ns() - enqueued_ns, priority.name.lower())
+            try:
+                task(*args, **kwargs)
+            except Exception as e:
+                if self._on_error is None or not self._on_error(e):
+                    logger.exception("Ошибка обработки апдейта")
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._cond.notify_all()
+
+
+def _cancel(task: Callable[..., Any], reason: str) -> None:
+    """Задачи с трейсом (TracedTask) закрывают его с пометкой причины."""
+    cancel = getattr(task, "cancel", None)
+    if cancel is not None:
+        cancel(reason)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from inbibe_bot.shared.metrics import UPDATES_FILTERED
+
+# Единственные виды апдейтов, на которые есть хэндлеры; передаётся в set_webhook и polling
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+class UpdateFilter:
+    """Предварительная сортировка апдейтов по сырому JSON, до Update.de_json и предикатов telebot.
+
+    Пропускает то же, на что реагировали бы хэндлеры: личные сообщения, reply в админ-чате на
+    известный запрос (стол, альтернативное время) и callback'и с известным префиксом.
+    Всё остальное — болтовня админ-чата, правки, вступления, чужие группы — отбрасывается.
+    """
+
+    def __init__(
+        self,
+        admin_group_id: int,
+        knows_prompt: Callable[[int], bool],
+        resolve_callback: Callable[[str], str | None],
+    ) -> None:
+        self._admin_group_id = admin_group_id
+        self._knows_prompt = knows_prompt
+        self._resolve_callback = resolve_callback
+
+    def classify(self, data: dict[str, Any]) -> str | None:
+        """Причина пропуска апдейта или None, если его нужно обработать; решение попадает в метрику."""
+        reason = self._classify(data)
+        UPDATES_FILTERED.inc(reason or "accepted")
+        return reason
+
+    def _classify(self, data: dict[str, Any]) -> str | None:
+        message = data.get("message")
+        if message is not None:
+            return self._classify_message(message)
+        call = data.get("callback_query")
+        if call is not None:
+            return None if self._resolve_callback(call.get("data") or "") is not None else "unknown_callback"
+        return "kind"
+
+    def _classify_message(self, message: dict[str, Any]) -> str | None:
+        chat = message.get("chat") or {}
+        if chat.get("type") == "private":
+            return None
+        if chat.get("id") != self._admin_group_id:
+            return "foreign_chat"
+        reply_to = message.get("reply_to_message")
+        if reply_to is None:
+            return "admin_chatter"
+        if not self._knows_prompt(reply_to.get("message_id", 0)):
+            return "admin_unknown_reply"
+        return None
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import telebot
+from telebot.types import WebhookInfo
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookRegistration:
+    """Регистрация вебхука только при изменении: перезапуск не снимает и не ставит его заново.
+
+    getWebhookInfo не возвращает secret_token, поэтому его хэш вместе с URL хранится рядом с
+    state.json. Вебхук переустанавливается, если отличается URL, allowed_updates или секрет, а также
+    когда Telegram копит апдейты после ошибок доставки: setWebhook сбрасывает паузу между повторами.
+    """
+
+    def __init__(self, url: str, secret: str, allowed_updates: list[str], marker: Path) -> None:
+        self.url = url
+        self.secret = secret
+        self.allowed_updates = allowed_updates
+        self._marker = marker
+
+    def needs_update(self, info: WebhookInfo) -> bool:
+        if info.url != self.url:
+            logger.info("Webhook: адрес изменился (%s -> %s)", info.url or "не задан", self.url)
+            return True
+        # Telegram не возвращает allowed_updates, если список не задавали
+        current: list[str] = getattr(info, "allowed_updates", None) or []
+        if sorted(current) != sorted(self.allowed_updates):
+            logger.info("Webhook: изменился список allowed_updates")
+            return True
+        if self._stored() != self._fingerprint():
+            logger.info("Webhook: секрет изменился или не сохранён локально")
+            return True
+        if info.pending_update_count and info.last_error_date:
+            logger.info(
+                "Webhook: в очереди Telegram %d апдейтов после ошибки доставки (%s)",
+                info.pending_update_count, info.last_error_message,
+            )
+            return True
+        return False
+
+    def ensure(self, bot: telebot.TeleBot, info: WebhookInfo | None = None) -> bool:
+        """Сверяет вебхук с желаемым и при расхождении переустанавливает; True — если был вызван setWebhook."""
+        if info is None:
+            info = bot.get_webhook_info()
+        if not self.needs_update(info):
+            logger.info("Webhook уже установлен: %s", self.url)
+            return False
+        bot.set_webhook(url=self.url, secret_token=self.secret, allowed_updates=self.allowed_updates)
+        self.remember()
+        logger.info("Webhook установлен: %s", self.url)
+        return True
+
+    def remember(self) -> None:
+        try:
+            self._marker.parent.mkdir(exist_ok=True)
+            self._marker.write_text(json.dumps({"url": self.url, "secret_sha256": self._fingerprint()}))
+        except OSError:
+            # Без отметки следующий запуск просто переустановит вебхук
+            logger.warning("Не удалось сохранить отметку вебхука в %s", self._marker)
+
+    def _stored(self) -> str | None:
+        try:
+            data = json.loads(self._marker.read_text())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("url") != self.url:
+            return None
+        digest = data.get("secret_sha256")
+        return digest if isinstance(digest, str) else None
+
+    def _fingerprint(self) -> str:
+        return hashlib.sha256(self.secret.encode("utf-8")).hexdigest()
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import os
+import socket
 from dataclasses import dataclass
 from pathlib import Path
 
+from inbibe_bot.shared.vk_api import VK_API_URL
+
 
 class ConfigError(Exception):
     pass
@@ -21,7 +24,41 @@ class AppConfig:
     tg_mode: str
     actual_tables: tuple[int, ...]
     state_file: Path
+    history_file: Path
     http_port: int
+    booking_duration_min: int
+    table_capacities: dict[int, int]
+    vk_api_url: str
+    capture_dir: Path | None
+    capture_max_bytes: int
+    capture_backups: int
+    capture_salt: str | None
+    trace_slow_ms: int
+    trace_buffer: int
+    trace_export_file: Path | None
+    admin_token: str | None
+    profiler_max_s: int
+    state_backend: str
+    redis_url: str | None
+    redis_prefix: str
+    replica_id: str
+    leader_ttl_ms: int
+    replication_role: str | None
+    replication_address: str | None
+    replication_secret: str | None
+    update_workers: int
+    user_callback_queue: int
+    user_text_queue: int
+    booking_expire_grace_min: int
+    flow_ttl_hours: int
+    shutdown_timeout_s: float
+    tg_pool_size: int
+    tg_connect_timeout_s: float
+    tg_read_timeout_s: float
+    circuit_failure_rate: float
+    circuit_min_calls: int
+    circuit_open_s: float
+    retry_queue_limit: int
 
     @classmethod
     def from_env(cls) -> "AppConfig":
@@ -54,6 +91,49 @@ class AppConfig:
                 31, 32, 33, 34, 35, 36, 37, 38, 39,
             )
 
+        try:
+            default_capacity = int(os.getenv("DEFAULT_TABLE_CAPACITY", "4"))
+            table_capacities = {t: default_capacity for t in actual_tables}
+            for item in os.getenv("TABLE_CAPACITIES", "").split(","):
+                if item.strip():
+                    table, capacity = item.split(":")
+                    table_capacities[int(table)] = int(capacity)
+        except ValueError:
+            raise ConfigError("TABLE_CAPACITIES должен быть списком пар стол:мест через запятую")
+
+        capture_dir = os.getenv("CAPTURE_DIR", "")
+        trace_export_file = os.getenv("TRACE_EXPORT_FILE", "")
+
+        state_backend = os.getenv("STATE_BACKEND", "memory").lower()
+        if state_backend not in ("memory", "redis"):
+            raise ConfigError("STATE_BACKEND должен быть memory или redis")
+        redis_url = os.getenv("REDIS_URL") or None
+        if state_backend == "redis" and not redis_url:
+            raise ConfigError("REDIS_URL не задан (нужен при STATE_BACKEND=redis)")
+
+        replication_role = os.getenv("REPLICATION_ROLE", "").lower() or None
+        replication_address = os.getenv("REPLICATION_ADDRESS") or None
+        replication_secret = os.getenv("REPLICATION_SECRET") or None
+        if replication_role is not None:
+            if replication_role not in ("primary", "standby"):
+                raise ConfigError("REPLICATION_ROLE должен быть primary или standby")
+            if state_backend != "memory":
+                raise ConfigError("Репликация нужна только при STATE_BACKEND=memory")
+            if not replication_address or not replication_address.startswith(("tcp://", "unix://")):
+                raise ConfigError("REPLICATION_ADDRESS должен быть вида tcp://host:port или unix:///path")
+            if not replication_secret or len(replication_secret) < 16:
+                raise ConfigError("REPLICATION_SECRET не задан или короче 16 символов (нужен при REPLICATION_ROLE)")
+
+        update_workers = int(os.getenv("UPDATE_WORKERS", "4"))
+        if update_workers < 1:
+            raise ConfigError("UPDATE_WORKERS должен быть не меньше 1")
+        tg_pool_size = int(os.getenv("TG_POOL_SIZE", "16"))
+        if tg_pool_size < 1:
+            raise ConfigError("TG_POOL_SIZE должен быть не меньше 1")
+        circuit_failure_rate = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+        if not 0 < circuit_failure_rate <= 1:
+            raise ConfigError("CIRCUIT_FAILURE_RATE должен быть в диапазоне (0, 1]")
+
         return cls(
             tg_api_key=tg_api_key,
             admin_group_id=admin_group_id,
@@ -65,5 +145,39 @@ class AppConfig:
             tg_mode=os.getenv("TG_MODE", "webhook").lower(),
             actual_tables=actual_tables,
             state_file=Path(os.getenv("STATE_FILE", "data/state.json")),
+            history_file=Path(os.getenv("HISTORY_FILE", "data/reservations.jsonl")),
             http_port=int(os.getenv("HTTP_PORT", "8000")),
+            booking_duration_min=int(os.getenv("BOOKING_DURATION_MIN", "120")),
+            table_capacities=table_capacities,
+            vk_api_url=os.getenv("VK_API_URL", VK_API_URL),
+            capture_dir=Path(capture_dir) if capture_dir else None,
+            capture_max_bytes=int(os.getenv("CAPTURE_MAX_MB", "50")) * 1024 * 1024,
+            capture_backups=int(os.getenv("CAPTURE_BACKUPS", "10")),
+            capture_salt=os.getenv("CAPTURE_SALT") or None,
+            trace_slow_ms=int(os.getenv("TRACE_SLOW_MS", "1000")),
+            trace_buffer=int(os.getenv("TRACE_BUFFER", "200")),
+            trace_export_file=Path(trace_export_file) if trace_export_file else None,
+            admin_token=os.getenv("ADMIN_TOKEN") or None,
+            profiler_max_s=int(os.getenv("PROFILER_MAX_S", "300")),
+            state_backend=state_backend,
+            redis_url=redis_url,
+            redis_prefix=os.getenv("REDIS_PREFIX", "inbibe:"),
+            replica_id=os.getenv("REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}",
+            leader_ttl_ms=int(os.getenv("LEADER_TTL_MS", "10000")),
+            replication_role=replication_role,
+            replication_address=replication_address,
+            replication_secret=replication_secret,
+            update_workers=update_workers,
+            user_callback_queue=int(os.getenv("USER_CALLBACK_QUEUE", "200")),
+            user_text_queue=int(os.getenv("USER_TEXT_QUEUE", "100")),
+            booking_expire_grace_min=int(os.getenv("BOOKING_EXPIRE_GRACE_MIN", "30")),
+            flow_ttl_hours=int(os.getenv("FLOW_TTL_HOURS", "24")),
+            shutdown_timeout_s=float(os.getenv("SHUTDOWN_TIMEOUT_S", "8")),
+            tg_pool_size=tg_pool_size,
+            tg_connect_timeout_s=float(os.getenv("TG_CONNECT_TIMEOUT_S", "5")),
+            tg_read_timeout_s=float(os.getenv("TG_READ_TIMEOUT_S", "15")),
+            circuit_failure_rate=circuit_failure_rate,
+            circuit_min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "5")),
+            circuit_open_s=float(os.getenv("CIRCUIT_OPEN_S", "30")),
+            retry_queue_limit=int(os.getenv("RETRY_QUEUE_LIMIT", "500")),
         )
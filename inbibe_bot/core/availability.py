@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from threading import RLock
+from typing import Iterable, Mapping
+
+import numpy as np
+import numpy.typing as npt
+
+from inbibe_bot.core.occupancy import Reservation, ReservationEvent, TableOccupancy
+from inbibe_bot.shared.datetime_utils import MSK, to_msk_naive
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+class AvailabilityGrid:
+    """Матрица занятости «столы × 15-минутные слоты» на скользящем горизонте от сегодняшнего дня.
+
+    Обновляется инкрементально по событиям TableOccupancy; запросы по вместимости
+    считаются векторно. Ячейка хранит число броней, чтобы снятие одной брони
+    не освобождало слот, частично занятый соседней.
+    """
+
+    def __init__(
+        self,
+        occupancy: TableOccupancy,
+        capacities: Mapping[int, int],
+        horizon_days: int,
+        today: date,
+    ) -> None:
+        self._occupancy = occupancy
+        self._tables = occupancy.tables
+        self._rows = {t: i for i, t in enumerate(self._tables)}
+        self._capacity = np.array([capacities[t] for t in self._tables], dtype=np.int32)
+        self._duration_slots = _ceil_slots(occupancy.default_duration)
+        self._horizon_days = horizon_days
+        self._busy = np.zeros((len(self._tables), horizon_days * SLOTS_PER_DAY), dtype=np.uint8)
+        self._origin = today
+        self._lock = RLock()
+
+    @property
+    def origin(self) -> date:
+        return self._origin
+
+    def attach(self) -> None:
+        """Строит сетку из текущего состояния занятости и подписывается на изменения."""
+        self.rebuild(self._occupancy.list_all())
+        self._occupancy.add_listener(self.apply)
+
+    def apply(self, event: ReservationEvent, reservation: Reservation) -> None:
+        delta = 1 if event == ReservationEvent.RESERVED else -1
+        with self._lock:
+            self._mark(reservation, delta)
+
+    def rebuild(self, reservations: Iterable[Reservation]) -> None:
+        with self._lock:
+            self._busy.fill(0)
+            for r in reservations:
+                self._mark(r, 1)
+
+    def roll(self, today: date) -> None:
+        """Сдвигает горизонт на новый день; хвост достраивается из индекса занятости."""
+        with self._lock:
+            days = (today - self._origin).days
+            if days <= 0:
+                return
+            self._origin = today
+            if days >= self._horizon_days:
+                self.rebuild(self._occupancy.list_all())
+                return
+            shift = days * SLOTS_PER_DAY
+            self._busy[:, :-shift] = self._busy[:, shift:]
+            self._busy[:, -shift:] = 0
+            tail_start = datetime.combine(today + timedelta(days=self._horizon_days - days), datetime.min.time())
+            for r in self._occupancy.list_all():
+                if r.end > tail_start:
+                    self._mark(r, 1, not_before=tail_start)
+
+    def covers(self, day: date) -> bool:
+        return 0 <= (day - self._origin).days < self._horizon_days
+
+    def free_capacity(self, day: date) -> npt.NDArray[np.int32]:
+        """Суммарная вместимость столов, свободных на всю длительность брони, для каждого слота дня."""
+        self._sync_day()
+        if not self.covers(day):
+            return np.full(SLOTS_PER_DAY, int(self._capacity.sum()), dtype=np.int32)
+        with self._lock:
+            free = self._free_windows(day)
+            capacity: npt.NDArray[np.int32] = (free * self._capacity[:, None]).sum(axis=0, dtype=np.int32)
+            return capacity
+
+    def full_slots(self, day: date, guests: int = 1) -> set[int]:
+        """Номера слотов дня, на которые не поместится ни одна бронь на guests гостей."""
+        self._sync_day()
+        if not self.covers(day):
+            return set()
+        with self._lock:
+            free = self._free_windows(day)
+            fits = free & (self._capacity >= guests)[:, None]
+            return {int(s) for s in np.flatnonzero(~fits.any(axis=0))}
+
+    def free_tables(self, start: datetime, guests: int = 1) -> list[int]:
+        """Свободные на [start, start + длительность) столы вместимостью от guests."""
+        start = to_msk_naive(start)
+        self._sync_day()
+        if not self.covers(start.date()):
+            capacity = dict(zip(self._tables, self._capacity.tolist()))
+            return [t for t in self._occupancy.free_tables(start) if capacity[t] >= guests]
+        first = self._slot(start)
+        last = min(first + self._duration_slots, self._busy.shape[1])
+        with self._lock:
+            window = self._busy[:, first:last]
+            free = ~window.any(axis=1) & (self._capacity >= guests)
+            return [self._tables[i] for i in np.flatnonzero(free)]
+
+    def _sync_day(self) -> None:
+        today = datetime.now(MSK).date()
+        if today != self._origin:
+            self.roll(today)
+
+    def _free_windows(self, day: date) -> npt.NDArray[np.bool_]:
+        """free[t, s] — стол t свободен на слоты [s, s + длительность) дня day."""
+        first = (day - self._origin).days * SLOTS_PER_DAY
+        width = self._busy.shape[1]
+        stop = min(first + SLOTS_PER_DAY + self._duration_slots, width)
+        occupied = (self._busy[:, first:stop] > 0).astype(np.int32)
+        # Занятость в окне длительности брони — через префиксные суммы по времени
+        csum = np.zeros((occupied.shape[0], occupied.shape[1] + 1), dtype=np.int32)
+        np.cumsum(occupied, axis=1, out=csum[:, 1:])
+        ends = np.minimum(np.arange(SLOTS_PER_DAY) + self._duration_slots, occupied.shape[1])
+        window_busy = csum[:, ends] - csum[:, :SLOTS_PER_DAY]
+        return np.asarray(window_busy == 0)
+
+    def _slot(self, dt: datetime) -> int:
+        minutes = (dt.date() - self._origin).days * 24 * 60 + dt.hour * 60 + dt.minute
+        return minutes // SLOT_MINUTES
+
+    def _mark(self, r: Reservation, delta: int, not_before: datetime | None = None) -> None:
+        start = max(r.start, not_before) if not_before else r.start
+        first = max(self._slot(start), 0)
+        end_minutes = (r.end.date() - self._origin).days * 24 * 60 + r.end.hour * 60 + r.end.minute
+        last = min(-(-end_minutes // SLOT_MINUTES), self._busy.shape[1])
+        if first >= last:
+            return
+        rows = [self._rows[t] for t in r.tables if t in self._rows]
+        if delta > 0:
+            self._busy[rows, first:last] += 1
+        else:
+            block = self._busy[rows, first:last]
+            self._busy[rows, first:last] = np.where(block > 0, block - 1, 0)
+
+
+def _ceil_slots(duration: timedelta) -> int:
+    return max(1, -(-int(duration.total_seconds() // 60) // SLOT_MINUTES))
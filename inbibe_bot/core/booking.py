@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from enum import Enum
 
@@ -32,6 +32,11 @@ class Booking:
     admin_message_id: int | None = None
     table_request_message_id: int | None = None
     alt_request_message_id: int | None = None
+    # Номер сохранённой ревизии: update() в хранилище проходит, только если он не изменился с чтения
+    version: int = 0
+
+    def copy(self) -> "Booking":
+        return replace(self, table_numbers=set(self.table_numbers))
 
     def to_dict(self) -> dict:
         return {
@@ -47,6 +52,7 @@ class Booking:
             "admin_message_id": self.admin_message_id,
             "table_request_message_id": self.table_request_message_id,
             "alt_request_message_id": self.alt_request_message_id,
+            "version": self.version,
         }
 
     @classmethod
@@ -64,4 +70,5 @@ class Booking:
             admin_message_id=data.get("admin_message_id"),
             table_request_message_id=data.get("table_request_message_id"),
             alt_request_message_id=data.get("alt_request_message_id"),
+            version=data.get("version", 0),
         )
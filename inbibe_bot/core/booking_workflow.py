@@ -37,6 +37,7 @@ class BookingWorkflow:
         return booking
 
     def assign_tables(self, booking: Booking, tables: set[int]) -> Booking:
+        """Только проверка и смена статуса: занять столы (TableOccupancy.reserve) — забота вызывающего."""
         invalid = tables - self._allowed_tables
         if invalid:
             raise ValueError(f"Недопустимые номера столов: {sorted(invalid)}")
@@ -45,6 +46,17 @@ class BookingWorkflow:
         booking.status = BookingStatus.APPROVED
         return booking
 
+    def assign_suggested(self, booking: Booking, tables: set[int]) -> Booking:
+        """Подтверждение в одно нажатие с карточки: PENDING → AWAITING_TABLE → APPROVED."""
+        if booking.status != BookingStatus.PENDING:
+            return self.assign_tables(booking, tables)
+        self.request_table_selection(booking)
+        try:
+            return self.assign_tables(booking, tables)
+        except ValueError:
+            booking.status = BookingStatus.PENDING
+            raise
+
     def reject(self, booking: Booking) -> Booking:
         self._ensure_transition(booking, BookingStatus.REJECTED)
         booking.status = BookingStatus.REJECTED
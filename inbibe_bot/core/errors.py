@@ -19,3 +19,27 @@ class BookingNotFound(KeyError):
     def __init__(self, booking_id: str) -> None:
         super().__init__(booking_id)
         self.booking_id = booking_id
+
+
+class TableConflict(ValueError):
+    def __init__(self, tables: list[int]) -> None:
+        super().__init__(f"Столы уже заняты на это время: {tables}")
+        self.tables = tables
+
+
+class BookingConflict(Exception):
+    """Заявку изменили между чтением и update(): действие нужно повторить со свежей версией."""
+
+    def __init__(self, booking_id: str, expected: int, actual: int) -> None:
+        super().__init__(f"Заявка {booking_id} изменена параллельно (версия {expected}, в хранилище {actual})")
+        self.booking_id = booking_id
+        self.expected = expected
+        self.actual = actual
+
+
+class BookingBusy(Exception):
+    """Заявку сейчас обрабатывает другое действие, и оно не завершилось за отведённое время."""
+
+    def __init__(self, booking_id: str) -> None:
+        super().__init__(f"Заявка {booking_id} занята другим действием")
+        self.booking_id = booking_id
@@ -37,6 +37,11 @@ class BookingFormatter:
             f"🌐 Источник: {booking.source.value}"
         )
 
+    @staticmethod
+    def admin_expired(booking: Booking) -> str:
+        details = BookingFormatter.admin_final(booking).split("\n", 1)[1]
+        return f"⌛ *Заявка брони истекла без решения:*\n{details}"
+
     @staticmethod
     def admin_table_prompt(booking: Booking) -> str:
         return (
@@ -66,3 +71,12 @@ class BookingFormatter:
         formatted_date = format_date_russian(booking.date_time)
         time_str = booking.date_time.strftime("%H:%M")
         return f"❌ Извините, {booking.name}. Ваша бронь на {formatted_date} в {time_str} была отклонена.\nДля новой брони введите /start"
+
+    @staticmethod
+    def user_expired(booking: Booking) -> str:
+        formatted_date = format_date_russian(booking.date_time)
+        time_str = booking.date_time.strftime("%H:%M")
+        return (
+            f"⌛ {booking.name}, к сожалению, ваша заявка на {formatted_date} в {time_str} "
+            f"не была обработана вовремя и отменена.\nДля новой брони введите /start"
+        )
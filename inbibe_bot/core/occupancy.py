@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from threading import RLock
+from typing import Callable, Iterable
+
+from inbibe_bot.core.errors import TableConflict
+from inbibe_bot.shared.datetime_utils import to_msk_naive
+
+
+class ReservationEvent(str, Enum):
+    RESERVED = "reserved"
+    RELEASED = "released"
+
+
+@dataclass(frozen=True)
+class Reservation:
+    booking_id: str
+    tables: frozenset[int]
+    start: datetime
+    end: datetime
+
+    def to_dict(self) -> dict:
+        return {
+            "booking_id": self.booking_id,
+            "tables": sorted(self.tables),
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Reservation":
+        return cls(
+            booking_id=data["booking_id"],
+            tables=frozenset(data["tables"]),
+            start=datetime.fromisoformat(data["start"]),
+            end=datetime.fromisoformat(data["end"]),
+        )
+
+
+ReservationListener = Callable[[ReservationEvent, Reservation], None]
+# Получает границу уборки: все брони, закончившиеся не позже неё, удалены
+PruneListener = Callable[[datetime], None]
+
+
+class _TableTimeline:
+    """Непересекающиеся полуинтервалы [start, end) одного стола, отсортированные по началу (в минутах)."""
+
+    __slots__ = ("starts", "ends", "owners")
+
+    def __init__(self) -> None:
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        self.owners: list[str] = []
+
+    def overlapping(self, start: int, end: int) -> str | None:
+        i = bisect_right(self.starts, start)
+        if i > 0 and self.ends[i - 1] > start:
+            return self.owners[i - 1]
+        if i < len(self.starts) and self.starts[i] < end:
+            return self.owners[i]
+        return None
+
+    def insert(self, start: int, end: int, owner: str) -> None:
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.owners.insert(i, owner)
+
+    def remove(self, start: int, owner: str) -> None:
+        i = bisect_right(self.starts, start) - 1
+        while i >= 0 and self.starts[i] == start:
+            if self.owners[i] == owner:
+                del self.starts[i], self.ends[i], self.owners[i]
+                return
+            i -= 1
+
+
+class TableOccupancy(ABC):
+    """Занятость столов подтверждёнными бронями; reserve() — единственная проверка пересечений.
+
+    Общее для реализаций: список столов, длительность брони по умолчанию и подписчики. Слушатели
+    получают занятия и освобождения, сделанные через этот объект, — сетка доступности процесса
+    обновляется по ним сразу, не дожидаясь перечитывания.
+    """
+
+    def __init__(self, tables: Iterable[int], default_duration: timedelta) -> None:
+        self._tables = sorted(set(tables))
+        self._default_duration = default_duration
+        self._listeners: list[ReservationListener] = []
+        self._prune_listeners: list[PruneListener] = []
+        self._on_change: Callable[[], None] | None = None
+
+    @property
+    def tables(self) -> list[int]:
+        return list(self._tables)
+
+    @property
+    def default_duration(self) -> timedelta:
+        return self._default_duration
+
+    def set_change_callback(self, fn: Callable[[], None]) -> None:
+        self._on_change = fn
+
+    def add_listener(self, fn: ReservationListener) -> None:
+        self._listeners.append(fn)
+
+    def add_prune_listener(self, fn: PruneListener) -> None:
+        """Уборка прошедших броней — не освобождение: сетке и репликам она не нужна, журналу — нужна."""
+        self._prune_listeners.append(fn)
+
+    def is_free(self, table: int, start: datetime, duration: timedelta | None = None) -> bool:
+        return not self.conflicts({table}, start, duration)
+
+    def free_tables(self, start: datetime, duration: timedelta | None = None) -> list[int]:
+        busy = self.conflicts(self._tables, start, duration)
+        return [t for t in self._tables if t not in busy]
+
+    @abstractmethod
+    def conflicts(
+        self, tables: Iterable[int], start: datetime, duration: timedelta | None = None
+    ) -> dict[int, str]:
+        """Возвращает {стол: ID брони}, с которыми пересекается интервал."""
+
+    @abstractmethod
+    def reserve(
+        self,
+        booking_id: str,
+        tables: set[int],
+        start: datetime,
+        duration: timedelta | None = None,
+    ) -> Reservation:
+        """Атомарно проверяет и занимает столы. При пересечении бросает TableConflict."""
+
+    @abstractmethod
+    def release(self, booking_id: str) -> Reservation | None: ...
+
+    @abstractmethod
+    def get(self, booking_id: str) -> Reservation | None: ...
+
+    @abstractmethod
+    def list_all(self) -> list[Reservation]: ...
+
+    @abstractmethod
+    def prune(self, before: datetime) -> int:
+        """Удаляет брони, закончившиеся до before. Слушатели не уведомляются — это не отмена."""
+
+    @abstractmethod
+    def restore(self, reservations: Iterable[Reservation]) -> None:
+        """Заменяет состояние целиком (загрузка из state.json или истории), без уведомлений."""
+
+    def _reservation(
+        self, booking_id: str, tables: set[int], start: datetime, duration: timedelta | None
+    ) -> Reservation:
+        start = to_msk_naive(start)
+        return Reservation(
+            booking_id=booking_id,
+            tables=frozenset(tables),
+            start=start,
+            end=start + (duration or self._default_duration),
+        )
+
+    def _emit(self, event: ReservationEvent, reservation: Reservation) -> None:
+        for listener in self._listeners:
+            listener(event, reservation)
+        if self._on_change:
+            self._on_change()
+
+    def _pruned(self, cutoff: datetime) -> None:
+        for listener in self._prune_listeners:
+            listener(cutoff)
+        if self._on_change:
+            self._on_change()
+
+
+class InMemoryTableOccupancy(TableOccupancy):
+    """Индекс занятости в памяти процесса.
+
+    На каждый стол — отсортированный список интервалов, поэтому проверка
+    «свободен ли стол на [start, start + duration)» стоит O(log n).
+    """
+
+    def __init__(self, tables: Iterable[int], default_duration: timedelta) -> None:
+        super().__init__(tables, default_duration)
+        self._timelines: dict[int, _TableTimeline] = {}
+        self._reservations: dict[str, Reservation] = {}
+        self._lock = RLock()
+
+    def conflicts(
+        self, tables: Iterable[int], start: datetime, duration: timedelta | None = None
+    ) -> dict[int, str]:
+        s, e = self._span(start, duration)
+        result: dict[int, str] = {}
+        with self._lock:
+            for table in tables:
+                timeline = self._timelines.get(table)
+                owner = timeline.overlapping(s, e) if timeline else None
+                if owner is not None:
+                    result[table] = owner
+        return result
+
+    def free_tables(self, start: datetime, duration: timedelta | None = None) -> list[int]:
+        s, e = self._span(start, duration)
+        with self._lock:
+            return [
+                t for t in self._tables
+                if (tl := self._timelines.get(t)) is None or tl.overlapping(s, e) is None
+            ]
+
+    def reserve(
+        self,
+        booking_id: str,
+        tables: set[int],
+        start: datetime,
+        duration: timedelta | None = None,
+    ) -> Reservation:
+        reservation = self._reservation(booking_id, tables, start, duration)
+        with self._lock:
+            previous = self._reservations.get(booking_id)
+            if previous is not None:
+                self._remove(previous)
+            busy = self.conflicts(tables, reservation.start, reservation.end - reservation.start)
+            if busy:
+                if previous is not None:
+                    self._insert(previous)
+                raise TableConflict(sorted(busy))
+            self._insert(reservation)
+        if previous is not None:
+            self._emit(ReservationEvent.RELEASED, previous)
+        self._emit(ReservationEvent.RESERVED, reservation)
+        return reservation
+
+    def release(self, booking_id: str) -> Reservation | None:
+        with self._lock:
+            reservation = self._reservations.get(booking_id)
+            if reservation is None:
+                return None
+            self._remove(reservation)
+        self._emit(ReservationEvent.RELEASED, reservation)
+        return reservation
+
+    def get(self, booking_id: str) -> Reservation | None:
+        with self._lock:
+            return self._reservations.get(booking_id)
+
+    def list_all(self) -> list[Reservation]:
+        with self._lock:
+            return sorted(self._reservations.values(), key=lambda r: r.start)
+
+    def prune(self, before: datetime) -> int:
+        cutoff = to_msk_naive(before)
+        with self._lock:
+            stale = [r for r in self._reservations.values() if r.end <= cutoff]
+            for r in stale:
+                self._remove(r)
+        if stale:
+            self._pruned(cutoff)
+        return len(stale)
+
+    def restore(self, reservations: Iterable[Reservation]) -> None:
+        with self._lock:
+            self._timelines.clear()
+            self._reservations.clear()
+            for r in reservations:
+                self._insert(r)
+
+    def _span(self, start: datetime, duration: timedelta | None) -> tuple[int, int]:
+        s = _minutes(to_msk_naive(start))
+        return s, s + int((duration or self._default_duration).total_seconds() // 60)
+
+    def _insert(self, r: Reservation) -> None:
+        s = _minutes(r.start)
+        e = _minutes(r.end)
+        for table in r.tables:
+            self._timelines.setdefault(table, _TableTimeline()).insert(s, e, r.booking_id)
+        self._reservations[r.booking_id] = r
+
+    def _remove(self, r: Reservation) -> None:
+        s = _minutes(r.start)
+        for table in r.tables:
+            timeline = self._timelines.get(table)
+            if timeline is not None:
+                timeline.remove(s, r.booking_id)
+        self._reservations.pop(r.booking_id, None)
+
+
+def _minutes(dt: datetime) -> int:
+    return dt.toordinal() * 1440 + dt.hour * 60 + dt.minute
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Mapping
+
+from inbibe_bot.core.availability import AvailabilityGrid
+
+# Стыковка столов «стоит» пару мест на стыке — одиночный стол с тем же запасом предпочтительнее.
+_EXTRA_TABLE_PENALTY = 2
+
+Suggestion = tuple[int, ...]
+
+
+class TableSuggester:
+    """Подбор стола или соседних столов под заявку.
+
+    Соседними считаются столы одного зала (одинаковый десяток номера), идущие подряд: 21+22, 21+22+23.
+    Все одиночные столы и такие цепочки до max_tables столов заранее собраны в индекс,
+    отсортированный по вместимости, поэтому подбор — бинарный поиск плюс короткий проход
+    по кандидатам в порядке «наименьший лишний запас мест» (best fit) до первого заведомо худшего.
+    """
+
+    def __init__(
+        self,
+        capacities: Mapping[int, int],
+        availability: AvailabilityGrid,
+        max_tables: int = 3,
+    ) -> None:
+        self._availability = availability
+        combinations = _adjacent_combinations(sorted(capacities), max_tables)
+        combinations.sort(key=lambda c: (sum(capacities[t] for t in c), len(c), c))
+        self._combinations = combinations
+        self._capacities = [sum(capacities[t] for t in c) for c in combinations]
+
+    @property
+    def size(self) -> int:
+        return len(self._combinations)
+
+    def suggest(self, guests: int, start: datetime, limit: int = 3) -> tuple[Suggestion, ...]:
+        """Лучшие варианты рассадки среди столов, свободных на всё время брони."""
+        guests = max(guests, 1)
+        free = set(self._availability.free_tables(start))
+        best: list[tuple[int, Suggestion]] = []
+        for i in range(bisect_left(self._capacities, guests), len(self._combinations)):
+            waste = self._capacities[i] - guests
+            if len(best) == limit and waste > best[-1][0]:
+                break
+            combination = self._combinations[i]
+            if not free.issuperset(combination):
+                continue
+            insort(best, (waste + (len(combination) - 1) * _EXTRA_TABLE_PENALTY, combination))
+            del best[limit:]
+        return tuple(c for _, c in best)
+
+
+def _adjacent_combinations(tables: list[int], max_tables: int) -> list[Suggestion]:
+    result: list[Suggestion] = []
+    for i in range(len(tables)):
+        run = [tables[i]]
+        result.append((tables[i],))
+        for nxt in tables[i + 1:i + max_tables]:
+            if nxt != run[-1] + 1 or nxt // 10 != run[0] // 10:
+                break
+            run.append(nxt)
+            result.append(tuple(run))
+    return result
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime, date
 from enum import Enum
 from typing import Final
@@ -37,6 +37,9 @@ class UserFlow:
     step: FlowStep = FlowStep.IDLE
     data: UserFlowData = field(default_factory=UserFlowData)
 
+    def copy(self) -> "UserFlow":
+        return replace(self, data=replace(self.data))
+
     def start(self) -> None:
         self.step = FlowStep.NAME
         self.data = UserFlowData()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Callable, Iterator
+
+from inbibe_bot.bootstrap import AppContext
+from inbibe_bot.storage.replication import ReplicationPrimary, ReplicationStandby
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ShutdownReport:
+    abandoned_updates: dict[str, int] = field(default_factory=dict)
+    unsent_replication: int = 0
+    pending_timers: int = 0
+    deferred_calls: int = 0
+    flushed: bool = False
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "abandoned_updates": self.abandoned_updates,
+            "unsent_replication": self.unsent_replication,
+            "pending_timers": self.pending_timers,
+            "deferred_calls": self.deferred_calls,
+            "flushed": self.flushed,
+        }
+
+
+class Lifecycle:
+    """Фазы запуска и остановки процесса.
+
+    По SIGTERM/SIGINT прекращает приём (вебхук, polling), затем в пределах deadline_s дожидается
+    выполняющихся апдейтов и фоновых очередей, один раз сохраняет состояние и пишет отчёт о брошенном.
+    Время каждой фазы попадает в лог — по нему видно, что удлиняет окно деплоя.
+    """
+
+    def __init__(self, deadline_s: float) -> None:
+        self.deadline_s = deadline_s
+        self._stage = "startup"
+        self._phases: dict[str, list[tuple[str, float]]] = {"startup": [], "shutdown": []}
+        self._stage_started = time.perf_counter()
+        self._stop_requested = threading.Event()
+        self._intake_stopped = threading.Event()
+        self._stop_intake: list[Callable[[], None]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self._phases[self._stage].append((name, elapsed))
+            logger.info("Фаза %s/%s: %.1f мс", self._stage, name, elapsed)
+
+    def on_stop(self, fn: Callable[[], None]) -> None:
+        """Регистрирует остановку источника апдейтов; вызываются по порядку при запросе остановки."""
+        self._stop_intake.append(fn)
+
+    def install_signals(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+
+    def request_stop(self, reason: str) -> None:
+        if self._stop_requested.is_set():
+            return
+        self._stop_requested.set()
+        logger.info("%s: прекращаю приём апдейтов", reason)
+        # Главный поток может быть занят serve_forever, а shutdown() ждёт его выхода — останавливаем из другого
+        threading.Thread(target=self._run_stop_intake, daemon=True, name="stop-intake").start()
+
+    def wait(self) -> None:
+        """Блокирует главный поток до запроса остановки; короткие ожидания — чтобы сигналы обрабатывались сразу."""
+        while not self._stop_requested.wait(1.0):
+            pass
+
+    def startup_done(self) -> None:
+        self._log_stage("Запуск")
+        self._stage = "shutdown"
+
+    def shutdown(self, app: AppContext) -> ShutdownReport:
+        """Дренаж, финальное сохранение и остановка фоновых потоков; вызывать после wait()."""
+        self._stage_started = time.perf_counter()
+        deadline = time.monotonic() + self.deadline_s
+        report = ShutdownReport()
+
+        with self.phase("stop_intake"):
+            self._intake_stopped.wait(max(0.0, deadline - time.monotonic()))
+        if app.scheduler is not None:
+            with self.phase("drain"):
+                report.abandoned_updates = app.scheduler.drain(max(0.0, deadline - time.monotonic()))
+        with self.phase("timers"):
+            app.wheel.stop(max(0.0, deadline - time.monotonic()))
+            report.pending_timers = app.wheel.size()
+        with self.phase("retry"):
+            app.retry.stop(max(0.0, deadline - time.monotonic()))
+            report.deferred_calls = app.retry.size()
+        if _owns_state(app):
+            with self.phase("flush"):
+                app.persister.save()
+                report.flushed = True
+        if isinstance(app.replication, ReplicationPrimary):
+            with self.phase("replication"):
+                report.unsent_replication = app.replication.flush(max(0.0, deadline - time.monotonic()))
+                app.replication.stop()
+        if app.elector is not None:
+            with self.phase("leadership"):
+                app.elector.stop()
+        if app.recorder is not None:
+            with self.phase("recorder"):
+                app.recorder.close()
+
+        self._log_stage("Остановка")
+        abandoned = sum(report.abandoned_updates.values()) + report.unsent_replication + report.deferred_calls
+        if abandoned:
+            logger.warning("Брошено при остановке: %s", report.to_dict())
+        else:
+            logger.info("Остановка без потерь: %s", report.to_dict())
+        return report
+
+    def _on_signal(self, signum: int, frame: FrameType | None) -> None:
+        name = signal.Signals(signum).name
+        if self._stop_requested.is_set():
+            logger.warning("Повторный %s: выход без дренажа", name)
+            os._exit(1)
+        self.request_stop(f"Получен {name}")
+
+    def _run_stop_intake(self) -> None:
+        try:
+            for fn in self._stop_intake:
+                try:
+                    fn()
+                except Exception:
+                    logger.exception("Ошибка при остановке приёма апдейтов")
+        finally:
+            self._intake_stopped.set()
+
+    def _log_stage(self, title: str) -> None:
+        total = (time.perf_counter() - self._stage_started) * 1000
+        phases = ", ".join(f"{name} {ms:.0f}" for name, ms in self._phases[self._stage])
+        logger.info("%s: %.0f мс (%s)", title, total, phases or "без фаз")
+
+
+def _owns_state(app: AppContext) -> bool:
+    """state.json пишет только экземпляр с состоянием в памяти; резерв — лишь после promote."""
+    if app.config.state_backend != "memory":
+        return False
+    return not isinstance(app.replication, ReplicationStandby) or app.replication.promoted
@@ -1,21 +1,111 @@
+import atexit
+import copy
+import itertools
+import json
 import os
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Any
 
 LOG_LEVEL = logging.INFO
 LOG_FORMAT = "%(asctime)s [%(levelname)s] [%(name)s] %(message)s"
 LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
 LOG_DIR = "logs"
 LOG_FILE = os.path.join(LOG_DIR, "inbibe-bot.log")
+LOG_QUEUE_SIZE = 10_000
 
-os.makedirs(LOG_DIR, exist_ok=True)
+# Поля LogRecord, которые не считаются пользовательскими extra
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class LazyJson:
+    """Аргумент лога, сериализуемый в JSON только если запись действительно форматируется."""
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, payload: Any) -> None:
+        self._payload = payload
+
+    def __str__(self) -> str:
+        return json.dumps(self._payload, ensure_ascii=False, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна JSON-строка; extra-поля записи попадают в объект как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Кладёт запись в очередь без блокировки: при переполнении запись теряется.
+
+    Сообщение подставляется здесь, в потоке вызова: аргументы могут быть изменяемыми объектами, и к
+    моменту вывода в потоке слушателя они уже будут другими. Формат строки, extra и трейсбек — у слушателя.
+    """
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Как в QueueHandler.prepare: копия, чтобы не менять запись, которую видят другие хэндлеры
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает каждую N-ю запись ниже WARNING; предупреждения и ошибки — всегда."""
+
+    def __init__(self, every: int) -> None:
+        super().__init__()
+        self._every = every
+        # Фильтр один на логгер, а пишут в него потоки хэндлеров: next() у count атомарен, «+= 1» — нет
+        self._seen = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        return self._every > 0 and next(self._seen) % self._every == 0
 
 
 def setup_logging() -> None:
-    formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
+    """Логи пишутся в очередь, в stdout их выводит отдельный поток — хэндлеры не ждут вывода.
+
+    LOG_JSON=1 — структурированный вывод; LOG_SAMPLE=логгер:N,... — писать каждую N-ю запись
+    уровня INFO и ниже для указанных логгеров (0 — не писать).
+    """
+    if os.getenv("LOG_JSON", "") in ("1", "true", "yes"):
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
 
+    os.makedirs(LOG_DIR, exist_ok=True)
     file_handler = TimedRotatingFileHandler(
         LOG_FILE,
         when="midnight",
@@ -30,7 +120,16 @@ def setup_logging() -> None:
     root_logger.setLevel(LOG_LEVEL)
 
     if not root_logger.handlers:
-        root_logger.addHandler(console_handler)
-        # root_logger.addHandler(file_handler)
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+        listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+        # listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        root_logger.addHandler(_NonBlockingQueueHandler(log_queue))
+        listener.start()
+        atexit.register(listener.stop)
+
+    for item in os.getenv("LOG_SAMPLE", "").split(","):
+        if item.strip():
+            name, every = item.rsplit(":", 1)
+            logging.getLogger(name.strip()).addFilter(SamplingFilter(int(every)))
 
     logging.getLogger("inbibe_bot").setLevel(logging.DEBUG)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, TypeVar
+
+_F = TypeVar("_F", bound=Callable[..., object])
+_ATTR = "access_log_policy"
+
+# Сайт опрашивает /api/bookings постоянно: в лог попадает каждый 100-й успешный опрос
+BOOKINGS_ACCESS_LOG_EVERY = 100
+
+# werkzeug пишет access-лог в том же потоке сразу после ответа — решение передаётся через thread-local
+_decision = threading.local()
+
+
+@dataclass
+class AccessLogPolicy:
+    """Как писать access-лог маршрута: успешные ответы — каждый every-й (0 — никогда), ошибки — всегда."""
+
+    every: int = 1
+    # Политика одна на маршрут, а запросы идут из разных потоков сервера: next() у count атомарен,
+    # в отличие от «+= 1» над полем
+    _seen: itertools.count[int] = field(default_factory=itertools.count, repr=False, compare=False)
+
+    def should_log(self, status: int) -> bool:
+        if status >= 400 or self.every == 1:
+            return True
+        if self.every <= 0:
+            return False
+        return next(self._seen) % self.every == 0
+
+
+def access_log(every: int) -> Callable[[_F], _F]:
+    """Метаданные маршрута: см. AccessLogPolicy."""
+    def decorator(view: _F) -> _F:
+        setattr(view, _ATTR, AccessLogPolicy(every))
+        return view
+    return decorator
+
+
+def policy_of(view: Callable[..., object] | None) -> AccessLogPolicy | None:
+    policy: AccessLogPolicy | None = getattr(view, _ATTR, None)
+    return policy
+
+
+def decide(view: Callable[..., object] | None, status: int) -> None:
+    policy = policy_of(view)
+    _decision.skip = policy is not None and not policy.should_log(status)
+
+
+class AccessLogFilter(logging.Filter):
+    """Фильтр логгера werkzeug: не форматирует запись, а смотрит решение, принятое по маршруту."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        skip = getattr(_decision, "skip", False)
+        _decision.skip = False
+        return not skip
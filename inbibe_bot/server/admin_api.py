@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import hmac
+import logging
+from dataclasses import dataclass, field
+
+from flask import Response, jsonify, request
+
+from inbibe_bot.shared.circuit_breaker import BREAKERS
+from inbibe_bot.shared.profiler import MemoryProfiler, SamplingProfiler
+from inbibe_bot.shared.retry_queue import RetryQueue
+from inbibe_bot.storage.booking_repository import BookingRepository
+from inbibe_bot.storage.replication import Replication, ReplicationStandby
+
+logger = logging.getLogger(__name__)
+
+MIN_INTERVAL_MS = 1.0
+
+
+@dataclass
+class AdminApiDeps:
+    token: str | None
+    max_profile_s: float
+    cpu: SamplingProfiler = field(default_factory=SamplingProfiler)
+    memory: MemoryProfiler = field(default_factory=MemoryProfiler)
+    replication: Replication | None = None
+    retry: RetryQueue | None = None
+    booking_repo: BookingRepository | None = None
+
+
+def authorize(deps: AdminApiDeps) -> tuple[Response, int] | None:
+    """Ответ-отказ, если токен не совпал; без ADMIN_TOKEN эндпоинты считаются отсутствующими."""
+    if not deps.token:
+        return jsonify({"error": "not found"}), 404
+    header = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(header.encode("utf-8"), f"Bearer {deps.token}".encode("utf-8")):
+        logger.warning("Отклонён запрос к %s: неверный токен", request.path)
+        return jsonify({"error": "unauthorized"}), 401
+    return None
+
+
+def handle_cpu_start(deps: AdminApiDeps) -> tuple[Response, int]:
+    interval_ms = max(request.args.get("interval_ms", 10.0, type=float), MIN_INTERVAL_MS)
+    duration = min(request.args.get("max_s", deps.max_profile_s, type=float), deps.max_profile_s)
+    if not deps.cpu.start(interval_ms / 1000, duration):
+        return jsonify({"error": "already running", **deps.cpu.status()}), 409
+    return jsonify(deps.cpu.status()), 200
+
+
+def handle_cpu_status(deps: AdminApiDeps) -> tuple[Response, int]:
+    return jsonify(deps.cpu.status()), 200
+
+
+def handle_cpu_stop(deps: AdminApiDeps) -> tuple[Response, int]:
+    response = Response(deps.cpu.stop(), content_type="text/plain; charset=utf-8")
+    response.headers["Content-Disposition"] = "attachment; filename=cpu.collapsed"
+    return response, 200
+
+
+def handle_memory_snapshot(deps: AdminApiDeps) -> tuple[Response, int]:
+    return jsonify(deps.memory.snapshot()), 200
+
+
+def handle_memory_diff(deps: AdminApiDeps) -> tuple[Response, int]:
+    group_by = request.args.get("group", "lineno")
+    if group_by not in ("lineno", "filename", "traceback"):
+        return jsonify({"error": "group must be lineno, filename or traceback"}), 400
+    diff = deps.memory.diff(request.args.get("limit", 25, type=int), group_by)
+    if diff is None:
+        return jsonify({"error": "no baseline snapshot"}), 409
+    return jsonify(diff), 200
+
+
+def handle_memory_stop(deps: AdminApiDeps) -> tuple[Response, int]:
+    deps.memory.stop()
+    return jsonify({"tracing": False}), 200
+
+
+def handle_replication_status(deps: AdminApiDeps) -> tuple[Response, int]:
+    if deps.replication is None:
+        return jsonify({"role": None}), 200
+    return jsonify(deps.replication.status()), 200
+
+
+def handle_replication_promote(deps: AdminApiDeps) -> tuple[Response, int]:
+    if not isinstance(deps.replication, ReplicationStandby):
+        return jsonify({"error": "not a standby"}), 409
+    if not deps.replication.promote():
+        return jsonify({"error": "already promoted", **deps.replication.status()}), 409
+    return jsonify(deps.replication.status()), 200
+
+
+def handle_breakers(deps: AdminApiDeps) -> tuple[Response, int]:
+    deferred = deps.retry.by_dependency() if deps.retry is not None else {}
+    return jsonify({b.name: {**b.snapshot(), "deferred": deferred.get(b.name, 0)} for b in BREAKERS}), 200
+
+
+def handle_bookings(deps: AdminApiDeps) -> tuple[Response, int]:
+    """Заявки в работе из снимка репозитория: один согласованный срез, без блокировок и копий."""
+    if deps.booking_repo is None:
+        return jsonify({"error": "not found"}), 404
+    snapshot = deps.booking_repo.snapshot()
+    bookings = sorted(snapshot.values(), key=lambda b: b.date_time)
+    return jsonify({"version": snapshot.version, "bookings": [b.to_dict() for b in bookings]}), 200
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
-import json
+import functools
 import logging
 from dataclasses import dataclass
 
 import telebot
 from flask import Response, jsonify, request
 
+from inbibe_bot.client.keyboard_cache import KeyboardCache
 from inbibe_bot.core.booking import Booking, Source
 from inbibe_bot.core.formatter import BookingFormatter
-from inbibe_bot.server.dto import BookingRequest, BookingResponse, BookingValidationError
+from inbibe_bot.core.table_suggester import TableSuggester
+from inbibe_bot.server.dto import BookingRequest, BookingResponse, parse_booking_body
+from inbibe_bot.shared.circuit_breaker import TELEGRAM_BREAKER, CircuitOpenError
 from inbibe_bot.shared.id_gen import gen_id
+from inbibe_bot.shared.retry_queue import RetryQueue
 from inbibe_bot.storage.booking_repository import BookingRepository
 from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
+from inbibe_bot.storage.traffic_recorder import TrafficRecorder
 from inbibe_bot.storage.user_registry import register_vk_user
 
 logger = logging.getLogger(__name__)
@@ -25,6 +30,10 @@ class BookingApiDeps:
     booking_repo: BookingRepository
     delivery_queue: ApprovedBookingQueue
     formatter: BookingFormatter
+    keyboards: KeyboardCache
+    suggester: TableSuggester
+    recorder: TrafficRecorder | None = None
+    retry: RetryQueue | None = None
 
 
 def handle_get_bookings(queue: ApprovedBookingQueue) -> Response:
@@ -39,6 +48,13 @@ def handle_health() -> Response:
 
 
 def handle_post_booking(deps: BookingApiDeps) -> tuple[Response, int]:
+    response, status = _post_booking(deps)
+    if deps.recorder is not None:
+        deps.recorder.record_api(request.path, request.get_data(), status)
+    return response, status
+
+
+def _post_booking(deps: BookingApiDeps) -> tuple[Response, int]:
     parsed_or_err = _parse_booking_request()
     if isinstance(parsed_or_err, BookingResponse):
         return jsonify(parsed_or_err.to_dict()), 400
@@ -57,44 +73,30 @@ def handle_post_booking(deps: BookingApiDeps) -> tuple[Response, int]:
     if parsed_or_err.user_id is not None:
         register_vk_user(parsed_or_err.user_id)
 
-    markup = telebot.types.InlineKeyboardMarkup()
-    markup.add(
-        telebot.types.InlineKeyboardButton("✅ Подтвердить", callback_data=f"approve_{booking.id}"),
-        telebot.types.InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{booking.id}"),
-    )
-    markup.add(
-        telebot.types.InlineKeyboardButton("🕘 Изменить дату/время", callback_data=f"approve_alt_{booking.id}")
-    )
+    try:
+        _send_admin_card(deps, booking)
+    except CircuitOpenError:
+        if deps.retry is None:
+            raise
+        # Заявка уже сохранена: карточка уйдёт в админ-чат, когда Telegram снова станет доступен
+        deps.retry.defer(
+            TELEGRAM_BREAKER, f"карточка новой заявки {booking.id}", functools.partial(_send_admin_card, deps, booking)
+        )
 
+    return jsonify(BookingResponse.ok().to_dict()), 200
+
+
+def _send_admin_card(deps: BookingApiDeps, booking: Booking) -> None:
     msg = deps.bot.send_message(
         deps.admin_group_id,
         deps.formatter.admin_new(booking),
-        reply_markup=markup,
+        reply_markup=deps.keyboards.admin_review(
+            booking.id, deps.suggester.suggest(booking.guests, booking.date_time)
+        ),
     )
     booking.admin_message_id = msg.message_id
     deps.booking_repo.update(booking)
 
-    return jsonify(BookingResponse.ok().to_dict()), 200
-
 
 def _parse_booking_request() -> BookingRequest | BookingResponse:
-    raw = request.get_data()
-    if not raw:
-        return BookingResponse.fail(error="empty body")
-
-    try:
-        decoded = raw.decode("utf-8")
-    except UnicodeDecodeError:
-        return BookingResponse.fail(error="invalid encoding, expected UTF-8")
-
-    try:
-        parsed = json.loads(decoded)
-    except json.JSONDecodeError:
-        return BookingResponse.fail(error="invalid JSON")
-
-    logging.info("Получен запрос бронирования: %s", json.dumps(parsed, ensure_ascii=False))
-
-    try:
-        return BookingRequest.from_json(parsed)
-    except BookingValidationError as e:
-        return BookingResponse.fail(error=str(e))
+    return parse_booking_body(request.get_data())
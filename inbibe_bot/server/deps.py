@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import telebot
+
+from inbibe_bot.client.keyboard_cache import KeyboardCache
+from inbibe_bot.client.update_filter import UpdateFilter
+from inbibe_bot.core.formatter import BookingFormatter
+from inbibe_bot.core.table_suggester import TableSuggester
+from inbibe_bot.shared.retry_queue import RetryQueue
+from inbibe_bot.storage.booking_repository import BookingRepository
+from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
+from inbibe_bot.storage.replication import Replication
+from inbibe_bot.storage.traffic_recorder import TrafficRecorder
+
+
+# Отдельно от routes: bootstrap и asyncio-рантайм собирают зависимости, не импортируя Flask
+@dataclass
+class ServerDeps:
+    bot: telebot.TeleBot
+    admin_group_id: int
+    webhook_secret: str
+    booking_repo: BookingRepository
+    delivery_queue: ApprovedBookingQueue
+    formatter: BookingFormatter
+    keyboards: KeyboardCache
+    suggester: TableSuggester
+    recorder: TrafficRecorder | None = None
+    admin_token: str | None = None
+    max_profile_s: float = 300.0
+    replication: Replication | None = None
+    update_filter: UpdateFilter | None = None
+    retry: RetryQueue | None = None
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import json
+import logging
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone, timedelta
 from typing import Any, Optional
 
+from inbibe_bot.logging_config import LazyJson
+
+logger = logging.getLogger(__name__)
+
 MSK = timezone(timedelta(hours=3))
 
 
@@ -65,3 +71,26 @@ class BookingRequest:
             )
         except (KeyError, TypeError, ValueError) as e:
             raise BookingValidationError(f"Невалидные данные бронирования: {e}")
+
+
+def parse_booking_body(raw: bytes) -> BookingRequest | BookingResponse:
+    """Разбирает тело POST /api/book; при ошибке — готовый ответ 400."""
+    if not raw:
+        return BookingResponse.fail(error="empty body")
+
+    try:
+        decoded = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return BookingResponse.fail(error="invalid encoding, expected UTF-8")
+
+    try:
+        parsed = json.loads(decoded)
+    except json.JSONDecodeError:
+        return BookingResponse.fail(error="invalid JSON")
+
+    logger.info("Получен запрос бронирования: %s", LazyJson(parsed))
+
+    try:
+        return BookingRequest.from_json(parsed)
+    except BookingValidationError as e:
+        return BookingResponse.fail(error=str(e))
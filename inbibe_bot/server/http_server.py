@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from werkzeug.serving import BaseWSGIServer, make_server
 
-from inbibe_bot.server.routes import ServerDeps, build_app
+from inbibe_bot.server.deps import ServerDeps
+from inbibe_bot.server.routes import build_app
 
 
 def build_server(deps: ServerDeps, port: int) -> BaseWSGIServer:
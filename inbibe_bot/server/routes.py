@@ -1,34 +1,24 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+import time
 
-import telebot
-from flask import Flask, Response
+from flask import Flask, Response, g, jsonify, request
 
-from inbibe_bot.core.formatter import BookingFormatter
-from inbibe_bot.server import booking_api, telegram_webhook
+from inbibe_bot.server import admin_api, booking_api, telegram_webhook
+from inbibe_bot.server.access_log import BOOKINGS_ACCESS_LOG_EVERY, AccessLogFilter, access_log, decide
+from inbibe_bot.server.admin_api import AdminApiDeps
 from inbibe_bot.server.booking_api import BookingApiDeps
-from inbibe_bot.storage.booking_repository import BookingRepository
-from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
+from inbibe_bot.server.deps import ServerDeps
+from inbibe_bot.shared.metrics import HTTP_REQUESTS, HTTP_SECONDS, REGISTRY
+from inbibe_bot.shared.tracing import TRACER
+from inbibe_bot.storage.replication import ReplicationStandby
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class ServerDeps:
-    bot: telebot.TeleBot
-    admin_group_id: int
-    webhook_secret: str
-    booking_repo: BookingRepository
-    delivery_queue: ApprovedBookingQueue
-    formatter: BookingFormatter
-
-
-class _SkipBookingsAccessLogFilter(logging.Filter):
-    def filter(self, record: logging.LogRecord) -> bool:
-        msg = record.getMessage()
-        return not ("GET /api/bookings" in msg and " 200 " in msg)
+# Что отвечает резервный экземпляр до promote: остальное изменило бы копию состояния в обход основного
+STANDBY_PATHS = ("/api/health", "/api/metrics", "/api/traces")
 
 
 def build_app(deps: ServerDeps) -> Flask:
@@ -41,7 +31,47 @@ def build_app(deps: ServerDeps) -> Flask:
         booking_repo=deps.booking_repo,
         delivery_queue=deps.delivery_queue,
         formatter=deps.formatter,
+        keyboards=deps.keyboards,
+        suggester=deps.suggester,
+        recorder=deps.recorder,
+        retry=deps.retry,
     )
+    admin_deps = AdminApiDeps(
+        token=deps.admin_token,
+        max_profile_s=deps.max_profile_s,
+        replication=deps.replication,
+        retry=deps.retry,
+        booking_repo=deps.booking_repo,
+    )
+
+    @app.before_request
+    def _start_timer() -> None:
+        g.started_ns = time.perf_counter_ns()
+
+    @app.before_request
+    def _guard_admin() -> tuple[Response, int] | None:
+        if request.path.startswith("/api/admin/"):
+            return admin_api.authorize(admin_deps)
+        return None
+
+    @app.before_request
+    def _guard_standby() -> tuple[Response, int] | None:
+        standby = deps.replication
+        if not isinstance(standby, ReplicationStandby) or standby.promoted:
+            return None
+        if request.path in STANDBY_PATHS or request.path.startswith("/api/admin/"):
+            return None
+        return jsonify({"error": "standby"}), 503
+
+    @app.after_request
+    def _observe(response: Response) -> Response:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        started = g.get("started_ns")
+        if started is not None:
+            HTTP_SECONDS.observe_ns(time.perf_counter_ns() - started, route, request.method)
+        HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+        decide(app.view_functions.get(request.endpoint or ""), response.status_code)
+        return response
 
     @app.after_request
     def _cors(response: Response) -> Response:
@@ -54,7 +84,19 @@ def build_app(deps: ServerDeps) -> Flask:
     def health() -> Response:
         return booking_api.handle_health()
 
+    @app.get("/api/metrics")
+    @access_log(every=0)
+    def metrics() -> Response:
+        return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.get("/api/traces")
+    @access_log(every=0)
+    def traces() -> Response:
+        limit = request.args.get("limit", type=int)
+        return jsonify(TRACER.recent(limit, slow_only=request.args.get("slow") == "1"))
+
     @app.get("/api/bookings")
+    @access_log(every=BOOKINGS_ACCESS_LOG_EVERY)
     def get_bookings() -> Response:
         return booking_api.handle_get_bookings(deps.delivery_queue)
 
@@ -64,8 +106,52 @@ def build_app(deps: ServerDeps) -> Flask:
 
     @app.post("/webhook")
     def webhook() -> tuple[str, int]:
-        return telegram_webhook.handle_webhook(deps.bot, deps.webhook_secret)
+        return telegram_webhook.handle_webhook(
+            deps.bot, deps.webhook_secret, deps.recorder, deps.update_filter
+        )
+
+    @app.post("/api/admin/profile/cpu/start")
+    def cpu_profile_start() -> tuple[Response, int]:
+        return admin_api.handle_cpu_start(admin_deps)
+
+    @app.get("/api/admin/profile/cpu")
+    def cpu_profile_status() -> tuple[Response, int]:
+        return admin_api.handle_cpu_status(admin_deps)
+
+    @app.post("/api/admin/profile/cpu/stop")
+    def cpu_profile_stop() -> tuple[Response, int]:
+        return admin_api.handle_cpu_stop(admin_deps)
+
+    @app.post("/api/admin/profile/memory/snapshot")
+    def memory_snapshot() -> tuple[Response, int]:
+        return admin_api.handle_memory_snapshot(admin_deps)
+
+    @app.get("/api/admin/profile/memory/diff")
+    def memory_diff() -> tuple[Response, int]:
+        return admin_api.handle_memory_diff(admin_deps)
+
+    @app.post("/api/admin/profile/memory/stop")
+    def memory_stop() -> tuple[Response, int]:
+        return admin_api.handle_memory_stop(admin_deps)
+
+    @app.get("/api/admin/replication")
+    def replication_status() -> tuple[Response, int]:
+        return admin_api.handle_replication_status(admin_deps)
+
+    @app.post("/api/admin/replication/promote")
+    def replication_promote() -> tuple[Response, int]:
+        return admin_api.handle_replication_promote(admin_deps)
+
+    @app.get("/api/admin/breakers")
+    def breakers() -> tuple[Response, int]:
+        return admin_api.handle_breakers(admin_deps)
+
+    @app.get("/api/admin/bookings")
+    def admin_bookings() -> tuple[Response, int]:
+        return admin_api.handle_bookings(admin_deps)
 
-    logging.getLogger("werkzeug").addFilter(_SkipBookingsAccessLogFilter())
+    werkzeug_logger = logging.getLogger("werkzeug")
+    if not any(isinstance(f, AccessLogFilter) for f in werkzeug_logger.filters):
+        werkzeug_logger.addFilter(AccessLogFilter())
 
     return app
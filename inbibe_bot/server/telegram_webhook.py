@@ -1,29 +1,59 @@
 from __future__ import annotations
 
+import json
 import logging
 
 import telebot
 from flask import request
 
+from inbibe_bot.client.update_filter import UpdateFilter
+from inbibe_bot.shared.tracing import TRACER, current_span
+from inbibe_bot.storage.traffic_recorder import TrafficRecorder
+
 logger = logging.getLogger(__name__)
 
 
-def handle_webhook(bot: telebot.TeleBot, webhook_secret: str) -> tuple[str, int]:
+def handle_webhook(
+    bot: telebot.TeleBot,
+    webhook_secret: str,
+    recorder: TrafficRecorder | None = None,
+    update_filter: UpdateFilter | None = None,
+) -> tuple[str, int]:
     secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
     if secret != webhook_secret:
         return "", 403
 
+    with TRACER.trace("update", source="webhook"):
+        return _process(bot, recorder, update_filter)
+
+
+def _process(
+    bot: telebot.TeleBot, recorder: TrafficRecorder | None, update_filter: UpdateFilter | None
+) -> tuple[str, int]:
     raw = request.get_data()
     if not raw:
         return "", 400
 
     try:
-        json_string = raw.decode("utf-8")
-    except UnicodeDecodeError:
+        data = json.loads(raw)
+    except ValueError:
+        return "", 400
+    if not isinstance(data, dict):
         return "", 400
 
+    if recorder is not None:
+        recorder.record_update(data, "webhook")
+
+    # Лишние апдейты отсекаются до сборки объектов telebot и проверки предикатов хэндлеров
+    skipped = update_filter.classify(data) if update_filter is not None else None
+    if skipped is not None:
+        current = current_span()
+        if current is not None:
+            current.trace.root.attrs["skipped"] = skipped
+        return "", 200
+
     try:
-        update = telebot.types.Update.de_json(json_string)
+        update = telebot.types.Update.de_json(data)
     except Exception:
         return "", 400
 
@@ -34,3 +64,4 @@ def handle_webhook(bot: telebot.TeleBot, webhook_secret: str) -> tuple[str, int]
         return "", 500
 
     return "", 200
+
@@ -0,0 +1,80 @@
+"""Действия, которые решения сервисного слоя поручают транспорту — синхронному telebot или asyncio.
+
+Сервис меняет состояние и возвращает список действий; транспорт выполняет их по порядку.
+Так решение (что ответить, кого уведомить) одно на оба рантайма, а различается только отправка.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Union
+
+from telebot import REPLY_MARKUP_TYPES
+
+from inbibe_bot.core.booking import Booking
+
+
+class PromptKind(str, Enum):
+    CARD = "card"
+    TABLE = "table"
+    ALT_DATETIME = "alt_datetime"
+
+    @property
+    def ephemeral(self) -> bool:
+        """Запросы стола и даты удаляются из чата вместе с заявкой; карточка остаётся."""
+        return self is not PromptKind.CARD
+
+
+@dataclass(frozen=True)
+class Answer:
+    """Ответ на действие: всплывающее уведомление на callback или reply на сообщение админа."""
+
+    text: str
+    alert: bool = False
+
+
+@dataclass(frozen=True)
+class Send:
+    chat_id: int
+    text: str
+    markup: REPLY_MARKUP_TYPES | None = None
+    parse_mode: str | None = None
+
+
+@dataclass(frozen=True)
+class NotifyUser:
+    """Уведомление гостя в TG или VK — по источнику заявки."""
+
+    booking: Booking
+    text: str
+
+
+@dataclass(frozen=True)
+class EditCard:
+    """Новый текст карточки заявки в админ-чате."""
+
+    booking: Booking
+    text: str
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """Сообщение по заявке в админ-чат; его message_id транспорт передаёт в BookingService.record_prompt.
+
+    failure — ответ админу, если отправить не удалось (остальные действия тогда не выполняются);
+    None — ошибка только пишется в лог.
+    """
+
+    booking_id: str
+    kind: PromptKind
+    text: str
+    markup: REPLY_MARKUP_TYPES | None = None
+    failure: str | None = None
+
+
+@dataclass(frozen=True)
+class ClearEphemeral:
+    booking_id: str
+
+
+Action = Union[Answer, Send, NotifyUser, EditCard, Prompt, ClearEphemeral]
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterator
+
+from inbibe_bot.client.keyboard_cache import KeyboardCache
+from inbibe_bot.core.availability import AvailabilityGrid
+from inbibe_bot.core.booking import Booking
+from inbibe_bot.core.booking_workflow import BookingWorkflow
+from inbibe_bot.core.errors import BookingBusy, BookingConflict, InvalidTransition
+from inbibe_bot.core.formatter import BookingFormatter
+from inbibe_bot.core.occupancy import TableOccupancy
+from inbibe_bot.core.table_suggester import TableSuggester
+from inbibe_bot.service.actions import Action, Answer, ClearEphemeral, EditCard, NotifyUser, Prompt, PromptKind
+from inbibe_bot.shared.datetime_utils import parse_admin_datetime
+from inbibe_bot.shared.metrics import BOOKING_CONFLICTS
+from inbibe_bot.shared.striped_lock import StripedLock
+from inbibe_bot.storage.booking_repository import BookingRepository
+from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
+
+logger = logging.getLogger(__name__)
+
+# Сколько действие над заявкой ждёт параллельное: дольше — админ видит BUSY_TEXT и повторяет сам
+BOOKING_LOCK_TIMEOUT_S = 3.0
+BUSY_TEXT = "Заявку сейчас обрабатывает другой администратор. Обновите карточку и попробуйте ещё раз."
+NOT_FOUND_TEXT = "Заявка не найдена."
+STALE_TEXT = "Действие неактуально."
+BAD_DATETIME_TEXT = "Неверный формат даты/времени. Попробуйте снова.\nОжидаемый формат: DD.MM.YY HH:MM"
+BAD_TABLES_TEXT = "Пожалуйста, вводите только числа через пробел."
+
+_Decision = Callable[[Booking], list[Action]]
+
+
+@dataclass
+class BookingService:
+    """Решения по заявкам в админ-чате, общие для синхронного и asyncio-рантайма.
+
+    Каждый метод читает заявку и меняет состояние под её блокировкой, а возвращает действия
+    (ответ админу, уведомление гостя, правка карточки), которые транспорт выполняет уже без блокировки:
+    сеть не держит заявку, а второй админ, нажавший одновременно, либо дождётся и увидит изменённую
+    заявку, либо получит BUSY_TEXT.
+    """
+
+    booking_repo: BookingRepository
+    delivery_queue: ApprovedBookingQueue
+    occupancy: TableOccupancy
+    workflow: BookingWorkflow
+    formatter: BookingFormatter
+    keyboards: KeyboardCache
+    availability: AvailabilityGrid
+    suggester: TableSuggester
+    locks: StripedLock
+
+    @contextmanager
+    def locked(self, booking_id: str) -> Iterator[None]:
+        """Сериализует действия над одной заявкой; BookingBusy, если не дождались BOOKING_LOCK_TIMEOUT_S."""
+        if not self.locks.acquire(booking_id, BOOKING_LOCK_TIMEOUT_S):
+            BOOKING_CONFLICTS.inc("busy")
+            raise BookingBusy(booking_id)
+        try:
+            yield
+        finally:
+            self.locks.release(booking_id)
+
+    # --- новая заявка ---
+
+    def submit(self, booking: Booking) -> list[Action]:
+        self.booking_repo.add(booking)
+        return [self.card(booking)]
+
+    def card(self, booking: Booking) -> Prompt:
+        """Карточка новой заявки с подсказанными столами."""
+        return Prompt(
+            booking.id,
+            PromptKind.CARD,
+            self.formatter.admin_new(booking),
+            self.keyboards.admin_review(booking.id, self.suggester.suggest(booking.guests, booking.date_time)),
+        )
+
+    def record_prompt(self, booking_id: str, kind: PromptKind, message_id: int) -> None:
+        """Запоминает отправленное сообщение: по нему находится заявка для reply админа."""
+        try:
+            with self.locked(booking_id):
+                booking = self.booking_repo.get(booking_id)
+                if booking is None:
+                    return
+                if kind is PromptKind.CARD:
+                    booking.admin_message_id = message_id
+                elif kind is PromptKind.TABLE:
+                    booking.table_request_message_id = message_id
+                else:
+                    booking.alt_request_message_id = message_id
+                self.booking_repo.update(booking)
+        except (BookingBusy, BookingConflict) as e:
+            logger.warning("Сообщение %s (%s) не привязано к заявке: %s", message_id, kind.value, e)
+
+    # --- кнопки карточки ---
+
+    def approve(self, booking_id: str) -> list[Action]:
+        return self._decide(booking_id, self._approve)
+
+    def request_alt_datetime(self, booking_id: str) -> list[Action]:
+        return self._decide(booking_id, self._request_alt_datetime)
+
+    def reject(self, booking_id: str) -> list[Action]:
+        return self._decide(booking_id, self._reject)
+
+    # --- выбор стола ---
+
+    def assign_table(self, booking_id: str, table: int) -> list[Action]:
+        return self._decide(booking_id, lambda b: self._assign(b, {table}, "Стол выбран, бронь подтверждена."))
+
+    def assign_suggested(self, booking_id: str, tables: tuple[int, ...]) -> list[Action]:
+        return self._decide(booking_id, lambda b: self._assign(b, set(tables), "Бронь подтверждена.", suggested=True))
+
+    def assign_from_reply(self, booking_id: str, text: str | None) -> list[Action]:
+        try:
+            assert text is not None
+            tables = {int(t) for t in text.split()}
+        except (ValueError, AssertionError):
+            return [Answer(BAD_TABLES_TEXT)]
+        return self._decide(booking_id, lambda b: self._assign(b, tables, None))
+
+    # --- новая дата/время ---
+
+    def reschedule_from_reply(self, booking_id: str, text: str | None) -> list[Action]:
+        new_dt = parse_admin_datetime(text)
+        if new_dt is None:
+            return [Answer(BAD_DATETIME_TEXT)]
+        return self._decide(booking_id, lambda b: self._reschedule(b, new_dt))
+
+    # --- истечение (поток колеса таймеров, блокировку берёт вызывающий) ---
+
+    def expire(self, booking: Booking) -> list[Action]:
+        self.workflow.reject(booking)
+        self.booking_repo.update(booking)
+        self.booking_repo.delete(booking.id)
+        self.occupancy.release(booking.id)
+        actions: list[Action] = [NotifyUser(booking, self.formatter.user_expired(booking))]
+        if booking.admin_message_id is not None:
+            actions.append(EditCard(booking, self.formatter.admin_expired(booking)))
+        actions.append(ClearEphemeral(booking.id))
+        logger.info("Заявка %s истекла без решения администратора", booking.id)
+        return actions
+
+    def table_choices(self, booking: Booking) -> tuple[int, ...]:
+        """Столы для клавиатуры выбора: свободные и вмещающие гостей, иначе — все свободные (для объединения)."""
+        fitting = self.availability.free_tables(booking.date_time, booking.guests)
+        if fitting:
+            return tuple(fitting)
+        return tuple(self.availability.free_tables(booking.date_time))
+
+    # --- решения (под блокировкой заявки) ---
+
+    def _decide(self, booking_id: str, decision: _Decision) -> list[Action]:
+        try:
+            with self.locked(booking_id):
+                booking = self.booking_repo.get(booking_id)
+                if booking is None:
+                    return [Answer(NOT_FOUND_TEXT, alert=True)]
+                return decision(booking)
+        except (BookingBusy, BookingConflict) as e:
+            if isinstance(e, BookingConflict):
+                BOOKING_CONFLICTS.inc("stale")
+            logger.info("Действие над заявкой отклонено: %s", e)
+            return [Answer(BUSY_TEXT, alert=True)]
+
+    def _approve(self, booking: Booking) -> list[Action]:
+        try:
+            self.workflow.request_table_selection(booking)
+        except InvalidTransition:
+            return [Answer(STALE_TEXT, alert=True)]
+        self.booking_repo.update(booking)
+        return [self._table_prompt(booking, failure="Ошибка при отправке клавиатуры"), Answer("Выберите номер стола")]
+
+    def _request_alt_datetime(self, booking: Booking) -> list[Action]:
+        try:
+            self.workflow.request_new_datetime(booking)
+        except InvalidTransition:
+            return [Answer(STALE_TEXT, alert=True)]
+        self.booking_repo.update(booking)
+        suggested = datetime.now() + timedelta(hours=2)
+        logger.info("Запрошено изменение даты/времени для заявки %s", booking.id)
+        return [
+            Prompt(
+                booking.id,
+                PromptKind.ALT_DATETIME,
+                self.formatter.admin_alt_datetime_prompt(booking, suggested),
+                failure="Ошибка при отправке запроса даты/времени",
+            ),
+            Answer("Ожидается новая дата/время."),
+        ]
+
+    def _reject(self, booking: Booking) -> list[Action]:
+        try:
+            self.workflow.reject(booking)
+        except InvalidTransition:
+            return [Answer(STALE_TEXT, alert=True)]
+        self.booking_repo.update(booking)
+        self.booking_repo.delete(booking.id)
+        self.occupancy.release(booking.id)
+        logger.info("Заявка %s отклонена", booking.id)
+        return [
+            NotifyUser(booking, self.formatter.user_rejected(booking)),
+            EditCard(booking, self.formatter.admin_final(booking)),
+            Answer("Обработано."),
+            ClearEphemeral(booking.id),
+        ]
+
+    def _assign(self, booking: Booking, tables: set[int], done: str | None, suggested: bool = False) -> list[Action]:
+        try:
+            if suggested:
+                self.workflow.assign_suggested(booking, tables)
+            else:
+                self.workflow.assign_tables(booking, tables)
+            # Столы занимаются рядом с фиксацией решения: TableConflict — ValueError
+            self.occupancy.reserve(booking.id, tables, booking.date_time)
+        except (InvalidTransition, ValueError) as e:
+            return [Answer(str(e), alert=True)]
+        try:
+            # Сначала фиксируется решение (BookingConflict → BUSY_TEXT в _decide), и только потом — выдача и уведомления
+            self.booking_repo.update(booking)
+            self.delivery_queue.enqueue(booking)
+            self.booking_repo.delete(booking.id)
+        except BaseException:
+            # Заявка не подтверждена: столы не должны остаться занятыми ею
+            self.occupancy.release(booking.id)
+            raise
+        logger.info("Заявка %s подтверждена (столы %s)", booking.id, sorted(tables))
+        actions: list[Action] = [
+            NotifyUser(booking, self.formatter.user_approved(booking)),
+            EditCard(booking, self.formatter.admin_final(booking)),
+            ClearEphemeral(booking.id),
+        ]
+        if done is not None:
+            actions.append(Answer(done))
+        return actions
+
+    def _reschedule(self, booking: Booking, new_dt: datetime) -> list[Action]:
+        self.workflow.apply_new_datetime(booking, new_dt)
+        try:
+            self.workflow.request_table_selection(booking)
+        except InvalidTransition:
+            return [Answer(STALE_TEXT)]
+        booking.alt_request_message_id = None
+        self.booking_repo.update(booking)
+        logger.info("Заявка %s: дата/время обновлены на %s", booking.id, new_dt)
+        return [self._table_prompt(booking)]
+
+    def _table_prompt(self, booking: Booking, failure: str | None = None) -> Prompt:
+        return Prompt(
+            booking.id,
+            PromptKind.TABLE,
+            self.formatter.admin_table_prompt(booking),
+            self.keyboards.tables(booking.id, self.table_choices(booking)),
+            failure=failure,
+        )
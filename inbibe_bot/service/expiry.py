@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import functools
+import logging
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Callable, Sequence, TypeVar
+
+from inbibe_bot.core.booking import Booking, BookingStatus
+from inbibe_bot.core.errors import BookingBusy, BookingConflict, BookingNotFound
+from inbibe_bot.core.user_flow import UserFlow
+from inbibe_bot.service.actions import Action, ClearEphemeral
+from inbibe_bot.service.bookings import BOOKING_LOCK_TIMEOUT_S, BookingService
+from inbibe_bot.shared.datetime_utils import MSK, to_msk_naive
+from inbibe_bot.shared.metrics import EXPIRED
+from inbibe_bot.shared.timer_wheel import Timer, TimerWheel
+from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService
+from inbibe_bot.storage.user_flow_repository import UserFlowRepository
+
+logger = logging.getLogger(__name__)
+
+# Хэндлеры чистят временные сообщения сразу после удаления заявки; проверка — с запасом
+ORPHAN_CHECK_S = 60
+COMPACT_INTERVAL_S = 3600
+# Обход общего хранилища лидером: истечение заявки или сценария запаздывает не больше чем на столько
+SCAN_INTERVAL_S = 30
+
+_TERMINAL = {BookingStatus.APPROVED, BookingStatus.REJECTED}
+_K = TypeVar("_K")
+
+Perform = Callable[[Sequence[Action]], None]
+
+
+class ExpiryService:
+    """Истечения на таймерах колеса вместо периодических полных обходов.
+
+    Таймеры ставятся по событиям репозиториев (booking.put, flow.put) и снимаются при удалении:
+    - заявка без решения админа через grace после времени брони отклоняется, гость получает уведомление;
+    - сценарий пользователя без изменений дольше flow_ttl удаляется;
+    - временные сообщения удалённой заявки, если их не убрал хэндлер, удаляются из админ-чата;
+    - раз в час занятость очищается от прошедших броней, сетка доступности сдвигается на текущий день.
+
+    При общем хранилище (attach_shared) событий о чужих изменениях нет: таймеры ставит обход репозиториев.
+    Таймеры срабатывают в потоке колеса; уведомления и чистку сообщений выполняет транспорт рантайма
+    через perform — синхронный telebot сразу, asyncio — в своём event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        bookings: BookingService,
+        flow_repo: UserFlowRepository,
+        ephemeral: EphemeralMessageService,
+        wheel: TimerWheel,
+        perform: Perform,
+        grace: timedelta,
+        flow_ttl: timedelta,
+    ) -> None:
+        self._service = bookings
+        self._booking_repo = bookings.booking_repo
+        self._flow_repo = flow_repo
+        self._ephemeral = ephemeral
+        self._wheel = wheel
+        self._perform = perform
+        self._grace = grace
+        self._flow_ttl = flow_ttl
+        self._bookings: dict[str, Timer] = {}
+        self._flows: dict[int, Timer] = {}
+        self._lock = Lock()
+        # Только при общем хранилище: сценарии на момент последнего обхода и проверка лидерства
+        self._seen_flows: dict[int, UserFlow] | None = None
+        self._is_leader: Callable[[], bool] = lambda: True
+
+    def attach(self) -> None:
+        """Подписывается на изменения и ставит таймеры для уже загруженного состояния."""
+        self._booking_repo.add_listener(self._on_booking)
+        self._flow_repo.add_listener(self._on_flow)
+        for booking in self._booking_repo.list_active():
+            self._arm_booking(booking)
+        for flow in self._flow_repo.list_all():
+            self._arm_flow(flow.user_id)
+        # state.json мог сохраниться между удалением заявки и чисткой её сообщений
+        for booking_id in self._ephemeral.snapshot():
+            if self._booking_repo.get(booking_id) is None:
+                self._wheel.schedule(0, functools.partial(self._clear_orphan, booking_id))
+        self._wheel.every(COMPACT_INTERVAL_S, self.compact)
+
+    def attach_shared(self, is_leader: Callable[[], bool]) -> None:
+        """Таймеры по обходу общего хранилища раз в SCAN_INTERVAL_S.
+
+        Обходит только лидер — иначе одну заявку отклоняли бы все реплики; реплика, переставшая
+        быть лидером, снимает свои таймеры на следующем обходе.
+        """
+        self._is_leader = is_leader
+        self._seen_flows = {}
+        self._wheel.every(SCAN_INTERVAL_S, self.scan)
+        self._wheel.every(COMPACT_INTERVAL_S, self.compact)
+
+    def scan(self) -> None:
+        if not self._is_leader():
+            self._disarm_all()
+            return
+        active = {b.id: b for b in self._booking_repo.list_active()}
+        flows = {f.user_id: f for f in self._flow_repo.list_all()}
+        with self._lock:
+            armed_bookings = set(self._bookings)
+            armed_flows = set(self._flows)
+            seen = self._seen_flows or {}
+            self._seen_flows = flows
+        for booking_id in armed_bookings - active.keys():
+            # Решение приняли (или заявку удалили) на любой реплике: сообщения могли остаться
+            self._disarm(self._bookings, booking_id)
+            self._wheel.schedule(ORPHAN_CHECK_S, functools.partial(self._clear_orphan, booking_id))
+        for booking_id, booking in active.items():
+            if booking_id not in armed_bookings:
+                self._arm_booking(booking)
+        for user_id in armed_flows - flows.keys():
+            self._disarm(self._flows, user_id)
+        for user_id, flow in flows.items():
+            # Изменённый с прошлого обхода сценарий живёт flow_ttl заново — как после save()
+            if user_id not in armed_flows or seen.get(user_id) != flow:
+                self._arm_flow(user_id)
+
+    def compact(self) -> None:
+        now = datetime.now(MSK)
+        pruned = self._service.occupancy.prune(now)
+        self._service.availability.roll(now.date())
+        if pruned:
+            logger.info("Из занятости удалено прошедших броней: %d", pruned)
+
+    # --- события репозиториев (вызываются под их блокировками: только постановка таймеров) ---
+
+    def _on_booking(self, op: str, payload: object) -> None:
+        if op == "booking.put":
+            assert isinstance(payload, Booking)
+            self._arm_booking(payload)
+        elif op == "booking.delete":
+            assert isinstance(payload, str)
+            self._disarm(self._bookings, payload)
+            self._wheel.schedule(ORPHAN_CHECK_S, functools.partial(self._clear_orphan, payload))
+
+    def _on_flow(self, op: str, payload: object) -> None:
+        if op == "flow.put":
+            assert isinstance(payload, UserFlow)
+            self._arm_flow(payload.user_id)
+        elif op == "flow.delete":
+            assert isinstance(payload, int)
+            self._disarm(self._flows, payload)
+
+    def _arm_booking(self, booking: Booking) -> None:
+        if booking.status in _TERMINAL:
+            self._disarm(self._bookings, booking.id)
+            return
+        self._schedule_booking(booking.id, (self._deadline(booking) - _now()).total_seconds())
+
+    def _schedule_booking(self, booking_id: str, delay: float) -> None:
+        timer = self._wheel.schedule(delay, functools.partial(self._expire_booking, booking_id))
+        with self._lock:
+            previous = self._bookings.get(booking_id)
+            self._bookings[booking_id] = timer
+        if previous is not None:
+            self._wheel.cancel(previous)
+
+    def _arm_flow(self, user_id: int) -> None:
+        timer = self._wheel.schedule(self._flow_ttl.total_seconds(), functools.partial(self._expire_flow, user_id))
+        with self._lock:
+            previous = self._flows.get(user_id)
+            self._flows[user_id] = timer
+        if previous is not None:
+            self._wheel.cancel(previous)
+
+    def _disarm_all(self) -> None:
+        with self._lock:
+            timers = [*self._bookings.values(), *self._flows.values()]
+            self._bookings.clear()
+            self._flows.clear()
+            if self._seen_flows is not None:
+                self._seen_flows = {}
+        for timer in timers:
+            self._wheel.cancel(timer)
+
+    def _disarm(self, timers: dict[_K, Timer], key: _K) -> None:
+        with self._lock:
+            timer = timers.pop(key, None)
+        if timer is not None:
+            self._wheel.cancel(timer)
+
+    def _deadline(self, booking: Booking) -> datetime:
+        return to_msk_naive(booking.date_time) + self._grace
+
+    # --- срабатывания (поток колеса) ---
+
+    def _expire_booking(self, booking_id: str) -> None:
+        try:
+            with self._service.locked(booking_id):
+                actions = self._reject_expired(booking_id)
+        except (BookingBusy, BookingConflict):
+            # Заявку как раз обрабатывает админ: его решение переставит или снимет таймер, иначе — повтор
+            self._schedule_booking(booking_id, BOOKING_LOCK_TIMEOUT_S)
+            return
+        except BookingNotFound:
+            return
+        # Уведомления — уже без блокировки заявки
+        self._perform(actions)
+
+    def _reject_expired(self, booking_id: str) -> list[Action]:
+        booking = self._booking_repo.get(booking_id)
+        if booking is None or booking.status in _TERMINAL:
+            return []
+        if self._deadline(booking) > _now():
+            self._arm_booking(booking)
+            return []
+        EXPIRED.inc("booking")
+        return self._service.expire(booking)
+
+    def _expire_flow(self, user_id: int) -> None:
+        with self._lock:
+            current = self._flows.get(user_id)
+            # Сценарий успели сохранить после срабатывания: таймер уже переставлен
+            if current is not None and current.pending:
+                return
+            self._flows.pop(user_id, None)
+            seen = self._seen_flows.get(user_id) if self._seen_flows is not None else None
+        if self._seen_flows is not None:
+            # Общее хранилище: после обхода сценарий могли продолжить на другой реплике
+            flow = self._flow_repo.get(user_id)
+            if flow is None:
+                return
+            if flow != seen:
+                with self._lock:
+                    self._seen_flows[user_id] = flow
+                self._arm_flow(user_id)
+                return
+        self._flow_repo.delete(user_id)
+        EXPIRED.inc("flow")
+        logger.info("Сценарий пользователя %s удалён после %s без активности", user_id, self._flow_ttl)
+
+    def _clear_orphan(self, booking_id: str) -> None:
+        if not self._ephemeral.has(booking_id) or self._booking_repo.get(booking_id) is not None:
+            return
+        self._perform([ClearEphemeral(booking_id)])
+        EXPIRED.inc("ephemeral")
+        logger.info("Удалены осиротевшие временные сообщения заявки %s", booking_id)
+
+
+def _now() -> datetime:
+    return datetime.now(MSK).replace(tzinfo=None)
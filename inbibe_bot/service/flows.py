@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from telebot.types import ReplyKeyboardRemove
+
+from inbibe_bot.client.callbacks import CallbackData
+from inbibe_bot.client.keyboard_cache import KeyboardCache
+from inbibe_bot.core.availability import AvailabilityGrid
+from inbibe_bot.core.booking import Source
+from inbibe_bot.core.errors import FlowValidationError
+from inbibe_bot.core.user_flow import FlowStep, UserFlow
+from inbibe_bot.service.actions import Action, Answer, Send
+from inbibe_bot.service.bookings import BookingService
+from inbibe_bot.storage.user_flow_repository import UserFlowRepository
+from inbibe_bot.storage.user_registry import register_tg_user
+
+logger = logging.getLogger(__name__)
+
+WELCOME_TEXT = (
+    "Добро пожаловать в бар *Инбайб*!\n"
+    "Мы работаем каждый день с *15:00 до 03:00*,\n"
+    "а по *пятницам и субботам* — до *05:00*.\n\n"
+    "Чтобы начать бронирование, нажмите кнопку «Начать бронирование».\n"
+    "Если хотите начать заново — введите /start."
+)
+
+
+@dataclass
+class FlowService:
+    """Сценарий бронирования в личном чате: шаг сценария → действия для транспорта."""
+
+    flow_repo: UserFlowRepository
+    keyboards: KeyboardCache
+    availability: AvailabilityGrid
+    bookings: BookingService
+
+    def start(self, chat_id: int) -> list[Action]:
+        register_tg_user(chat_id)
+        flow = self.flow_repo.get_or_create(chat_id)
+        flow.start()
+        self.flow_repo.save(flow)
+        logger.info("Пользователь %s запустил /start", chat_id)
+        return [Send(chat_id, WELCOME_TEXT, self.keyboards.main_menu(), parse_mode="Markdown")]
+
+    def contact(self, chat_id: int, phone: str) -> list[Action]:
+        flow = self.flow_repo.get(chat_id)
+        if not flow or flow.step != FlowStep.PHONE:
+            return []
+        logger.info("Пользователь %s поделился контактом", chat_id)
+        return self._submit_phone(flow, phone)
+
+    def pick_date(self, chat_id: int, data: str) -> list[Action]:
+        flow = self.flow_repo.get(chat_id)
+        if not flow or flow.step != FlowStep.DATE:
+            return [Answer("Выбор даты больше неактуален.")]
+        try:
+            selected_date = CallbackData.parse_date(data)
+        except ValueError:
+            return [Answer("Неверная дата.")]
+        flow.submit_date(selected_date)
+        self.flow_repo.save(flow)
+        return [
+            Answer("Дата выбрана."),
+            Send(
+                chat_id,
+                f"Выберите время бронирования на {selected_date.strftime('%d.%m')}:",
+                self.keyboards.times(selected_date, self.availability.full_slots(selected_date)),
+            ),
+        ]
+
+    def pick_time(self, chat_id: int, data: str) -> list[Action]:
+        flow = self.flow_repo.get(chat_id)
+        if not flow or flow.step != FlowStep.TIME:
+            return [Answer("Выбор времени больше неактуален.")]
+        try:
+            selected_dt = CallbackData.parse_time(data)
+        except ValueError:
+            return [Answer("Ошибка формата времени.")]
+        flow.submit_time(selected_dt)
+        self.flow_repo.save(flow)
+        return [
+            Answer("Время выбрано."),
+            Send(chat_id, f"Отлично! 📅\nВы выбрали {selected_dt:%d.%m в %H:%M}.\nТеперь введите количество гостей:"),
+        ]
+
+    def message(self, chat_id: int, text: str) -> list[Action]:
+        flow = self.flow_repo.get(chat_id)
+        if not flow or flow.step == FlowStep.IDLE:
+            return [Send(chat_id, "Пожалуйста, начните с команды /start")]
+
+        if flow.step == FlowStep.NAME:
+            flow.submit_name(text)
+            self.flow_repo.save(flow)
+            return [
+                Send(
+                    chat_id,
+                    "Введите, пожалуйста, Ваш телефон.\n"
+                    "Можно поделиться номером, нажав кнопку ниже, или ввести вручную.",
+                    self.keyboards.phone(),
+                )
+            ]
+
+        if flow.step == FlowStep.PHONE:
+            return self._submit_phone(flow, text)
+
+        if flow.step == FlowStep.GUESTS:
+            if not text.isdigit():
+                return [Send(chat_id, "Пожалуйста, введите количество гостей (числом).")]
+            booking = flow.submit_guests(int(text), Source.TG)
+            self.flow_repo.delete(chat_id)
+            logger.info("Создана бронь TG %s для пользователя %s", booking.id, chat_id)
+            return [
+                Send(chat_id, "Спасибо! Ваша заявка отправлена. Мы скоро с Вами свяжемся!"),
+                *self.bookings.submit(booking),
+            ]
+        return []
+
+    def _submit_phone(self, flow: UserFlow, phone: str) -> list[Action]:
+        chat_id = flow.user_id
+        try:
+            flow.submit_phone(phone)
+        except FlowValidationError as e:
+            return [Send(chat_id, str(e))]
+        self.flow_repo.save(flow)
+        return [
+            Send(chat_id, "Спасибо! Номер принят.", ReplyKeyboardRemove()),
+            Send(chat_id, "Выберите дату бронирования:", self.keyboards.dates()),
+        ]
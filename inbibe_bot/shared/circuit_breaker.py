@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from threading import Lock
+from typing import Callable
+
+from inbibe_bot.shared.metrics import CIRCUIT_REJECTED, CIRCUIT_TRANSITIONS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# Исходы последних вызовов, по которым считается доля ошибок
+WINDOW = 20
+
+BreakerListener = Callable[[str, str], None]
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён без обращения к зависимости: предохранитель разомкнут."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"{name}: предохранитель разомкнут")
+        self.name = name
+
+
+class CircuitBreaker:
+    """Предохранитель внешней зависимости по доле ошибок в окне последних вызовов.
+
+    closed — вызовы идут, исходы копятся в окне; когда ошибок не меньше failure_rate (после min_calls
+    вызовов), переходит в open. open — вызовы сразу получают CircuitOpenError, через open_s секунд
+    следующий вызов становится пробным (half_open): успех замыкает цепь, ошибка снова размыкает.
+    Каждый пропущенный allow() вызов должен закончиться record().
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5, open_s: float = 30.0) -> None:
+        self.name = name
+        self._failure_rate = failure_rate
+        self._min_calls = min_calls
+        self._open_s = open_s
+        self._state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=WINDOW)
+        self._opened_at = 0.0
+        self._probing = False
+        self._listeners: list[BreakerListener] = []
+        self._lock = Lock()
+
+    def configure(self, failure_rate: float, min_calls: int, open_s: float) -> None:
+        with self._lock:
+            self._failure_rate = failure_rate
+            self._min_calls = min_calls
+            self._open_s = open_s
+
+    def add_listener(self, fn: BreakerListener) -> None:
+        """fn(name, state) вызывается после каждой смены состояния, вне блокировки."""
+        self._listeners.append(fn)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_s:
+                changed = self._transition(HALF_OPEN)
+            elif self._state == HALF_OPEN and not self._probing:
+                changed = False
+            else:
+                CIRCUIT_REJECTED.inc(self.name)
+                return False
+            self._probing = True
+        if changed:
+            self._emit(HALF_OPEN)
+        return True
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if self._state == CLOSED:
+                self._outcomes.append(ok)
+                failures = self._outcomes.count(False)
+                tripped = (
+                    len(self._outcomes) >= self._min_calls
+                    and failures >= self._failure_rate * len(self._outcomes)
+                )
+                changed = tripped and self._transition(OPEN)
+            elif self._state == OPEN:
+                # Вызов, начатый до размыкания: пробой решает только вызов в half_open
+                return
+            else:
+                self._probing = False
+                changed = self._transition(CLOSED if ok else OPEN)
+            state = self._state
+        if changed:
+            self._emit(state)
+
+    def snapshot(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "window": len(self._outcomes),
+                "failures": self._outcomes.count(False),
+                "open_for_s": round(time.monotonic() - self._opened_at, 1) if self._state != CLOSED else 0.0,
+            }
+
+    def _transition(self, state: str) -> bool:
+        """Вызывается под блокировкой; False — состояние не изменилось."""
+        if state == self._state:
+            if state == OPEN:
+                self._opened_at = time.monotonic()
+            return False
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._outcomes.clear()
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+        return True
+
+    def _emit(self, state: str) -> None:
+        if state == OPEN:
+            logger.warning("%s: предохранитель разомкнут на %.0f с", self.name, self._open_s)
+        else:
+            logger.info("%s: предохранитель %s", self.name, "замкнут" if state == CLOSED else "пробует вызов")
+        for listener in self._listeners:
+            try:
+                listener(self.name, state)
+            except Exception:
+                logger.exception("Ошибка в обработчике смены состояния предохранителя %s", self.name)
+
+
+TELEGRAM_BREAKER = CircuitBreaker("telegram")
+VK_BREAKER = CircuitBreaker("vk")
+BREAKERS = (TELEGRAM_BREAKER, VK_BREAKER)
+
+
+def register_metrics() -> None:
+    REGISTRY.gauge_callback(
+        "inbibe_circuit_state", "Состояние предохранителей внешних зависимостей (1 — текущее)",
+        ("dependency", "state"),
+        lambda: {(b.name, s): float(b.state == s) for b in BREAKERS for s in STATES},
+    )
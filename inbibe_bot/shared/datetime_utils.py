@@ -21,6 +21,13 @@ def format_date_russian(dt: datetime) -> str:
     return f"{d.strftime('%d.%m')} ({weekday_ru})"
 
 
+def to_msk_naive(dt: datetime) -> datetime:
+    """Приводит время к наивному московскому (TG-брони хранятся наивными, VK-брони — с tz)."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(MSK).replace(tzinfo=None)
+
+
 def parse_admin_datetime(text: str | None) -> datetime | None:
     """Парсит дату/время в формате DD.MM.YY HH:MM, который вводит администратор вручную."""
     if text is None:
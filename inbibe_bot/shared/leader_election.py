@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from inbibe_bot.shared.metrics import REGISTRY
+from inbibe_bot.shared.resp import RespClient, RespError
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    """Выбор лидера среди реплик через аренду ключа: SET key id NX PX ttl и продление каждые ttl/3.
+
+    Продление и освобождение — через WATCH/MULTI, чтобы не тронуть чужую аренду.
+    Если продлить не удаётся (нет связи с хранилищем), лидерство снимается до истечения аренды,
+    так что две реплики одновременно лидерами себя не считают. Для этого таймаут client должен быть
+    меньше ttl/3: иначе зависшая команда продления переживёт аренду (см. bootstrap.build_elector).
+    """
+
+    def __init__(self, client: RespClient, key: str, identity: str, ttl_ms: int) -> None:
+        self._client = client
+        self._key = key
+        self._identity = identity
+        self._ttl_ms = ttl_ms
+        self._elected = threading.Event()
+        self._demoted = threading.Event()
+        self._demoted.set()
+        self._stop = threading.Event()
+        self._lease_deadline = 0.0
+        self._thread: threading.Thread | None = None
+
+    @property
+    def identity(self) -> str:
+        return self._identity
+
+    @property
+    def is_leader(self) -> bool:
+        return self._elected.is_set()
+
+    @property
+    def poll_timeout_s(self) -> int:
+        """Long poll getUpdates лидера: снятый лидер получает апдейты не дольше одного интервала продления."""
+        return max(1, self._ttl_ms // 3000)
+
+    def start(self) -> None:
+        REGISTRY.gauge_callback(
+            "inbibe_leader", "1 — эта реплика лидер (опрашивает Telegram)", (),
+            lambda: {(): 1.0 if self.is_leader else 0.0},
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True, name="leader-election")
+        self._thread.start()
+        logger.info("Выбор лидера запущен: реплика %s, аренда %d мс", self._identity, self._ttl_ms)
+
+    def stop(self) -> None:
+        """Останавливает продление и отдаёт аренду, чтобы другая реплика стала лидером сразу, а не через ttl."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.is_leader:
+            try:
+                self._compare_and(("DEL", self._key))
+            except (OSError, RespError):
+                logger.warning("Не удалось освободить аренду лидера, она истечёт сама")
+            self._set_leader(False)
+
+    def wait_elected(self, timeout: float | None = None) -> bool:
+        return self._elected.wait(timeout)
+
+    def wait_demoted(self, timeout: float | None = None) -> bool:
+        return self._demoted.wait(timeout)
+
+    def _run(self) -> None:
+        interval = self._ttl_ms / 3000
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                if self.is_leader:
+                    renewed = self._compare_and(("PEXPIRE", self._key, self._ttl_ms))
+                else:
+                    renewed = self._client.execute(
+                        "SET", self._key, self._identity, "NX", "PX", self._ttl_ms
+                    ) is not None
+                if renewed:
+                    self._lease_deadline = started + self._ttl_ms / 1000
+                self._set_leader(renewed)
+            except (OSError, RespError) as e:
+                logger.warning("Хранилище недоступно при продлении аренды лидера: %s", e)
+                # Аренда ещё может быть нашей, но продлить её нельзя — уступаем заранее: следующая
+                # попытка может упасть только через interval + таймаут команды
+                if self.is_leader and time.monotonic() + interval + self._client.timeout >= self._lease_deadline:
+                    self._set_leader(False)
+            self._stop.wait(interval)
+
+    def _compare_and(self, command: tuple[str | int, ...]) -> bool:
+        """Выполняет command над ключом, только если аренда всё ещё наша."""
+        with self._client.connection("leader") as conn:
+            conn.execute("WATCH", self._key)
+            if conn.execute("GET", self._key) != self._identity:
+                conn.execute("UNWATCH")
+                return False
+            replies = conn.pipeline([("MULTI",), command, ("EXEC",)])
+        return replies[-1] is not None and not isinstance(replies[-1], RespError)
+
+    def _set_leader(self, leader: bool) -> None:
+        if leader == self.is_leader:
+            return
+        if leader:
+            self._demoted.clear()
+            self._elected.set()
+            logger.info("Реплика %s стала лидером", self._identity)
+        else:
+            self._elected.clear()
+            self._demoted.set()
+            logger.warning("Реплика %s больше не лидер", self._identity)
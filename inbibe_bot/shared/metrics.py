@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Generic, Iterable, Mapping, TypeVar
+
+Labels = tuple[str, ...]
+Sample = tuple[str, Labels, float]
+_V = TypeVar("_V")
+
+# Секунды: от быстрых колбэков до ответа Telegram через прокси
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+BYTES_BUCKETS: tuple[float, ...] = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+
+class _PerThread(Generic[_V]):
+    """Значения метрики по потокам: запись — в словарь своего потока без блокировок, сумма — при чтении.
+
+    Шарды завершившихся потоков (werkzeug создаёт поток на запрос) сворачиваются в общий итог при сборе.
+    """
+
+    def __init__(self, merge: Callable[[_V, _V], _V]) -> None:
+        self._merge = merge
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict[Labels, _V]]] = []
+        self._retired: dict[Labels, _V] = {}
+        self._lock = threading.Lock()
+
+    def shard(self) -> dict[Labels, _V]:
+        try:
+            values: dict[Labels, _V] = self._local.values
+        except AttributeError:
+            values = {}
+            self._local.values = values
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def collect(self) -> dict[Labels, _V]:
+        with self._lock:
+            total = dict(self._retired)
+            alive = []
+            for thread, values in self._shards:
+                # copy() словаря атомарна под GIL — владелец потока может писать параллельно
+                snapshot = values.copy()
+                for labels, value in snapshot.items():
+                    total[labels] = self._merge(total[labels], value) if labels in total else value
+                    if not thread.is_alive():
+                        prev = self._retired.get(labels)
+                        self._retired[labels] = self._merge(prev, value) if prev is not None else value
+                if thread.is_alive():
+                    alive.append((thread, values))
+            self._shards = alive
+        return total
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: _PerThread[float] = _PerThread(lambda a, b: a + b)
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        values = self._values.shard()
+        values[labels] = values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in sorted(self._values.collect().items()):
+            yield self.name + "_total", labels, value
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами; в ячейке — счётчики по корзинам и сумма в последнем элементе."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Labels = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: _PerThread[list[float]] = _PerThread(lambda a, b: [x + y for x, y in zip(a, b)])
+
+    def observe(self, value: float, *labels: str) -> None:
+        values = self._values.shard()
+        cell = values.get(labels)
+        if cell is None:
+            cell = values[labels] = [0.0] * (len(self.buckets) + 2)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def observe_ns(self, elapsed_ns: int, *labels: str) -> None:
+        self.observe(elapsed_ns / 1e9, *labels)
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, cell in sorted(self._values.collect().items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, cell):
+                cumulative += count
+                yield self.name + "_bucket", labels + (_format(bound),), cumulative
+            cumulative += cell[len(self.buckets)]
+            yield self.name + "_bucket", labels + ("+Inf",), cumulative
+            yield self.name + "_sum", labels, cell[-1]
+            yield self.name + "_count", labels, cumulative
+
+
+class Gauge:
+    """Последнее записанное значение (присваивание атомарно под GIL)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames: Labels = ()
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def samples(self) -> Iterable[Sample]:
+        yield self.name, (), self._value
+
+
+class GaugeCallback:
+    """Значения считаются при сборе: размеры репозиториев, глубина очередей и т.п."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Labels, fn: Callable[[], Mapping[Labels, float]]) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.fn = fn
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in sorted(self.fn().items()):
+            yield self.name, labels, value
+
+
+Metric = Counter | Histogram | Gauge | GaugeCallback
+_M = TypeVar("_M", Counter, Histogram, Gauge, GaugeCallback)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Labels = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Labels = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._register(Gauge(name, help))
+
+    def gauge_callback(
+        self, name: str, help: str, labelnames: Labels, fn: Callable[[], Mapping[Labels, float]]
+    ) -> None:
+        """Регистрирует (или заменяет — при повторной сборке зависимостей) вычисляемый gauge."""
+        with self._lock:
+            self._metrics[name] = GaugeCallback(name, help, labelnames, fn)
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus 0.0.4."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            names = metric.labelnames + (("le",) if isinstance(metric, Histogram) else ())
+            for sample_name, labels, value in metric.samples():
+                if labels:
+                    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(names, labels))
+                    lines.append(f"{sample_name}{{{pairs}}} {_format(value)}")
+                else:
+                    lines.append(f"{sample_name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _M) -> _M:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Метрика {metric.name} уже зарегистрирована с другим типом")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if value == int(value) and abs(value) < 1e15 else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "inbibe_handler_seconds", "Время обработки апдейта по хэндлерам", ("handler",)
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "inbibe_handler_errors", "Исключения в хэндлерах", ("handler",)
+)
+TELEGRAM_SECONDS = REGISTRY.histogram(
+    "inbibe_telegram_request_seconds", "Длительность запросов к Bot API", ("method",)
+)
+TELEGRAM_REQUESTS = REGISTRY.counter(
+    "inbibe_telegram_requests", "Запросы к Bot API по коду ответа", ("method", "code")
+)
+TELEGRAM_TIMEOUTS = REGISTRY.counter(
+    "inbibe_telegram_timeouts", "Таймауты соединения или чтения при запросах к Bot API", ("method",)
+)
+VK_SECONDS = REGISTRY.histogram("inbibe_vk_request_seconds", "Длительность запросов к VK API")
+VK_REQUESTS = REGISTRY.counter("inbibe_vk_requests", "Запросы к VK API по коду ответа", ("code",))
+STATE_SAVE_SECONDS = REGISTRY.histogram("inbibe_state_save_seconds", "Длительность StatePersister.save")
+STATE_SAVE_BYTES = REGISTRY.histogram(
+    "inbibe_state_save_bytes", "Размер state.json при сохранении", buckets=BYTES_BUCKETS
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "inbibe_http_request_seconds", "Длительность HTTP-запросов по маршрутам", ("route", "method")
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "inbibe_http_requests", "HTTP-запросы по маршрутам и статусам", ("route", "method", "status")
+)
+STATE_BACKEND_SECONDS = REGISTRY.histogram(
+    "inbibe_state_backend_seconds", "Длительность команд к общему хранилищу состояния", ("command",)
+)
+STATE_BACKEND_ERRORS = REGISTRY.counter(
+    "inbibe_state_backend_errors", "Ошибки соединения с общим хранилищем состояния", ("command",)
+)
+UPDATES_FILTERED = REGISTRY.counter(
+    "inbibe_updates_filtered", "Апдейты Telegram по решению предфильтра (accepted или причина пропуска)", ("result",)
+)
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "inbibe_update_wait_seconds", "Ожидание апдейта в очереди планировщика по классам", ("priority",)
+)
+SCHEDULER_SHED = REGISTRY.counter(
+    "inbibe_updates_shed", "Апдейты, отброшенные планировщиком при переполнении очереди класса", ("priority",)
+)
+EXPIRED = REGISTRY.counter(
+    "inbibe_expired", "Истечения по таймерам: заявки, сценарии, осиротевшие временные сообщения", ("kind",)
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    "inbibe_circuit_rejected", "Вызовы, отклонённые разомкнутым предохранителем", ("dependency",)
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "inbibe_circuit_transitions", "Смены состояния предохранителей", ("dependency", "state")
+)
+BOOKING_CONFLICTS = REGISTRY.counter(
+    "inbibe_booking_conflicts", "Отклонённые параллельные действия над заявкой: busy, stale", ("kind",)
+)
+DEFERRED_CALLS = REGISTRY.counter(
+    "inbibe_deferred_calls", "Отложенные вызовы: deferred, done, failed, dropped", ("dependency", "result")
+)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import linecache
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 64
+
+
+class SamplingProfiler:
+    """Сэмплирующий CPU-профайлер живого процесса.
+
+    Фоновый поток раз в interval снимает стеки всех потоков через sys._current_frames()
+    и копит их в формате collapsed stacks (flamegraph.pl, speedscope, inferno).
+    Интерпретатор не трассируется, поэтому накладные расходы — один обход стеков на тик.
+    """
+
+    def __init__(self) -> None:
+        self._stacks: Counter[str] = Counter()
+        self._labels: dict[CodeType, str] = {}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._started_at = 0.0
+        self._interval = 0.01
+        self._samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_ms": round(self._interval * 1000, 3),
+            "samples": self._samples,
+            "elapsed_s": round(time.monotonic() - self._started_at, 1) if self._started_at else 0.0,
+        }
+
+    def start(self, interval: float, max_duration: float) -> bool:
+        """Запускает сэмплирование; False — профайлер уже работает."""
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self._samples = 0
+            self._interval = interval
+            self._started_at = time.monotonic()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(max_duration,), daemon=True, name="cpu-profiler"
+            )
+            self._thread.start()
+        logger.info("CPU-профайлер запущен: интервал %.1f мс, не дольше %.0f с", interval * 1000, max_duration)
+        return True
+
+    def stop(self) -> str:
+        """Останавливает сэмплирование и возвращает collapsed stacks: «поток;функция;... число»."""
+        with self._lock:
+            thread = self._thread
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+        logger.info("CPU-профайлер остановлен: %d сэмплов", self._samples)
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def _run(self, max_duration: float) -> None:
+        me = threading.get_ident()
+        deadline = time.monotonic() + max_duration
+        names: dict[int | None, str] = {}
+        while not self._stop.wait(self._interval):
+            if time.monotonic() > deadline:
+                logger.warning("CPU-профайлер остановлен по таймауту %.0f с", max_duration)
+                break
+            frames = sys._current_frames()
+            if not names.keys() >= frames.keys():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                self._stacks[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self._samples += 1
+
+    def _collapse(self, thread_name: str, frame: FrameType | None) -> str:
+        parts: list[str] = []
+        while frame is not None and len(parts) < MAX_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                module = frame.f_globals.get("__name__", "?")
+                label = self._labels[code] = f"{module}:{code.co_name}"
+            parts.append(label)
+            frame = frame.f_back
+        parts.append(thread_name)
+        parts.reverse()
+        return ";".join(parts)
+
+
+class MemoryProfiler:
+    """Снимки tracemalloc и разница с базовым снимком: какие места аллокаций выросли."""
+
+    def __init__(self, nframes: int = 10) -> None:
+        self._nframes = nframes
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Включает tracemalloc (если выключен) и запоминает базовый снимок."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self._nframes)
+                logger.info("tracemalloc включён (%d кадров)", self._nframes)
+            self._baseline = _take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        return {"traced_bytes": current, "peak_bytes": peak}
+
+    def diff(self, limit: int, group_by: str = "lineno") -> dict[str, Any] | None:
+        """Топ мест по приросту памяти с момента базового снимка; None — снимка ещё нет."""
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                return None
+            current = _take_snapshot()
+            stats = current.compare_to(self._baseline, group_by)
+        top = [s for s in stats if s.size_diff > 0][:limit]
+        return {
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "top": [
+                {
+                    "size_diff": s.size_diff,
+                    "count_diff": s.count_diff,
+                    "size": s.size,
+                    "traceback": [_frame_line(f) for f in s.traceback],
+                }
+                for s in top
+            ],
+        }
+
+    def stop(self) -> None:
+        with self._lock:
+            self._baseline = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("tracemalloc выключен")
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def _frame_line(frame: tracemalloc.Frame) -> str:
+    source = linecache.getline(frame.filename, frame.lineno).strip()
+    return f"{frame.filename}:{frame.lineno} {source}".rstrip()
@@ -0,0 +1,194 @@
+"""Минимальный синхронный клиент протокола Redis (RESP2) без внешних зависимостей."""
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Sequence
+from urllib.parse import urlsplit
+
+from inbibe_bot.shared.metrics import STATE_BACKEND_ERRORS, STATE_BACKEND_SECONDS
+from inbibe_bot.shared.tracing import span
+
+Command = Sequence[str | int | bytes]
+
+
+class RespError(Exception):
+    """Ответ сервера с ошибкой (-ERR ...). Соединение при этом остаётся рабочим."""
+
+
+class RespConnection:
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def execute(self, *args: str | int | bytes) -> Any:
+        self._sock.sendall(_encode(args))
+        return self._read(raise_errors=True)
+
+    def pipeline(self, commands: Sequence[Command]) -> list[Any]:
+        """Отправляет команды одним пакетом; ошибки отдельных команд возвращаются как RespError в списке."""
+        self._sock.sendall(b"".join(_encode(c) for c in commands))
+        return [self._read(raise_errors=False) for _ in commands]
+
+    def close(self) -> None:
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+    def _read(self, raise_errors: bool) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Соединение с хранилищем закрыто")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            error = RespError(body.decode("utf-8"))
+            if raise_errors:
+                raise error
+            return error
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            if size < 0:
+                return None
+            data = self._reader.read(size + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            count = int(body)
+            if count < 0:
+                return None
+            return [self._read(raise_errors=False) for _ in range(count)]
+        raise ConnectionError(f"Неизвестный тип ответа RESP: {line!r}")
+
+
+class RespClient:
+    """Пул соединений к Redis-совместимому серверу.
+
+    Соединение берётся на время одной команды или транзакции; после сетевой ошибки оно закрывается,
+    а не возвращается в пул. Повторов нет — ошибку видит вызывающий код.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 6379,
+        *,
+        db: int = 0,
+        password: str | None = None,
+        timeout: float = 5.0,
+        max_idle: int = 8,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._db = db
+        self._password = password
+        self._timeout = timeout
+        self._max_idle = max_idle
+        self._idle: list[RespConnection] = []
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self) -> float:
+        """Таймаут соединения и каждой команды, с."""
+        return self._timeout
+
+    @classmethod
+    def from_url(cls, url: str, *, timeout: float = 5.0) -> "RespClient":
+        """redis://[:password@]host[:port][/db]"""
+        parts = urlsplit(url)
+        if parts.scheme != "redis" or not parts.hostname:
+            raise ValueError(f"Ожидается адрес вида redis://host:port/db, получено {url!r}")
+        db = int(parts.path.lstrip("/") or 0)
+        return cls(parts.hostname, parts.port or 6379, db=db, password=parts.password, timeout=timeout)
+
+    def execute(self, *args: str | int | bytes) -> Any:
+        with self.connection(str(args[0]).lower()) as conn:
+            return conn.execute(*args)
+
+    def transaction(self, *commands: Command) -> list[Any]:
+        """MULTI/EXEC: команды выполняются атомарно, возвращаются их результаты."""
+        with self.connection("multi") as conn:
+            replies = conn.pipeline([("MULTI",), *commands, ("EXEC",)])
+        result = replies[-1]
+        if isinstance(result, RespError):
+            raise result
+        for reply in replies[:-1]:
+            if isinstance(reply, RespError):
+                raise reply
+        assert isinstance(result, list)
+        return result
+
+    @contextmanager
+    def connection(self, command: str = "connection") -> Iterator[RespConnection]:
+        started = time.perf_counter_ns()
+        try:
+            conn = self._acquire()
+        except OSError:
+            STATE_BACKEND_ERRORS.inc(command)
+            raise
+        try:
+            with span(f"redis.{command}"):
+                yield conn
+        except RespError:
+            self._release(conn)
+            raise
+        except OSError:
+            conn.close()
+            STATE_BACKEND_ERRORS.inc(command)
+            raise
+        except BaseException:
+            # Ответ мог остаться непрочитанным — такое соединение в пул не возвращаем
+            conn.close()
+            raise
+        else:
+            self._release(conn)
+        finally:
+            STATE_BACKEND_SECONDS.observe_ns(time.perf_counter_ns() - started, command)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _acquire(self) -> RespConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        conn = RespConnection(self._host, self._port, self._timeout)
+        try:
+            if self._password:
+                conn.execute("AUTH", self._password)
+            if self._db:
+                conn.execute("SELECT", self._db)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _release(self, conn: RespConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+def _encode(args: Command) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, int):
+            data = str(arg).encode()
+        else:
+            data = arg.encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable
+
+import requests  # type: ignore[import-untyped]
+
+from inbibe_bot.shared.circuit_breaker import CLOSED, CircuitBreaker, CircuitOpenError
+from inbibe_bot.shared.metrics import DEFERRED_CALLS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RETRY_INTERVAL_S = 5.0
+MAX_ATTEMPTS = 5
+# Ошибки, после которых вызов повторяется: зависимость недоступна, а не отклонила сам запрос
+NETWORK_ERRORS: tuple[type[Exception], ...] = (requests.RequestException,)
+
+
+@dataclass
+class _Deferred:
+    breaker: CircuitBreaker
+    description: str
+    fn: Callable[[], object]
+    attempts: int = 0
+
+
+class RetryQueue:
+    """Вызовы, отклонённые разомкнутым предохранителем: уведомления гостям, правки карточек, удаления сообщений.
+
+    Повторяются в своём потоке раз в RETRY_INTERVAL_S и сразу после замыкания предохранителя, в порядке
+    постановки. Первый вызов после паузы предохранителя и есть пробный: пока зависимость недоступна,
+    очередь по ней не трогается. Сетевые ошибки (retryable: requests у синхронного рантайма, aiohttp у
+    asyncio) повторяются до MAX_ATTEMPTS раз, ответы-ошибки API — нет. При переполнении вытесняются
+    самые старые вызовы.
+    """
+
+    def __init__(
+        self, limit: int, retryable: tuple[type[Exception], ...] = NETWORK_ERRORS
+    ) -> None:
+        self._limit = limit
+        self._retryable = retryable
+        self._items: deque[_Deferred] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def defer(self, breaker: CircuitBreaker, description: str, fn: Callable[[], object]) -> None:
+        with self._lock:
+            self._items.append(_Deferred(breaker, description, fn))
+            dropped = self._items.popleft() if len(self._items) > self._limit else None
+        DEFERRED_CALLS.inc(breaker.name, "deferred")
+        logger.info("%s недоступен, отложено: %s", breaker.name, description)
+        if dropped is not None:
+            DEFERRED_CALLS.inc(dropped.breaker.name, "dropped")
+            logger.warning("Очередь повторов переполнена, отброшено: %s", dropped.description)
+
+    def size(self) -> int:
+        return len(self._items)
+
+    def by_dependency(self) -> dict[str, int]:
+        with self._lock:
+            return dict(Counter(item.breaker.name for item in self._items))
+
+    def on_breaker_change(self, name: str, state: str) -> None:
+        if state == CLOSED:
+            self._wake.set()
+
+    def start(self) -> None:
+        REGISTRY.gauge_callback(
+            "inbibe_deferred_calls_pending", "Отложенные вызовы внешних зависимостей в очереди повторов",
+            ("dependency",), lambda: {(name,): n for name, n in self.by_dependency().items()},
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True, name="retry-queue")
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def flush(self) -> int:
+        """Повторяет отложенное по доступным зависимостям; возвращает число выполненных вызовов."""
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+        done = 0
+        keep: list[_Deferred] = []
+        blocked: set[str] = set()
+        for item in items:
+            if item.breaker.name in blocked or self._stop.is_set():
+                keep.append(item)
+                continue
+            try:
+                item.fn()
+                done += 1
+                DEFERRED_CALLS.inc(item.breaker.name, "done")
+            except CircuitOpenError:
+                blocked.add(item.breaker.name)
+                keep.append(item)
+            except self._retryable as exc:
+                blocked.add(item.breaker.name)
+                item.attempts += 1
+                if item.attempts < MAX_ATTEMPTS:
+                    keep.append(item)
+                else:
+                    DEFERRED_CALLS.inc(item.breaker.name, "failed")
+                    logger.error(
+                        "Отложенный вызов не выполнен после %d попыток: %s (%s)", item.attempts, item.description, exc
+                    )
+            except Exception as exc:
+                DEFERRED_CALLS.inc(item.breaker.name, "failed")
+                logger.error("Отложенный вызов завершился ошибкой: %s (%s)", item.description, exc)
+        with self._lock:
+            # Отложенное за время прохода — после оставшихся, чтобы сохранить порядок
+            self._items.extendleft(reversed(keep))
+        if done:
+            logger.info("Выполнено отложенных вызовов: %d, в очереди: %d", done, self.size())
+        return done
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(RETRY_INTERVAL_S)
+            self._wake.clear()
+            if self._items and not self._stop.is_set():
+                self.flush()
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from threading import RLock
+from typing import Hashable
+
+from inbibe_bot.shared.tracing import span
+
+
+class StripedLock:
+    """Блокировки по ключу из фиксированного набора полос: память не растёт с числом ключей.
+
+    Ключ попадает в полосу hash(key) % stripes, так что один ключ всегда сериализован, а разные ключи
+    одной полосы изредка ждут друг друга. Полосы — RLock: повторный захват тем же потоком не блокирует.
+    """
+
+    def __init__(self, stripes: int, name: str) -> None:
+        if stripes < 1:
+            raise ValueError("Нужна хотя бы одна полоса")
+        self._stripes = [RLock() for _ in range(stripes)]
+        self._name = name
+
+    def acquire(self, key: Hashable, timeout: float) -> bool:
+        """Ожидание занятой полосы попадает в трейс; False — не дождались за timeout секунд."""
+        lock = self._stripe(key)
+        if lock.acquire(blocking=False):
+            return True
+        with span(self._name):
+            return lock.acquire(timeout=timeout)
+
+    def release(self, key: Hashable) -> None:
+        self._stripe(key).release()
+
+    def _stripe(self, key: Hashable) -> RLock:
+        return self._stripes[hash(key) % len(self._stripes)]
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import time
+from threading import Lock
+from typing import Any, Callable
+
+import requests  # type: ignore[import-untyped]
+import telebot.apihelper as apihelper
+from requests.adapters import HTTPAdapter  # type: ignore[import-untyped]
+
+from inbibe_bot.shared.circuit_breaker import CircuitBreaker
+from inbibe_bot.shared.metrics import REGISTRY, TELEGRAM_REQUESTS, TELEGRAM_SECONDS, TELEGRAM_TIMEOUTS
+from inbibe_bot.shared.tracing import span
+
+RequestSender = Callable[..., Any]
+
+LONG_POLL_METHOD = "getUpdates"
+# (connect, read) по методам Bot API; остальные — таймауты по умолчанию из конфигурации
+METHOD_TIMEOUTS: dict[str, tuple[float, float]] = {
+    # Ответ на нажатие кнопки Telegram принимает ~15 с, дальше повторять бессмысленно
+    "answerCallbackQuery": (3.0, 5.0),
+    "sendChatAction": (3.0, 5.0),
+    "deleteMessage": (3.0, 10.0),
+    "sendPhoto": (5.0, 60.0),
+    "sendDocument": (5.0, 60.0),
+}
+# long polling держит соединение до timeout getUpdates; второе — на время перезапуска polling
+LONG_POLL_CONNECTIONS = 2
+
+
+def default_sender(
+    method: str,
+    url: str,
+    params: dict[str, Any] | None = None,
+    files: Any = None,
+    timeout: Any = None,
+    proxies: Any = None,
+) -> Any:
+    """То же, что делает apihelper без CUSTOM_REQUEST_SENDER."""
+    return apihelper._get_req_session().request(
+        method, url, params=params, files=files, timeout=timeout, proxies=proxies
+    )
+
+
+class TelegramTransport:
+    """Общий пул keep-alive соединений к Bot API для всех потоков.
+
+    Без него apihelper заводит requests.Session на каждый поток и пересоздаёт её раз в 10 минут, а werkzeug
+    запускает поток на каждый HTTP-запрос: вызовы из API бронирований почти всегда открывали новое
+    TLS-соединение (через прокси — ещё и CONNECT). Long polling getUpdates живёт в отдельном пуле и не
+    занимает соединения обработчиков и не проходит через предохранитель: у polling свои повторы. Если пул мал, urllib3 открывает лишнее соединение и закрывает его
+    после ответа с предупреждением в логе — это сигнал увеличить TG_POOL_SIZE.
+    """
+
+    def __init__(
+        self, pool_size: int, connect_timeout: float, read_timeout: float, breaker: CircuitBreaker | None = None
+    ) -> None:
+        self._default_timeout = (connect_timeout, read_timeout)
+        self._breaker = breaker
+        self._sessions = {"api": _pooled_session(pool_size), "poll": _pooled_session(LONG_POLL_CONNECTIONS)}
+        self._in_flight = dict.fromkeys(self._sessions, 0)
+        self._lock = Lock()
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        files: Any = None,
+        timeout: Any = None,
+        proxies: Any = None,
+    ) -> Any:
+        name = url.rsplit("/", 1)[-1]
+        pool = "poll" if name == LONG_POLL_METHOD else "api"
+        breaker = self._breaker if pool == "api" else None
+        if breaker is not None:
+            breaker.check()
+        ok = False
+        with self._lock:
+            self._in_flight[pool] += 1
+        try:
+            result = self._sessions[pool].request(
+                method, url, params=params, files=files, timeout=self._timeout(name, timeout), proxies=proxies
+            )
+            # 4xx — ответ Bot API на сам запрос; 5xx приходят от прокси или перегруженного Telegram
+            ok = result.status_code < 500
+            return result
+        except requests.Timeout:
+            TELEGRAM_TIMEOUTS.inc(name)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight[pool] -= 1
+            if breaker is not None:
+                breaker.record(ok)
+
+    def register_metrics(self) -> None:
+        REGISTRY.gauge_callback(
+            "inbibe_telegram_connections",
+            "Соединения к Bot API по пулам: opened — открыто за всё время, idle — ждут запроса, in_flight — заняты",
+            ("pool", "state"),
+            self._connection_stats,
+        )
+
+    def close(self) -> None:
+        for session in self._sessions.values():
+            session.close()
+
+    def _timeout(self, name: str, passed: Any) -> Any:
+        # Без явного timeout в вызове telebot передаёт (CONNECT_TIMEOUT, READ_TIMEOUT); для getUpdates read
+        # уже вычислен из long_polling_timeout
+        if name == LONG_POLL_METHOD or passed not in (None, (apihelper.CONNECT_TIMEOUT, apihelper.READ_TIMEOUT)):
+            return passed
+        return METHOD_TIMEOUTS.get(name, self._default_timeout)
+
+    def _connection_stats(self) -> dict[tuple[str, ...], float]:
+        stats: dict[tuple[str, ...], float] = {}
+        for pool, session in self._sessions.items():
+            opened, idle = _pool_usage(session)
+            stats[(pool, "opened")] = opened
+            stats[(pool, "idle")] = idle
+            with self._lock:
+                stats[(pool, "in_flight")] = self._in_flight[pool]
+        return stats
+
+
+class MeteredSender:
+    """Обёртка транспорта telebot: длительность и коды ответов Bot API по методам."""
+
+    def __init__(self, inner: RequestSender) -> None:
+        self.inner = inner
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        files: Any = None,
+        timeout: Any = None,
+        proxies: Any = None,
+    ) -> Any:
+        name = url.rsplit("/", 1)[-1]
+        started = time.perf_counter_ns()
+        code = "error"
+        try:
+            with span(f"telegram.{name}"):
+                result = self.inner(method, url, params=params, files=files, timeout=timeout, proxies=proxies)
+            # Bot API дублирует error_code в HTTP-статусе (400, 403, 429...)
+            code = str(getattr(result, "status_code", "error"))
+            return result
+        finally:
+            TELEGRAM_SECONDS.observe_ns(time.perf_counter_ns() - started, name)
+            TELEGRAM_REQUESTS.inc(name, code)
+
+
+def install_metrics() -> None:
+    """Встраивает MeteredSender в apihelper поверх текущего транспорта (повторный вызов ничего не делает)."""
+    current = apihelper.CUSTOM_REQUEST_SENDER
+    if isinstance(current, MeteredSender):
+        return
+    apihelper.CUSTOM_REQUEST_SENDER = MeteredSender(current or default_sender)  # type: ignore[assignment]
+
+
+def install_transport(transport: RequestSender) -> None:
+    """Ставит транспорт в apihelper; встроенный ранее MeteredSender остаётся снаружи."""
+    current = apihelper.CUSTOM_REQUEST_SENDER
+    if isinstance(current, MeteredSender):
+        current.inner = transport
+    else:
+        apihelper.CUSTOM_REQUEST_SENDER = transport  # type: ignore[assignment]
+
+
+def _pooled_session(size: int) -> requests.Session:
+    session = requests.Session()
+    # Повторы — забота telebot и вызывающего кода: скрытый повтор удвоил бы sendMessage
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _pool_usage(session: requests.Session) -> tuple[int, int]:
+    """Открытые за всё время и простаивающие соединения по всем хостам (включая пулы через прокси)."""
+    adapter = session.get_adapter("https://")
+    assert isinstance(adapter, HTTPAdapter)
+    opened = idle = 0
+    for manager in (adapter.poolmanager, *adapter.proxy_manager.values()):
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            if pool.pool is not None:
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+    return opened, idle
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable
+
+from inbibe_bot.shared.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+LEVELS = 4
+# Дальше горизонта (64^4 тиков, ~194 дня при тике в секунду) таймер лежит в последнем слоте и перекладывается
+_HORIZON = SLOTS ** LEVELS - 1
+
+
+class Timer:
+    """Запланированный вызов; снимается через TimerWheel.cancel из любого потока."""
+
+    __slots__ = ("deadline", "fn", "interval", "_slot")
+
+    def __init__(self, deadline: int, fn: Callable[[], object], interval: int | None) -> None:
+        self.deadline = deadline
+        self.fn = fn
+        self.interval = interval
+        self._slot: set[Timer] | None = None
+
+    @property
+    def pending(self) -> bool:
+        return self._slot is not None
+
+
+class TimerWheel:
+    """Иерархическое колесо таймеров: один поток на все истечения и фоновые проходы.
+
+    Четыре уровня по 64 слота; постановка и отмена — O(1), на тике обрабатывается один слот,
+    а таймеры верхних уровней перекладываются вниз, когда до них доходит очередь.
+    Колбэки выполняются в потоке колеса и должны быть короткими.
+    """
+
+    def __init__(self, tick_s: float = 1.0) -> None:
+        self._tick_s = tick_s
+        self._wheels: list[list[set[Timer]]] = [[set() for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._tick = 0
+        self._origin = time.monotonic()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def schedule(self, delay_s: float, fn: Callable[[], object]) -> Timer:
+        """Вызов fn через delay_s секунд (с точностью до тика)."""
+        with self._lock:
+            timer = Timer(self._deadline(delay_s), fn, None)
+            self._insert(timer)
+        return timer
+
+    def every(self, interval_s: float, fn: Callable[[], object]) -> Timer:
+        """Периодический вызов; первый — через interval_s."""
+        interval = max(1, round(interval_s / self._tick_s))
+        with self._lock:
+            timer = Timer(self._now_tick() + interval, fn, interval)
+            self._insert(timer)
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        with self._lock:
+            if timer._slot is not None:
+                timer._slot.discard(timer)
+                timer._slot = None
+                self._size -= 1
+
+    def size(self) -> int:
+        return self._size
+
+    def start(self) -> None:
+        REGISTRY.gauge_callback(
+            "inbibe_timers", "Таймеры в колесе (истечения заявок, сценариев, фоновые проходы)", (),
+            lambda: {(): self.size()},
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True, name="timer-wheel")
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def advance(self, ticks: int) -> int:
+        """Прокручивает колесо на ticks тиков и выполняет наступившие таймеры; возвращает их число."""
+        fired = 0
+        for _ in range(ticks):
+            with self._lock:
+                due = self._step()
+            for timer in due:
+                fired += 1
+                try:
+                    timer.fn()
+                except Exception:
+                    logger.exception("Ошибка в таймере %s", getattr(timer.fn, "__name__", timer.fn))
+        return fired
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._tick_s - (time.monotonic() - self._origin) % self._tick_s):
+            # После паузы процесса (GC, сон ноутбука) колесо догоняет все пропущенные тики
+            self.advance(self._now_tick() - self._tick)
+
+    def _now_tick(self) -> int:
+        return int((time.monotonic() - self._origin) / self._tick_s)
+
+    def _deadline(self, delay_s: float) -> int:
+        return max(self._tick + 1, self._now_tick() + max(1, round(delay_s / self._tick_s)))
+
+    def _insert(self, timer: Timer) -> None:
+        deadline = min(timer.deadline, self._tick + _HORIZON)
+        delta = max(deadline - self._tick, 1)
+        level = 0
+        while delta >= SLOTS << (SLOT_BITS * level) and level < LEVELS - 1:
+            level += 1
+        slot = self._wheels[level][(deadline >> (SLOT_BITS * level)) & (SLOTS - 1)]
+        slot.add(timer)
+        timer._slot = slot
+        self._size += 1
+
+    def _step(self) -> list[Timer]:
+        self._tick += 1
+        tick = self._tick
+        # Сверху вниз: таймеры уровня, чей слот стал текущим, перекладываются ближе к нулевому
+        for level in range(LEVELS - 1, 0, -1):
+            if tick & ((1 << (SLOT_BITS * level)) - 1) == 0:
+                slot = self._wheels[level][(tick >> (SLOT_BITS * level)) & (SLOTS - 1)]
+                pending = list(slot)
+                slot.clear()
+                self._size -= len(pending)
+                for timer in pending:
+                    self._insert(timer)
+        slot = self._wheels[0][tick & (SLOTS - 1)]
+        due = [t for t in slot if t.deadline <= tick]
+        for timer in due:
+            slot.discard(timer)
+            timer._slot = None
+            self._size -= 1
+            if timer.interval is not None:
+                timer.deadline = tick + timer.interval
+                self._insert(timer)
+        return due
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import telebot
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("inbibe_span", default=None)
+_instrumented: weakref.WeakSet[telebot.TeleBot] = weakref.WeakSet()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent", "name", "attrs", "start_ns", "end_ns", "error")
+
+    def __init__(self, trace: Trace, parent: Span | None, name: str, attrs: dict[str, Any]) -> None:
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: int | None = None
+        self.error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "offset_ms": round((self.start_ns - self.trace.root.start_ns) / 1e6, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Дерево спанов одного апдейта или HTTP-запроса.
+
+    Хэндлеры telebot выполняются в пуле потоков, поэтому трейс закрывается,
+    когда завершились и корневой спан, и все задачи, унёсшие его контекст.
+    """
+
+    def __init__(self, tracer: Tracer, name: str, attrs: dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.trace_id = os.urandom(16).hex()
+        self.wall_ns = time.time_ns()
+        self.spans: list[Span] = []
+        self.root = Span(self, None, name, attrs)
+        self.spans.append(self.root)
+        self._holds = 1
+        self._lock = threading.Lock()
+
+    def hold(self) -> None:
+        with self._lock:
+            self._holds += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._holds -= 1
+            done = self._holds == 0
+        if done:
+            self.tracer._finish(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = max((s.end_ns for s in self.spans if s.end_ns is not None), default=self.root.start_ns)
+        return (end - self.root.start_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.wall_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "spans": [s.to_dict() for s in self.spans],
+        }
+
+    def breakdown(self) -> str:
+        children: dict[str | None, list[Span]] = {}
+        for s in self.spans:
+            children.setdefault(s.parent.span_id if s.parent else None, []).append(s)
+        lines: list[str] = []
+
+        def walk(span: Span, depth: int) -> None:
+            attrs = " ".join(f"{k}={v}" for k, v in span.attrs.items())
+            error = f" ОШИБКА {span.error}" if span.error else ""
+            lines.append(f"{'  ' * depth}{span.name} {span.duration_ms:.1f} мс {attrs}{error}".rstrip())
+            for child in sorted(children.get(span.span_id, []), key=lambda c: c.start_ns):
+                walk(child, depth + 1)
+
+        walk(self.root, 1)
+        return "\n".join(lines)
+
+
+class Tracer:
+    """Трассировка апдейтов: кольцевой буфер последних трейсов, лог медленных, экспорт в файл (OTLP/JSON)."""
+
+    def __init__(self) -> None:
+        self.slow_ms = 1000.0
+        self._recent: deque[Trace] = deque(maxlen=200)
+        self._export_path: Path | None = None
+        self._export_lock = threading.Lock()
+
+    def configure(self, slow_ms: float, buffer_size: int, export_path: Path | None = None) -> None:
+        self.slow_ms = slow_ms
+        self._recent = deque(self._recent, maxlen=buffer_size)
+        self._export_path = export_path
+
+    @contextmanager
+    def trace(self, name: str, **attrs: Any) -> Iterator[Span | None]:
+        """Корневой спан; внутри уже открытого трейса ведёт себя как обычный дочерний спан."""
+        if _current.get() is not None:
+            with span(name, **attrs) as s:
+                yield s
+            return
+        trace = Trace(self, name, attrs)
+        token = _current.set(trace.root)
+        try:
+            yield trace.root
+        except BaseException as exc:
+            trace.root.error = type(exc).__name__
+            raise
+        finally:
+            trace.root.end_ns = time.perf_counter_ns()
+            _current.reset(token)
+            trace.release()
+
+    def recent(self, limit: int | None = None, slow_only: bool = False) -> list[dict[str, Any]]:
+        traces = list(self._recent)
+        if slow_only:
+            traces = [t for t in traces if t.duration_ms > self.slow_ms]
+        traces.reverse()
+        return [t.to_dict() for t in traces[:limit]]
+
+    def _finish(self, trace: Trace) -> None:
+        self._recent.append(trace)
+        duration = trace.duration_ms
+        if duration > self.slow_ms:
+            logger.warning(
+                "Медленная обработка %s: %.1f мс (бюджет %.0f мс)\n%s",
+                trace.root.name, duration, self.slow_ms, trace.breakdown(),
+            )
+        if self._export_path is not None:
+            self._export(trace)
+
+    def _export(self, trace: Trace) -> None:
+        assert self._export_path is not None
+        line = json.dumps(_to_otlp(trace), ensure_ascii=False) + "\n"
+        try:
+            with self._export_lock, self._export_path.open("a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            logger.exception("Не удалось записать трейс в %s", self._export_path)
+
+
+TRACER = Tracer()
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | None]:
+    """Дочерний спан текущего трейса; вне трейса ничего не записывает."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(parent.trace, parent, name, attrs)
+    parent.trace.spans.append(s)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as exc:
+        s.error = type(exc).__name__
+        raise
+    finally:
+        s.end_ns = time.perf_counter_ns()
+        _current.reset(token)
+
+
+class TracedLock:
+    """Обёртка над (R)Lock: ожидание захвата попадает в трейс, только если блокировка занята."""
+
+    def __init__(self, lock: Any, name: str) -> None:
+        self._lock = lock
+        self._name = name
+
+    def __enter__(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            with span(self._name):
+                self._lock.acquire()
+
+    def __exit__(self, *exc: object) -> None:
+        self._lock.release()
+
+
+def instrument_bot(bot: telebot.TeleBot) -> None:
+    """Каждый апдейт обрабатывается в своём трейсе, контекст передаётся в пул потоков telebot."""
+    if bot in _instrumented:
+        return
+    _instrumented.add(bot)
+    process = bot.process_new_updates
+    exec_task = bot._exec_task
+
+    def process_new_updates(updates: list[telebot.types.Update]) -> None:
+        current = _current.get()
+        if current is not None:
+            # Вебхук: трейс открыт ещё при приёме HTTP-запроса
+            if updates:
+                current.trace.root.attrs.setdefault("kind", update_kind(updates[0]))
+            with span("process"):
+                process(updates)
+            return
+        for update in updates:
+            with TRACER.trace("update", source="polling", kind=update_kind(update)):
+                process([update])
+
+    def traced_exec_task(task: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        current = _current.get()
+        if current is None:
+            exec_task(task, *args, **kwargs)
+            return
+        current.trace.hold()
+        # Аргументы идут дальше как есть: планировщик апдейтов классифицирует задачу по ним
+        exec_task(TracedTask(task, current.trace, contextvars.copy_context()), *args, **kwargs)
+
+    bot.process_new_updates = process_new_updates  # type: ignore[method-assign]
+    bot._exec_task = traced_exec_task  # type: ignore[method-assign]
+
+
+class TracedTask:
+    """Задача пула в контексте трейса; трейс закрывается после выполнения или отмены (cancel)."""
+
+    def __init__(self, task: Callable[..., Any], trace: Trace, ctx: contextvars.Context) -> None:
+        self._task = task
+        self._trace = trace
+        self._ctx = ctx
+
+    def __call__(self, *args: Any, **kwargs: Any) -> None:
+        try:
+            self._ctx.run(self._task, *args, **kwargs)
+        finally:
+            self._trace.release()
+
+    def cancel(self, reason: str) -> None:
+        self._trace.root.attrs["shed"] = reason
+        self._trace.release()
+
+
+def update_kind(update: telebot.types.Update) -> str:
+    for kind in ("message", "callback_query", "edited_message", "my_chat_member", "chat_member"):
+        if getattr(update, kind, None) is not None:
+            return kind
+    return "other"
+
+
+def _to_otlp(trace: Trace) -> dict[str, Any]:
+    """Трейс в формате OTLP/JSON (как у файлового экспортёра OpenTelemetry Collector)."""
+    def attributes(attrs: dict[str, Any]) -> list[dict[str, Any]]:
+        return [{"key": k, "value": {"stringValue": str(v)}} for k, v in attrs.items()]
+
+    spans = []
+    for s in trace.spans:
+        start = trace.wall_ns + (s.start_ns - trace.root.start_ns)
+        end = trace.wall_ns + ((s.end_ns or s.start_ns) - trace.root.start_ns)
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": s.parent.span_id if s.parent else "",
+            "name": s.name,
+            "kind": 2 if s.parent is None else 1,
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(end),
+            "attributes": attributes(s.attrs),
+            "status": {"code": 2, "message": s.error} if s.error else {},
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": "inbibe-bot"})},
+            "scopeSpans": [{"scope": {"name": "inbibe_bot"}, "spans": spans}],
+        }]
+    }
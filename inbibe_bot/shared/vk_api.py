@@ -1,31 +1,68 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import datetime
 
 import requests  # type: ignore[import-untyped]
 
+from inbibe_bot.shared.circuit_breaker import VK_BREAKER
+from inbibe_bot.shared.metrics import VK_REQUESTS, VK_SECONDS
+from inbibe_bot.shared.tracing import span
+
 logger = logging.getLogger(__name__)
 
 VK_API_URL = "https://api.vk.com/method/messages.send"
 
 
-def send_vk_message(user_id: int, message: str, *, token: str, api_version: str) -> bool:
-    """Отправляет сообщение VK-пользователю от имени группы."""
+class VkSendError(Exception):
+    """VK принял запрос, но вернул ошибку API: повтор того же сообщения не поможет."""
+
+    def __init__(self, user_id: int) -> None:
+        super().__init__(f"VK не принял сообщение пользователю {user_id}")
+        self.user_id = user_id
+
+
+def send_vk_message(
+    user_id: int, message: str, *, token: str, api_version: str, api_url: str = VK_API_URL
+) -> bool:
+    """Отправляет сообщение VK-пользователю от имени группы.
+
+    При разомкнутом предохранителе VK сразу бросает CircuitOpenError, при недоступности VK (сеть,
+    таймаут, ответ 5xx) — requests.RequestException: такой вызов стоит повторить. Ошибка API — False.
+    """
+    VK_BREAKER.check()
+    started = time.perf_counter_ns()
+    code = "error"
+    available = False
     try:
-        resp = requests.post(
-            VK_API_URL,
-            data={
-                "user_id": user_id,
-                "random_id": int(datetime.now().timestamp() * 1000),
-                "message": message,
-                "access_token": token,
-                "v": api_version,
-            },
-            timeout=10,
-        )
+        with span("vk.send"):
+            resp = requests.post(
+                api_url,
+                data={
+                    "user_id": user_id,
+                    "random_id": int(datetime.now().timestamp() * 1000),
+                    "message": message,
+                    "access_token": token,
+                    "v": api_version,
+                },
+                timeout=10,
+            )
+        code = str(resp.status_code)
+        available = resp.status_code < 500
+        if not available:
+            raise requests.HTTPError(f"VK ответил {resp.status_code}", response=resp)
         data = resp.json()
+        if isinstance(data.get("error"), dict):
+            code = f"vk_{data['error'].get('error_code')}"
         return "response" in data and isinstance(data["response"], int)
+    except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+        logger.warning("VK недоступен, сообщение пользователю %s не отправлено", user_id)
+        raise
     except Exception:
         logger.warning("Сообщение пользователю VK %s не было отправлено", user_id)
         return False
+    finally:
+        VK_BREAKER.record(available)
+        VK_SECONDS.observe_ns(time.perf_counter_ns() - started)
+        VK_REQUESTS.inc(code)
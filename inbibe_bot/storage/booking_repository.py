@@ -1,31 +1,43 @@
 from __future__ import annotations
 
-from threading import RLock
+from abc import ABC, abstractmethod
 from typing import Callable
 
 from inbibe_bot.core.booking import Booking, BookingStatus
-from inbibe_bot.core.errors import BookingNotFound
+from inbibe_bot.core.errors import BookingConflict, BookingNotFound
+from inbibe_bot.storage.concurrent_map import ConcurrentMap
+from inbibe_bot.storage.mutations import MutationListener
+from inbibe_bot.storage.snapshots import Snapshot
 
 _TERMINAL = {BookingStatus.APPROVED, BookingStatus.REJECTED}
+# Поля заявки с id сообщений в админ-чате: по reply на них find_by_* находят заявку
+_MESSAGE_FIELDS = ("admin_message_id", "table_request_message_id", "alt_request_message_id")
 
 
-class BookingRepository:
+class BookingRepository(ABC):
+    """Заявки: общий контракт in-memory хранилища и хранилища поверх Redis (shared_state).
+
+    get/require/find_* выдают копии — их можно менять без блокировок, а в хранилище изменения попадают
+    только через update(), который сверяет версию (compare-and-set). list_* и snapshot() — только для чтения.
+    Слушатели (add_listener) получают изменения, сделанные через этот объект.
+    """
+
     def __init__(self) -> None:
-        self._data: dict[str, Booking] = {}
-        self._lock = RLock()
         self._on_change: Callable[[], None] | None = None
+        self._listeners: list[MutationListener] = []
 
     def set_change_callback(self, fn: Callable[[], None]) -> None:
         self._on_change = fn
 
+    def add_listener(self, fn: MutationListener) -> None:
+        self._listeners.append(fn)
+
+    @abstractmethod
     def add(self, booking: Booking) -> None:
-        with self._lock:
-            self._data[booking.id] = booking
-        self._notify()
+        """Кладёт заявку как есть, без сверки версии: новые заявки, восстановление и репликация."""
 
-    def get(self, booking_id: str) -> Booking | None:
-        with self._lock:
-            return self._data.get(booking_id)
+    @abstractmethod
+    def get(self, booking_id: str) -> Booking | None: ...
 
     def require(self, booking_id: str) -> Booking:
         booking = self.get(booking_id)
@@ -33,45 +45,126 @@ class BookingRepository:
             raise BookingNotFound(booking_id)
         return booking
 
+    @abstractmethod
+    def update(self, booking: Booking) -> None:
+        """Сохраняет заявку, если с чтения её никто не менял, и увеличивает booking.version.
+
+        BookingConflict — в хранилище уже другая версия, BookingNotFound — заявку успели удалить.
+        """
+
+    @abstractmethod
+    def delete(self, booking_id: str) -> None: ...
+
+    @abstractmethod
+    def snapshot(self) -> Snapshot[str, Booking]: ...
+
+    @abstractmethod
+    def list_all(self) -> list[Booking]: ...
+
+    def list_active(self) -> list[Booking]:
+        """Заявки без решения — только для чтения."""
+        return [b for b in self.list_all() if b.status not in _TERMINAL]
+
+    @abstractmethod
+    def find_by_admin_message_id(self, message_id: int) -> Booking | None: ...
+
+    @abstractmethod
+    def find_by_table_request_message_id(self, message_id: int) -> Booking | None: ...
+
+    @abstractmethod
+    def find_by_alt_request_message_id(self, message_id: int) -> Booking | None: ...
+
+    def _emit(self, op: str, payload: object) -> None:
+        for listener in self._listeners:
+            listener(op, payload)
+
+    def _notify(self) -> None:
+        if self._on_change:
+            self._on_change()
+
+
+class InMemoryBookingRepository(BookingRepository):
+    """Заявки в памяти процесса, в ConcurrentMap.
+
+    Чтение идёт без блокировок, запись блокирует только сегмент своей заявки и публикует копию
+    словаря сегмента; snapshot() собирает сегменты в согласованный Snapshot. find_by_* не обходят
+    заявки: id сообщений админ-чата ведутся в индексах message_id -> booking_id.
+    Слушатели вызываются под блокировкой сегмента — для одной заявки в порядке изменений.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._data: ConcurrentMap[str, Booking] = ConcurrentMap("lock.bookings")
+        self._by_message: dict[str, ConcurrentMap[int, str]] = {
+            name: ConcurrentMap("lock.bookings_index") for name in _MESSAGE_FIELDS
+        }
+
+    def add(self, booking: Booking) -> None:
+        stored = booking.copy()
+        with self._data.locked(booking.id):
+            self._reindex(self._data.get(booking.id), stored)
+            self._data.put(booking.id, stored)
+            self._emit("booking.put", stored)
+        self._notify()
+
+    def snapshot(self) -> Snapshot[str, Booking]:
+        """Согласованный снимок всех заявок без блокировок. Заявки в нём только для чтения — копий не делается."""
+        return self._data.snapshot()
+
+    def get(self, booking_id: str) -> Booking | None:
+        booking = self._data.get(booking_id)
+        return booking.copy() if booking is not None else None
+
     def update(self, booking: Booking) -> None:
-        with self._lock:
-            self._data[booking.id] = booking
+        stored = booking.copy()
+        stored.version += 1
+        with self._data.locked(booking.id):
+            current = self._data.get(booking.id)
+            if current is None:
+                raise BookingNotFound(booking.id)
+            if current.version != booking.version:
+                raise BookingConflict(booking.id, booking.version, current.version)
+            self._reindex(current, stored)
+            self._data.put(booking.id, stored)
+            self._emit("booking.put", stored)
+        booking.version = stored.version
         self._notify()
 
     def delete(self, booking_id: str) -> None:
-        with self._lock:
-            self._data.pop(booking_id, None)
+        with self._data.locked(booking_id):
+            self._reindex(self._data.pop(booking_id), None)
+            self._emit("booking.delete", booking_id)
         self._notify()
 
-    def list_active(self) -> list[Booking]:
-        with self._lock:
-            return [b for b in self._data.values() if b.status not in _TERMINAL]
-
     def list_all(self) -> list[Booking]:
-        with self._lock:
-            return list(self._data.values())
+        """Все заявки из текущего снимка — только для чтения."""
+        return list(self._data.snapshot().values())
 
     def find_by_admin_message_id(self, message_id: int) -> Booking | None:
-        with self._lock:
-            return next(
-                (b for b in self._data.values() if b.admin_message_id == message_id),
-                None,
-            )
+        return self._find_by("admin_message_id", message_id)
 
     def find_by_table_request_message_id(self, message_id: int) -> Booking | None:
-        with self._lock:
-            return next(
-                (b for b in self._data.values() if b.table_request_message_id == message_id),
-                None,
-            )
+        return self._find_by("table_request_message_id", message_id)
 
     def find_by_alt_request_message_id(self, message_id: int) -> Booking | None:
-        with self._lock:
-            return next(
-                (b for b in self._data.values() if b.alt_request_message_id == message_id),
-                None,
-            )
-
-    def _notify(self) -> None:
-        if self._on_change:
-            self._on_change()
+        return self._find_by("alt_request_message_id", message_id)
+
+    def _find_by(self, name: str, message_id: int) -> Booking | None:
+        booking_id = self._by_message[name].get(message_id)
+        booking = self._data.get(booking_id) if booking_id is not None else None
+        # Индекс обновляется до публикации заявки: заявку сверяем с самим хранилищем
+        if booking is None or getattr(booking, name) != message_id:
+            return None
+        return booking.copy()
+
+    def _reindex(self, previous: Booking | None, stored: Booking | None) -> None:
+        """Под блокировкой сегмента заявки: переносит id её сообщений в индексах find_by_*."""
+        for name, index in self._by_message.items():
+            old = getattr(previous, name) if previous is not None else None
+            new = getattr(stored, name) if stored is not None else None
+            if old == new:
+                continue
+            if old is not None and previous is not None and index.get(old) == previous.id:
+                index.pop(old)
+            if new is not None and stored is not None:
+                index.put(new, stored.id)
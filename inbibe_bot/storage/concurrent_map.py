@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from contextlib import ExitStack, contextmanager
+from operator import attrgetter
+from threading import RLock
+from typing import Generic, Hashable, Iterator, TypeVar
+
+from inbibe_bot.shared.tracing import TracedLock
+from inbibe_bot.storage.snapshots import Snapshot
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# По числу потоков обработки (пул telebot, HTTP, колесо таймеров): писатели редко встречаются, а обход
+# снимка проходит по всем сегментам — лишние сегменты замедляют его без выигрыша под GIL
+DEFAULT_STRIPES = 8
+# Попыток собрать снимок без блокировок, прежде чем остановить писателей
+_SNAPSHOT_ATTEMPTS = 8
+_STATE = attrgetter("state")
+
+
+class _Segment(Generic[K, V]):
+    __slots__ = ("lock", "state")
+
+    def __init__(self, name: str) -> None:
+        self.lock = TracedLock(RLock(), name)
+        # (число коммитов сегмента, словарь) публикуется одной ссылкой; словарь после публикации не меняется
+        self.state: tuple[int, dict[K, V]] = (0, {})
+
+
+class ConcurrentMap(Generic[K, V]):
+    """Словарь из stripes сегментов со своей блокировкой у каждого.
+
+    Чтение (get, in, len, snapshot) идёт без блокировок: сегмент хранит неизменяемый словарь, запись
+    под блокировкой сегмента копирует его и подменяет ссылку (copy-on-write). Писатели разных сегментов
+    не ждут друг друга, а копия на запись — O(размер сегмента). Сами значения карта не копирует:
+    если их меняют на месте, их согласованность — забота вызывающего.
+    """
+
+    def __init__(self, name: str, stripes: int = DEFAULT_STRIPES) -> None:
+        if stripes < 1:
+            raise ValueError("Нужен хотя бы один сегмент")
+        self._segments: list[_Segment[K, V]] = [_Segment(name) for _ in range(stripes)]
+        # Последний собранный снимок и публикации сегментов, из которых он собран (одной ссылкой)
+        self._last: tuple[list[tuple[int, dict[K, V]]], Snapshot[K, V]] = ([], Snapshot())
+
+    def get(self, key: K) -> V | None:
+        return self._segment(key).state[1].get(key)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._segment(key).state[1]
+
+    def __len__(self) -> int:
+        return sum(len(s.state[1]) for s in self._segments)
+
+    def snapshot(self) -> Snapshot[K, V]:
+        """Согласованный снимок всех сегментов; version — число коммитов карты.
+
+        Двойной сбор: если два обхода подряд застали в каждом сегменте одну и ту же публикацию, все
+        сегменты были такими одновременно — между обходами. Прошлый снимок служит первым обходом: без
+        записей он возвращается после одного обхода. Если писатели раз за разом мешают, снимок
+        собирается под блокировками всех сегментов, поэтому вызывать его под locked() нельзя.
+        """
+        cached_states, cached = self._last
+        states = list(map(_STATE, self._segments))
+        if states == cached_states:
+            return cached
+        for _ in range(_SNAPSHOT_ATTEMPTS):
+            again = list(map(_STATE, self._segments))
+            # Каждая публикация — новый кортеж с бóльшим номером: равенство списков значит «ничего не менялось»
+            if again == states:
+                return self._remember(states)
+            states = again
+        with ExitStack() as stack:
+            for segment in self._segments:
+                stack.enter_context(segment.lock)
+            states = list(map(_STATE, self._segments))
+        return self._remember(states)
+
+    @contextmanager
+    def locked(self, key: K) -> Iterator[None]:
+        """Блокировка сегмента ключа: проверка и запись под ней атомарны (put/pop внутри не ждут)."""
+        with self._segment(key).lock:
+            yield
+
+    def put(self, key: K, value: V) -> V | None:
+        segment = self._segment(key)
+        with segment.lock:
+            version, data = segment.state
+            previous = data.get(key)
+            data = dict(data)
+            data[key] = value
+            segment.state = (version + 1, data)
+        return previous
+
+    def pop(self, key: K) -> V | None:
+        segment = self._segment(key)
+        with segment.lock:
+            version, data = segment.state
+            if key not in data:
+                return None
+            data = dict(data)
+            previous = data.pop(key)
+            segment.state = (version + 1, data)
+        return previous
+
+    def _segment(self, key: K) -> _Segment[K, V]:
+        return self._segments[hash(key) % len(self._segments)]
+
+    def _remember(self, states: list[tuple[int, dict[K, V]]]) -> Snapshot[K, V]:
+        versions, segments = zip(*states)
+        snapshot: Snapshot[K, V] = Snapshot(sum(versions), segments)
+        self._last = (states, snapshot)
+        return snapshot
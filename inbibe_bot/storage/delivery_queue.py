@@ -1,36 +1,81 @@
 from __future__ import annotations
 
 import queue
+from abc import ABC, abstractmethod
+from threading import Lock
 from typing import Callable
 
 from inbibe_bot.core.booking import Booking
+from inbibe_bot.storage.mutations import MutationListener
 
 
-class ApprovedBookingQueue:
+class ApprovedBookingQueue(ABC):
+    """Одобренные заявки, ожидающие выдачи через /api/bookings: in-memory или список в Redis (shared_state)."""
+
     def __init__(self) -> None:
-        self._q: queue.Queue[Booking] = queue.Queue()
         self._on_change: Callable[[], None] | None = None
+        self._listeners: list[MutationListener] = []
 
     def set_change_callback(self, fn: Callable[[], None]) -> None:
         self._on_change = fn
 
+    def add_listener(self, fn: MutationListener) -> None:
+        self._listeners.append(fn)
+
+    @abstractmethod
+    def enqueue(self, booking: Booking) -> None: ...
+
+    @abstractmethod
+    def drain(self) -> list[Booking]:
+        """Забирает все заявки из очереди; одну заявку получает один вызывающий."""
+
+    @abstractmethod
+    def size(self) -> int: ...
+
+    @abstractmethod
+    def snapshot(self) -> list[Booking]:
+        """Возвращает содержимое очереди не разрушая её (для сохранения состояния)."""
+
+    def _emit(self, op: str, payload: object) -> None:
+        for listener in self._listeners:
+            listener(op, payload)
+
+    def _notify(self) -> None:
+        if self._on_change:
+            self._on_change()
+
+
+class InMemoryBookingQueue(ApprovedBookingQueue):
+    def __init__(self) -> None:
+        super().__init__()
+        self._q: queue.Queue[Booking] = queue.Queue()
+        # Только упорядочивает изменения для слушателей; сама очередь потокобезопасна
+        self._emit_lock = Lock()
+
     def enqueue(self, booking: Booking) -> None:
-        self._q.put(booking)
+        with self._emit_lock:
+            self._q.put(booking)
+            self._emit("delivery.push", booking)
         self._notify()
 
     def drain(self) -> list[Booking]:
         items: list[Booking] = []
-        while True:
-            try:
-                items.append(self._q.get_nowait())
-            except queue.Empty:
-                break
+        with self._emit_lock:
+            while True:
+                try:
+                    items.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            if items:
+                self._emit("delivery.drain", items)
         if items:
             self._notify()
         return items
 
+    def size(self) -> int:
+        return self._q.qsize()
+
     def snapshot(self) -> list[Booking]:
-        """Возвращает содержимое очереди не разрушая её (для сохранения состояния)."""
         items: list[Booking] = []
         while True:
             try:
@@ -40,7 +85,3 @@ class ApprovedBookingQueue:
         for item in items:
             self._q.put(item)
         return items
-
-    def _notify(self) -> None:
-        if self._on_change:
-            self._on_change()
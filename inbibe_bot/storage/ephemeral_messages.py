@@ -1,42 +1,120 @@
 from __future__ import annotations
 
+import functools
 import logging
+from abc import ABC, abstractmethod
 from collections import defaultdict
 from typing import Callable, DefaultDict
 
 import telebot
 
+from inbibe_bot.shared.circuit_breaker import TELEGRAM_BREAKER, CircuitOpenError
+from inbibe_bot.shared.retry_queue import RetryQueue
+from inbibe_bot.storage.mutations import MutationListener
+
 logger = logging.getLogger(__name__)
 
 
-class EphemeralMessageService:
-    """Управляет временными сообщениями в админ-чате, связанными с заявкой."""
+class EphemeralMessageService(ABC):
+    """Временные сообщения в админ-чате, связанные с заявкой: реестр в памяти или в Redis (shared_state).
+
+    Общее для реализаций — удаление из чата (clear) с откладыванием в очередь повторов.
+    """
 
-    def __init__(self, bot: telebot.TeleBot) -> None:
+    def __init__(self, bot: telebot.TeleBot | None) -> None:
         self._bot = bot
-        self._messages: DefaultDict[str, list[tuple[int, int]]] = defaultdict(list)
         self._on_change: Callable[[], None] | None = None
+        self._listeners: list[MutationListener] = []
+        self._retry: RetryQueue | None = None
 
     def set_change_callback(self, fn: Callable[[], None]) -> None:
         self._on_change = fn
 
+    def set_retry_queue(self, queue: RetryQueue) -> None:
+        """Куда откладывать удаление, если Telegram недоступен (иначе сообщение остаётся в чате)."""
+        self._retry = queue
+
+    def add_listener(self, fn: MutationListener) -> None:
+        self._listeners.append(fn)
+
     def register(self, booking_id: str, message: telebot.types.Message) -> None:
-        self._messages[booking_id].append((message.chat.id, message.message_id))
-        logger.debug(
-            "Зарегистрировано временное сообщение для заявки %s (chat_id=%s, message_id=%s)",
-            booking_id, message.chat.id, message.message_id,
-        )
-        self._notify()
+        self.add(booking_id, message.chat.id, message.message_id)
+
+    @abstractmethod
+    def add(self, booking_id: str, chat_id: int, message_id: int) -> None:
+        """Регистрирует сообщение по идентификаторам."""
 
     def clear(self, booking_id: str) -> None:
-        for chat_id, message_id in self._messages.pop(booking_id, []):
+        assert self._bot is not None
+        for chat_id, message_id in self.take(booking_id):
             try:
                 self._bot.delete_message(chat_id, message_id)
                 logger.debug("Удалено временное сообщение (заявка %s, message_id=%s)", booking_id, message_id)
+            except CircuitOpenError:
+                if self._retry is not None:
+                    self._retry.defer(
+                        TELEGRAM_BREAKER,
+                        f"временное сообщение {message_id} заявки {booking_id}",
+                        functools.partial(self._bot.delete_message, chat_id, message_id),
+                    )
             except Exception as exc:
                 logger.warning("Не удалось удалить временное сообщение заявки %s: %s", booking_id, exc)
+
+    @abstractmethod
+    def take(self, booking_id: str) -> list[tuple[int, int]]:
+        """Забирает сообщения заявки из реестра; удалять их из чата — забота вызывающего."""
+
+    @abstractmethod
+    def has(self, booking_id: str) -> bool: ...
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+    @abstractmethod
+    def snapshot(self) -> dict[str, list[list[int]]]: ...
+
+    @abstractmethod
+    def restore(self, data: dict[str, list[list[int]]]) -> None: ...
+
+    def _emit(self, op: str, payload: object) -> None:
+        for listener in self._listeners:
+            listener(op, payload)
+
+    def _notify(self) -> None:
+        if self._on_change:
+            self._on_change()
+
+
+class InMemoryEphemeralMessages(EphemeralMessageService):
+    def __init__(self, bot: telebot.TeleBot | None) -> None:
+        super().__init__(bot)
+        self._messages: DefaultDict[str, list[tuple[int, int]]] = defaultdict(list)
+
+    def add(self, booking_id: str, chat_id: int, message_id: int) -> None:
+        """Повторная регистрация того же сообщения игнорируется."""
+        messages = self._messages[booking_id]
+        if (chat_id, message_id) in messages:
+            return
+        messages.append((chat_id, message_id))
+        self._emit("ephemeral.add", (booking_id, chat_id, message_id))
+        logger.debug(
+            "Зарегистрировано временное сообщение для заявки %s (chat_id=%s, message_id=%s)",
+            booking_id, chat_id, message_id,
+        )
         self._notify()
 
+    def take(self, booking_id: str) -> list[tuple[int, int]]:
+        messages = self._messages.pop(booking_id, [])
+        self._emit("ephemeral.take", booking_id)
+        self._notify()
+        return messages
+
+    def has(self, booking_id: str) -> bool:
+        return bool(self._messages.get(booking_id))
+
+    def count(self) -> int:
+        return sum(len(v) for v in list(self._messages.values()))
+
     def snapshot(self) -> dict[str, list[list[int]]]:
         return {k: [list(m) for m in v] for k, v in self._messages.items()}
 
@@ -44,7 +122,3 @@ class EphemeralMessageService:
         self._messages.clear()
         for k, v in data.items():
             self._messages[k] = [(chat_id, msg_id) for chat_id, msg_id in v]
-
-    def _notify(self) -> None:
-        if self._on_change:
-            self._on_change()
@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+# Слушатель изменений хранилища: имя операции ("booking.put", "delivery.drain", ...) и её аргумент.
+# Вызывается синхронно в потоке, изменившем данные, поэтому должен быть быстрым.
+MutationListener = Callable[[str, Any], None]
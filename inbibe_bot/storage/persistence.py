@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import itertools
 import json
 import logging
+import os
+import time
 from datetime import datetime
 from pathlib import Path
+from threading import Lock
 
 from inbibe_bot.core.booking import Booking
+from inbibe_bot.core.occupancy import Reservation, TableOccupancy
 from inbibe_bot.core.user_flow import UserFlow, UserFlowData, FlowStep
+from inbibe_bot.shared.metrics import STATE_SAVE_BYTES, STATE_SAVE_SECONDS
+from inbibe_bot.shared.tracing import TracedLock, span
 from inbibe_bot.storage.booking_repository import BookingRepository
 from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
 from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService
+from inbibe_bot.storage.reservation_history import ReservationHistory
 from inbibe_bot.storage.user_flow_repository import UserFlowRepository
 
 STATE_VERSION = 2
@@ -17,6 +25,14 @@ logger = logging.getLogger(__name__)
 
 
 class StatePersister:
+    """state.json: сохранение при каждом изменении хранилищ и восстановление при старте.
+
+    save() зовут хэндлеры из разных потоков. Записи идут по одной под блокировкой, файл подменяется
+    целиком (временный файл + os.replace), поэтому читатель и упавший процесс видят только целый
+    снимок. Каждый вызов получает номер; запрос, чьи изменения уже вошли в снимок записи, начатой
+    позже него, пропускается — очередь ждущих save() схлопывается в одну запись.
+    """
+
     def __init__(
         self,
         path: Path,
@@ -24,32 +40,91 @@ class StatePersister:
         flows: UserFlowRepository,
         queue: ApprovedBookingQueue,
         ephemeral: EphemeralMessageService,
+        occupancy: TableOccupancy,
+        history: ReservationHistory,
     ) -> None:
         self._path = path
         self._bookings = bookings
         self._flows = flows
         self._queue = queue
         self._ephemeral = ephemeral
+        self._occupancy = occupancy
+        self._history = history
+        self._save_lock = TracedLock(Lock(), "lock.state_save")
+        self._versions = itertools.count(1)
+        # Номер, взятый записью перед снимком: всё, что запрошено раньше него, уже в файле
+        self._written = 0
 
     def save(self) -> None:
-        try:
-            data = {
-                "version": STATE_VERSION,
-                "bookings": [b.to_dict() for b in self._bookings.list_all()],
-                "user_flows": [_flow_to_dict(f) for f in self._flows.list_all()],
-                "pending_delivery": [b.to_dict() for b in self._queue.snapshot()],
-                "ephemeral_messages": self._ephemeral.snapshot(),
-            }
-            self._path.parent.mkdir(exist_ok=True)
-            self._path.write_text(
-                json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
-            logger.info("Состояние сохранено в %s", self._path)
-        except Exception:
-            logger.exception("Ошибка при сохранении состояния")
+        requested = next(self._versions)
+        with span("state.save"):
+            self._save(requested)
+
+    def _save(self, requested: int) -> None:
+        with self._save_lock:
+            if requested < self._written:
+                return
+            version = next(self._versions)
+            started = time.perf_counter_ns()
+            try:
+                payload = json.dumps(self.snapshot(), ensure_ascii=False, indent=2).encode("utf-8")
+                self._path.parent.mkdir(exist_ok=True)
+                tmp = self._path.with_name(self._path.name + ".tmp")
+                with tmp.open("wb") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self._path)
+                self._written = version
+                STATE_SAVE_BYTES.observe(len(payload))
+                STATE_SAVE_SECONDS.observe_ns(time.perf_counter_ns() - started)
+                logger.info("Состояние сохранено в %s", self._path)
+            except Exception:
+                logger.exception("Ошибка при сохранении состояния")
+
+    def snapshot(self) -> dict:
+        """Всё состояние в формате state.json (для файла и для начальной синхронизации реплики).
+
+        Заявки и сценарии берутся из опубликованных снимков репозиториев: каждый согласован на момент
+        своего последнего коммита, и сериализация не мешает хэндлерам.
+        """
+        bookings = self._bookings.snapshot()
+        flows = self._flows.snapshot()
+        return {
+            "version": STATE_VERSION,
+            "bookings": [b.to_dict() for b in bookings.values()],
+            "user_flows": [flow_to_dict(f) for f in flows.values()],
+            "pending_delivery": [b.to_dict() for b in self._queue.snapshot()],
+            "ephemeral_messages": self._ephemeral.snapshot(),
+            "reservations": [r.to_dict() for r in self._occupancy.list_all()],
+        }
+
+    def restore(self, data: dict) -> None:
+        """Заменяет содержимое хранилищ снимком из snapshot()."""
+        for booking in self._bookings.list_all():
+            self._bookings.delete(booking.id)
+        for b in data.get("bookings", []):
+            self._bookings.add(Booking.from_dict(b))
+
+        for flow in self._flows.list_all():
+            self._flows.delete(flow.user_id)
+        for f in data.get("user_flows", []):
+            self._flows.save(flow_from_dict(f))
+
+        self._queue.drain()
+        for b in data.get("pending_delivery", []):
+            self._queue.enqueue(Booking.from_dict(b))
+
+        self._ephemeral.restore(data.get("ephemeral_messages", {}))
+
+        if "reservations" in data:
+            self._occupancy.restore(Reservation.from_dict(r) for r in data["reservations"])
+        else:
+            self.rebuild_occupancy()
 
     def load(self) -> None:
         if not self._path.exists():
+            self.rebuild_occupancy()
             return
         try:
             data = json.loads(self._path.read_text(encoding="utf-8"))
@@ -59,25 +134,28 @@ class StatePersister:
                     "Формат state.json v%s устарел (текущий v%s). Стартуем с чистым состоянием.",
                     version, STATE_VERSION,
                 )
+                self.rebuild_occupancy()
                 return
 
-            for b in data.get("bookings", []):
-                self._bookings.add(Booking.from_dict(b))
-
-            for f in data.get("user_flows", []):
-                self._flows.save(_flow_from_dict(f))
-
-            for b in data.get("pending_delivery", []):
-                self._queue.enqueue(Booking.from_dict(b))
-
-            self._ephemeral.restore(data.get("ephemeral_messages", {}))
-
+            self.restore(data)
             logger.info("Состояние восстановлено из %s", self._path)
         except Exception:
             logger.exception("Ошибка при загрузке состояния, стартуем с чистым состоянием")
+            self.rebuild_occupancy()
+
+    def rebuild_occupancy(self) -> None:
+        """Занятость столов из журнала броней (state.json без неё, устарел или повреждён)."""
+        try:
+            reservations = self._history.replay()
+        except OSError:
+            logger.exception("Не удалось прочитать историю броней")
+            return
+        self._occupancy.restore(reservations)
+        if reservations:
+            logger.info("Занятость столов восстановлена из истории: %d броней", len(reservations))
 
 
-def _flow_to_dict(flow: UserFlow) -> dict:
+def flow_to_dict(flow: UserFlow) -> dict:
     return {
         "user_id": flow.user_id,
         "step": flow.step.value,
@@ -90,7 +168,7 @@ def _flow_to_dict(flow: UserFlow) -> dict:
     }
 
 
-def _flow_from_dict(d: dict) -> UserFlow:
+def flow_from_dict(d: dict) -> UserFlow:
     data = d["data"]
     return UserFlow(
         user_id=d["user_id"],
@@ -0,0 +1,433 @@
+"""Горячий резерв: основной экземпляр шлёт каждое изменение хранилищ резервному по TCP/Unix-сокету.
+
+Протокол — строки JSON {"seq", "ts", "op", "data"}. Сначала стороны доказывают друг другу знание
+REPLICATION_SECRET (HMAC-SHA256 над случайными nonce, сам секрет по сети не идёт); только после этого
+резерв получает снимок состояния (op="snapshot", формат state.json), затем поток операций и heartbeat
+раз в секунду. Операции применяются идемпотентно: снимок снимается уже после подписки, и изменения
+на стыке могут прийти дважды. Поток не шифруется: между хостами — только через доверенную сеть или туннель.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import io
+import json
+import logging
+import queue
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from inbibe_bot.core.availability import AvailabilityGrid
+from inbibe_bot.core.booking import Booking
+from inbibe_bot.core.errors import TableConflict
+from inbibe_bot.core.occupancy import Reservation, ReservationEvent, TableOccupancy
+from inbibe_bot.core.user_flow import UserFlow
+from inbibe_bot.shared.metrics import REGISTRY
+from inbibe_bot.storage.booking_repository import BookingRepository
+from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
+from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService
+from inbibe_bot.storage.persistence import StatePersister, flow_from_dict, flow_to_dict
+from inbibe_bot.storage.user_flow_repository import UserFlowRepository
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_S = 1.0
+# Резерв, отставший сильнее, отключается и при переподключении получает свежий снимок
+MAX_BACKLOG = 10_000
+RECONNECT_MAX_S = 10.0
+HANDSHAKE_TIMEOUT_S = 5.0
+# Строка рукопожатия — nonce и подпись; до проверки секрета длинные строки от собеседника не читаются
+HANDSHAKE_LINE_MAX = 4096
+
+
+@dataclass
+class Stores:
+    bookings: BookingRepository
+    flows: UserFlowRepository
+    queue: ApprovedBookingQueue
+    ephemeral: EphemeralMessageService
+    occupancy: TableOccupancy
+    availability: AvailabilityGrid
+    persister: StatePersister
+
+
+def parse_address(address: str) -> tuple[socket.AddressFamily, Any]:
+    """tcp://host:port или unix:///path/to.sock; tcp://:port — только локальный интерфейс.
+
+    Слушать все интерфейсы нужно явно: tcp://0.0.0.0:port.
+    """
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    raise ValueError(f"Адрес репликации должен быть tcp://host:port или unix:///path, получено {address!r}")
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+@dataclass
+class _Subscriber:
+    name: str
+    start_seq: int
+    frames: queue.Queue[dict[str, Any]] = field(default_factory=lambda: queue.Queue(MAX_BACKLOG))
+    overflow: bool = False
+
+
+class ReplicationPrimary:
+    """Сервер репликации на основном экземпляре: подписывается на хранилища и раздаёт операции резервам."""
+
+    def __init__(self, address: str, secret: str, stores: Stores) -> None:
+        self._address = address
+        self._secret = secret
+        self._stores = stores
+        self._seq = 0
+        self._subscribers: list[_Subscriber] = []
+        self._lock = threading.Lock()
+        self._server: socketserver.BaseServer | None = None
+
+    def attach(self) -> None:
+        s = self._stores
+        for store in (s.bookings, s.flows, s.queue, s.ephemeral):
+            store.add_listener(self._on_mutation)
+        s.occupancy.add_listener(self._on_reservation)
+
+    def start(self) -> None:
+        family, address = parse_address(self._address)
+        primary = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                primary._serve(self.connection, self.rfile, str(self.client_address or "unix"))
+
+        server: socketserver.BaseServer
+        if family == socket.AF_UNIX:
+            Path(address).unlink(missing_ok=True)
+            unix_server = socketserver.ThreadingUnixStreamServer(address, Handler)
+            unix_server.daemon_threads = True
+            server = unix_server
+        else:
+            server = _TcpServer(address, Handler)
+        self._server = server
+        threading.Thread(target=server.serve_forever, daemon=True, name="replication-primary").start()
+        REGISTRY.gauge_callback(
+            "inbibe_replication_standbys", "Подключённые резервные экземпляры", (),
+            lambda: {(): float(len(self._subscribers))},
+        )
+        REGISTRY.gauge_callback(
+            "inbibe_replication_backlog", "Операции, ещё не отправленные резервам", (),
+            lambda: {(): float(sum(sub.frames.qsize() for sub in list(self._subscribers)))},
+        )
+        logger.info("Репликация: ожидаю резервные экземпляры на %s", self._address)
+
+    def flush(self, timeout: float) -> int:
+        """Ждёт, пока резервы заберут накопленные операции; возвращает, сколько осталось неотправленными."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                backlog = sum(sub.frames.qsize() for sub in self._subscribers)
+            if not backlog or time.monotonic() >= deadline:
+                return backlog
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "role": "primary",
+                "seq": self._seq,
+                "standbys": [{"peer": s.name, "backlog": s.frames.qsize()} for s in self._subscribers],
+            }
+
+    def _on_mutation(self, op: str, payload: Any) -> None:
+        self._publish(op, _encode(op, payload))
+
+    def _on_reservation(self, event: ReservationEvent, reservation: Reservation) -> None:
+        self._publish(f"reservation.{event.value}", reservation.to_dict())
+
+    def _publish(self, op: str, data: Any) -> None:
+        with self._lock:
+            self._seq += 1
+            if not self._subscribers:
+                return
+            frame = {"seq": self._seq, "ts": time.time(), "op": op, "data": data}
+            for sub in self._subscribers:
+                try:
+                    sub.frames.put_nowait(frame)
+                except queue.Full:
+                    sub.overflow = True
+
+    def _serve(self, conn: socket.socket, reader: io.BufferedIOBase, peer: str) -> None:
+        if not self._handshake(conn, reader, peer):
+            return
+        with self._lock:
+            sub = _Subscriber(peer, self._seq)
+            self._subscribers.append(sub)
+        logger.info("Репликация: подключился резервный экземпляр %s", peer)
+        try:
+            # Снимок — после подписки: всё, что изменится дальше, уже в очереди подписчика
+            snapshot = self._stores.persister.snapshot()
+            _send(conn, {"seq": sub.start_seq, "ts": time.time(), "op": "snapshot", "data": snapshot})
+            while not sub.overflow:
+                try:
+                    frame = sub.frames.get(timeout=HEARTBEAT_S)
+                except queue.Empty:
+                    frame = {"seq": self._seq, "ts": time.time(), "op": "heartbeat", "data": None}
+                _send(conn, frame)
+            logger.warning("Репликация: резерв %s отстал больше чем на %d операций, отключаю", peer, MAX_BACKLOG)
+        except OSError as e:
+            logger.warning("Репликация: соединение с резервом %s потеряно: %s", peer, e)
+        finally:
+            with self._lock:
+                self._subscribers.remove(sub)
+
+    def _handshake(self, conn: socket.socket, reader: io.BufferedIOBase, peer: str) -> bool:
+        """Резерв доказывает знание секрета до того, как получит снимок; основной отвечает тем же."""
+        nonce = secrets.token_hex(16)
+        try:
+            conn.settimeout(HANDSHAKE_TIMEOUT_S)
+            _send(conn, {"op": "challenge", "nonce": nonce})
+            reply = json.loads(reader.readline(HANDSHAKE_LINE_MAX))
+            if not isinstance(reply, dict) or reply.get("op") != "auth" or not _verify(
+                self._secret, "standby", nonce, reply.get("mac")
+            ):
+                logger.warning("Репликация: %s не подтвердил REPLICATION_SECRET, соединение закрыто", peer)
+                _send(conn, {"op": "denied"})
+                return False
+            _send(conn, {"op": "welcome", "mac": _mac(self._secret, "primary", str(reply.get("nonce", "")))})
+            conn.settimeout(None)
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning("Репликация: рукопожатие с %s не удалось: %s", peer, e)
+            return False
+
+
+class ReplicationStandby:
+    """Клиент репликации на резервном экземпляре: держит копию состояния до команды promote()."""
+
+    def __init__(self, address: str, secret: str, stores: Stores, on_promote: Callable[[], None]) -> None:
+        self._address = address
+        self._secret = secret
+        self._stores = stores
+        self._on_promote = on_promote
+        self._applied_seq = 0
+        self._head_seq = 0
+        self._lag_s = 0.0
+        self._last_frame_at = 0.0
+        self._connected = False
+        self._sock: socket.socket | None = None
+        self._stop = threading.Event()
+        self._promoted = threading.Event()
+        self._promote_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def promoted(self) -> bool:
+        return self._promoted.is_set()
+
+    def start(self) -> None:
+        REGISTRY.gauge_callback(
+            "inbibe_replication_lag_seconds", "Отставание резерва от основного экземпляра по времени", (),
+            lambda: {(): self.lag_seconds()},
+        )
+        REGISTRY.gauge_callback(
+            "inbibe_replication_lag_ops", "Операции основного экземпляра, ещё не применённые резервом", (),
+            lambda: {(): float(self._head_seq - self._applied_seq)},
+        )
+        REGISTRY.gauge_callback(
+            "inbibe_replication_connected", "1 — резерв подключён к основному экземпляру", (),
+            lambda: {(): 1.0 if self._connected else 0.0},
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True, name="replication-standby")
+        self._thread.start()
+
+    def wait_promoted(self, timeout: float | None = None) -> bool:
+        return self._promoted.wait(timeout)
+
+    def promote(self) -> bool:
+        """Останавливает приём потока и переводит экземпляр в основной. False — если уже переведён."""
+        with self._promote_lock:
+            if self.promoted:
+                return False
+            self._stop.set()
+            self._disconnect()
+            if self._thread is not None:
+                self._thread.join()
+            logger.warning(
+                "Резерв переводится в основной: применено операций до seq=%d, отставание %.1f с",
+                self._applied_seq, self.lag_seconds(),
+            )
+            self._on_promote()
+            self._promoted.set()
+            return True
+
+    def lag_seconds(self) -> float:
+        if self.promoted:
+            return 0.0
+        if self._connected or not self._last_frame_at:
+            return self._lag_s
+        return self._lag_s + time.time() - self._last_frame_at
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "role": "primary" if self.promoted else "standby",
+            "primary": self._address,
+            "connected": self._connected,
+            "applied_seq": self._applied_seq,
+            "lag_ops": self._head_seq - self._applied_seq,
+            "lag_seconds": round(self.lag_seconds(), 3),
+        }
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                self._follow()
+                backoff = 0.5
+            except (OSError, ValueError) as e:
+                if self._stop.is_set():
+                    return
+                logger.warning("Репликация: нет связи с основным экземпляром %s: %s", self._address, e)
+            finally:
+                self._connected = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_S)
+
+    def _follow(self) -> None:
+        family, address = parse_address(self._address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(HEARTBEAT_S * 5)
+        sock.connect(address)
+        self._sock = sock
+        try:
+            with sock.makefile("rb") as reader:
+                self._handshake(sock, reader)
+                for line in reader:
+                    frame = json.loads(line)
+                    self._apply(frame)
+                    self._connected = True
+        finally:
+            self._disconnect()
+
+    def _handshake(self, sock: socket.socket, reader: io.BufferedIOBase) -> None:
+        challenge = json.loads(reader.readline(HANDSHAKE_LINE_MAX))
+        if not isinstance(challenge, dict) or challenge.get("op") != "challenge":
+            raise ValueError("основной экземпляр не запросил REPLICATION_SECRET")
+        nonce = secrets.token_hex(16)
+        _send(sock, {"op": "auth", "mac": _mac(self._secret, "standby", str(challenge.get("nonce"))), "nonce": nonce})
+        reply = json.loads(reader.readline(HANDSHAKE_LINE_MAX))
+        if not isinstance(reply, dict) or reply.get("op") != "welcome":
+            raise ValueError("основной экземпляр не принял REPLICATION_SECRET")
+        if not _verify(self._secret, "primary", nonce, reply.get("mac")):
+            raise ValueError("основной экземпляр не подтвердил REPLICATION_SECRET")
+
+    def _disconnect(self) -> None:
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def _apply(self, frame: dict[str, Any]) -> None:
+        op, data, seq = frame["op"], frame["data"], frame["seq"]
+        now = time.time()
+        self._lag_s = max(0.0, now - frame["ts"])
+        self._last_frame_at = now
+        self._head_seq = max(self._head_seq, seq)
+        if op == "heartbeat":
+            return
+        if op == "snapshot":
+            self._stores.persister.restore(data)
+            self._stores.availability.rebuild(self._stores.occupancy.list_all())
+            self._head_seq = self._applied_seq = seq
+            logger.info("Репликация: получен снимок состояния (seq=%d)", seq)
+            return
+        try:
+            _APPLY[op](self._stores, data)
+        except TableConflict as e:
+            # Копия разошлась с основным экземпляром — переподключение принесёт свежий снимок
+            raise ValueError(f"конфликт столов при применении seq={seq}") from e
+        self._applied_seq = seq
+
+
+def _send(conn: socket.socket, frame: dict[str, Any]) -> None:
+    conn.sendall(json.dumps(frame, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+
+
+def _mac(secret: str, role: str, nonce: str) -> str:
+    # Роль в подписи: ответ одной стороны нельзя вернуть ей же как ответ другой
+    return hmac.new(secret.encode("utf-8"), f"{role}:{nonce}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _verify(secret: str, role: str, nonce: str, mac: object) -> bool:
+    return isinstance(mac, str) and hmac.compare_digest(
+        mac.encode("utf-8"), _mac(secret, role, nonce).encode("utf-8")
+    )
+
+
+def _encode(op: str, payload: Any) -> Any:
+    if isinstance(payload, Booking):
+        return payload.to_dict()
+    if isinstance(payload, UserFlow):
+        return flow_to_dict(payload)
+    if op == "delivery.drain":
+        return [b.id for b in payload]
+    if isinstance(payload, tuple):
+        return list(payload)
+    return payload
+
+
+def _push_delivery(s: Stores, data: dict) -> None:
+    if all(b.id != data["id"] for b in s.queue.snapshot()):
+        s.queue.enqueue(Booking.from_dict(data))
+
+
+def _add_ephemeral(s: Stores, data: list) -> None:
+    booking_id, chat_id, message_id = data
+    if [chat_id, message_id] not in s.ephemeral.snapshot().get(booking_id, []):
+        s.ephemeral.add(booking_id, chat_id, message_id)
+
+
+def _drain_delivery(s: Stores, ids: list[str]) -> None:
+    drained = set(ids)
+    for booking in s.queue.drain():
+        if booking.id not in drained:
+            s.queue.enqueue(booking)
+
+
+def _reserve(s: Stores, data: dict) -> None:
+    r = Reservation.from_dict(data)
+    s.occupancy.reserve(r.booking_id, set(r.tables), r.start, r.end - r.start)
+
+
+_APPLY: dict[str, Callable[[Stores, Any], object]] = {
+    # Версию уже присвоил основной узел: на резерве заявка кладётся как есть
+    "booking.put": lambda s, d: s.bookings.add(Booking.from_dict(d)),
+    "booking.delete": lambda s, d: s.bookings.delete(d),
+    "flow.put": lambda s, d: s.flows.save(flow_from_dict(d)),
+    "flow.delete": lambda s, d: s.flows.delete(d),
+    "delivery.push": _push_delivery,
+    "delivery.drain": _drain_delivery,
+    "ephemeral.add": _add_ephemeral,
+    "ephemeral.take": lambda s, d: s.ephemeral.take(d),
+    f"reservation.{ReservationEvent.RESERVED.value}": _reserve,
+    f"reservation.{ReservationEvent.RELEASED.value}": lambda s, d: s.occupancy.release(d["booking_id"]),
+}
+
+
+Replication = ReplicationPrimary | ReplicationStandby
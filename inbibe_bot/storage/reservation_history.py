@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Iterable
+
+from inbibe_bot.core.occupancy import Reservation, ReservationEvent
+
+logger = logging.getLogger(__name__)
+
+# Строка журнала об уборке прошедших броней: {"event": "pruned", "before": ...}.
+# Новые журналы после уборки сжимаются (compact), такие строки остались только в старых
+_PRUNED = "pruned"
+
+
+class ReservationHistory:
+    """Журнал занятия/освобождения столов (JSON Lines, дозапись).
+
+    Из него восстанавливается индекс занятости, если в state.json его нет или файл повреждён.
+    После уборки прошедших броней (TableOccupancy.prune) журнал переписывается из действующих
+    броней (compact) — иначе он рос бы без конца, а проигрывание вернуло бы убранное.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = Lock()
+
+    def append(self, event: ReservationEvent, reservation: Reservation) -> None:
+        line = json.dumps({"event": event.value, **reservation.to_dict()}, ensure_ascii=False)
+        try:
+            with self._lock:
+                self._path.parent.mkdir(exist_ok=True)
+                with self._path.open("a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError:
+            logger.exception("Не удалось записать событие брони %s в историю", reservation.booking_id)
+
+    def compact(self, active: Callable[[], Iterable[Reservation]]) -> None:
+        """Заменяет журнал строками reserved по действующим броням.
+
+        active() вызывается под блокировкой журнала: дозапись, начатая до снимка, уже в старом файле
+        и учтена снимком, а начатая после ждёт и попадает в новый. Новый файл пишется рядом и
+        подменяет старый через os.replace — при падении остаётся либо старый журнал, либо новый целиком.
+        """
+        try:
+            with self._lock:
+                lines = [
+                    json.dumps({"event": ReservationEvent.RESERVED.value, **r.to_dict()}, ensure_ascii=False)
+                    for r in active()
+                ]
+                self._path.parent.mkdir(exist_ok=True)
+                tmp = self._path.with_name(self._path.name + ".tmp")
+                with tmp.open("w", encoding="utf-8") as f:
+                    f.writelines(line + "\n" for line in lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self._path)
+        except OSError:
+            logger.exception("Не удалось сжать историю броней")
+            return
+        logger.info("История броней сжата: %d действующих", len(lines))
+
+    def replay(self) -> list[Reservation]:
+        """Проигрывает журнал построчно и возвращает брони, действующие на его конец."""
+        active: dict[str, Reservation] = {}
+        with self._lock:
+            try:
+                f = self._path.open(encoding="utf-8")
+            except FileNotFoundError:
+                return []
+            with f:
+                for lineno, line in enumerate(f, 1):
+                    self._apply(active, lineno, line)
+        return list(active.values())
+
+    def _apply(self, active: dict[str, Reservation], lineno: int, line: str) -> None:
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+            if record.get("event") == _PRUNED:
+                before = datetime.fromisoformat(record["before"])
+                for booking_id in [k for k, r in active.items() if r.end <= before]:
+                    del active[booking_id]
+                return
+            reservation = Reservation.from_dict(record)
+            event = ReservationEvent(record["event"])
+        except (ValueError, KeyError):
+            logger.warning("Пропущена битая строка %d в %s", lineno, self._path)
+            return
+        if event == ReservationEvent.RESERVED:
+            active[reservation.booking_id] = reservation
+        else:
+            active.pop(reservation.booking_id, None)
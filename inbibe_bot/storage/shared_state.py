@@ -0,0 +1,366 @@
+"""Хранилища поверх Redis-совместимого сервера: состояние общее для всех реплик бота.
+
+Классы реализуют те же абстрактные хранилища, что и in-memory, поэтому хэндлеры не меняются. Объекты,
+которые возвращают get/require, — копии: изменения видны другим репликам только после update()/save().
+Слушатели получают только изменения, сделанные через этот процесс, — о чужих хранилище не сообщает.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+import telebot
+
+from inbibe_bot.core.booking import Booking
+from inbibe_bot.core.errors import BookingBusy, BookingConflict, BookingNotFound, TableConflict
+from inbibe_bot.core.occupancy import Reservation, ReservationEvent, TableOccupancy
+from inbibe_bot.core.user_flow import UserFlow
+from inbibe_bot.shared.datetime_utils import to_msk_naive
+from inbibe_bot.shared.resp import RespClient, RespError
+from inbibe_bot.storage.booking_repository import BookingRepository
+from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
+from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService
+from inbibe_bot.storage.persistence import flow_from_dict, flow_to_dict
+from inbibe_bot.storage.snapshots import Snapshot
+from inbibe_bot.storage.user_flow_repository import UserFlowRepository
+
+# Попыток транзакции WATCH/MULTI: EXEC срывается и от записей других реплик в тот же хэш, но бесконечно
+# повторять нельзя — под постоянной чужой записью поток хэндлера висел бы. Дальше — BookingBusy
+MAX_WATCH_ATTEMPTS = 16
+
+
+class RespBookingRepository(BookingRepository):
+    """Заявки в хэше <prefix>bookings (id -> JSON)."""
+
+    def __init__(self, client: RespClient, prefix: str) -> None:
+        super().__init__()
+        self._client = client
+        self._key = f"{prefix}bookings"
+
+    def add(self, booking: Booking) -> None:
+        self._client.execute("HSET", self._key, booking.id, _dumps(booking.to_dict()))
+        self._emit("booking.put", booking.copy())
+        self._notify()
+
+    def get(self, booking_id: str) -> Booking | None:
+        raw = self._client.execute("HGET", self._key, booking_id)
+        return Booking.from_dict(json.loads(raw)) if raw is not None else None
+
+    def update(self, booking: Booking) -> None:
+        """Compare-and-set по полю version: WATCH на хэш, запись в MULTI/EXEC.
+
+        WATCH следит за всем хэшем, поэтому EXEC срывается и от изменений других заявок — тогда
+        версия перечитывается и запись повторяется (до MAX_WATCH_ATTEMPTS раз, затем BookingBusy);
+        конфликт только если изменилась эта заявка.
+        """
+        stored = booking.copy()
+        stored.version += 1
+        for _ in range(MAX_WATCH_ATTEMPTS):
+            with self._client.connection("hset") as conn:
+                conn.execute("WATCH", self._key)
+                raw = conn.execute("HGET", self._key, booking.id)
+                if raw is None:
+                    conn.execute("UNWATCH")
+                    raise BookingNotFound(booking.id)
+                actual = json.loads(raw).get("version", 0)
+                if actual != booking.version:
+                    conn.execute("UNWATCH")
+                    raise BookingConflict(booking.id, booking.version, actual)
+                replies = conn.pipeline(
+                    [("MULTI",), ("HSET", self._key, booking.id, _dumps(stored.to_dict())), ("EXEC",)]
+                )
+            if isinstance(replies[-1], RespError):
+                raise replies[-1]
+            if replies[-1] is not None:
+                break
+        else:
+            raise BookingBusy(booking.id)
+        booking.version = stored.version
+        self._emit("booking.put", stored)
+        self._notify()
+
+    def delete(self, booking_id: str) -> None:
+        self._client.execute("HDEL", self._key, booking_id)
+        self._emit("booking.delete", booking_id)
+        self._notify()
+
+    def snapshot(self) -> Snapshot[str, Booking]:
+        """Одно чтение HVALS: согласовано на момент команды, но собирается заново на каждый вызов."""
+        return Snapshot.of((b.id, b) for b in self.list_all())
+
+    def list_all(self) -> list[Booking]:
+        return [Booking.from_dict(json.loads(raw)) for raw in self._client.execute("HVALS", self._key)]
+
+    # Активных заявок единицы-десятки: поиск перебором дешевле поддержки вторичных индексов
+    def find_by_admin_message_id(self, message_id: int) -> Booking | None:
+        return next((b for b in self.list_all() if b.admin_message_id == message_id), None)
+
+    def find_by_table_request_message_id(self, message_id: int) -> Booking | None:
+        return next((b for b in self.list_all() if b.table_request_message_id == message_id), None)
+
+    def find_by_alt_request_message_id(self, message_id: int) -> Booking | None:
+        return next((b for b in self.list_all() if b.alt_request_message_id == message_id), None)
+
+
+class RespUserFlowRepository(UserFlowRepository):
+    """Сценарии пользователей в хэше <prefix>flows (user_id -> JSON)."""
+
+    def __init__(self, client: RespClient, prefix: str) -> None:
+        super().__init__()
+        self._client = client
+        self._key = f"{prefix}flows"
+
+    def get(self, user_id: int) -> UserFlow | None:
+        raw = self._client.execute("HGET", self._key, user_id)
+        return flow_from_dict(json.loads(raw)) if raw is not None else None
+
+    def save(self, flow: UserFlow) -> None:
+        self._client.execute("HSET", self._key, flow.user_id, _dumps(flow_to_dict(flow)))
+        self._emit("flow.put", flow.copy())
+        self._notify()
+
+    def delete(self, user_id: int) -> None:
+        self._client.execute("HDEL", self._key, user_id)
+        self._emit("flow.delete", user_id)
+        self._notify()
+
+    def snapshot(self) -> Snapshot[int, UserFlow]:
+        return Snapshot.of((f.user_id, f) for f in self.list_all())
+
+    def list_all(self) -> list[UserFlow]:
+        return [flow_from_dict(json.loads(raw)) for raw in self._client.execute("HVALS", self._key)]
+
+
+class RespBookingQueue(ApprovedBookingQueue):
+    """Очередь одобренных заявок — список <prefix>delivery; drain атомарен, заявку получит одна реплика."""
+
+    def __init__(self, client: RespClient, prefix: str) -> None:
+        super().__init__()
+        self._client = client
+        self._key = f"{prefix}delivery"
+
+    def enqueue(self, booking: Booking) -> None:
+        self._client.execute("RPUSH", self._key, _dumps(booking.to_dict()))
+        self._emit("delivery.push", booking)
+        self._notify()
+
+    def drain(self) -> list[Booking]:
+        raw, _ = self._client.transaction(("LRANGE", self._key, 0, -1), ("DEL", self._key))
+        items = [Booking.from_dict(json.loads(r)) for r in raw]
+        if items:
+            self._emit("delivery.drain", items)
+            self._notify()
+        return items
+
+    def size(self) -> int:
+        size: int = self._client.execute("LLEN", self._key)
+        return size
+
+    def snapshot(self) -> list[Booking]:
+        return [Booking.from_dict(json.loads(r)) for r in self._client.execute("LRANGE", self._key, 0, -1)]
+
+
+class RespEphemeralMessages(EphemeralMessageService):
+    """Временные сообщения: список <prefix>ephemeral:<booking_id> и множество заявок <prefix>ephemeral."""
+
+    def __init__(self, client: RespClient, prefix: str, bot: telebot.TeleBot | None) -> None:
+        super().__init__(bot)
+        self._client = client
+        self._index = f"{prefix}ephemeral"
+
+    def add(self, booking_id: str, chat_id: int, message_id: int) -> None:
+        self._client.transaction(
+            ("RPUSH", self._list(booking_id), f"{chat_id}:{message_id}"),
+            ("SADD", self._index, booking_id),
+        )
+        self._emit("ephemeral.add", (booking_id, chat_id, message_id))
+        self._notify()
+
+    def take(self, booking_id: str) -> list[tuple[int, int]]:
+        raw, _, _ = self._client.transaction(
+            ("LRANGE", self._list(booking_id), 0, -1),
+            ("DEL", self._list(booking_id)),
+            ("SREM", self._index, booking_id),
+        )
+        self._emit("ephemeral.take", booking_id)
+        self._notify()
+        return [_parse_message(item) for item in raw]
+
+    def has(self, booking_id: str) -> bool:
+        exists: int = self._client.execute("EXISTS", self._list(booking_id))
+        return exists > 0
+
+    def count(self) -> int:
+        return sum(len(v) for v in self.snapshot().values())
+
+    def snapshot(self) -> dict[str, list[list[int]]]:
+        booking_ids: list[str] = self._client.execute("SMEMBERS", self._index)
+        if not booking_ids:
+            return {}
+        with self._client.connection("lrange") as conn:
+            lists = conn.pipeline([("LRANGE", self._list(b), 0, -1) for b in booking_ids])
+        return {b: [list(_parse_message(m)) for m in items] for b, items in zip(booking_ids, lists) if items}
+
+    def restore(self, data: dict[str, list[list[int]]]) -> None:
+        stale: list[str] = self._client.execute("SMEMBERS", self._index)
+        commands: list[tuple[str | int, ...]] = [("DEL", self._list(b)) for b in stale]
+        commands.append(("DEL", self._index))
+        for booking_id, messages in data.items():
+            if messages:
+                commands.append(("RPUSH", self._list(booking_id), *(f"{c}:{m}" for c, m in messages)))
+                commands.append(("SADD", self._index, booking_id))
+        self._client.transaction(*commands)
+
+    def _list(self, booking_id: str) -> str:
+        return f"{self._index}:{booking_id}"
+
+
+class RespTableOccupancy(TableOccupancy):
+    """Занятость столов в хэше <prefix>reservations (booking_id -> JSON) и хэшах по дням начала брони
+    <prefix>reservations:<YYYY-MM-DD>: проверка пересечений читает только соседние дни.
+
+    reserve() — WATCH на индекс и дни, которые могут пересечься с бронью, чтение их броней и запись
+    в MULTI/EXEC: если другая реплика заняла или освободила стол в эти дни, EXEC срывается и проверка
+    повторяется (до MAX_WATCH_ATTEMPTS раз, затем BookingBusy). Так два админа на разных репликах не займут один стол. Сетка доступности процесса
+    обновляется по своим событиям сразу, а чужие изменения видит после AvailabilityGrid.rebuild из list_all().
+    """
+
+    def __init__(self, client: RespClient, prefix: str, tables: Iterable[int], default_duration: timedelta) -> None:
+        super().__init__(tables, default_duration)
+        self._client = client
+        self._key = f"{prefix}reservations"
+
+    def conflicts(
+        self, tables: Iterable[int], start: datetime, duration: timedelta | None = None
+    ) -> dict[int, str]:
+        probe = self._reservation("", set(tables), start, duration)
+        days = self._days(probe)
+        with self._client.connection("hvals") as conn:
+            replies = conn.pipeline([("HVALS", key) for key in days])
+        return _overlaps(probe, _parse_reservations(replies))
+
+    def reserve(
+        self,
+        booking_id: str,
+        tables: set[int],
+        start: datetime,
+        duration: timedelta | None = None,
+    ) -> Reservation:
+        reservation = self._reservation(booking_id, tables, start, duration)
+        data = _dumps(reservation.to_dict())
+        days = self._days(reservation)
+        for _ in range(MAX_WATCH_ATTEMPTS):
+            with self._client.connection("reserve") as conn:
+                conn.execute("WATCH", self._key, *days)
+                raw, *day_replies = conn.pipeline([("HGET", self._key, booking_id), *(("HVALS", d) for d in days)])
+                previous = Reservation.from_dict(json.loads(raw)) if raw is not None else None
+                others = [r for r in _parse_reservations(day_replies) if r.booking_id != booking_id]
+                busy = _overlaps(reservation, others)
+                if busy:
+                    conn.execute("UNWATCH")
+                    raise TableConflict(sorted(busy))
+                commands: list[tuple[str | int, ...]] = [("MULTI",)]
+                if previous is not None:
+                    commands.append(("HDEL", self._day(previous.start.date()), booking_id))
+                commands += [
+                    ("HSET", self._key, booking_id, data),
+                    ("HSET", self._day(reservation.start.date()), booking_id, data),
+                    ("EXEC",),
+                ]
+                replies = conn.pipeline(commands)
+            if isinstance(replies[-1], RespError):
+                raise replies[-1]
+            if replies[-1] is not None:
+                break
+        else:
+            raise BookingBusy(booking_id)
+        if previous is not None:
+            self._emit(ReservationEvent.RELEASED, previous)
+        self._emit(ReservationEvent.RESERVED, reservation)
+        return reservation
+
+    def release(self, booking_id: str) -> Reservation | None:
+        for _ in range(MAX_WATCH_ATTEMPTS):
+            with self._client.connection("release") as conn:
+                conn.execute("WATCH", self._key)
+                raw = conn.execute("HGET", self._key, booking_id)
+                if raw is None:
+                    conn.execute("UNWATCH")
+                    return None
+                reservation = Reservation.from_dict(json.loads(raw))
+                replies = conn.pipeline([
+                    ("MULTI",),
+                    ("HDEL", self._key, booking_id),
+                    ("HDEL", self._day(reservation.start.date()), booking_id),
+                    ("EXEC",),
+                ])
+            if isinstance(replies[-1], RespError):
+                raise replies[-1]
+            if replies[-1] is not None:
+                break
+        else:
+            raise BookingBusy(booking_id)
+        self._emit(ReservationEvent.RELEASED, reservation)
+        return reservation
+
+    def get(self, booking_id: str) -> Reservation | None:
+        raw = self._client.execute("HGET", self._key, booking_id)
+        return Reservation.from_dict(json.loads(raw)) if raw is not None else None
+
+    def list_all(self) -> list[Reservation]:
+        reservations = _parse_reservations([self._client.execute("HVALS", self._key)])
+        return sorted(reservations, key=lambda r: r.start)
+
+    def prune(self, before: datetime) -> int:
+        cutoff = to_msk_naive(before)
+        stale = [r for r in self.list_all() if r.end <= cutoff]
+        if not stale:
+            return 0
+        self._client.transaction(
+            ("HDEL", self._key, *(r.booking_id for r in stale)),
+            *(("HDEL", self._day(r.start.date()), r.booking_id) for r in stale),
+        )
+        self._pruned(cutoff)
+        return len(stale)
+
+    def restore(self, reservations: Iterable[Reservation]) -> None:
+        commands: list[tuple[str | int, ...]] = [("DEL", self._key)]
+        commands += [("DEL", self._day(d)) for d in {r.start.date() for r in self.list_all()}]
+        for r in reservations:
+            data = _dumps(r.to_dict())
+            commands.append(("HSET", self._key, r.booking_id, data))
+            commands.append(("HSET", self._day(r.start.date()), r.booking_id, data))
+        self._client.transaction(*commands)
+
+    def _days(self, reservation: Reservation) -> list[str]:
+        """Дни начала броней, которые могут пересечься с этой: бронь не длиннее суток, поэтому — с предыдущего."""
+        first = reservation.start.date() - timedelta(days=1)
+        count = (reservation.end.date() - first).days + 1
+        return [self._day(first + timedelta(days=i)) for i in range(count)]
+
+    def _day(self, day: date) -> str:
+        return f"{self._key}:{day.isoformat()}"
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _parse_message(item: str) -> tuple[int, int]:
+    chat_id, message_id = item.split(":")
+    return int(chat_id), int(message_id)
+
+
+def _parse_reservations(replies: list[list[str]]) -> list[Reservation]:
+    return [Reservation.from_dict(json.loads(raw)) for reply in replies for raw in reply]
+
+
+def _overlaps(reservation: Reservation, others: Iterable[Reservation]) -> dict[int, str]:
+    """{стол: ID брони} для броней из others, пересекающихся с reservation по столам и времени."""
+    busy: dict[int, str] = {}
+    for other in others:
+        if other.start < reservation.end and reservation.start < other.end:
+            for table in other.tables & reservation.tables:
+                busy[table] = other.booking_id
+    return busy
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import chain
+from operator import methodcaller
+from typing import Generic, Hashable, Iterable, Iterator, Mapping, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_VALUES = methodcaller("values")
+
+
+@dataclass(frozen=True)
+class Snapshot(Generic[K, V]):
+    """Состояние хранилища после коммита номер version; после публикации не меняется.
+
+    segments — словари сегментов ConcurrentMap (ключ лежит в segments[hash(key) % len(segments)]).
+    Сегмент при записи копируется (copy-on-write), а опубликованный словарь больше никто не трогает,
+    поэтому снимок обходят без блокировок и копий.
+    """
+
+    version: int = 0
+    segments: tuple[Mapping[K, V], ...] = field(default_factory=lambda: ({},))
+
+    @classmethod
+    def of(cls, pairs: Iterable[tuple[K, V]]) -> Snapshot[K, V]:
+        """Снимок без истории коммитов (version 0) — для хранилищ, которые не публикуют снимки сами."""
+        return cls(0, (dict(pairs),))
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self.segments)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._segment(key)
+
+    def get(self, key: K) -> V | None:
+        return self._segment(key).get(key)
+
+    def values(self) -> Iterator[V]:
+        return chain.from_iterable(map(_VALUES, self.segments))
+
+    def _segment(self, key: K) -> Mapping[K, V]:
+        return self.segments[hash(key) % len(self.segments)]
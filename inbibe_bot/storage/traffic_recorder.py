@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import IO, Any
+
+import telebot.apihelper as apihelper
+
+from inbibe_bot.shared.telegram_transport import RequestSender, default_sender
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_NAME = "capture.jsonl.gz"
+
+# Методы Bot API, ответ на которые — отправленное/изменённое сообщение
+_MESSAGE_METHODS = {"sendMessage", "editMessageText", "editMessageReplyMarkup"}
+_PERSON_KEYS = {"from", "chat", "user", "sender_chat", "forward_from"}
+_PHONE = re.compile(r"^\+?[\d\s\-()]{10,}$")
+# Тексты кнопок и команды — не персональные данные, их нужно воспроизводить как есть
+_KEEP_TEXTS = {"Начать бронирование"}
+
+class _Scrubber:
+    """Заменяет персональные данные стабильными псевдонимами.
+
+    Один и тот же пользователь получает один и тот же псевдоним в пределах соли,
+    поэтому сценарии в записи остаются связными. Отрицательные ID (группы) не трогаются:
+    по ним бот узнаёт админ-чат.
+    """
+
+    def __init__(self, salt: bytes) -> None:
+        self._salt = salt
+
+    def update(self, raw: dict[str, Any]) -> dict[str, Any]:
+        data: dict[str, Any] = json.loads(json.dumps(raw))
+        self._walk(data, None, None)
+        return data
+
+    def booking_request(self, body: dict[str, Any]) -> dict[str, Any]:
+        data = dict(body)
+        if str(data.get("user_id", "")).isdigit():
+            data["user_id"] = self.user_id(int(data["user_id"]))
+        if "name" in data:
+            data["name"] = self._alias("name", str(data["name"]))
+        if "phone" in data:
+            data["phone"] = self._phone(str(data["phone"]))
+        return data
+
+    def user_id(self, value: int) -> int:
+        if value <= 0:
+            return value
+        return 1_000_000_000 + self._digest("id", str(value)) % 9_000_000_000
+
+    def _walk(self, node: Any, key: str | None, parent: str | None) -> None:
+        if isinstance(node, list):
+            for item in node:
+                self._walk(item, key, parent)
+            return
+        if not isinstance(node, dict):
+            return
+        if key in _PERSON_KEYS:
+            self._person(node)
+        if key in ("reply_to_message", "pinned_message") or (key == "message" and parent == "callback_query"):
+            # Сообщения бота: текст содержит данные заявки, для воспроизведения нужны только ID и кнопки
+            for field in ("text", "entities", "caption"):
+                node.pop(field, None)
+        elif isinstance(node.get("text"), str) and node.get("chat", {}).get("type") == "private":
+            node["text"] = self._private_text(node["text"])
+        if isinstance(node.get("contact"), dict):
+            contact = node["contact"]
+            contact["phone_number"] = self._phone(str(contact.get("phone_number", "")))
+            contact["first_name"] = self._alias("name", str(contact.get("first_name", "")))
+            contact.pop("last_name", None)
+            contact.pop("vcard", None)
+            if isinstance(contact.get("user_id"), int):
+                contact["user_id"] = self.user_id(contact["user_id"])
+        for child_key, child in node.items():
+            self._walk(child, child_key, key)
+
+    def _person(self, node: dict[str, Any]) -> None:
+        if isinstance(node.get("id"), int):
+            node["id"] = self.user_id(node["id"])
+        if node.get("first_name"):
+            node["first_name"] = self._alias("user", str(node["id"]))
+        for field in ("last_name", "username", "bio"):
+            node.pop(field, None)
+
+    def _private_text(self, text: str) -> str:
+        stripped = text.strip()
+        if stripped.startswith("/") or stripped.isdigit() or stripped in _KEEP_TEXTS:
+            return text
+        if _PHONE.match(stripped):
+            return self._phone(stripped)
+        return self._alias("name", stripped)
+
+    def _phone(self, phone: str) -> str:
+        return "+7999" + f"{self._digest('phone', phone) % 10_000_000:07d}"
+
+    def _alias(self, kind: str, value: str) -> str:
+        return f"Гость-{self._digest(kind, value) % 0xFFFFFF:06x}"
+
+    def _digest(self, kind: str, value: str) -> int:
+        h = hashlib.blake2b(f"{kind}:{value}".encode("utf-8"), key=self._salt, digest_size=8)
+        return int.from_bytes(h.digest(), "big")
+
+
+class TrafficRecorder:
+    """Запись входящего трафика (вебхук, getUpdates, /api/book) и ответов Bot API для последующего воспроизведения.
+
+    Пишет JSON Lines в gzip с ротацией по размеру; персональные данные вычищаются до записи.
+    Каждая запись дописывается отдельным sync-flush, так что файл читается и после падения процесса.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, backups: int, salt: bytes | None = None) -> None:
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._scrubber = _Scrubber(salt or os.urandom(16))
+        self._lock = Lock()
+        self._raw: IO[bytes] | None = None
+        self._gz: gzip.GzipFile | None = None
+        self._inner_sender: RequestSender | None = None
+
+    @property
+    def path(self) -> Path:
+        return self._directory / CAPTURE_NAME
+
+    def install(self) -> None:
+        """Встраивается в транспорт telebot: пишет ответы Bot API, включая апдейты из getUpdates (polling)."""
+        previous = apihelper.CUSTOM_REQUEST_SENDER
+        self._inner_sender = previous or default_sender
+        apihelper.CUSTOM_REQUEST_SENDER = self._send  # type: ignore[assignment]
+        logger.info("Запись трафика включена: %s", self.path)
+
+    def record_update(self, raw: dict[str, Any], source: str) -> None:
+        self._write({"k": "in", "src": source, "update": self._scrubber.update(raw)})
+
+    def record_api(self, route: str, body: bytes, status: int) -> None:
+        try:
+            parsed = json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            parsed = None
+        if isinstance(parsed, dict):
+            record: dict[str, Any] = {"body": self._scrubber.booking_request(parsed)}
+        else:
+            # Тело не разобрать — неизвестно, где в нём персональные данные; сохраняется только размер
+            record = {"invalid": len(body)}
+        self._write({"k": "api", "route": route, "status": status, **record})
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_file()
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        files: Any = None,
+        timeout: Any = None,
+        proxies: Any = None,
+    ) -> Any:
+        assert self._inner_sender is not None
+        result = self._inner_sender(method, url, params=params, files=files, timeout=timeout, proxies=proxies)
+        try:
+            self._record_call(url.rsplit("/", 1)[-1], params or {}, result)
+        except Exception:
+            logger.exception("Не удалось записать вызов Bot API")
+        return result
+
+    def _record_call(self, name: str, params: dict[str, Any], result: Any) -> None:
+        if getattr(result, "status_code", None) != 200:
+            self._write({"k": "out", "method": name, "ok": False})
+            return
+        payload = result.json()
+        if name == "getUpdates":
+            for raw in payload.get("result") or []:
+                self.record_update(raw, "polling")
+            return
+        record: dict[str, Any] = {"k": "out", "method": name, "ok": bool(payload.get("ok"))}
+        if "chat_id" in params:
+            record["chat_id"] = self._scrubber.user_id(int(params["chat_id"]))
+        if name == "answerCallbackQuery":
+            record["callback_query_id"] = params.get("callback_query_id")
+            record["text"] = params.get("text")
+        elif name in _MESSAGE_METHODS and isinstance(payload.get("result"), dict):
+            record["message_id"] = payload["result"].get("message_id")
+            markup = params.get("reply_markup")
+            if markup:
+                record["buttons"] = _callback_buttons(markup)
+        self._write(record)
+
+    def _write(self, record: dict[str, Any]) -> None:
+        line = json.dumps({"t": round(time.time(), 4), **record}, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                gz = self._open()
+                gz.write(line.encode("utf-8"))
+                gz.flush()
+                assert self._raw is not None
+                if self._raw.tell() >= self._max_bytes:
+                    self._rotate()
+        except OSError:
+            logger.exception("Ошибка записи трафика в %s", self.path)
+
+    def _open(self) -> gzip.GzipFile:
+        if self._gz is None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            if self.path.exists():
+                # Файл от прошлого запуска мог остаться без gzip-трейлера — дописывать в него нельзя
+                self._rotate()
+            self._raw = self.path.open("ab")
+            self._gz = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        return self._gz
+
+    def _rotate(self) -> None:
+        self._close_file()
+        rotated = self._directory / f"capture-{datetime.now():%Y%m%d-%H%M%S-%f}.jsonl.gz"
+        self.path.rename(rotated)
+        old = sorted(self._directory.glob("capture-*.jsonl.gz"))
+        for stale in old[:-self._backups] if self._backups else old:
+            stale.unlink(missing_ok=True)
+        logger.info("Файл записи трафика ротирован: %s", rotated.name)
+
+    def _close_file(self) -> None:
+        if self._gz is not None:
+            self._gz.close()
+            self._gz = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+
+def read_capture(paths: list[Path]) -> list[dict[str, Any]]:
+    """Читает записи из файлов по порядку; обрезанный хвост (процесс упал при записи) пропускается."""
+    records: list[dict[str, Any]] = []
+    for path in paths:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        records.append(json.loads(line))
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+            logger.warning("Файл %s обрезан, прочитано до места обрыва", path)
+    return records
+
+
+def _callback_buttons(markup: Any) -> list[str]:
+    data = json.loads(markup) if isinstance(markup, str) else markup
+    return [
+        button["callback_data"]
+        for row in data.get("inline_keyboard", [])
+        for button in row
+        if "callback_data" in button
+    ]
+
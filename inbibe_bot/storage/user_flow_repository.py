@@ -1,44 +1,86 @@
 from __future__ import annotations
 
-from threading import RLock
+from abc import ABC, abstractmethod
 from typing import Callable
 
 from inbibe_bot.core.user_flow import UserFlow
+from inbibe_bot.storage.concurrent_map import ConcurrentMap
+from inbibe_bot.storage.mutations import MutationListener
+from inbibe_bot.storage.snapshots import Snapshot
 
 
-class UserFlowRepository:
+class UserFlowRepository(ABC):
+    """Сценарии гостей: общий контракт in-memory хранилища и хранилища поверх Redis (shared_state).
+
+    get/get_or_create выдают копию: хэндлер меняет её без блокировок и сохраняет через save().
+    get_or_create ничего не записывает — новый сценарий появляется в хранилище только после save().
+    snapshot() и list_all() — только для чтения.
+    """
+
     def __init__(self) -> None:
-        self._data: dict[int, UserFlow] = {}
-        self._lock = RLock()
         self._on_change: Callable[[], None] | None = None
+        self._listeners: list[MutationListener] = []
 
     def set_change_callback(self, fn: Callable[[], None]) -> None:
         self._on_change = fn
 
+    def add_listener(self, fn: MutationListener) -> None:
+        self._listeners.append(fn)
+
     def get_or_create(self, user_id: int) -> UserFlow:
-        with self._lock:
-            if user_id not in self._data:
-                self._data[user_id] = UserFlow(user_id=user_id)
-        return self._data[user_id]
+        return self.get(user_id) or UserFlow(user_id=user_id)
+
+    @abstractmethod
+    def get(self, user_id: int) -> UserFlow | None: ...
+
+    @abstractmethod
+    def save(self, flow: UserFlow) -> None: ...
+
+    @abstractmethod
+    def delete(self, user_id: int) -> None: ...
+
+    @abstractmethod
+    def snapshot(self) -> Snapshot[int, UserFlow]: ...
+
+    @abstractmethod
+    def list_all(self) -> list[UserFlow]: ...
+
+    def _emit(self, op: str, payload: object) -> None:
+        for listener in self._listeners:
+            listener(op, payload)
+
+    def _notify(self) -> None:
+        if self._on_change:
+            self._on_change()
+
+
+class InMemoryUserFlowRepository(UserFlowRepository):
+    """Сценарии в памяти процесса — ConcurrentMap, как у InMemoryBookingRepository."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._data: ConcurrentMap[int, UserFlow] = ConcurrentMap("lock.flows")
 
     def get(self, user_id: int) -> UserFlow | None:
-        with self._lock:
-            return self._data.get(user_id)
+        flow = self._data.get(user_id)
+        return flow.copy() if flow is not None else None
 
     def save(self, flow: UserFlow) -> None:
-        with self._lock:
-            self._data[flow.user_id] = flow
+        stored = flow.copy()
+        with self._data.locked(flow.user_id):
+            self._data.put(flow.user_id, stored)
+            self._emit("flow.put", stored)
         self._notify()
 
     def delete(self, user_id: int) -> None:
-        with self._lock:
-            self._data.pop(user_id, None)
+        with self._data.locked(user_id):
+            self._data.pop(user_id)
+            self._emit("flow.delete", user_id)
         self._notify()
 
-    def list_all(self) -> list[UserFlow]:
-        with self._lock:
-            return list(self._data.values())
+    def snapshot(self) -> Snapshot[int, UserFlow]:
+        return self._data.snapshot()
 
-    def _notify(self) -> None:
-        if self._on_change:
-            self._on_change()
+    def list_all(self) -> list[UserFlow]:
+        """Сохранённые сценарии из снимка — только для чтения."""
+        return list(self._data.snapshot().values())
@@ -1,19 +1,76 @@
 import logging
+import signal
 import sys
-import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
+import telebot
+from telebot.types import WebhookInfo
+
+from inbibe_bot.bootstrap import build_context
+from inbibe_bot.client.bot_factory import build_bot
+from inbibe_bot.client.update_filter import ALLOWED_UPDATES
+from inbibe_bot.client.webhook import WebhookRegistration
 from inbibe_bot.config import AppConfig, ConfigError
-from inbibe_bot.core.booking_workflow import BookingWorkflow
-from inbibe_bot.core.formatter import BookingFormatter
-from inbibe_bot.client.bot_factory import Deps, build_bot, register_all_handlers
+from inbibe_bot.lifecycle import Lifecycle
 from inbibe_bot.logging_config import setup_logging
 from inbibe_bot.server.http_server import build_server
-from inbibe_bot.server.routes import ServerDeps
-from inbibe_bot.storage.booking_repository import BookingRepository
-from inbibe_bot.storage.delivery_queue import ApprovedBookingQueue
-from inbibe_bot.storage.ephemeral_messages import EphemeralMessageService
-from inbibe_bot.storage.persistence import StatePersister
-from inbibe_bot.storage.user_flow_repository import UserFlowRepository
+from inbibe_bot.server.deps import ServerDeps
+from inbibe_bot.shared.leader_election import LeaderElector
+from inbibe_bot.storage.replication import ReplicationStandby
+
+
+def poll_while_leader(bot: telebot.TeleBot, elector: LeaderElector, stopping: threading.Event) -> None:
+    """Опрашивает Telegram, только пока реплика лидер; остальные реплики обслуживают HTTP и ждут.
+
+    stop_polling не прерывает идущий getUpdates, поэтому long poll короткий (elector.poll_timeout_s):
+    снятый лидер дочитывает не дольше интервала продления аренды, а не 30 с.
+    """
+    while not stopping.is_set():
+        if not elector.wait_elected(1):
+            continue
+        poller = threading.Thread(
+            target=bot.polling,
+            kwargs={
+                "non_stop": True,
+                "timeout": elector.poll_timeout_s + 10,
+                "long_polling_timeout": elector.poll_timeout_s,
+                "allowed_updates": ALLOWED_UPDATES,
+            },
+            daemon=True,
+            name="tg-polling",
+        )
+        poller.start()
+        while not stopping.is_set() and not elector.wait_demoted(1):
+            pass
+        stop_polling(bot, poller)
+        if not stopping.is_set():
+            logging.info("Polling остановлен: реплика больше не лидер")
+
+
+def stop_polling(bot: telebot.TeleBot, poller: threading.Thread) -> None:
+    # polling() сбрасывает флаг остановки при старте — повторяем, пока поток не выйдет
+    while poller.is_alive():
+        bot.stop_polling()
+        poller.join(1)
+
+
+def wait_for_promotion(standby: ReplicationStandby, server_deps: ServerDeps, port: int) -> None:
+    """Резерв: принимает поток репликации и ждёт POST /api/admin/replication/promote или SIGUSR1."""
+    http_server = build_server(server_deps, port)
+    threading.Thread(target=http_server.serve_forever, daemon=True, name="http-server").start()
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(
+            signal.SIGUSR1,
+            lambda *_: threading.Thread(target=standby.promote, daemon=True, name="promote").start(),
+        )
+    logging.info("Резервный экземпляр: HTTP на порту %s, жду команды promote", port)
+    try:
+        standby.wait_promoted()
+    finally:
+        # Дальше сервер поднимается заново обычным путём запуска
+        http_server.shutdown()
+        http_server.server_close()
 
 
 if __name__ == "__main__":
@@ -25,99 +82,102 @@ if __name__ == "__main__":
         logging.error("Ошибка конфигурации: %s", e)
         sys.exit(1)
 
-    # --- Зависимости ---
-    bot = build_bot(config)
-    booking_repo = BookingRepository()
-    flow_repo = UserFlowRepository()
-    delivery_queue = ApprovedBookingQueue()
-    ephemeral = EphemeralMessageService(bot)
-    workflow = BookingWorkflow(allowed_tables=set(config.actual_tables))
-    formatter = BookingFormatter()
-
-    deps = Deps(
-        bot=bot,
-        config=config,
-        booking_repo=booking_repo,
-        flow_repo=flow_repo,
-        delivery_queue=delivery_queue,
-        ephemeral=ephemeral,
-        workflow=workflow,
-        formatter=formatter,
-    )
-
-    # --- Persistence ---
-    persister = StatePersister(
-        path=config.state_file,
-        bookings=booking_repo,
-        flows=flow_repo,
-        queue=delivery_queue,
-        ephemeral=ephemeral,
-    )
-    persister.load()
-
-    # Сохранять при каждом изменении — надёжнее чем atexit в Docker
-    for repo in (booking_repo, flow_repo, delivery_queue, ephemeral):
-        repo.set_change_callback(persister.save)
+    if config.tg_mode == "webhook" and not config.webhook_url:
+        logging.error("WEBHOOK_URL не задан, запуск невозможен")
+        sys.exit(1)
 
-    # --- Регистрация хэндлеров ---
-    register_all_handlers(deps)
+    lifecycle = Lifecycle(config.shutdown_timeout_s)
 
-    # --- Прокси ---
-    import telebot.apihelper as _apihelper
+    # Прокси и пул соединений к Telegram настраивает build_bot
     if config.tg_proxy:
-        _apihelper.proxy = {"https": config.tg_proxy}  # type: ignore[assignment]
         logging.info("Прокси для Telegram: %s", config.tg_proxy)
     else:
         logging.info("Прокси для Telegram: не задан")
 
-    # --- HTTP сервер (нужен в обоих режимах) ---
-    server_deps = ServerDeps(
-        bot=bot,
-        admin_group_id=config.admin_group_id,
-        webhook_secret=config.webhook_secret,
-        booking_repo=booking_repo,
-        delivery_queue=delivery_queue,
-        formatter=formatter,
-    )
-
     logging.info("Режим запуска: %s", config.tg_mode)
 
-    if config.tg_mode == "polling":
-        import threading
-        bot.remove_webhook()
-
-        http_server = build_server(server_deps, config.http_port)
-        threading.Thread(
-            target=http_server.serve_forever,
-            daemon=True,
-            name="http-server",
-        ).start()
-        logging.info("HTTP сервер запущен на порту %s (фоновый поток)", config.http_port)
-
+    bot = build_bot(config)
+    registration = WebhookRegistration(
+        config.webhook_url + "/webhook",
+        config.webhook_secret,
+        ALLOWED_UPDATES,
+        marker=config.state_file.with_name("webhook.json"),
+    )
+    # Запрос к Telegram идёт, пока загружается состояние; резерв спросит после promote — вебхук мог смениться
+    setup = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tg-setup")
+    prefetched: Future[object] | None = None
+    if config.replication_role != "standby":
+        prefetched = setup.submit(bot.remove_webhook if config.tg_mode == "polling" else bot.get_webhook_info)
+    setup.shutdown(wait=False)
+
+    with lifecycle.phase("context"):
+        app = build_context(config, bot)
+    router = app.router
+    keyboards = app.deps.keyboards
+
+    if app.elector is not None:
+        app.elector.start()
+
+    if app.replication is not None:
+        app.replication.start()
+    if isinstance(app.replication, ReplicationStandby):
         try:
-            bot.infinity_polling(timeout=30, long_polling_timeout=30)
+            with lifecycle.phase("standby"):
+                wait_for_promotion(app.replication, app.server_deps, config.http_port)
         except KeyboardInterrupt:
-            logging.info("Остановка бота...")
-        finally:
-            http_server.shutdown()
-            bot.remove_webhook()
+            logging.info("Остановка резервного экземпляра...")
+            sys.exit(0)
 
-    else:  # webhook
-        if not config.webhook_url:
-            logging.error("WEBHOOK_URL не задан, запуск невозможен")
-            sys.exit(1)
+    app.wheel.start()
+    app.retry.start()
 
-        bot.remove_webhook()
-        time.sleep(1)
-        bot.set_webhook(url=config.webhook_url + "/webhook", secret_token=config.webhook_secret)
-        logging.info("Webhook установлен: %s/webhook", config.webhook_url)
+    # Приём апдейтов — в фоновых потоках: главный ждёт сигнала и проводит остановку
+    with lifecycle.phase("http"):
+        http_server = build_server(app.server_deps, config.http_port)
+        threading.Thread(target=http_server.serve_forever, daemon=True, name="http-server").start()
+    logging.info("HTTP сервер запущен на порту %s", config.http_port)
 
-        try:
-            with build_server(server_deps, config.http_port) as httpd:
-                logging.info("HTTP сервер запущен на порту %s", config.http_port)
-                httpd.serve_forever()
-        except KeyboardInterrupt:
-            logging.info("Остановка бота...")
-        finally:
-            bot.remove_webhook()
-            logging.info("Webhook удален")
+    if config.tg_mode == "polling":
+        with lifecycle.phase("remove_webhook"):
+            if prefetched is not None:
+                prefetched.result()
+            else:
+                bot.remove_webhook()
+
+        stopping = threading.Event()
+        if app.elector is None:
+            poller = threading.Thread(
+                target=bot.infinity_polling,
+                kwargs={"timeout": 30, "long_polling_timeout": 30, "allowed_updates": ALLOWED_UPDATES},
+                daemon=True,
+                name="tg-polling",
+            )
+        else:
+            poller = threading.Thread(
+                target=poll_while_leader, args=(bot, app.elector, stopping), daemon=True, name="tg-leader"
+            )
+        poller.start()
+
+        def stop_intake() -> None:
+            stopping.set()
+            stop_polling(bot, poller)
+
+        lifecycle.on_stop(stop_intake)
+
+    else:  # webhook
+        # Вебхук не снимается ни при остановке, ни при запуске: Telegram копит апдейты, пока процесс
+        # перезапускается, а setWebhook вызывается только при изменении адреса, секрета или allowed_updates
+        with lifecycle.phase("webhook"):
+            info = prefetched.result() if prefetched is not None else None
+            assert info is None or isinstance(info, WebhookInfo)
+            registration.ensure(bot, info)
+
+    lifecycle.on_stop(http_server.shutdown)
+    lifecycle.install_signals()
+    lifecycle.startup_done()
+
+    lifecycle.wait()
+    lifecycle.shutdown(app)
+    http_server.server_close()
+    logging.info("Статистика маршрутов: %s", router.stats())
+    logging.info("Статистика кэша клавиатур: %s", keyboards.stats())
@@ -0,0 +1,166 @@
+import asyncio
+import contextlib
+import logging
+import signal
+import sys
+import threading
+
+from aiohttp import web
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import WebhookInfo
+
+from inbibe_bot.aio import telegram
+from inbibe_bot.aio.bootstrap import build_async_context, close_context
+from inbibe_bot.aio.server import AccessLogger
+from inbibe_bot.client.update_filter import ALLOWED_UPDATES
+from inbibe_bot.client.webhook import WebhookRegistration
+from inbibe_bot.config import AppConfig, ConfigError
+from inbibe_bot.lifecycle import Lifecycle
+from inbibe_bot.logging_config import setup_logging
+from inbibe_bot.shared.leader_election import LeaderElector
+from inbibe_bot.storage.replication import ReplicationStandby
+
+
+def start_setup(
+    bot: AsyncTeleBot, config: AppConfig
+) -> tuple[asyncio.Task[bool] | None, asyncio.Task[WebhookInfo] | None]:
+    """Запрос к Telegram, который идёт, пока загружается состояние; резерв делает его после promote."""
+    if config.tg_mode == "polling":
+        return asyncio.create_task(bot.delete_webhook()), None
+    return None, asyncio.create_task(bot.get_webhook_info())
+
+
+async def wait_for_promotion(standby: ReplicationStandby) -> None:
+    """Резерв: принимает поток репликации и ждёт SIGUSR1; HTTP и приём апдейтов — только после promote."""
+    if hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1,
+            lambda: threading.Thread(target=standby.promote, daemon=True, name="promote").start(),
+        )
+    logging.info("Резервный экземпляр: жду SIGUSR1 для promote")
+    # Ожидание короткими отрезками, как в poll_while_leader: поток executor'а не должен висеть вечно
+    while not await asyncio.to_thread(standby.wait_promoted, 1.0):
+        pass
+
+
+async def poll_while_leader(bot: AsyncTeleBot, elector: LeaderElector) -> None:
+    """Опрашивает Telegram, только пока реплика лидер; остальные реплики обслуживают HTTP и ждут.
+
+    При снятии лидерства опрос отменяется вместе с идущим запросом, а long poll короткий
+    (elector.poll_timeout_s): getUpdates, начатый до снятия, не держится на стороне Telegram 30 с.
+    """
+    # Ожидание короткими отрезками: поток executor'а не должен висеть вечно, иначе asyncio.run не завершится
+    while True:
+        while not await asyncio.to_thread(elector.wait_elected, 1.0):
+            pass
+        poller = asyncio.create_task(
+            bot.infinity_polling(
+                timeout=elector.poll_timeout_s,
+                request_timeout=elector.poll_timeout_s + 30,
+                allowed_updates=ALLOWED_UPDATES,
+            )
+        )
+        while not await asyncio.to_thread(elector.wait_demoted, 1.0):
+            pass
+        poller.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await poller
+        logging.info("Polling остановлен: реплика больше не лидер")
+
+
+async def main(config: AppConfig) -> None:
+    # SIGTERM отменяет main(): finally ниже закрывает приём и дожидается хэндлеров в пределах SHUTDOWN_TIMEOUT_S
+    task = asyncio.current_task()
+    assert task is not None
+    with contextlib.suppress(NotImplementedError):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+
+    lifecycle = Lifecycle(config.shutdown_timeout_s)
+    bot = telegram.build_async_bot(config)
+    # Запрос к Telegram идёт, пока в отдельном потоке загружается состояние; резерв спросит после promote
+    removed: asyncio.Task[bool] | None = None
+    webhook_info: asyncio.Task[WebhookInfo] | None = None
+    if config.replication_role != "standby":
+        removed, webhook_info = start_setup(bot, config)
+
+    with lifecycle.phase("context"):
+        app = await build_async_context(config, bot)
+
+    if config.tg_proxy:
+        logging.info("Прокси для Telegram: %s", config.tg_proxy)
+    else:
+        logging.info("Прокси для Telegram: не задан")
+    logging.info("Режим запуска: %s (asyncio)", config.tg_mode)
+
+    if app.elector is not None:
+        app.elector.start()
+    if app.replication is not None:
+        app.replication.start()
+    if isinstance(app.replication, ReplicationStandby):
+        with lifecycle.phase("standby"):
+            await wait_for_promotion(app.replication)
+        removed, webhook_info = start_setup(bot, config)
+    app.wheel.start()
+    app.retry.start()
+
+    runner = web.AppRunner(app.web_app, access_log_class=AccessLogger, shutdown_timeout=config.shutdown_timeout_s)
+    with lifecycle.phase("http"):
+        await runner.setup()
+        await web.TCPSite(runner, port=config.http_port).start()
+    logging.info("HTTP сервер запущен на порту %s", config.http_port)
+
+    try:
+        if removed is not None:
+            with lifecycle.phase("remove_webhook"):
+                await removed
+            lifecycle.startup_done()
+            if app.elector is None:
+                await bot.infinity_polling(timeout=30, request_timeout=60, allowed_updates=ALLOWED_UPDATES)
+            else:
+                await poll_while_leader(bot, app.elector)
+        else:
+            assert webhook_info is not None
+            # Вебхук не снимается при остановке и переустанавливается только при изменении
+            registration = WebhookRegistration(
+                config.webhook_url + "/webhook",
+                config.webhook_secret,
+                ALLOWED_UPDATES,
+                marker=config.state_file.with_name("webhook.json"),
+            )
+            with lifecycle.phase("webhook"):
+                if registration.needs_update(await webhook_info):
+                    await bot.set_webhook(
+                        url=registration.url,
+                        secret_token=registration.secret,
+                        allowed_updates=registration.allowed_updates,
+                    )
+                    registration.remember()
+                    logging.info("Webhook установлен: %s", registration.url)
+                else:
+                    logging.info("Webhook уже установлен: %s", registration.url)
+            lifecycle.startup_done()
+            await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        logging.info("Статистика маршрутов: %s", app.router.stats())
+        logging.info("Статистика кэша клавиатур: %s", app.deps.keyboards.stats())
+        await close_context(app)
+
+
+if __name__ == "__main__":
+    setup_logging()
+
+    try:
+        config = AppConfig.from_env()
+    except ConfigError as e:
+        logging.error("Ошибка конфигурации: %s", e)
+        sys.exit(1)
+
+    if config.tg_mode != "polling" and not config.webhook_url:
+        logging.error("WEBHOOK_URL не задан, запуск невозможен")
+        sys.exit(1)
+
+    try:
+        asyncio.run(main(config))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logging.info("Остановка бота...")